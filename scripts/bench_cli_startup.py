@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Benchmark the import time of short-lived CLI commands.
+
+Usage:
+    bench_cli_startup.py [-n 5] [--budget-ms 500]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _import_ms(args: list, cwd: str, env: dict, module: str = "") -> float:
+    """Cumulative import time of module (all top level modules if empty) with -X importtime."""
+    ret = subprocess.run([sys.executable, "-X", "importtime"] + args, cwd=cwd, env=env,
+                         capture_output=True, text=True, timeout=60, check=True)
+    total = 0
+    for line in ret.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line.split("|")
+        name = parts[2].strip()
+        try:
+            cumulative = int(parts[1].strip())
+        except ValueError:
+            continue  # header line
+        if name == module:
+            return cumulative / 1000.0
+        if not module and "." not in name:
+            total += cumulative
+    return total / 1000.0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="CLI startup benchmark")
+    parser.add_argument("-n", type=int, default=5, help="Runs per command")
+    parser.add_argument("--budget-ms", type=float, default=0, help="Fail if the median import of ucagent.cli exceeds it")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as home:
+        env = dict(os.environ, HOME=home, UC_BENCH_HOOK="continue")
+        cli = [_import_ms(["-c", "import ucagent.cli"], ROOT, env, "ucagent.cli") for _ in range(args.n)]
+        hook = [_import_ms([os.path.join(ROOT, "ucagent.py"), "--hook-message", "UC_BENCH_HOOK"], home, env)
+                for _ in range(args.n)]
+    print(f"{'import ucagent.cli':<24} p50 {statistics.median(cli):8.2f} ms   max {max(cli):8.2f} ms")
+    print(f"{'--hook-message imports':<24} p50 {statistics.median(hook):8.2f} ms   max {max(hook):8.2f} ms")
+    if args.budget_ms and statistics.median(cli) > args.budget_ms:
+        print(f"import ucagent.cli exceeds the budget of {args.budget_ms} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
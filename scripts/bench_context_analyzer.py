@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""Benchmark the per round cost of the incremental context analysis against history length.
+
+Usage:
+    bench_context_analyzer.py [--history 1000,10000,100000] [-n 1000]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from ucagent.interaction.advanced import ContextAnalyzer  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Incremental context analysis benchmark")
+    parser.add_argument("--history", default="1000,10000,100000", help="Comma separated history lengths")
+    parser.add_argument("-n", type=int, default=1000, help="Rounds per history length")
+    args = parser.parse_args()
+    new = ["tool: RunTestCases failed", "ai: maybe fix the error"]
+    for size in [int(v) for v in args.history.split(",")]:
+        history = [f"msg {i}" for i in range(size)]
+        analyzer = ContextAnalyzer()
+        analyzer.analyze_incremental("tips", history)
+        t = time.perf_counter()
+        for _ in range(args.n):
+            analyzer.analyze_incremental("tips", new)
+        inc_us = (time.perf_counter() - t) / args.n * 1e6
+        t = time.perf_counter()
+        ContextAnalyzer().analyze_context("tips", history + new)
+        full_us = (time.perf_counter() - t) * 1e6
+        print(f"history {size:>8}: incremental {inc_us:10.1f} us/round   full {full_us:12.1f} us")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
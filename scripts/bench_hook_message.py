@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Benchmark `ucagent --hook-message` latency with and without the hook server.
+
+Usage:
+    bench_hook_message.py [--workspace DIR] [--key 'continue|quit'] [-n 20]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from ucagent.util.hook_daemon import HookStatusServer  # noqa: E402
+
+
+def _run(workspace: str, key: str, n: int) -> list:
+    cmd = [sys.executable, os.path.join(ROOT, "ucagent.py"), "--hook-message", key]
+    ret = []
+    for _ in range(n):
+        t = time.perf_counter()
+        subprocess.run(cmd, cwd=workspace, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        ret.append((time.perf_counter() - t) * 1000)
+    return ret
+
+
+def _report(name: str, values: list):
+    values = sorted(values)
+    p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+    print(f"{name:<12} p50 {statistics.median(values):8.1f} ms   p95 {p95:8.1f} ms   max {values[-1]:8.1f} ms")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="--hook-message latency benchmark")
+    parser.add_argument("--workspace", default="", help="Workspace dir (default: a temp dir)")
+    parser.add_argument("--key", default="continue|quit", help="Hook key")
+    parser.add_argument("-n", type=int, default=20, help="Calls per mode")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        workspace = os.path.abspath(args.workspace or tmp)
+        _report("file path", _run(workspace, args.key, args.n))
+        server = HookStatusServer(workspace)
+        if not server.start():
+            print(f"Hook server of {workspace} is already running")
+            return 1
+        try:
+            _report("hook server", _run(workspace, args.key, args.n))
+        finally:
+            server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Benchmark render_template over the strings of the lang/zh configs, with and without the compile cache.
+
+Usage:
+    bench_template_render.py [-n 50]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import yaml
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import ucagent.util.functions as fc  # noqa: E402
+
+
+def _collect_strings(data, ret: list) -> list:
+    if isinstance(data, str):
+        ret.append(data)
+    elif isinstance(data, list):
+        for d in data:
+            _collect_strings(d, ret)
+    elif isinstance(data, dict):
+        for k, v in data.items():
+            ret.append(str(k))
+            _collect_strings(v, ret)
+    return ret
+
+
+def _render_uncached(template: str, kwargs: dict) -> str:
+    """render_template parsing the template on every call."""
+    if "{" not in template:
+        return template
+    key, parts = fc._compile_template.__wrapped__(template)
+    if key is not None:
+        return kwargs.get(key, template)
+    return "".join(p if isinstance(p, str) else str(kwargs.get(p[1], p[0])) for p in parts)
+
+
+def _time(func, strings: list, ctx: dict, n: int) -> float:
+    t = time.perf_counter()
+    for _ in range(n):
+        for s in strings:
+            func(s, ctx)
+    return (time.perf_counter() - t) / n * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="render_template benchmark")
+    parser.add_argument("-n", type=int, default=50, help="Rounds over all strings")
+    args = parser.parse_args()
+    strings = []
+    for f in sorted(glob.glob(os.path.join(ROOT, "ucagent/lang/zh/config/*.yaml"))):
+        with open(f, "r", encoding="utf-8") as fp:
+            _collect_strings(yaml.safe_load(fc.replace_bash_var(fp.read(), {})), strings)
+    ctx = {"DUT": "ALU", "OUT": "unity_test", "CURRENT_FILE_NAME": "a.md"}
+    print(f"{len(strings)} strings per round")
+    print(f"{'uncached':<12} {_time(_render_uncached, strings, ctx, args.n):8.3f} ms/round")
+    print(f"{'cached':<12} {_time(fc.render_template, strings, ctx, args.n):8.3f} ms/round")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Run `picker export` through the UCAgent DUT package cache.
+
+Usage:
+    picker_export.py [--config setting.yaml] [--verify] [--no-cache] export <picker export args>
+"""
+import argparse
+import os
+import sys
+
+import yaml
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ucagent.util.dut_cache import DutCache, picker_export_cached  # noqa: E402
+
+
+def _load_cache_config(config_path: str) -> dict:
+    if not config_path or not os.path.isfile(config_path):
+        return {}
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f) or {}
+    except Exception:
+        return {}
+    value = data.get("dut_cache", {}) if isinstance(data, dict) else {}
+    return value if isinstance(value, dict) else {}
+
+
+def main() -> int:
+    argv = sys.argv[1:]
+    if "export" not in argv:
+        print(__doc__, file=sys.stderr)
+        return 2
+    idx = argv.index("export")
+    parser = argparse.ArgumentParser(description="picker export with DUT package cache")
+    parser.add_argument("--config", default="", help="Config file with a dut_cache section")
+    parser.add_argument("--verify", action="store_true", help="Rebuild on cache hit and compare with the cached package")
+    parser.add_argument("--no-cache", action="store_true", help="Always run picker")
+    args = parser.parse_args(argv[:idx])
+    picker_parser = argparse.ArgumentParser(add_help=False)
+    picker_parser.add_argument("rtl_file")
+    picker_parser.add_argument("--sname", required=True)
+    picker_parser.add_argument("--tdir", required=True)
+    picker_parser.add_argument("--fs", default=None)
+    picker_args, flags = picker_parser.parse_known_args(argv[idx + 1:])
+    cfg = _load_cache_config(args.config)
+    if args.no_cache:
+        cfg["enable"] = False
+    cache = DutCache.from_config(cfg)
+    ret = picker_export_cached(picker_args.rtl_file, picker_args.sname, picker_args.tdir, flags,
+                               filelist=picker_args.fs, cache=cache, verify=args.verify,
+                               picker=os.environ.get("PICKER", "picker"))
+    print(f"picker export {picker_args.sname}: {ret['result']} in {ret['time']}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -142,6 +142,80 @@ def test_bash_script_timeout():
     assert "timed out" in str(result).lower(), "Expected timeout message"
 
 
+def test_bash_script_timeout_kills_children():
+    """Test that a timeout also stops the processes started by the script."""
+    print("\n=== Test: Bash Script Timeout Kills Children ===")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        pid_file = os.path.join(tmpdir, "pid")
+        checker = BashScriptChecker(
+            cmd="bash",
+            arguments=["-c", f"sleep 300 & echo $! > {pid_file}; sleep 300"],
+            timeout=1
+        )
+        passed, result = checker.do_check()
+        print(f"Passed: {passed}")
+        print(f"Result: {yam_str(result)}")
+        assert passed is False, "Expected command to timeout"
+        with open(pid_file) as f:
+            child = int(f.read())
+        assert not os.path.exists(f"/proc/{child}") or \
+            open(f"/proc/{child}/stat").read().rsplit(")", 1)[1].split()[0] == "Z", "Expected child to be killed"
+
+
+def test_bash_script_early_stop():
+    """Test that a matched fail pattern stops the command without waiting for it."""
+    print("\n=== Test: Bash Script Early Stop ===")
+    import time
+    checker = BashScriptChecker(
+        cmd="bash",
+        arguments=["-c", "echo 'Error: broken'; sleep 300"],
+        fail_pattern={"Error:": "Command encountered an error"},
+        timeout=60
+    )
+    start = time.time()
+    passed, result = checker.do_check()
+    print(f"Passed: {passed}")
+    print(f"Result: {yam_str(result)}")
+    assert passed is False and result["message"] == "Command encountered an error"
+    assert time.time() - start < 5, "Expected the command to be stopped early"
+    # a pass pattern only stops the command if stop_on_pass is set
+    checker = BashScriptChecker(
+        cmd="bash",
+        arguments=["-c", "echo 'All tests passed'; sleep 300"],
+        pass_pattern={"All tests passed": "ok"},
+        stop_on_pass=True,
+        timeout=60
+    )
+    passed, result = checker.do_check()
+    assert passed is True and result["message"] == "ok"
+    with tempfile.TemporaryDirectory() as tmpdir:
+        report = os.path.join(tmpdir, "report.txt")
+        checker = BashScriptChecker(
+            cmd="bash",
+            arguments=["-c", f"echo 'All tests passed'; sleep 0.5; echo done > {report}"],
+            pass_pattern={"All tests passed": "ok"},
+            timeout=60
+        )
+        passed, result = checker.do_check()
+        assert passed is True and os.path.exists(report), "Expected the script to run to completion"
+
+
+def test_bash_script_large_output():
+    """Test that a huge output is bounded and still matched."""
+    print("\n=== Test: Bash Script Large Output ===")
+    checker = BashScriptChecker(
+        cmd="bash",
+        arguments=["-c", "echo 'Warning: in the middle' >&2; for i in $(seq 1 100000); do echo \"line $i of the output\"; done"],
+        fail_pattern={"Warning: in the middle": "warned"},
+        early_stop=False
+    )
+    passed, result = checker.do_check()
+    assert passed is False and result["message"] == "warned"
+    checker.fail_pattern = {"^line 50000 of": "anchored"}
+    passed, result = checker.do_check()
+    assert passed is True, "Expected the anchored pattern not to match the whole output"
+
+
 def test_bash_script_with_script_file():
     """Test bash script execution from a temporary script file."""
     print("\n=== Test: Bash Script File Execution ===")
@@ -315,6 +389,9 @@ if __name__ == "__main__":
     test_bash_script_wildcard_pattern()
     test_bash_script_regex_pattern()
     test_bash_script_timeout()
+    test_bash_script_timeout_kills_children()
+    test_bash_script_early_stop()
+    test_bash_script_large_output()
     test_bash_script_with_script_file()
     test_bash_script_stderr_capture()
     test_bash_script_multiple_patterns()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test cases for workspace bootstrap utilities."""
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+import sys
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import stat
+import tempfile
+
+from ucagent.util.bootstrap import sync_dir, copy_file_fast
+import ucagent.util.functions as fc
+
+
+def _make_src(root):
+    src = os.path.join(root, "src")
+    os.makedirs(os.path.join(src, "sub"))
+    for name in ["a.md", "sub/b.py"]:
+        with open(os.path.join(src, name), "w") as f:
+            f.write(f"content of {name}\n")
+    return src
+
+
+def test_sync_dir_skips_unchanged_files():
+    with tempfile.TemporaryDirectory() as root:
+        src = _make_src(root)
+        dst = os.path.join(root, "ws", "Guide_Doc")
+        manifest = os.path.join(root, "ws", ".ucagent_bootstrap.json")
+        stats = sync_dir(src, dst, manifest)
+        assert stats["skipped"] == 0
+        assert stats["copy"] + stats["reflink"] == 2
+        assert open(os.path.join(dst, "sub/b.py")).read() == "content of sub/b.py\n"
+        # restart with read-only destination: nothing is copied
+        ro_files = fc.chmode_ro(os.path.join(root, "ws"), ["Guide_Doc"])
+        stats = sync_dir(src, dst, manifest)
+        assert stats["skipped"] == 2
+        # modified source is re-copied even though the tree is read-only
+        with open(os.path.join(src, "a.md"), "w") as f:
+            f.write("changed\n")
+        stats = sync_dir(src, dst, manifest)
+        assert stats["skipped"] == 1
+        assert open(os.path.join(dst, "a.md")).read() == "changed\n"
+        fc.chmode_rw(ro_files)
+
+
+def test_sync_dir_into_read_only_tree():
+    with tempfile.TemporaryDirectory() as root:
+        src = _make_src(root)
+        dst = os.path.join(root, "ws", "Guide_Doc")
+        manifest = os.path.join(root, "ws", ".ucagent_bootstrap.json")
+        sync_dir(src, dst, manifest)
+        # a crashed run left Guide_Doc read-only, the source gained a nested dir
+        fc.chmode_ro(os.path.join(root, "ws"), ["Guide_Doc"])
+        os.makedirs(os.path.join(src, "sub", "new"))
+        with open(os.path.join(src, "sub", "new", "c.md"), "w") as f:
+            f.write("c\n")
+        os.remove(os.path.join(src, "a.md"))
+        stats = sync_dir(src, dst, manifest)
+        assert stats["skipped"] == 1 and stats["removed"] == 1
+        for d in [dst, os.path.join(dst, "sub")]:
+            assert os.stat(d).st_mode & stat.S_IWUSR
+        assert open(os.path.join(dst, "sub", "new", "c.md")).read() == "c\n"
+        assert not os.path.exists(os.path.join(dst, "a.md"))
+
+
+def test_sync_dir_removes_docs_of_old_source():
+    with tempfile.TemporaryDirectory() as root:
+        src = _make_src(root)
+        other = os.path.join(root, "other")
+        os.makedirs(os.path.join(other, "x"))
+        with open(os.path.join(other, "x", "d.md"), "w") as f:
+            f.write("d\n")
+        dst = os.path.join(root, "ws", "Guide_Doc")
+        manifest = os.path.join(root, "ws", ".ucagent_bootstrap.json")
+        sync_dir(src, dst, manifest)
+        with open(os.path.join(dst, "notes.md"), "w") as f:  # not synced, kept
+            f.write("mine\n")
+        stats = sync_dir(other, dst, manifest)
+        assert stats["removed"] == 2
+        assert sorted(os.listdir(dst)) == ["notes.md", "x"]
+
+
+def test_chmode_ro_single_pass():
+    with tempfile.TemporaryDirectory() as root:
+        _make_src(root)
+        ro_files = fc.chmode_ro(root, ["src"])
+        assert len(ro_files) == 4  # 2 files + sub + src
+        for p in ro_files:
+            assert not os.stat(p).st_mode & stat.S_IWUSR
+        fc.chmode_rw(ro_files)
+        for p in ro_files:
+            assert os.stat(p).st_mode & stat.S_IWUSR
+
+
+def test_hardlink_mode_keeps_source_mode():
+    with tempfile.TemporaryDirectory() as root:
+        src = _make_src(root)
+        dst = os.path.join(root, "ws", "Guide_Doc")
+        stats = sync_dir(src, dst, os.path.join(root, "ws", ".manifest.json"), mode="hardlink")
+        if stats["hardlink"] == 0:
+            return  # filesystem without hardlink support
+        src_mode = os.stat(os.path.join(src, "a.md")).st_mode
+        ro_files = fc.chmode_ro(os.path.join(root, "ws"), ["Guide_Doc"], skip_links=True)
+        assert os.stat(os.path.join(src, "a.md")).st_mode == src_mode
+        assert os.path.join(dst, "a.md") not in ro_files
+        fc.chmode_rw(ro_files)
+
+
+def test_copy_file_fast_plain_copy():
+    with tempfile.TemporaryDirectory() as root:
+        src = _make_src(root)
+        dst = os.path.join(root, "copy.md")
+        assert copy_file_fast(os.path.join(src, "a.md"), dst, mode="copy") == "copy"
+        assert open(dst).read() == "content of a.md\n"
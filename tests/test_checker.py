@@ -118,6 +118,51 @@ def test_checker_line_coverage():
     print(yam_str(m))
 
 
+def test_batch_file_process_incremental():
+    """BatchFileProcess only re-validates new/modified files and resumes its progress."""
+    import tempfile
+    from ucagent.checkers.file_markdown import BatchFileProcess
+
+    class CountFileCheck(BatchFileProcess):
+        def __init__(self, *a, **kw):
+            super().__init__(*a, **kw)
+            self.checked = []
+
+        def do_one_file_check(self, file_path):
+            self.checked.append(file_path)
+            return "bad" not in open(self.get_path(file_path)).read(), f"{file_path} is bad"
+
+    with tempfile.TemporaryDirectory() as workspace:
+        for i in range(5):
+            with open(os.path.join(workspace, f"doc_{i}.md"), "w") as f:
+                f.write(f"# doc {i}\n")
+        checker = CountFileCheck("docs", "doc_*.md", batch_size=2).set_workspace(workspace)
+        checker.on_init()
+        assert checker.batch_task.tbd_task_list == ["doc_0.md", "doc_1.md"]
+        results = [checker.do_check()[0] for _ in range(3)]
+        assert results == [False, False, True]
+        assert sorted(checker.checked) == [f"doc_{i}.md" for i in range(5)]
+        # nothing changed: no file is validated again
+        checker.checked.clear()
+        assert checker.do_check(is_complete=True)[0]
+        assert checker.checked == []
+        # restart: progress is resumed, only the modified file is re-validated
+        with open(os.path.join(workspace, "doc_3.md"), "a") as f:
+            f.write("bad\n")
+        checker = CountFileCheck("docs", "doc_*.md", batch_size=2).set_workspace(workspace)
+        checker.on_init()
+        assert len(checker.batch_task.gen_task_list) == 5
+        p, m = checker.do_check(is_complete=True)
+        assert not p and checker.checked == ["doc_3.md"]
+        # the stage starts over (--no-history): the progress is dropped, files are validated from the start
+        checker = CountFileCheck("docs", "doc_*.md", batch_size=5).set_workspace(workspace)
+        checker.on_reset()
+        assert not os.path.exists(os.path.join(workspace, checker.progress_file))
+        checker.on_init()
+        assert checker.batch_task.gen_task_list == []
+        assert not checker.do_check()[0] and checker.checked == [f"doc_{i}.md" for i in range(4)]
+
+
 if __name__ == "__main__":
     #test_markdown_checker()
     #test_checker_functions_and_checks()
@@ -126,3 +171,4 @@ if __name__ == "__main__":
     #test_checker_test_case()
     #test_checker_api_test()
     test_checker_line_coverage()
+    test_batch_file_process_incremental()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test cases for the light imports of short-lived CLI commands (timings: scripts/bench_cli_startup.py)."""
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+import sys
+import subprocess
+import tempfile
+
+project_dir = os.path.abspath(os.path.join(current_dir, ".."))
+
+# Top-level packages that must never be loaded by the hook/check paths
+HEAVY_MODULES = ["langchain", "langchain_core", "langgraph", "langmem", "mem0",
+                 "urwid", "git", "mcp", "langfuse", "openai", "toffee"]
+
+
+def run_importtime(args, cwd, env=None):
+    """Run python with -X importtime and return (stdout, {module: cumulative_us})."""
+    ret = subprocess.run([sys.executable, "-X", "importtime"] + args,
+                         cwd=cwd, env=env, capture_output=True, text=True, timeout=60)
+    modules = {}
+    for line in ret.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line.split("|")
+        try:
+            cumulative = int(parts[1].strip())
+        except ValueError:
+            continue  # header line
+        modules[parts[2].strip()] = cumulative
+    return ret, modules
+
+
+def assert_no_heavy_modules(modules):
+    loaded = [m for m in modules if m.split(".")[0] in HEAVY_MODULES]
+    assert not loaded, f"Heavy modules imported on a fast path: {loaded}"
+
+
+def test_cli_import_is_light():
+    """Importing ucagent.cli must not load the agent or heavy dependencies."""
+    ret, modules = run_importtime(["-c", "import ucagent.cli"], project_dir)
+    assert ret.returncode == 0, ret.stderr
+    assert_no_heavy_modules(modules)
+    assert "ucagent.verify_agent" not in modules
+
+
+def test_hook_message_fast_path():
+    """--hook-message answers without building the parser or VerifyAgent."""
+    with tempfile.TemporaryDirectory() as home:
+        env = os.environ.copy()
+        env["HOME"] = home
+        env["UC_TEST_HOOK_CONTINUE"] = "continue the verification"
+        ret, modules = run_importtime([os.path.join(project_dir, "ucagent.py"),
+                                       "--hook-message", "UC_TEST_HOOK_CONTINUE"],
+                                      home, env)
+        assert ret.returncode == 0, ret.stderr
+        assert ret.stdout.strip() == "continue the verification"
+        assert_no_heavy_modules(modules)
+        assert "ucagent.verify_agent" not in modules
+
+
+if __name__ == "__main__":
+    test_cli_import_is_light()
+    test_hook_message_fast_path()
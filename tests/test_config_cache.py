@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test cases for the config flat lookup map, the merged config cache and shared snapshots."""
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+import sys
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import subprocess
+
+import pytest
+
+from ucagent.util.config import Config, get_config, load_config_snapshot, share_config_snapshot, CONFIG_SNAPSHOT_ENV
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("UCAGENT_CONFIG_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("UCAGENT_CONFIG_CACHE", "1")
+    return tmp_path / "cache"
+
+
+def test_flat_lookup_semantics():
+    cfg = Config({"a": {"b": {"c": 1}, "l": ["1", "2"]}, "_temp_cfg": {"DUT": "Adder"}})
+    for frozen in (False, True):
+        if frozen:
+            cfg.freeze()
+        assert cfg.get_value("a.b.c") == 1
+        assert cfg.get_value("a.b").as_dict() == {"c": 1}
+        assert cfg.get_value("a.x", "d") == "d"
+        assert cfg.get_value("_temp_cfg").get_value("DUT") == "Adder"
+        with pytest.raises(AttributeError):
+            cfg.get_value("x.y")
+    assert "_flat" not in cfg.as_dict()
+    cfg.get_value("a.l").append("3")  # lists stay shared with the map
+    assert cfg.get_value("a.l") == ["1", "2", "3"]
+    cfg.update_template({})
+    cfg.un_freeze()
+    cfg.set_value("a.b", Config({"c": 2}))
+    cfg.freeze()
+    assert cfg.get_value("a.b.c") == 2
+    other = Config({"z": 1}).merge_from(cfg)
+    assert "_flat" not in other.__dict__
+
+
+def test_config_cache_hit_and_invalidation(cache_dir, tmp_path, monkeypatch):
+    work = tmp_path / "work"
+    work.mkdir()
+    (work / "config.yaml").write_text("hooks:\n  go_on: '$(UC_TEST_GO_ON: default)'\n")
+    monkeypatch.setenv("UCAGENT_CONFIG_CACHE", "0")
+    expected = get_config(search_dir=str(work)).as_dict()
+    monkeypatch.setenv("UCAGENT_CONFIG_CACHE", "1")
+    get_config(search_dir=str(work))
+    get_config(search_dir=str(work))  # second user config pass creates ~/.ucagent/setting.yaml
+    files = set(os.listdir(cache_dir))
+    cfg = get_config(search_dir=str(work), cfg_override={"lang": "en"})
+    assert set(os.listdir(cache_dir)) == files  # cache hit
+    assert cfg.get_value("lang") == "en"
+    cfg = get_config(search_dir=str(work))
+    assert cfg.as_dict() == expected and cfg.get_value("hooks.go_on") == "default"
+    monkeypatch.setenv("UC_TEST_GO_ON", "from env")
+    assert get_config(search_dir=str(work)).get_value("hooks.go_on") == "from env"
+    (work / "config.yaml").write_text("hooks:\n  go_on: 'edited'\n")
+    assert get_config(search_dir=str(work)).get_value("hooks.go_on") == "edited"
+
+
+
+def test_config_cache_holds_no_env_values(cache_dir, tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-secret-test-key")
+    monkeypatch.setenv("UC_TEST_FLAG", "true")
+    (tmp_path / "config.yaml").write_text("hooks:\n  flag: $(UC_TEST_FLAG: false)\n  url: 'http://$(UC_TEST_HOST: h):1'\n")
+    cache_dir.mkdir()
+    (cache_dir / "0123abcd.json").write_text("{}")  # entry of an older version
+    expected = get_config(search_dir=str(tmp_path)).as_dict()
+    assert expected["openai"]["openai_api_key"] == "sk-secret-test-key"
+    files = os.listdir(cache_dir)
+    assert len(files) == 1 and files[0].startswith("v")
+    assert "sk-secret-test-key" not in (cache_dir / files[0]).read_text()
+    cfg = get_config(search_dir=str(tmp_path))  # cache hit, substituted on load
+    assert os.listdir(cache_dir) == files and cfg.as_dict() == expected
+    assert cfg.get_value("hooks.flag") is True and cfg.get_value("hooks.url") == "http://h:1"
+
+
+def test_config_cache_miss_parses_once(cache_dir, tmp_path, monkeypatch):
+    import ucagent.util.config as config
+    monkeypatch.setenv("UCAGENT_CONFIG_CACHE", "0")
+    get_config(search_dir=str(tmp_path))  # may create ~/.ucagent/setting.yaml, part of the key
+    monkeypatch.setenv("UCAGENT_CONFIG_CACHE", "1")
+    loads = []
+    load_config_files = config.load_config_files
+    monkeypatch.setattr(config, "load_config_files", lambda *a, **kw: loads.append(a) or load_config_files(*a, **kw))
+    expected = get_config(search_dir=str(tmp_path)).as_dict()  # miss
+    assert len(loads) == 1
+    assert get_config(search_dir=str(tmp_path)).as_dict() == expected and len(loads) == 1  # hit
+
+
+def test_shared_snapshot_in_subprocess(cache_dir, tmp_path, monkeypatch):
+    cfg = get_config(cfg_override={"lang": "en"})
+    monkeypatch.delenv(CONFIG_SNAPSHOT_ENV, raising=False)
+    assert load_config_snapshot() is None
+    path = share_config_snapshot(cfg, str(tmp_path / "snapshot.json"))
+    assert os.environ[CONFIG_SNAPSHOT_ENV] == path
+    code = ("import sys; sys.path.insert(0, %r)\n"
+            "from ucagent.util.config import load_config_snapshot\n"
+            "cfg = load_config_snapshot()\n"
+            "print(cfg.get_value('lang'), cfg.get_value('template'))") % os.path.join(current_dir, "..")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert out.split() == ["en", cfg.get_value("template")]
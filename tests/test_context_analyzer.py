@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test cases for the incremental context analysis of the advanced interaction mode."""
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+import sys
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import random
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from ucagent.interaction.advanced import ContextAnalyzer, AdvancedInteractionLogic
+
+
+WORDS = ["tool: RunTestCases", "error in test", "maybe unclear", "pass", "complex design",
+         "simple step", "ai: check coverage", "tool: ReadTextFile", "all tests completed"]
+
+
+def test_incremental_matches_full_analysis():
+    rng = random.Random(5)
+    full, inc = ContextAnalyzer(), ContextAnalyzer()
+    history = []
+    for r in range(60):
+        new = [" ".join(rng.choices(WORDS, k=2)) for _ in range(rng.randint(0, 4))]
+        history.extend(new)
+        tips = f"verify the design, round {r}"
+        assert inc.analyze_incremental(tips, new) == full.analyze_context(tips, list(history))
+
+
+def test_incremental_state_is_bounded():
+    """The per round work depends on the new messages only, timings: scripts/bench_context_analyzer.py."""
+    analyzer = ContextAnalyzer()
+    new = ["tool: RunTestCases failed", "ai: maybe fix the error"]
+    analyzer.analyze_incremental("tips", [f"msg {i}" for i in range(200000)])
+    features = analyzer.features
+    assert len(features.recent) == 5 and len(features.message_digests) == features.message_digests.max_size
+    for _ in range(1000):
+        analysis = analyzer.analyze_incremental("tips", new)
+    assert analysis["tool_usage_patterns"]["tool_calls"] == 1000
+    assert len(features.recent) == 5 and len(features.message_digests) == features.message_digests.max_size
+    assert features.message_count == 202000 and features.unique_count == 200002
+
+
+class _Msg:
+    def __init__(self, id, type, content):
+        self.id, self.type, self.content = id, type, content
+
+
+class _Agent:
+    def __init__(self):
+        self.messages = []
+
+    def messages_get_raw(self):
+        return list(self.messages)
+
+
+def test_new_message_history():
+    logic = AdvancedInteractionLogic(_Agent())
+    logic.agent.messages = [_Msg("a", "human", "start"), _Msg("b", "ai", "ok")]
+    assert logic._get_new_message_history() == ["human: start", "ai: ok"]
+    assert logic._get_new_message_history() == []
+    # old messages removed by summary, only the appended ones are new
+    logic.agent.messages = logic.agent.messages[1:] + [_Msg("c", "tool", "done")]
+    assert logic._get_new_message_history() == ["tool: done"]
+
+
+def test_repeated_messages_without_id():
+    logic = AdvancedInteractionLogic(_Agent())
+    logic.agent.messages = [_Msg(None, "tool", "ok"), _Msg(None, "ai", "retry")]
+    assert logic._get_new_message_history() == ["tool: ok", "ai: retry"]
+    # identical id-less messages appended again are new
+    logic.agent.messages += [_Msg(None, "tool", "ok"), _Msg(None, "ai", "retry")]
+    assert logic._get_new_message_history() == ["tool: ok", "ai: retry"]
+    assert logic._get_new_message_history() == []
+
+
+class _CountingMsg(_Msg):
+    reads = 0
+
+    @property
+    def content(self):
+        _CountingMsg.reads += 1
+        return self._content
+
+    @content.setter
+    def content(self, value):
+        self._content = value
+
+
+def test_new_message_history_reads_only_new_messages():
+    logic = AdvancedInteractionLogic(_Agent())
+    logic.agent.messages = [_CountingMsg(None, "tool", f"out {i}") for i in range(1000)]
+    assert len(logic._get_new_message_history()) == 1000
+    logic.agent.messages.append(_CountingMsg(None, "ai", "next"))
+    _CountingMsg.reads = 0
+    assert logic._get_new_message_history() == ["ai: next"]
+    assert _CountingMsg.reads <= 4
+    # the first messages summarized away, the appended ones are still the only new ones
+    logic.agent.messages = [_CountingMsg(None, "ai", "summary")] + logic.agent.messages[500:] + \
+        [_CountingMsg(None, "tool", "done")]
+    assert logic._get_new_message_history() == ["tool: done"]
+
+
+def test_message_digests_bounded():
+    analyzer = ContextAnalyzer()
+    analyzer.features.message_digests.max_size = 100
+    analyzer.analyze_incremental("tips", [f"msg {i}" for i in range(1000)] + ["msg 999"] * 10)
+    assert len(analyzer.features.message_digests) == 100
+    assert analyzer.features.unique_count == 1000
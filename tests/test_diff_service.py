@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test cases for the batched git diff service."""
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+import sys
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import subprocess
+import tempfile
+
+from ucagent.util.diff_service import DiffService, paginate_diff
+from ucagent.util.result_pages import ResultPageStore
+from ucagent.util.tool_output import ToolOutputStore
+
+
+def _git(path, *args):
+    subprocess.run(["git", "-C", path, "-c", "user.name=test", "-c", "user.email=test@test",
+                    *args], check=True, capture_output=True)
+
+
+def _make_repo(root, nfiles):
+    _git(root, "init", "-q")
+    for i in range(nfiles):
+        with open(os.path.join(root, f"f{i}.py"), "w") as f:
+            f.write(f"a = {i}\n")
+    _git(root, "add", "-A")
+    _git(root, "commit", "-q", "-m", "init")
+    for i in range(nfiles):
+        with open(os.path.join(root, f"f{i}.py"), "a") as f:
+            f.write(f"b = {i}\n")
+    with open(os.path.join(root, "new.md"), "w") as f:
+        f.write("new\n")
+
+
+def test_diff_single_subprocess_and_cache():
+    with tempfile.TemporaryDirectory() as root:
+        _make_repo(root, 120)
+        service = DiffService(root)
+        status = service.status()
+        assert len(status["modified"]) == 120
+        assert status["untracked"] == ["new.md"]
+        calls = service.stat_git_calls
+        data = service.diff(".", status["modified"])
+        assert service.stat_git_calls == calls + 1
+        assert len(data) == 120
+        assert data["f7.py"]["added"] == "1"
+        assert "+b = 7" in data["f7.py"]["patch"]
+        # unchanged tree: served from cache
+        service.diff(".", status["modified"])
+        assert service.stat_git_calls == calls + 1
+        assert service.stat_cache_hits == 1
+        # modified file invalidates the cached diff
+        with open(os.path.join(root, "f7.py"), "a") as f:
+            f.write("c = 7\n")
+        data = service.diff(".", service.status()["modified"])
+        assert data["f7.py"]["added"] == "2"
+        # committing changes HEAD/index
+        _git(root, "add", "-A")
+        _git(root, "commit", "-q", "-m", "update")
+        assert service.is_dirty()[0] is False
+        assert len(service.diff(".")) == 0
+
+
+def test_paginate_diff():
+    with tempfile.TemporaryDirectory() as root:
+        _make_repo(root, 30)
+        data = DiffService(root).diff(".")
+        text, count = paginate_diff(data, page=1, max_chars=1000)
+        assert count > 1
+        assert len(text) <= 1000
+        pages = [paginate_diff(data, page=p, max_chars=1000)[0] for p in range(1, count + 1)]
+        assert sum(p.count("Diff for ") for p in pages) == 30
+        # pages out of range are clamped
+        assert paginate_diff(data, page=count + 5, max_chars=1000)[0] == pages[-1]
+
+
+def test_internal_files_not_untracked():
+    with tempfile.TemporaryDirectory() as root:
+        _make_repo(root, 1)
+        _git(root, "add", "-A")
+        _git(root, "commit", "-q", "-m", "update")
+        store = ToolOutputStore(os.path.join(root, ".ucagent_tool_outputs"))
+        store.save("RunTestCases", "x" * 100)
+        ResultPageStore(os.path.join(root, ".ucagent_mcp_results"), page_chars=1024).put("Tool", "y" * 3000)
+        with open(os.path.join(root, ".ucagent_info.json"), "w") as f:
+            f.write("{}")
+        # the spill directories ignore themselves, the status filter covers the rest
+        out = subprocess.run(["git", "-C", root, "status", "--porcelain"], capture_output=True, text=True).stdout
+        assert out.strip() == "?? .ucagent_info.json"
+        assert DiffService(root).is_dirty() == (False, {"staged": [], "modified": [], "untracked": []})
+        with open(os.path.join(root, "new.py"), "w") as f:
+            f.write("c = 1\n")
+        assert DiffService(root).status()["untracked"] == ["new.py"]
+
+
+def test_paths_with_separator_and_worktree():
+    with tempfile.TemporaryDirectory() as root:
+        repo = os.path.join(root, "repo")
+        os.makedirs(os.path.join(repo, "x b"))
+        for name in ("x b/y.py", "gone.py", "space name.py"):
+            with open(os.path.join(repo, name), "w") as f:
+                f.write("a = 1\n")
+        _git(repo, "init", "-q")
+        _git(repo, "add", "-A")
+        _git(repo, "commit", "-q", "-m", "init")
+        for name in ("x b/y.py", "space name.py"):
+            with open(os.path.join(repo, name), "a") as f:
+                f.write("b = 2\n")
+        os.remove(os.path.join(repo, "gone.py"))
+        data = DiffService(repo).diff(".")
+        assert sorted(data) == ["gone.py", "space name.py", "x b/y.py"]
+        assert all(item["patch"] for item in data.values())
+        # linked worktree: .git is a file, HEAD/index are in the worktree git dir
+        tree = os.path.join(root, "tree")
+        _git(repo, "worktree", "add", "-q", "-b", "side", tree)
+        service = DiffService(tree)
+        assert os.path.isfile(os.path.join(tree, ".git"))
+        assert service._state_key()[0] == "ref: refs/heads/side"
+        with open(os.path.join(tree, "gone.py"), "a") as f:
+            f.write("c = 3\n")
+        assert list(service.diff(".")) == ["gone.py"]
+        _git(tree, "commit", "-q", "-am", "side")
+        assert len(service.diff(".")) == 0
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test cases for the chunked Guide_Doc vector index."""
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+import sys
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import json
+
+from ucagent.util.doc_index import DocIndex, HashingEmbedder, split_markdown, split_python, split_verilog
+
+MD = """# Guide
+
+Intro text.
+
+## Coverage
+
+Functional coverage groups are defined with CovGroup and watch points.
+
+```python
+# not a heading
+```
+
+## Assertions
+
+Use assert with a message to check the DUT outputs.
+"""
+
+PY = '''import os
+
+
+def helper(a):
+    return a + 1
+
+
+class Env:
+    def setup(self):
+        pass
+'''
+
+SV = """`timescale 1ns/1ps
+module adder(input a, input b, output s);
+  function f;
+    input x;
+    f = x;
+  endfunction
+  assign s = a ^ b;
+endmodule
+
+module top;
+endmodule
+"""
+
+
+class CountingEmbedder(HashingEmbedder):
+
+    def __init__(self):
+        super().__init__(dims=64)
+        self.embedded = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+
+def _lines(text, chunk):
+    return "".join(text.splitlines(keepends=True)[chunk["start_line"] - 1:chunk["end_line"]])
+
+
+def test_splitters_anchor_lines():
+    chunks = split_markdown(MD, min_chars=0)
+    assert [c["title"] for c in chunks] == ["Guide", "Guide > Coverage", "Guide > Assertions"]
+    assert all(_lines(MD, c) == c["text"] for c in chunks)
+    assert "# not a heading" in chunks[1]["text"]
+    assert len(split_markdown(MD, min_chars=1000)) == 1
+    assert all(len(c["text"]) <= 80 for c in split_markdown(MD, max_chars=80, min_chars=0))
+    py = split_python(PY, min_chars=0)
+    assert [c["title"] for c in py] == ["", "helper", "Env"] and all(_lines(PY, c) == c["text"] for c in py)
+    assert [c["title"] for c in split_python(PY, max_chars=30, min_chars=0)][-1] == "Env.setup"
+    sv = split_verilog(SV, min_chars=0)
+    assert [c["title"] for c in sv] == ["", "adder", "top"]
+    assert sv[1]["start_line"] == 2 and sv[1]["end_line"] == 8
+
+
+def test_index_search_persist_and_rebuild(tmp_path):
+    doc = tmp_path / "Guide_Doc"
+    doc.mkdir()
+    (doc / "guide.md").write_text(MD)
+    (doc / "env.py").write_text(PY)
+    (doc / "notes.txt").write_text("not indexed")
+    index_dir = str(tmp_path / ".ucagent_doc_index")
+    emb = CountingEmbedder()
+    index = DocIndex(emb, index_dir, min_chars=0).build(str(doc), base_dir=str(tmp_path))
+    assert index.stats["files"] == 2 and emb.embedded == index.stats["chunks"] == 6
+    hit = index.search("functional coverage groups watch points", k=2)[0]
+    assert hit["anchor"] == "Guide_Doc/guide.md:5-12" and hit["title"] == "Guide > Coverage"
+    assert len(index.search("assert", k=100)) == 6
+    # a new index loads the vectors, only the changed file is embedded again
+    (doc / "env.py").write_text(PY + "\n\ndef extra():\n    pass\n")
+    emb2 = CountingEmbedder()
+    index2 = DocIndex(emb2, index_dir, min_chars=0).build(str(doc), base_dir=str(tmp_path))
+    assert emb2.embedded == 4 and index2.stats["reused"] == 3
+    assert index2.search("functional coverage groups watch points", k=1)[0]["anchor"] == hit["anchor"]
+    files = os.listdir(index_dir)
+    assert len([f for f in files if f.startswith("vectors-")]) == 1
+    with open(os.path.join(index_dir, "index.json")) as f:
+        assert json.load(f)["files"]["Guide_Doc/env.py"]["count"] == 4
+    # another embedder key invalidates the persisted vectors
+    emb3 = CountingEmbedder()
+    DocIndex(emb3, index_dir, model_key="other", min_chars=0).build(str(doc), base_dir=str(tmp_path))
+    assert emb3.embedded == 7
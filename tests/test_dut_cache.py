@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test cases for the picker export DUT package cache."""
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+import sys
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import subprocess
+import textwrap
+
+from ucagent.util.dut_cache import DutCache, ensure_dut_package, picker_export_cached
+
+
+FAKE_PICKER = textwrap.dedent("""\
+    #!{python}
+    import os, sys
+    if sys.argv[1] == "--version":
+        print("picker 0.9-test")
+        sys.exit(0)
+    args = sys.argv[2:]
+    sname, tdir = args[args.index("--sname") + 1], args[args.index("--tdir") + 1]
+    with open(os.path.join(os.path.dirname(sys.argv[0]), "calls"), "a") as f:
+        f.write("x")
+    pkg = os.path.join(tdir, sname)
+    os.makedirs(os.path.join(pkg, "lib"), exist_ok=True)
+    src = open(args[0]).read()
+    with open(os.path.join(pkg, "__init__.py"), "w") as f:
+        f.write("# built from\\n" + src)
+    with open(os.path.join(pkg, "lib", "libDUT.so"), "wb") as f:
+        f.write(src.encode() * 100)
+""")
+
+
+def _setup(tmp_path):
+    picker = tmp_path / "bin" / "picker"
+    picker.parent.mkdir()
+    picker.write_text(FAKE_PICKER.format(python=sys.executable))
+    picker.chmod(0o755)
+    rtl = tmp_path / "ws" / "Adder_RTL" / "Adder.v"
+    rtl.parent.mkdir(parents=True)
+    rtl.write_text("module Adder(); endmodule\n")
+    return str(picker), str(rtl), str(tmp_path / "ws")
+
+
+def _calls(picker):
+    path = os.path.join(os.path.dirname(picker), "calls")
+    return len(open(path).read()) if os.path.exists(path) else 0
+
+
+def test_export_hit_miss_and_restore(tmp_path):
+    picker, rtl, ws = _setup(tmp_path)
+    cache = DutCache(cache_dir=str(tmp_path / "cache"), max_entries=2, copy_mode="hardlink")
+    flags = ["--rw", "1", "-c"]
+    assert picker_export_cached(rtl, "Adder", ws, flags, cache=cache, picker=picker)["result"] == "miss"
+    built = open(os.path.join(ws, "Adder", "lib", "libDUT.so"), "rb").read()
+    # a second workspace with the same RTL is restored, picker is not run
+    ws2 = str(tmp_path / "ws2")
+    ret = picker_export_cached(rtl, "Adder", ws2, flags, cache=cache, picker=picker)
+    assert ret["result"] == "hit" and _calls(picker) == 1
+    assert open(os.path.join(ws2, "Adder", "lib", "libDUT.so"), "rb").read() == built
+    # different flags or RTL are different keys
+    assert picker_export_cached(rtl, "Adder", ws2, ["--rw", "0"], cache=cache, picker=picker)["result"] == "miss"
+    with open(rtl, "a") as f:
+        f.write("// changed\n")
+    assert picker_export_cached(rtl, "Adder", ws2, flags, cache=cache, picker=picker)["result"] == "miss"
+    assert _calls(picker) == 3
+    # the rebuild over the hardlinked restore did not write into the cache
+    assert all(cache.verify_entry(key)[0] for key, _, _ in cache.entries())
+    assert cache.get_statistics()["entries"] == 2  # LRU eviction
+    # verify mode rebuilds and compares
+    ret = picker_export_cached(rtl, "Adder", ws, flags, cache=cache, picker=picker, verify=True)
+    assert ret["result"] == "hit" and ret["diffs"] == []
+
+
+def test_ensure_package_and_corruption(tmp_path):
+    picker, rtl, ws = _setup(tmp_path)
+    cache = DutCache(cache_dir=str(tmp_path / "cache"), copy_mode="copy")
+    picker_export_cached(rtl, "Adder", ws, ["-c"], cache=cache, picker=picker)
+    pkg_init = os.path.join(ws, "Adder", "__init__.py")
+    assert ensure_dut_package(ws, "Adder", cache) is None  # intact
+    os.chmod(pkg_init, 0o644)
+    with open(pkg_init, "w") as f:
+        f.write("broken")
+    assert ensure_dut_package(ws, "Adder", cache) is not None
+    assert open(pkg_init).read().startswith("# built from")
+    # a corrupted cache entry is dropped instead of restored
+    key = cache.entries()[0][0]
+    lib = os.path.join(cache.entry_dir(key), "pkg", "lib", "libDUT.so")
+    os.chmod(lib, 0o644)
+    with open(lib, "ab") as f:
+        f.write(b"x")
+    assert cache.restore(key, os.path.join(ws, "Adder")) is None
+    assert cache.entries() == []
+
+
+def test_ensure_package_keeps_extra_files(tmp_path):
+    picker, rtl, ws = _setup(tmp_path)
+    cache = DutCache(cache_dir=str(tmp_path / "cache"), copy_mode="copy")
+    picker_export_cached(rtl, "Adder", ws, ["-c"], cache=cache, picker=picker)
+    pkg = os.path.join(ws, "Adder")
+    # files copied in after the export (make init_%) are not package changes
+    with open(os.path.join(pkg, "README.md"), "w") as f:
+        f.write("readme")
+    assert ensure_dut_package(ws, "Adder", cache) is None
+    os.remove(os.path.join(pkg, "lib", "libDUT.so"))
+    stats = ensure_dut_package(ws, "Adder", cache)
+    assert stats["copy"] == 1 and stats["kept"] >= 1
+    assert os.path.exists(os.path.join(pkg, "lib", "libDUT.so"))
+    assert open(os.path.join(pkg, "README.md")).read() == "readme"
+    # a read-only package dir with intact files is left alone
+    os.chmod(pkg, 0o555)
+    try:
+        assert ensure_dut_package(ws, "Adder", cache) is None
+    finally:
+        os.chmod(pkg, 0o755)
+
+
+def test_restored_copy_is_private(tmp_path):
+    picker, rtl, ws = _setup(tmp_path)
+    cache = DutCache(cache_dir=str(tmp_path / "cache"))
+    picker_export_cached(rtl, "Adder", ws, ["-c"], cache=cache, picker=picker)
+    ws2 = str(tmp_path / "ws2")
+    assert picker_export_cached(rtl, "Adder", ws2, ["-c"], cache=cache, picker=picker)["result"] == "hit"
+    lib = os.path.join(ws2, "Adder", "lib", "libDUT.so")
+    # the default restore does not share inodes, writes stay out of the cache entry
+    assert os.stat(lib).st_nlink == 1 and os.access(lib, os.W_OK)
+    with open(lib, "ab") as f:
+        f.write(b"x")
+    assert all(cache.verify_entry(key)[0] for key, _, _ in cache.entries())
+
+
+def test_ensure_package_skips_hashing_when_unchanged(tmp_path, monkeypatch):
+    import ucagent.util.dut_cache as dut_cache
+    picker, rtl, ws = _setup(tmp_path)
+    cache = DutCache(cache_dir=str(tmp_path / "cache"), copy_mode="copy")
+    picker_export_cached(rtl, "Adder", ws, ["-c"], cache=cache, picker=picker)
+    hashed = []
+    real_sha256 = dut_cache.file_sha256
+    monkeypatch.setattr(dut_cache, "file_sha256", lambda path: hashed.append(path) or real_sha256(path))
+    for _ in range(3):
+        assert ensure_dut_package(ws, "Adder", cache) is None
+    assert hashed == []
+    # a changed file is detected by size/mtime, then restored from the verified entry
+    lib = os.path.join(ws, "Adder", "lib", "libDUT.so")
+    with open(lib, "wb") as f:
+        f.write(b"broken")
+    assert ensure_dut_package(ws, "Adder", cache)["copy"] == 1
+    hashed.clear()
+    assert ensure_dut_package(ws, "Adder", cache) is None
+    assert hashed == []
+
+
+def test_picker_export_script(tmp_path):
+    picker, rtl, ws = _setup(tmp_path)
+    script = os.path.join(current_dir, "..", "scripts", "picker_export.py")
+    env = dict(os.environ, PICKER=picker, UCAGENT_DUT_CACHE_DIR=str(tmp_path / "cache"))
+    cmd = [sys.executable, script, "export", rtl, "--rw", "1", "--sname", "Adder",
+           "--tdir", ws + "/", "-c", "-w", os.path.join(ws, "Adder", "Adder.fst")]
+    out = [subprocess.run(cmd, env=env, capture_output=True, text=True, check=True).stdout for _ in range(2)]
+    assert "miss" in out[0] and "hit" in out[1] and _calls(picker) == 1
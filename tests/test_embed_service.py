@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test cases for the batched and cached embedding service."""
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+import sys
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import threading
+import time
+
+import pytest
+
+from ucagent.util.embed_service import EmbeddingService, HashingEmbedder, new_embed_backend, get_embed_service
+from ucagent.memory.long_term import LongTermMemoryStore
+
+
+class SlowBackend(HashingEmbedder):
+
+    def __init__(self, delay=0.0):
+        super().__init__(dims=32)
+        self.delay = delay
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def embed_documents(self, texts):
+        self.release.wait(10)
+        time.sleep(self.delay)
+        self.calls.append(list(texts))
+        return super().embed_documents(texts)
+
+
+def test_dedup_batches_and_disk_cache(tmp_path):
+    backend = SlowBackend()
+    service = EmbeddingService(backend, "slow", cache_dir=str(tmp_path), batch_size=3)
+    vecs = service.embed_documents(["a", "b", "a", "c", "d"])
+    assert [len(c) for c in backend.calls] == [3, 1] and vecs[0] == vecs[2]
+    assert service.embed_query("b") == vecs[1] and len(backend.calls) == 2
+    # a new service with the same model key reads the cache, another key does not
+    backend2 = SlowBackend()
+    assert EmbeddingService(backend2, "slow", cache_dir=str(tmp_path)).embed_documents(["d", "c"]) == vecs[4:2:-1]
+    assert backend2.calls == []
+    EmbeddingService(backend2, "other", cache_dir=str(tmp_path)).embed_query("a")
+    assert backend2.calls == [["a"]]
+
+
+def test_disk_cache_is_capped_and_binary(tmp_path):
+    backend = SlowBackend()
+    service = EmbeddingService(backend, "slow", cache_dir=str(tmp_path), batch_size=8, cache_max_entries=20)
+    for i in range(5):
+        service.embed_documents([f"text {i} {j}" for j in range(8)])
+    assert len(service._cache) <= 20
+    # header + (sha1 + 32 float32) per entry, no text format
+    size = os.path.getsize(service.cache_path)
+    assert service.cache_path.endswith(".f32") and (size - 12) % (20 + 32 * 4) == 0
+    assert (size - 12) // (20 + 32 * 4) <= 20
+    # the most recent entries survive a reload, a torn record is dropped
+    with open(service.cache_path, "ab") as f:
+        f.write(b"torn")
+    backend2 = SlowBackend()
+    reloaded = EmbeddingService(backend2, "slow", cache_dir=str(tmp_path), cache_max_entries=20)
+    recent = [f"text 4 {j}" for j in range(8)]
+    assert reloaded.embed_documents(recent) == service.embed_documents(recent) and backend2.calls == []
+    assert (os.path.getsize(reloaded.cache_path) - 12) % (20 + 32 * 4) == 0
+
+
+def test_submit_collects_a_batch():
+    backend = SlowBackend()
+    backend.release.clear()
+    service = EmbeddingService(backend, "slow", batch_size=8, batch_wait=0.2)
+    start = time.time()
+    futures = [service.submit(t) for t in ["x", "y", "x", "z"]]
+    assert time.time() - start < 0.1 and service.is_pending()
+    backend.release.set()
+    assert [len(f.result(timeout=5)) for f in futures] == [32] * 4
+    assert backend.calls == [["x", "y", "z"]] and futures[0].result() == futures[2].result()
+    assert service.submit("y").done()  # cached
+    service.close(5)
+    assert not service.is_pending()
+
+
+def test_backend_fallback():
+    backend, key = new_embed_backend({"backend": "hashing", "dims": 16})
+    assert isinstance(backend, HashingEmbedder) and key == "hashing:16"
+    backend, key = new_embed_backend({"backend": "openai", "model_name": "", "fallback": "hashing", "dims": 8})
+    assert key == "hashing:8"
+    with pytest.raises(ValueError):
+        new_embed_backend({"backend": "openai", "model_name": ""})
+    with pytest.raises(ValueError):
+        new_embed_backend({"backend": "gpu"})
+
+
+def test_long_term_memory_save_does_not_block(tmp_path):
+    config = {"backend": "hashing", "dims": 64, "batch_wait_ms": 100, "cache_dir": ".ucagent_embed_cache"}
+    store = LongTermMemoryStore(str(tmp_path), "dut", enable_embed=True, embed_config=config)
+    service = get_embed_service(config, str(tmp_path))
+    assert get_embed_service(dict(config), str(tmp_path)) is service
+    start = time.time()
+    store.save({"stage": "s1"}, "the adder overflow bug in the carry chain")
+    store.save({"stage": "s2"}, "coverage of the fifo full flag")
+    assert time.time() - start < 0.1
+    hits = store.search("fifo full flag coverage", limit=1)
+    assert hits[0]["meta"]["stage"] == "s2"
+    assert len(store._load_vector_cache()) == 2
+    assert os.listdir(tmp_path / ".ucagent_embed_cache")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test cases for the resident hook status server used by --hook-message."""
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+import sys
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import socket
+
+import pytest
+
+import ucagent.util.functions as fc
+from ucagent.util.hook_daemon import HookStatusServer, get_hook_socket_path, query_hook_message
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    ws = tmp_path / "ws"
+    ws.mkdir()
+    (ws / "hook.yaml").write_text("hooks:\n  go_on: 'keep going'\n  done: 'all done'\n")
+    monkeypatch.chdir(ws)
+    return str(ws)
+
+
+def _file_path_msg(key, workspace):
+    _, continue_msg, stop_msg = fc.get_interaction_messages(key)
+    return fc.get_ucagent_hook_msg(continue_msg, stop_msg, stop_msg, continue_msg, "", workspace, True)
+
+
+def test_server_matches_file_path(workspace):
+    key = "hook.yaml::go_on|done"
+    assert query_hook_message(key, workspace) == (False, None)  # no server, use the file path
+    server = HookStatusServer(workspace)
+    assert server.start()
+    try:
+        for status in ({}, {"stage_index": 1}, {"all_completed": True},
+                       {"all_completed": True, "is_agent_exit": True}):
+            if status:
+                fc.save_ucagent_info(workspace, status, sync=True)
+            server.update(status)
+            served, msg = query_hook_message(key, workspace, need_agent_exit=True)
+            assert served and msg == _file_path_msg(key, workspace)
+        assert msg == "all done"
+        os.environ["go_on"] = "from env"
+        try:
+            server.update({"stage_index": 2})
+            assert query_hook_message(key, workspace, need_agent_exit=True) == (True, "from env")
+        finally:
+            del os.environ["go_on"]
+        assert query_hook_message("missing.yaml::go_on", workspace) == (False, None)
+    finally:
+        server.stop()
+    assert not os.path.exists(get_hook_socket_path(workspace))
+
+
+def test_stale_socket_and_long_path(workspace, tmp_path):
+    path = get_hook_socket_path(workspace)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(path)
+    sock.close()  # left behind by a killed agent
+    assert query_hook_message("go_on", workspace) == (False, None)
+    server = HookStatusServer(workspace)
+    assert server.start()
+    try:
+        assert not HookStatusServer(workspace).start()  # owned by a live server
+    finally:
+        server.stop()
+    long_ws = tmp_path / ("d" * 120)
+    long_ws.mkdir()
+    assert get_hook_socket_path(str(long_ws)).startswith("/")
+    assert len(get_hook_socket_path(str(long_ws))) <= 100
+
+
+def test_served_path_loads_config_once(workspace, monkeypatch):
+    """Queries are answered from the server memory, timings: scripts/bench_hook_message.py."""
+    import ucagent.util.config as config
+    key = "hook.yaml::go_on|done"
+    fc.save_ucagent_info(workspace, {"stage_index": 1}, sync=True)
+    loads = []
+    get_config = config.get_config
+    monkeypatch.setattr(config, "get_config", lambda *a, **kw: loads.append(a) or get_config(*a, **kw))
+    server = HookStatusServer(workspace, {"stage_index": 1})
+    assert server.start()
+    try:
+        monkeypatch.setattr(fc, "load_ucagent_info", lambda *a, **kw: pytest.fail("status file read"))
+        for _ in range(20):
+            assert query_hook_message(key, workspace) == (True, "keep going")
+    finally:
+        server.stop()
+    assert len(loads) == 1 and server.request_count >= 20
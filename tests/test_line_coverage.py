@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test cases for interval based line coverage/mapping helpers."""
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+import sys
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import json
+import random
+import tempfile
+
+from ucagent.util.intervals import IntervalSet
+import ucagent.util.functions as fc
+
+
+def test_interval_set_ops():
+    rng = random.Random(7)
+    for _ in range(200):
+        a = [(s, s + rng.randint(0, 5)) for s in (rng.randint(1, 100) for _ in range(rng.randint(0, 10)))]
+        b = [(s, s + rng.randint(0, 5)) for s in (rng.randint(1, 100) for _ in range(rng.randint(0, 10)))]
+        sa = {x for s, e in a for x in range(s, e + 1)}
+        sb = {x for s, e in b for x in range(s, e + 1)}
+        ia, ib = IntervalSet(a), IntervalSet(b)
+        assert set(ia) == sa and len(ia) == len(sa)
+        assert set(ia | ib) == sa | sb
+        assert set(ia - ib) == sa - sb
+        assert set(ia.complement(1, 110)) == set(range(1, 111)) - sa
+        assert all((x in ia) == (x in sa) for x in range(0, 112))
+    assert IntervalSet.parse("5,1-3,4").ranges() == [(1, 5)]
+    assert IntervalSet.parse("1,2,3,7-9,11").to_str() == "1-3,7-9,11"
+    assert fc.range_list_merge([(10, 20)], [(21, 25), (30, 30), (1, 2)]) == [(1, 2), (10, 25), (30, 30)]
+
+
+def test_un_mapped_lines_and_map_cache():
+    with tempfile.TemporaryDirectory() as ws:
+        with open(os.path.join(ws, "dut.v"), "w") as f:
+            f.write("".join(f"line{i}\n" if i % 10 else "\n" for i in range(1, 5001)))
+        map_file = os.path.join(ws, "map.txt")
+        with open(map_file, "w") as f:
+            f.write("FG-A/FC-B/CK-C: 1-2000,2001-4000\n# comment\nFG-A/FC-B/CK-D: 4500-5000\n")
+        ck_map = fc.parse_line_CK_map_file(ws, "map.txt")
+        assert ck_map == {"FG-A/FC-B/CK-C": [(1, 4000)], "FG-A/FC-B/CK-D": [(4500, 5000)]}
+        unmapped, msg = fc.get_un_mapped_lines(ws, "dut.v", ck_map, 3)
+        assert unmapped == [x for x in range(4001, 4500) if x % 10]
+        assert "4001: line4001" in msg and "more lines" in msg
+        # result is cached until the file changes, and callers get a copy
+        ck_map["FG-A/FC-B/CK-C"].append((0, 0))
+        assert fc.parse_line_CK_map_file(ws, "map.txt")["FG-A/FC-B/CK-C"] == [(1, 4000)]
+        with open(map_file, "w") as f:
+            f.write("FG-A/FC-B/CK-C: 1-5000\n")
+        assert fc.get_un_mapped_lines(ws, "dut.v", fc.parse_line_CK_map_file(ws, "map.txt"))[0] == []
+
+
+def test_parse_un_coverage_json_compacts_lines():
+    with tempfile.TemporaryDirectory() as ws:
+        data = {
+            "overview": {"total": {"line": 100}, "miss": {"line": 6}},
+            "uncovered": {"data": {
+                os.path.join(ws, "dut.v"): {
+                    "total": {"line": 100},
+                    "modules": {"top": {"miss": {"line": 6}, "line": ["10", "11", "12", "13", "40-41"]}},
+                }
+            }},
+        }
+        with open(os.path.join(ws, "cov.json"), "w") as f:
+            json.dump(data, f)
+        ret = fc.parse_un_coverage_json("cov.json", ws)
+        assert ret["coverage_rate"] == 0.94
+        assert ret["uncoverage_detail"][0]["lines_uncovered"].endswith("dut.v:10-13,40-41")
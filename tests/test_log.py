@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test cases for the queued, rotated and size-capped log pipeline."""
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+import sys
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import gzip
+import re
+import tempfile
+
+import ucagent.util.log as log
+
+
+def test_rotation_compression_and_payload_blobs():
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = os.path.join(tmp, "log", "ucagent-log.log")
+        blob_dir = os.path.join(tmp, "blobs")
+        log.init_log_logger(name="ucagent-test-log", log_file=log_file, max_bytes=20000, backup_count=3,
+                            max_payload_chars=1000, blob_dir=blob_dir)
+        logger = log.logging.getLogger("ucagent-test-log")
+        payload = "{\"report\": [" + ",".join(str(i) for i in range(5000)) + "]}"
+        for i in range(2000):
+            logger.info(f"line {i}")
+        logger.info(payload)
+        logger.info(payload)
+        log.stop_log_listener("ucagent-test-log")
+        files = sorted(os.listdir(os.path.dirname(log_file)))
+        assert files == ["ucagent-log.log", "ucagent-log.log.1.gz", "ucagent-log.log.2.gz", "ucagent-log.log.3.gz"]
+        with gzip.open(log_file + ".1.gz", "rt") as f:
+            assert f.readline().endswith("\n")
+        lines = list(log.read_log_lines(log_file))
+        assert all(len(l) < 1200 for l in lines)
+        indexes = [int(m.group(1)) for m in (re.search(r"line (\d+)$", l) for l in lines) if m]
+        assert indexes == sorted(indexes) and indexes[-1] == 1999
+        digest = re.search(r"truncated, blob (\w+)", "\n".join(lines)).group(1)
+        assert "repeated payload" in lines[-1]
+        assert log.LogBlobStore(blob_dir).get(digest) == payload
+        assert log.get_log_file_path("ucagent-test-log") == os.path.abspath(log_file)
+
+
+def test_sync_write_and_blob_cap():
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = os.path.join(tmp, "msg.log")
+        log.init_msg_logger(name="ucagent-test-msg", log_file=log_file, async_write=False, compress=None,
+                            max_bytes=0, max_payload_chars=0)
+        logger = log.logging.getLogger("ucagent-test-msg")
+        logger.info("x" * 50000)
+        for h in logger.handlers:
+            h.flush()
+        assert os.path.getsize(log_file) > 50000
+        store = log.LogBlobStore(os.path.join(tmp, "blobs"), max_bytes=4000)
+        for i in range(100):
+            store.put(f"{i:040d}", os.urandom(200).hex())
+        assert store.total_bytes <= 4000
+        for h in logger.handlers:
+            h.close()
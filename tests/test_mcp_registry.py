@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test cases for the MCP port allocation and endpoint registry."""
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+import sys
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import socket
+import subprocess
+
+from ucagent.util.mcp_registry import reserve_port, take_reserved_socket, release_port
+from ucagent.util.mcp_registry import publish_endpoint, unpublish_endpoint, list_endpoints, ENDPOINT_FILE
+
+ROOT = os.path.abspath(os.path.join(current_dir, ".."))
+PUBLISHER = """
+import sys
+sys.path.insert(0, {root!r})
+from ucagent.util.mcp_registry import reserve_port, publish_endpoint
+port = reserve_port()
+publish_endpoint(sys.argv[1], "127.0.0.1", port, registry=sys.argv[2])
+print(port, flush=True)
+sys.stdin.read()
+"""
+
+
+def test_reserved_port_is_held():
+    port = reserve_port()
+    other = socket.socket()
+    other.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    try:
+        try:
+            other.bind(("127.0.0.1", port))
+            assert False, "reserved port was bound twice"
+        except OSError:
+            pass
+    finally:
+        other.close()
+    sock = take_reserved_socket(port, "localhost")
+    assert sock is not None and sock.getsockname()[1] == port
+    sock.close()
+    assert take_reserved_socket(port) is None
+    port = reserve_port()
+    release_port(port)
+    assert take_reserved_socket(port) is None
+
+
+def test_concurrent_instances(tmp_path):
+    registry = str(tmp_path / "registry.json")
+    count = 50
+    procs = []
+    for i in range(count):
+        ws = tmp_path / f"ws{i}"
+        ws.mkdir()
+        procs.append(subprocess.Popen([sys.executable, "-c", PUBLISHER.format(root=ROOT), str(ws), registry],
+                                      stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True))
+    try:
+        ports = [int(p.stdout.readline()) for p in procs]
+        assert len(set(ports)) == count
+        endpoints = list_endpoints(registry=registry)
+        assert sorted(e["port"] for e in endpoints) == sorted(ports)
+        ws = str(tmp_path / "ws7")
+        assert [e["port"] for e in list_endpoints(ws, registry=registry)] == [ports[7]]
+        os.remove(os.path.join(ws, ENDPOINT_FILE))  # found in the registry too
+        assert [e["port"] for e in list_endpoints(ws, registry=registry)] == [ports[7]]
+    finally:
+        for p in procs:
+            p.stdin.close()
+            p.wait(timeout=10)
+    # exited servers are not listed
+    assert list_endpoints(registry=registry) == []
+
+
+def test_publish_and_unpublish(tmp_path):
+    registry = str(tmp_path / "registry.json")
+    entry = publish_endpoint(str(tmp_path), "127.0.0.1", 5123, registry=registry, no_file_ops=True)
+    assert entry["url"] == "http://127.0.0.1:5123/mcp" and entry["no_file_ops"]
+    assert os.path.exists(tmp_path / ENDPOINT_FILE)
+    publish_endpoint(str(tmp_path), "127.0.0.1", 5124, registry=registry)  # restarted server
+    assert [e["port"] for e in list_endpoints(registry=registry)] == [5124]
+    unpublish_endpoint(str(tmp_path), registry=registry)
+    assert list_endpoints(str(tmp_path), registry=registry) == []
+    assert not os.path.exists(tmp_path / ENDPOINT_FILE)
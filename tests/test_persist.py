@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test cases for atomic state persistence, the debounced writer and journals."""
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+import sys
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import json
+import random
+import signal
+import subprocess
+import textwrap
+import time
+
+from ucagent.util.persist import StatePersister, atomic_write_json, journal_append
+
+
+WRITER = textwrap.dedent("""
+    import sys
+    sys.path.insert(0, {root!r})
+    from ucagent.util.persist import atomic_write_json, journal_append
+    state_path, journal_path = sys.argv[1], sys.argv[2]
+    version = 0
+    while True:
+        version += 1
+        atomic_write_json(state_path, {{"version": version, "stages": ["x" * 64] * 2000,
+                                        "check": version * 7}})
+        journal_append(journal_path, ["%d,%s,%d" % (version, "y" * 1000, version * 7)],
+                       header="version,data,check")
+""")
+
+
+def test_atomic_write_survives_kill(tmp_path):
+    root = os.path.abspath(os.path.join(current_dir, ".."))
+    script = tmp_path / "writer.py"
+    script.write_text(WRITER.format(root=root))
+    state_path, journal_path = str(tmp_path / "state.json"), str(tmp_path / "res.csv")
+    rng = random.Random(7)
+    last_version = 0
+    for _ in range(10):
+        proc = subprocess.Popen([sys.executable, str(script), state_path, journal_path])
+        time.sleep(rng.uniform(0.3, 0.6))
+        proc.send_signal(signal.SIGKILL)
+        proc.wait()
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        assert state["check"] == state["version"] * 7 and len(state["stages"]) == 2000
+        # a torn journal tail is dropped before the next append
+        journal_append(journal_path, [], header="version,data,check")
+        with open(journal_path, "r", encoding="utf-8") as f:
+            lines = f.read().split("\n")
+        assert lines[0] == "version,data,check" and lines[-1] == ""
+        for line in lines[1:-1]:
+            version, data, check = line.split(",")
+            assert len(data) == 1000 and int(check) == int(version) * 7
+        last_version = state["version"]
+    assert last_version > 0
+
+
+def test_atomic_write_keeps_file_mode(tmp_path):
+    from ucagent.util import persist
+    path = str(tmp_path / "info.json")
+    atomic_write_json(path, {"v": 1})
+    assert os.stat(path).st_mode & 0o777 == 0o666 & ~persist._UMASK
+    os.chmod(path, 0o640)
+    atomic_write_json(path, {"v": 2})
+    assert os.stat(path).st_mode & 0o777 == 0o640
+    # temp files of a crashed writer are removed once they are old enough
+    old_tmp, new_tmp = str(tmp_path / "res.json.abc123.tmp"), str(tmp_path / "res.json.def456.tmp")
+    for p in (old_tmp, new_tmp):
+        with open(p, "w") as f:
+            f.write("{")
+    os.utime(old_tmp, (time.time() - 3600, time.time() - 3600))
+    atomic_write_json(str(tmp_path / "res.json"), {"v": 1})
+    assert not os.path.exists(old_tmp) and os.path.exists(new_tmp)
+
+
+def test_journal_drops_torn_line(tmp_path):
+    path = str(tmp_path / "res.csv")
+    journal_append(path, ["a,1"], header="k,v")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("b,")
+    journal_append(path, ["c,3"], header="k,v")
+    with open(path, "r", encoding="utf-8") as f:
+        assert f.read() == "k,v\na,1\nc,3\n"
+
+
+def test_state_persister_coalesces(tmp_path):
+    persister = StatePersister(debounce=0.1)
+    path = str(tmp_path / "info.json")
+    data = {"stage": 0}
+    for i in range(1000):
+        data["stage"] = i
+        persister.submit(path, data)
+    data["stage"] = -1  # submitted data is serialized at submit time
+    assert persister.flush(5)
+    assert persister.write_count <= 3
+    with open(path, "r", encoding="utf-8") as f:
+        assert json.load(f) == {"stage": 999}
+    persister.submit(path, {"stage": 1000})
+    persister.close(5)
+    with open(path, "r", encoding="utf-8") as f:
+        assert json.load(f) == {"stage": 1000}
+    atomic_write_json(path, {"stage": 1})
+    assert not persister.is_pending(path)
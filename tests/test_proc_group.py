@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test cases for process group cleanup of checker subprocesses."""
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+import sys
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import subprocess
+import time
+
+import pytest
+
+from ucagent.util.proc_group import popen_group, kill_process_group, list_process_tree, format_kill_stats
+from ucagent.util.proc_group import get_run_usage, format_run_usage, set_run_limits, get_run_limits
+from ucagent.util.proc_group import run_timeout, output_limit_chars, run_streaming
+
+pytestmark = pytest.mark.skipif(not os.path.isdir("/proc"), reason="needs /proc")
+
+# bash -> (sleep, subshell -> sleep, setsid python -> sleep), all long running
+NESTED = ("sleep 300 & (sleep 300 & wait) & "
+          "setsid python3 -c 'import subprocess; subprocess.Popen([\"sleep\", \"300\"]).wait()' & "
+          "wait")
+
+
+def _wait_tree(proc, count, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        pids = list_process_tree(proc.pid)
+        if len(pids) >= count:
+            return pids
+        time.sleep(0.02)
+    kill_process_group(proc, grace=0)
+    raise AssertionError(f"only {pids} started")
+
+
+def _alive(pids):
+    ret = []
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/stat") as f:
+                if f.read().rsplit(")", 1)[1].split()[0] not in ("Z", "X"):
+                    ret.append(p)
+        except FileNotFoundError:
+            pass
+    return ret
+
+
+def test_kill_nested_sleepers():
+    proc = popen_group(["bash", "-c", NESTED])
+    pids = _wait_tree(proc, 6)  # bash, sleep, subshell, sleep, python, sleep
+    start = time.time()
+    stats = kill_process_group(proc, grace=2.0)
+    assert time.time() - start < 3.0
+    assert _alive(pids) == [] and stats["survivors"] == []
+    assert set(pids) <= set(stats["pids"])
+    assert proc.returncode is not None
+    assert "by SIGTERM" in format_kill_stats(stats)
+
+
+def test_escalate_to_sigkill():
+    # an ignored SIGTERM is inherited by the children
+    proc = popen_group(["bash", "-c", "trap '' TERM; sleep 300 & sleep 300 & wait"])
+    pids = _wait_tree(proc, 3)
+    start = time.time()
+    stats = kill_process_group(proc, grace=0.3, kill_timeout=2.0)
+    assert time.time() - start < 2.5
+    assert _alive(pids) == []
+    assert len(stats["killed"]) >= 3 and stats["survivors"] == []
+
+
+def test_leftovers_after_exit():
+    # the leader exits but leaves a background child in its group
+    proc = popen_group(["bash", "-c", "sleep 300 & echo started"], stdout=subprocess.PIPE, text=True)
+    assert proc.stdout.readline().strip() == "started"
+    proc.wait()
+    left = list_process_tree(proc.pid)
+    assert len(left) == 1
+    stats = kill_process_group(proc, grace=1.0)
+    assert _alive(left) == [] and stats["terminated"] == left
+    assert kill_process_group(proc)["pids"] == []
+
+
+
+def test_reaped_leader_pid_reused():
+    proc = popen_group(["true"], limits={})
+    proc.wait()
+    # another process of another group got the pid of the reaped leader
+    other = subprocess.Popen(["bash", "-c", "sleep 300 & wait"])
+    try:
+        time.sleep(0.2)
+        proc.pid = other.pid
+        stats = kill_process_group(proc, grace=0.5)
+        assert stats["pids"] == [] and other.poll() is None
+        assert len(list_process_tree(other.pid)) == 2
+    finally:
+        kill_process_group(other, grace=0.5)
+
+def test_limits_and_usage(tmp_path):
+    py = sys.executable
+    proc = popen_group([py, "-c", "x = bytearray(100 * 1024 * 1024); x[::4096] = b'1' * len(x[::4096])"], limits={})
+    proc.wait()
+    usage = get_run_usage(proc)
+    assert usage["exit_reason"] == "ok" and usage["peak_rss_mb"] >= 100
+    assert usage["cpu_user"] is not None and usage["wall_seconds"] > 0
+    proc = popen_group([py, "-c", "while True: pass"], limits={"cpu_seconds": 1})
+    proc.wait(timeout=10)
+    usage = get_run_usage(proc)
+    assert usage["exit_reason"] == "cpu_limit" and usage["cpu_user"] + usage["cpu_sys"] >= 0.9
+    proc = popen_group([py, "-c", "x = bytearray(1024 * 1024 * 1024)"], limits={"memory_mb": 256},
+                       stderr=subprocess.PIPE, text=True)
+    _, err = proc.communicate(timeout=10)
+    usage = get_run_usage(proc, output=err)
+    assert usage["exit_reason"] == "memory_limit" and "memory_mb=256" in format_run_usage(usage)
+    proc = popen_group(["bash", "-c", "head -c 3000000 /dev/zero > big.bin"],
+                       limits={"file_size_mb": 1}, cwd=str(tmp_path), stderr=subprocess.DEVNULL)
+    proc.wait(timeout=10)
+    assert get_run_usage(proc)["exit_reason"] == "file_size_limit"
+    assert os.path.getsize(tmp_path / "big.bin") == 1024 * 1024
+    proc = popen_group(["sleep", "10"], limits={})
+    with pytest.raises(subprocess.TimeoutExpired):
+        proc.wait(timeout=0.1)
+    kill_process_group(proc)
+    assert get_run_usage(proc, timed_out=True)["exit_reason"] == "timeout"
+
+
+def test_run_limit_settings():
+    old = get_run_limits()
+    try:
+        limits = set_run_limits({"wall_seconds": 5, "output_kb": 1})
+        assert limits["wall_seconds"] == 5 and limits["memory_mb"] == 0
+        assert run_timeout(0) == 5 and run_timeout(10) == 5 and run_timeout(3) == 3
+        assert output_limit_chars() == 1024
+        assert set_run_limits({"enable": False, "wall_seconds": 5})["wall_seconds"] == 0
+        assert run_timeout(0) is None and output_limit_chars() == 1024 * 1024
+        with pytest.raises(ValueError):
+            set_run_limits({"rss": 1})
+    finally:
+        set_run_limits(old)
+
+
+def test_run_streaming_bounded_and_early_stop():
+    # 20 MB of output is kept as a 64 KB head and tail per stream
+    script = "import sys\nfor i in range(200000): print('x' * 100, i)\nprint('DONE', file=sys.stderr)"
+    res = run_streaming([sys.executable, "-c", script], timeout=60, limits={"output_kb": 64})
+    assert res["returncode"] == 0 and res["truncated"]
+    assert len(res["stdout"]) < 70 * 1024 and res["stdout"].rstrip().endswith("199999")
+    assert res["stderr"] == "DONE\n"
+    # the run is killed as soon as on_line decides
+    start = time.time()
+    res = run_streaming(["bash", "-c", "echo start; echo FATAL >&2; sleep 300"], timeout=60,
+                        on_line=lambda name, line: name if "FATAL" in line else None)
+    assert time.time() - start < 3
+    assert res["stopped"] == "stderr" and not res["timed_out"] and res["kill"]["survivors"] == []
+    assert res["stdout"] == "start\n"
+    res = run_streaming(["sleep", "300"], timeout=0.3)
+    assert res["timed_out"] and res["usage"]["exit_reason"] == "timeout"
+
+
+def test_group_popen_reaping_api():
+    # poll/wait/communicate/context manager on the public Popen API (any Python version)
+    proc = popen_group([sys.executable, "-c", "import sys; sys.exit(3)"], limits={})
+    while proc.poll() is None:
+        time.sleep(0.01)
+    assert proc.returncode == 3 and proc.rusage is not None and proc.wait() == 3
+    with popen_group(["bash", "-c", "echo out; kill -TERM $$"], limits={}, stdout=subprocess.PIPE, text=True) as proc:
+        out, _ = proc.communicate(timeout=10)
+    assert out == "out\n" and proc.returncode == -15
+    assert get_run_usage(proc)["exit_reason"] == "killed"
+    proc = popen_group(["sleep", "10"], limits={})
+    assert proc.poll() is None
+    stats = kill_process_group(proc, grace=1.0)
+    assert proc.returncode is not None and stats["survivors"] == []
+    del proc  # __del__ of a reaped process
+
+
+def test_run_streaming_end_to_end(tmp_path):
+    lines = []
+    res = run_streaming(["bash", "-c", "echo a; echo b >&2; exit 2"], timeout=10, cwd=str(tmp_path),
+                        on_line=lambda name, line: lines.append((name, line.strip())))
+    assert res["returncode"] == 2 and res["stdout"] == "a\n" and res["stderr"] == "b\n"
+    assert sorted(lines) == [("stderr", "b"), ("stdout", "a")]
+    assert not res["timed_out"] and res["stopped"] is None and res["usage"]["exit_reason"] == "exit"
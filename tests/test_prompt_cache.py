@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test cases for the cache-aware prompt layout and prompt cache accounting."""
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+import sys
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import pytest
+
+pytest.importorskip("langchain_core")
+pytest.importorskip("langmem")
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from ucagent.abackend.langchain.message import UCMessagesNode
+from ucagent.abackend.langchain.message.statistic import MessageStatistic
+from ucagent.abackend.langchain.message.prompt_cache import message_fingerprint
+
+
+class FakeCacheModel:
+    """Fake provider: caches request prefixes ending at cache_control markers."""
+
+    def __init__(self):
+        self.cache = set()
+
+    def invoke(self, messages):
+        key, tokens, cached, marked, lookups = [], 0, 0, [], []
+        for msg in messages:
+            key.append(message_fingerprint(msg))
+            tokens += count_tokens_approximately([msg])
+            lookups.append((b"".join(key), tokens))
+            if isinstance(msg.content, list) and "cache_control" in msg.content[-1]:
+                marked.append(lookups[-1][0])
+                for prefix, prefix_tokens in lookups:
+                    if prefix in self.cache:
+                        cached = max(cached, prefix_tokens)
+                lookups = []
+        self.cache.update(marked)
+        return {"input_tokens": tokens, "cache_read": cached}
+
+
+def run_session(node, model, rounds=30):
+    history = [SystemMessage(content="You are a verification agent. " * 50, id="sys")]
+    reports = []
+    for r in range(rounds):
+        history.append(HumanMessage(content=f"stage tips of round {r} " * 20, id=f"h{r}"))
+        history.append(AIMessage(content="", id=f"a{r}",
+                                 tool_calls=[{"id": f"c{r}", "name": "RunTestCases", "args": {"r": r}}]))
+        history.append(ToolMessage(content=f"result {r} " * 30, tool_call_id=f"c{r}", id=f"t{r}"))
+        if r % 10 == 5:
+            # a new failure/batch summary: dynamic context after the stable prefix
+            node.batch_summary_data = [AIMessage(content=f"BATCH_SUMMARY_CACHE: round {r}")]
+        ret = node({"messages": list(history)})
+        if model is not None:
+            reports.append((model.invoke(ret["llm_input_messages"]), dict(node.msg_stat.prompt_cache.last_call)))
+    return node.msg_stat.get_statistics()["prompt_cache"], reports
+
+
+def new_node(**kwargs):
+    return UCMessagesNode(MessageStatistic(), max_summary_tokens=256, max_keep_msgs=1000,
+                          tail_keep_msgs=10, model=None, **kwargs)
+
+
+def test_cache_aware_layout_accounting_matches_fake_provider():
+    node = new_node(cache_aware_layout=True, cache_control="anthropic")
+    node.summary_data = [AIMessage(content="summary of previous conversation " * 30)]
+    stat, reports = run_session(node, FakeCacheModel())
+    for provider, local in reports:
+        assert provider["input_tokens"] == local["prompt_tokens"]
+        assert provider["cache_read"] == local["cached_tokens"]
+    ret = node({"messages": [SystemMessage(content="sys", id="sys"), HumanMessage(content="go", id="x")]})
+    assert isinstance(ret["llm_input_messages"][0], SystemMessage)
+    assert stat["cached_ratio"] > 0.6
+
+
+def test_cache_aware_layout_beats_default_layout():
+    stats = {}
+    for mode in (False, True):
+        node = new_node(cache_aware_layout=mode)
+        node.summary_data = [AIMessage(content="summary of previous conversation " * 30)]
+        stats[mode], _ = run_session(node, None)
+        assert stats[mode]["prompt_tokens"] > 0
+    assert stats[True]["cached_tokens"] > stats[False]["cached_tokens"]
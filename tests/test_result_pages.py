@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test cases for the paged MCP tool results."""
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+import sys
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import glob
+import time
+
+import pytest
+
+from ucagent.util.result_pages import ResultPageStore, split_pages, format_page
+
+
+def _read_all(store, first):
+    pages = [first["page"]]
+    cursor = first["next_cursor"]
+    while cursor:
+        page = store.get_page(cursor)
+        pages.append(page["page"])
+        cursor = page["next_cursor"]
+    return "".join(pages)
+
+
+def test_split_pages_at_line_ends():
+    text = "".join(f"line {i:04d}\n" for i in range(1000))
+    ranges = split_pages(text, 1000)
+    assert all(text[e - 1] == "\n" and e - s <= 1000 for s, e in ranges)
+    assert "".join(text[s:e] for s, e in ranges) == text
+    assert split_pages("x" * 2500, 1000) == [(0, 1000), (1000, 2000), (2000, 2500)]
+
+
+def test_pages_roundtrip(tmp_path):
+    store = ResultPageStore(str(tmp_path), page_chars=1024)
+    assert not store.need_paging("x" * 1024) and store.need_paging("x" * 1025)
+    text = "".join(f"测试 {i} ok\n" for i in range(3000))
+    first = store.put("RunTestCases", text)
+    assert first["pages"] > 10 and len(first["page"]) <= 1024
+    assert format_page(first).startswith(f"[RESULT_PAGE 1/{first['pages']}] RunTestCases")
+    assert _read_all(store, first) == text
+    last = store.get_page(f"{first['handle']}.{first['pages'] - 1}")
+    assert last["next_cursor"] is None and "last page" in format_page(last)
+    with pytest.raises(ValueError):
+        store.get_page(f"{first['handle']}.{first['pages']}")
+    with pytest.raises(ValueError):
+        store.get_page("../x.1")
+    with pytest.raises(KeyError):
+        store.get_page("Other-000000000000.1")
+
+
+def test_lru_and_ttl(tmp_path):
+    store = ResultPageStore(str(tmp_path), page_chars=1024, max_results=2, ttl=0.3)
+    a = store.put("A", "a" * 3000)
+    b = store.put("B", "b" * 3000)
+    store.get_page(a["next_cursor"])  # a is now the most recent
+    store.put("C", "c" * 3000)
+    with pytest.raises(KeyError):
+        store.get_page(b["next_cursor"])
+    assert len(store) == 2 and len(glob.glob(str(tmp_path / "*.txt"))) == 2
+    time.sleep(0.4)
+    with pytest.raises(KeyError):
+        store.get_page(a["next_cursor"])
+    assert len(store) == 0 and os.listdir(tmp_path) == [".gitignore"]
+    store.close()
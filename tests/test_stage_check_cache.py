@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test cases for the memoized stage check results."""
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+import sys
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import pytest
+
+from ucagent.util.config import Config
+import ucagent.util.functions as fc
+
+EXCLUDE = [".git", "__pycache__", ".ucagent*", "*.log"]
+
+
+def test_workspace_signature(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a.py").write_text("a = 1\n")
+    sig = fc.workspace_signature(str(tmp_path), EXCLUDE)
+    assert fc.workspace_signature(str(tmp_path), EXCLUDE) == sig
+    (tmp_path / "run.log").write_text("log")
+    (tmp_path / ".ucagent_info.json").write_text("{}")
+    assert fc.workspace_signature(str(tmp_path), EXCLUDE) == sig  # excluded files
+    (tmp_path / "src" / "a.py").write_text("a = 2\n")
+    os.utime(tmp_path / "src" / "a.py", ns=(1, 1))
+    sig2 = fc.workspace_signature(str(tmp_path), EXCLUDE)
+    assert sig2 != sig
+    (tmp_path / "src" / "b.py").write_text("")
+    assert fc.workspace_signature(str(tmp_path), EXCLUDE) != sig2
+    # restricted to patterns: other files do not change the digest
+    sig3 = fc.workspace_signature(str(tmp_path), EXCLUDE, ["src/*.py"])
+    (tmp_path / "other.txt").write_text("x")
+    assert fc.workspace_signature(str(tmp_path), EXCLUDE, ["src/*.py"]) == sig3
+    (tmp_path / "src" / "c.py").write_text("")
+    assert fc.workspace_signature(str(tmp_path), EXCLUDE, ["src/*.py"]) != sig3
+    gen = fc.get_workspace_write_gen()
+    fc.mark_workspace_written()
+    assert fc.get_workspace_write_gen() == gen + 1
+
+
+COUNTS = {}
+
+
+def _make_stage(workspace, clss="CountingChecker"):
+    from ucagent.stage.vstage import VerifyStage
+    cfg = Config({"check_cache": {"enable": True, "exclude": EXCLUDE}, "_temp_cfg": {"DUT": "Adder"}})
+    checker = [Config({"clss": f"{__name__}.{clss}",
+                       "args": {"target": "out.txt"}, "extra_args": {}})]
+    return VerifyStage(cfg, workspace, "stage", "desc", ["task"], checker, [], ["out.txt"])
+
+
+def _checker_classes():
+    from ucagent.checkers.base import Checker
+
+    class CountingChecker(Checker):
+        def __init__(self, target, **kw):
+            self.target = target
+
+        def do_check(self, timeout=0, **kw):
+            COUNTS[self.target] = COUNTS.get(self.target, 0) + 1
+            with open(self.get_path(self.target)) as f:
+                ok = f.read().strip() == "ok"
+            with open(self.get_path("report.txt"), "w") as f:  # written by every check
+                f.write(str(COUNTS[self.target]))
+            return ok, "checked"
+
+    class StatefulChecker(CountingChecker):
+        memoize_result = False
+
+    class EditingChecker(CountingChecker):
+        def do_check(self, timeout=0, **kw):
+            ret = super().do_check(timeout, **kw)
+            fc.mark_workspace_written()  # a concurrent EditTextFile during the check
+            return ret
+
+    return CountingChecker, StatefulChecker, EditingChecker
+
+
+@pytest.fixture
+def stage_env(tmp_path):
+    pytest.importorskip("langchain_core")
+    mod = sys.modules[__name__]
+    mod.CountingChecker, mod.StatefulChecker, mod.EditingChecker = _checker_classes()
+    COUNTS.clear()
+    (tmp_path / "out.txt").write_text("bad")
+    return str(tmp_path)
+
+
+def test_unchanged_workspace_reuses_result(stage_env):
+    stage = _make_stage(stage_env)
+    assert stage.do_check(timeout=10)[0] is False and not stage.last_check_cached
+    ck_pass, ck_info = stage.do_check(timeout=10)
+    assert ck_pass is False and stage.last_check_cached and COUNTS["out.txt"] == 1
+    assert ck_info[0]["last_msg"].startswith("checked")
+    stage.do_check(timeout=20)  # a failure may pass with a longer timeout
+    assert COUNTS["out.txt"] == 2
+    with open(os.path.join(stage_env, "out.txt"), "w") as f:
+        f.write("ok")
+    os.utime(os.path.join(stage_env, "out.txt"), ns=(1, 1))
+    assert stage.do_check(timeout=20)[0] is True and COUNTS["out.txt"] == 3
+    assert stage.do_check(timeout=1)[0] is True and stage.last_check_cached  # pass is reused
+    fc.mark_workspace_written()  # e.g. EditTextFile
+    stage.do_check(timeout=1)
+    assert not stage.last_check_cached and COUNTS["out.txt"] == 4
+    stage.clear()
+    stage.do_check(timeout=1)
+    assert COUNTS["out.txt"] == 5
+
+
+def test_stateful_checker_is_not_memoized(stage_env):
+    stage = _make_stage(stage_env, "StatefulChecker")
+    stage.do_check(timeout=1)
+    stage.do_check(timeout=1)
+    assert not stage.last_check_cached and COUNTS["out.txt"] == 2
+
+
+def test_only_stage_files_are_watched(stage_env):
+    stage = _make_stage(stage_env)
+    assert "out.txt" in stage.check_watch_patterns and "Adder" in stage.check_watch_patterns
+    stage.do_check(timeout=1)
+    with open(os.path.join(stage_env, "unrelated.txt"), "w") as f:
+        f.write("x")
+    stage.do_check(timeout=1)
+    assert stage.last_check_cached and COUNTS["out.txt"] == 1
+    os.makedirs(os.path.join(stage_env, "Adder"))
+    with open(os.path.join(stage_env, "Adder", "libDUT.so"), "w") as f:
+        f.write("x")
+    stage.do_check(timeout=1)
+    assert not stage.last_check_cached and COUNTS["out.txt"] == 2
+
+
+def test_write_during_check_is_not_memoized(stage_env):
+    stage = _make_stage(stage_env, "EditingChecker")
+    stage.do_check(timeout=1)
+    stage.do_check(timeout=1)
+    assert not stage.last_check_cached and COUNTS["out.txt"] == 2
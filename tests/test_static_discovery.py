@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test cases for the ast based test function discovery."""
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+import sys
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import tempfile
+
+from ucagent.util import static_discovery as sd
+import ucagent.util.functions as fc
+
+
+TEST_FILE = '''
+import pytest
+import dut_package_that_does_not_exist
+from ucagent import repeat_count
+
+
+@pytest.mark.slow
+def test_random_b(env, seed):
+    """Random test B."""
+    for _ in range(repeat_count()):
+        env.dut.mark_function("FC", [])
+
+
+async def test_random_a(env):
+    pass
+
+
+def helper_not_matched(env):
+    pass
+
+
+def test_random_b(env):
+    pass
+
+
+if __name__ == "__main__":
+    print(test_random_a)
+'''
+
+
+def _write(root, name, content):
+    path = os.path.join(root, name)
+    with open(path, "w") as f:
+        f.write(content)
+    return path
+
+
+def test_discover_without_import():
+    with tempfile.TemporaryDirectory() as root:
+        path = _write(root, "test_dut_random.py", TEST_FILE)
+        n_modules = len(sys.modules)
+        for _ in range(200):
+            funcs = sd.discover_functions(path, "test_random_*")
+        assert len(sys.modules) == n_modules
+        assert [f.__name__ for f in funcs] == ["test_random_a", "test_random_b"]
+        assert funcs[0].is_async and funcs[0].args == ["env"]
+        # later definition wins, as after an import
+        assert funcs[1].args == ["env"] and funcs[1].markers == []
+        assert len(sd.__index_cache__) >= 1
+        # regex pattern and content change invalidate/refresh the index
+        _write(root, "test_dut_random.py", TEST_FILE.replace("def test_random_b(env):\n    pass\n", ""))
+        funcs = sd.discover_functions(path, r"test_random_[ab]$")
+        assert funcs[1].markers == ["slow"] and funcs[1].fixtures == ["env", "seed"]
+        assert "repeat_count()" in funcs[1].source and funcs[1].source.startswith("@pytest.mark.slow")
+        assert funcs[1].docstring == "Random test B."
+
+
+def test_dynamic_definitions_fall_back():
+    cases = [
+        "test_random_x = make_test()\n",
+        "for i in range(3):\n    globals()[f'test_random_{i}'] = lambda env: None\n",
+        "if True:\n    def test_random_c(env):\n        pass\n",
+        "exec('def test_random_d(env): pass')\n",
+        "def test_random_e(env:\n",
+    ]
+    with tempfile.TemporaryDirectory() as root:
+        for i, code in enumerate(cases):
+            path = _write(root, f"test_dyn_{i}.py", "def test_random_z(env):\n    pass\n" + code)
+            assert sd.discover_functions(path, "test_random_*") is None, code
+        # setattr inside a test body is not an import time definition
+        path = _write(root, "test_static.py", "def test_random_s(env):\n    setattr(env, 'x', 1)\n")
+        assert [f.name for f in sd.discover_functions(path, "test_random_*")] == ["test_random_s"]
+
+
+def test_fallback_matches_import_discovery():
+    with tempfile.TemporaryDirectory() as root:
+        path = _write(root, "test_import_ok.py", "def test_random_a(env, x=1):\n    '''doc'''\n    return x\n")
+        static = sd.discover_functions(path, "test_random_*")
+        imported = [sd.StaticFunction.from_object(f) for f in fc.get_target_from_file(path, "test_random_*")]
+        assert [(f.name, f.args, f.source, f.docstring) for f in static] == \
+               [(f.name, f.args, f.source, f.docstring) for f in imported]
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test cases for the streaming subprocess output capture."""
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+import sys
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import subprocess
+import tempfile
+import time
+
+from ucagent.util.stream_capture import StreamCapture
+import ucagent.util.functions as fc
+
+
+PYTEST_LIKE_OUTPUT = """============================= test session starts ==============================
+collected 3 items
+
+test_a.py .F.
+=================================== FAILURES ===================================
+___________________________________ test_b ____________________________________
+
+    def test_b():
+>       assert 1 == 2
+E       assert 1 == 2
+
+test_a.py:5: AssertionError
+=========================== short test summary info ============================
+FAILED test_a.py::test_b - assert 1 == 2
+========================= 1 failed, 2 passed in 0.10s =========================
+"""
+
+
+def test_large_output_is_bounded_and_spilled():
+    nlines = 200000
+    script = f"for i in range({nlines}): print('waveform line %08d ' % i + 'x' * 80)"
+    with tempfile.TemporaryDirectory() as root:
+        spill = os.path.join(root, "stdout.log")
+        worker = subprocess.Popen([sys.executable, "-c", script], stdout=subprocess.PIPE, text=True)
+        cap = StreamCapture("stdout", max_chars=100000, spill_file=spill,
+                            compactor=fc.PytestOutputCompactor()).start(worker.stdout)
+        assert worker.wait(timeout=60) == 0
+        assert cap.join(10)
+        assert cap.spilled
+        assert cap.lines == nlines
+        # memory holds only the head and the tail ring
+        in_memory = sum(len(x) for x in cap._head) + cap._tail_chars
+        assert in_memory <= cap.max_chars
+        assert os.path.getsize(spill) == cap.chars > 100 * cap.max_chars
+        text = cap.text()
+        assert text.startswith("waveform line 00000000 ")
+        assert "lines omitted, full output in " + spill in text
+        assert cap.tail(1)[0].startswith(f"waveform line {nlines - 1:08d} ")
+        # no failure signal: the compactor falls back to a bounded tail
+        assert len(cap.compacted().splitlines()) <= 120
+
+
+def test_head_and_tail_without_spill_file():
+    seen = []
+    cap = StreamCapture("stdout", max_chars=1000, on_line=seen.append)
+    for i in range(1000):
+        cap.feed(f"line {i:04d}\n")
+    assert cap.truncated and not cap.spilled and len(seen) == 1000
+    text = cap.text()
+    assert text.startswith("line 0000\n") and text.endswith("line 0999\n")
+    assert "lines omitted]" in text and len(text) < 1100
+
+
+def test_live_tail_while_running():
+    script = "import time\nfor i in range(5): print('line', i, flush=True)\ntime.sleep(30)"
+    worker = subprocess.Popen([sys.executable, "-c", script], stdout=subprocess.PIPE, text=True)
+    try:
+        cap = StreamCapture("stdout").start(worker.stdout)
+        deadline = time.time() + 10
+        while cap.lines < 5 and time.time() < deadline:
+            time.sleep(0.05)
+        assert cap.tail(2) == ["line 3\n", "line 4\n"]
+        assert not cap.spilled
+    finally:
+        worker.kill()
+        worker.wait()
+    assert cap.join(5)
+
+
+def test_incremental_compactor_matches_full_text():
+    text = PYTEST_LIKE_OUTPUT * 3
+    cap = StreamCapture("stdout", compactor=fc.PytestOutputCompactor())
+    for line in text.splitlines(keepends=True):
+        cap.feed(line)
+    assert cap.text() == text
+    assert cap.compacted() == fc.compact_pytest_output(text)
+    assert "E       assert 1 == 2" in cap.compacted()
+    small = fc.PytestOutputCompactor(max_lines=3, max_chars=100)
+    for line in text.splitlines():
+        small.feed(line)
+    assert small.result() == fc.compact_pytest_output(text, max_lines=3, max_chars=100)
+
+
+def test_spill_file_is_removed():
+    import ucagent.util.stream_capture as sc
+    with tempfile.TemporaryDirectory() as root:
+        spills = [os.path.join(root, f"out{i}.log") for i in range(2)]
+        caps = [StreamCapture("stdout", max_chars=100, spill_file=s) for s in spills]
+        for cap in caps:
+            for i in range(100):
+                cap.feed(f"line {i}\n")
+            cap.close()
+        assert all(os.path.exists(s) for s in spills)
+        caps[0].remove_spill()
+        assert not os.path.exists(spills[0]) and not caps[0].spilled
+        assert caps[0].text().endswith("line 99\n")
+        # the others are removed at exit
+        sc._remove_spill_files()
+        assert not os.path.exists(spills[1])
+
+
+def test_unique_spill_files():
+    with tempfile.TemporaryDirectory() as root:
+        # two runs of same-named tools use the same spill file name
+        spill = os.path.join(root, "ucagent_RunTestCases_1_stdout.log")
+        caps = [StreamCapture("stdout", max_chars=100, spill_file=spill, unique_spill=True) for _ in range(2)]
+        for n, cap in enumerate(caps):
+            for i in range(100):
+                cap.feed(f"run {n} line {i}\n")
+            cap.close()
+        assert caps[0].spill_file != caps[1].spill_file
+        assert all(os.path.basename(c.spill_file).startswith("ucagent_RunTestCases_1_stdout_") for c in caps)
+        caps[0].remove_spill()
+        assert open(caps[1].spill_file).read().startswith("run 1 line 0\n")
+        caps[1].remove_spill()
+        assert os.listdir(root) == []
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test cases for the fixed-memory statistics of messages and interaction trackers."""
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+import sys
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import random
+import statistics
+
+import pytest
+
+from ucagent.util.stream_stats import DecayedRate, LatencyHistogram, RecentKeySet, RunningStat
+
+
+def test_running_stat_and_histogram():
+    rng = random.Random(3)
+    values = [rng.lognormvariate(0, 1.5) for _ in range(20000)]
+    stat, hist = RunningStat(), LatencyHistogram()
+    for v in values:
+        stat.add(v)
+        hist.add(v)
+    assert stat.count == len(values) and stat.max == max(values) and stat.min == min(values)
+    assert stat.mean == pytest.approx(statistics.mean(values))
+    values.sort()
+    for p in (50, 90, 95, 99):
+        exact = values[int(len(values) * p / 100) - 1]
+        assert hist.percentile(p) == pytest.approx(exact, rel=1.0 / hist.sub_buckets)
+    assert hist.percentile(100) == values[-1]
+    assert LatencyHistogram().percentile(50) is None
+
+
+def test_decayed_rate_and_recent_keys():
+    rate = DecayedRate(half_life=5)
+    for _ in range(100):
+        rate.add(1.0)
+    for _ in range(5):
+        rate.add(0.0)
+    assert rate.value == pytest.approx(0.5)
+    keys = RecentKeySet(max_size=1000)
+    for i in range(1000000):
+        assert not keys.seen(i)
+        keys.seen(0)  # kept alive by repeated sightings
+    assert len(keys) == 1000 and 0 in keys and 999999 in keys and 1000 not in keys
+
+
+def test_message_statistic_bounded():
+    pytest.importorskip("langchain_core")
+    from langchain_core.messages import AIMessage
+    from ucagent.abackend.langchain.message.statistic import MessageStatistic
+    ms = MessageStatistic(max_recorded_ids=100)
+    msg = AIMessage(content="x", id="keep")
+    for i in range(5000):
+        ms.update_message([msg, AIMessage(content="y", id=f"m{i}")])
+    assert len(ms.recorded_messages) == 100
+    assert ms.count_ai_messages == 5001
+
+
+def test_trackers_soak():
+    pytest.importorskip("langchain_core")
+    from ucagent.interaction.advanced import PerformanceTracker, AdaptiveStrategy, ContextComplexity
+    from ucagent.interaction.orchestrator import ToolOrchestrator
+    tracker = PerformanceTracker(window_size=50)
+    orch = ToolOrchestrator(agent=None)
+    n = 1000000
+    for i in range(n):
+        tracker.record_round_performance(AdaptiveStrategy.FOCUSED, ContextComplexity.LOW,
+                                         0.1 + (i % 10) * 0.01, i % 4 != 0)
+        orch.usage_tracker.record_tool_usage("ReadTextFile" if i % 2 else "RunTestCases",
+                                             "exploration", i % 4 != 0, duration=0.5)
+    assert len(tracker.metrics["round_times"]) == 50
+    assert len(orch.usage_tracker.usage_history) == orch.usage_tracker.usage_history.maxlen
+    summary = tracker.get_performance_summary()
+    assert summary["total_rounds"] == n
+    assert summary["average_round_time"] == pytest.approx(0.145)
+    status = orch.get_orchestrator_status()
+    assert status["total_tracked_usage"] == n
+    analysis = orch.get_usage_insights()["effectiveness_analysis"]
+    assert analysis["context_success_rates"]["exploration"] == 0.75
+    assert analysis["tool_effectiveness"]["RunTestCases"] == 0.5
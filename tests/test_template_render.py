@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test cases for the compiled template rendering over the lang/zh configs (timings: scripts/bench_template_render.py)."""
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+import sys
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import glob
+import re
+import yaml
+
+import ucagent.util.functions as fc
+
+
+def render_template_ref(template, kwargs):
+    """The previous (uncompiled) implementation, used as reference."""
+    tvalue = template.strip()
+    if (tvalue.count("{") == tvalue.count("}") == 1) and \
+       (tvalue.startswith("{") and tvalue.endswith("}")):
+        key = tvalue.replace("}", "").replace("{", "").strip()
+        target = kwargs.get(key) if isinstance(kwargs, dict) else getattr(kwargs, key, None)
+        return target if target is not None else template
+    for k in re.findall(r"\{[^{}]*\}", template):
+        key = str(k).replace("}", "").replace("{", "").strip()
+        target = kwargs.get(key) if isinstance(kwargs, dict) else getattr(kwargs, key, None)
+        if target is not None:
+            template = template.replace(k, str(target))
+    return template
+
+
+def collect_strings(data, ret):
+    if isinstance(data, str):
+        ret.append(data)
+    elif isinstance(data, list):
+        for d in data:
+            collect_strings(d, ret)
+    elif isinstance(data, dict):
+        for k, v in data.items():
+            ret.append(str(k))
+            collect_strings(v, ret)
+    return ret
+
+
+def load_zh_strings():
+    ret = []
+    for f in sorted(glob.glob(os.path.join(current_dir, "../ucagent/lang/zh/config/*.yaml"))):
+        with open(f, "r", encoding="utf-8") as fp:
+            collect_strings(yaml.safe_load(fc.replace_bash_var(fp.read(), {})), ret)
+    return ret
+
+
+class Ctx:
+    DUT = "ALU"
+    COMPLETE_PROGRESS = "3/10"
+
+
+def test_render_template_parity_and_cache():
+    strings = load_zh_strings()
+    assert len(strings) > 100
+    contexts = [{"DUT": "ALU", "OUT": "unity_test", "CURRENT_FILE_NAME": "a.md"}, Ctx()]
+    for ctx in contexts:
+        for s in strings:
+            assert fc.render_template(s, ctx) == render_template_ref(s, ctx), s
+    # each template is parsed once, later renders are compile cache hits
+    templates = [s for s in strings if "{" in s]
+    assert len(set(templates)) < fc._compile_template.cache_info().maxsize
+    before = fc._compile_template.cache_info()
+    for s in templates:
+        fc.render_template(s, contexts[0])
+    after = fc._compile_template.cache_info()
+    assert after.misses == before.misses and after.hits - before.hits == len(templates)
+
+
+def test_render_template_large_and_single_key():
+    big = "x" * (fc.TEMPLATE_CACHE_MAX_LEN + 10) + "{DUT}"
+    assert fc.render_template(big, {"DUT": "ALU"}).endswith("xALU")
+    value = {"a": 1}
+    assert fc.render_template(" {DATA} ", {"DATA": value}) is value
+    assert fc.render_template("{MISSING} and {DUT}", {"DUT": "ALU"}) == "{MISSING} and ALU"
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test cases for the compaction of oversized tool outputs."""
+
+import os
+current_dir = os.path.dirname(os.path.abspath(__file__))
+import sys
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import glob
+import tempfile
+
+import pytest
+
+from ucagent.util.tool_output import ToolOutputStore, ToolOutputCompactor
+
+
+def pytest_like_output(n):
+    lines = ["============ test session starts ============", f"collected {n} items"]
+    for i in range(n):
+        lines.append(f"tests/test_dut.py::test_case_{i} " + ("FAILED" if i % 50 == 7 else "PASSED"))
+    lines.append("E   AssertionError: assert 1 == 2")
+    lines.append(f"====== {n // 50} failed, {n - n // 50} passed in 3.21s ======")
+    return "\n".join(lines)
+
+
+def test_compact_oversized_output():
+    with tempfile.TemporaryDirectory() as ws:
+        compactor = ToolOutputCompactor(ToolOutputStore(os.path.join(ws, ".out"), max_files=3),
+                                        default_budget=4096, budgets={"RoleInfo": 0})
+        assert compactor.compact("RunTestCases", "all pass") == "all pass"
+        text = pytest_like_output(2000)
+        digest = compactor.compact("RunTestCases", text)
+        assert len(digest) < 4096 + 1024 and digest.startswith("[TOOL_OUTPUT_COMPACTED]")
+        assert "counts: passed=1960, failed=40" in digest
+        assert "test_case_7 FAILED" in digest and "AssertionError" in digest
+        assert digest.rstrip().endswith("passed in 3.21s ======")
+        handle = [l for l in digest.splitlines() if l.startswith("handle: ")][0][len("handle: "):]
+        lines, total = compactor.store.read_lines(handle, 3, 2)
+        assert total == 2004 and lines == text.splitlines()[2:4]
+        assert compactor.compact("RoleInfo", text) == text
+        # bounded number of saved outputs, invalid handles are rejected
+        for i in range(5):
+            compactor.compact("ReadTextFile", f"{i}" * 5000)
+        assert sorted(os.listdir(os.path.join(ws, ".out")))[0] == ".gitignore"
+        assert len(glob.glob(os.path.join(ws, ".out", "*.txt"))) == 3
+        with pytest.raises(KeyError):
+            compactor.store.read_lines("../../etc/passwd")
+        stat = compactor.get_statistics()
+        assert stat["compacted"] == 6 and stat["raw_size"]["count"] == 8
+
+
+def test_single_long_line():
+    with tempfile.TemporaryDirectory() as ws:
+        compactor = ToolOutputCompactor(ToolOutputStore(ws), default_budget=1000)
+        digest = compactor.compact("SearchText", "x" * 100000)
+        assert len(digest) < 2000 and "100000 chars, 1 lines" in digest
@@ -34,8 +34,9 @@ class UCAgentCmdLineBackend(AgentBackendBase):
         Process a bash command and return the output.
         """
         import subprocess
-        process = subprocess.Popen(cmd, shell=True, cwd=self.CWD,
-                                   stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        from ucagent.util.proc_group import popen_group, kill_process_group
+        process = popen_group(cmd, shell=True, cwd=self.CWD,
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
         output_lines = []
         while True:
             output = process.stdout.readline()
@@ -45,7 +46,7 @@ class UCAgentCmdLineBackend(AgentBackendBase):
                 output_lines.append(output.strip())
                 self._echo_message(output.strip())
             if self._abort:
-                process.terminate()
+                kill_process_group(process)
                 info(f"Bash command '{cmd}' aborted.")
                 break
         return_code = process.poll()
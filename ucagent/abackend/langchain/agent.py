@@ -38,6 +38,8 @@ class UCAgentLangChainBackend(AgentBackendBase):
                 long_term_memory=getattr(vagent, "long_term_memory", None),
                 enable_failure_aware_context=getattr(vagent, "enable_failure_aware_context", False),
                 dut_name=getattr(vagent, "dut_name", ""),
+                cache_aware_layout=vagent.cfg.get_value("conversation_summary.cache_aware_layout", False),
+                cache_control=vagent.cfg.get_value("conversation_summary.cache_control", "none"),
             )
         else:
             info("Using SummarizationAndFixToolCall for conversation summarization (max_token={}, max_summary_tokens={})".format(vagent.max_token, vagent.max_summary_tokens))
@@ -2,6 +2,7 @@
 """Message and state utilities for UCAgent."""
 
 from .statistic import MessageStatistic
+from .prompt_cache import mark_cache_breakpoint, message_text
 from ucagent.util.functions import fill_dlist_none
 from ucagent.util.log import warning, info
 
@@ -685,6 +686,9 @@ class UCMessagesNode:
     Messages layout:
       local memory: role_info(system) + history_msgs
       llm input: summary_msgs(summarized by max_summary_tokens) + role_info + history_msg
+      llm input (cache_aware_layout): role_info | summary_msgs | dynamic context + history_msg
+        where '|' are prompt cache breakpoints, so changes of the dynamic context
+        (failure/batch summaries) do not invalidate the cached prefix before it
     """
 
     def __init__(
@@ -700,6 +704,8 @@ class UCMessagesNode:
         long_term_memory=None,
         enable_failure_aware_context: bool = False,
         dut_name: str = "",
+        cache_aware_layout: bool = False,
+        cache_control: str = "none",
     ):
         self.msg_stat = msg_stat
         self.max_summary_tokens = max_summary_tokens
@@ -729,6 +735,9 @@ class UCMessagesNode:
         self.enable_failure_aware_context = enable_failure_aware_context
         self.dut_name = dut_name
         self.arbit_summary_data = None
+        self.cache_aware_layout = cache_aware_layout
+        assert cache_control in ("none", "anthropic"), f"Unsupported cache_control: {cache_control}"
+        self.cache_control = cache_control
 
     def set_stage_context(self, stage_index: Optional[int], stage_title: str, section_index: str, progress: str):
         """Update current stage context for memory tagging and stage summary."""
@@ -962,18 +971,48 @@ class UCMessagesNode:
             self.arbit_summary_data = None
             ret["messages"] = [RemoveMessage(id=msg.id) for msg in tail_msgs]
             tail_msgs = []
-        if self.enable_failure_aware_context:
-            failure_prefix = self._build_failure_context_prefix()
-            if failure_prefix:
-                prefix = failure_prefix + self.summary_data
+        if self.cache_aware_layout:
+            ret["llm_input_messages"], breakpoints = self._build_cache_aware_input(role_info, tail_msgs)
+            self.msg_stat.prompt_cache.record(ret["llm_input_messages"], breakpoints)
+        else:
+            if self.enable_failure_aware_context:
+                failure_prefix = self._build_failure_context_prefix()
+                if failure_prefix:
+                    prefix = failure_prefix + self.summary_data
+                else:
+                    prefix = self.stage_summary_data + self.batch_summary_data + self.summary_data
             else:
                 prefix = self.stage_summary_data + self.batch_summary_data + self.summary_data
-        else:
-            prefix = self.stage_summary_data + self.batch_summary_data + self.summary_data
-        ret["llm_input_messages"] = prefix + role_info + tail_msgs
+            ret["llm_input_messages"] = prefix + role_info + tail_msgs
+            self.msg_stat.prompt_cache.record(ret["llm_input_messages"])
         self.msg_stat.update_message(ret["llm_input_messages"])
         return ret
 
+    def _build_cache_aware_input(self, role_info: List, tail_msgs: List) -> Tuple[List, List[int]]:
+        """Layout llm input as stable prefix, summary block, dynamic context and history.
+
+        Returns:
+            (messages, cache breakpoint indexes).
+        """
+        failure_prefix = self._build_failure_context_prefix() if self.enable_failure_aware_context else []
+        if failure_prefix:
+            summary_block, dynamic = self.summary_data, failure_prefix
+        else:
+            summary_block, dynamic = self.stage_summary_data + self.summary_data, self.batch_summary_data
+        messages = role_info + summary_block + dynamic + tail_msgs
+        breakpoints = []
+        for end in (len(role_info), len(role_info) + len(summary_block), len(messages)):
+            # the breakpoint is the last message with text before end (empty blocks can not be marked)
+            index = end - 1
+            while index >= 0 and not message_text(messages[index]):
+                index -= 1
+            if index >= 0 and index not in breakpoints:
+                breakpoints.append(index)
+        if self.cache_control == "anthropic":
+            for index in breakpoints:
+                messages[index] = mark_cache_breakpoint(messages[index])
+        return messages, breakpoints
+
     def set_arbit_summary(self, summary_text):
         """Set chat summary"""
         if isinstance(summary_text, str):
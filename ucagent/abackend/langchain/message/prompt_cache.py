@@ -0,0 +1,117 @@
+# --- coding: utf-8 ---
+"""Prompt cache breakpoints and local cached/uncached prompt token accounting."""
+
+from ucagent.util.stream_stats import RecentKeySet
+
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.messages import BaseMessage
+from typing import List, Optional
+import hashlib
+import json
+
+
+CACHE_CONTROL_BLOCK = {"type": "ephemeral"}
+
+
+def message_text(msg: BaseMessage) -> str:
+    """Text of a message, ignoring cache markers in content blocks."""
+    if isinstance(msg.content, str):
+        return msg.content
+    ret = []
+    for block in msg.content:
+        if isinstance(block, dict):
+            ret.append(str(block.get("text", "")))
+        else:
+            ret.append(str(block))
+    return "".join(ret)
+
+
+def message_fingerprint(msg: BaseMessage) -> bytes:
+    """What a provider cache compares: role, text and tool call data."""
+    extra = ""
+    tool_calls = getattr(msg, "tool_calls", None)
+    if tool_calls:
+        extra = json.dumps([[c.get("id"), c.get("name"), c.get("args")] for c in tool_calls],
+                           sort_keys=True, default=str)
+    tool_call_id = getattr(msg, "tool_call_id", None) or ""
+    return f"{msg.type}\0{tool_call_id}\0{message_text(msg)}\0{extra}\0".encode("utf-8", errors="replace")
+
+
+def mark_cache_breakpoint(msg: BaseMessage) -> BaseMessage:
+    """Return a copy of msg whose last text block carries an (Anthropic style) cache_control marker."""
+    if isinstance(msg.content, str):
+        blocks = [{"type": "text", "text": msg.content}]
+    else:
+        blocks = [dict(b) if isinstance(b, dict) else {"type": "text", "text": str(b)} for b in msg.content]
+    if not blocks or not message_text(msg):
+        return msg
+    blocks[-1]["cache_control"] = dict(CACHE_CONTROL_BLOCK)
+    return msg.model_copy(update={"content": blocks})
+
+
+def get_cache_breakpoints(messages: List[BaseMessage]) -> List[int]:
+    """Indexes of messages marked by mark_cache_breakpoint."""
+    ret = []
+    for i, m in enumerate(messages):
+        if isinstance(m.content, list) and any(isinstance(b, dict) and "cache_control" in b for b in m.content):
+            ret.append(i)
+    return ret
+
+
+class PromptCacheAccounting:
+    """Local estimate of the cached and uncached prompt tokens of each model call.
+
+    Models a provider prefix cache: the request prefix ending at a cache
+    breakpoint is written to the cache by a call, and a later call reads the
+    longest prefix (at any message boundary up to its last breakpoint) that
+    is already in the cache.
+
+    Args:
+        token_counter: Function counting the tokens of a list of messages.
+        max_prefixes: Number of cached prefixes remembered (LRU).
+    """
+
+    def __init__(self, token_counter=count_tokens_approximately, max_prefixes: int = 4096):
+        self.token_counter = token_counter
+        self.prefixes = RecentKeySet(max_prefixes)
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.last_call = {}
+
+    def record(self, messages: List[BaseMessage], breakpoints: Optional[List[int]] = None) -> dict:
+        """Account one call. Without breakpoints, the whole request is one prefix (automatic caching)."""
+        if breakpoints is None:
+            breakpoints = get_cache_breakpoints(messages) or [len(messages) - 1]
+        breakpoints = set(breakpoints)
+        last_breakpoint = max(breakpoints, default=-1)
+        digest = hashlib.sha1()
+        tokens, cached, keys = 0, 0, []
+        for i, msg in enumerate(messages):
+            digest.update(message_fingerprint(msg))
+            tokens += self.token_counter([msg])
+            if i > last_breakpoint:
+                continue
+            key = digest.hexdigest()
+            if key in self.prefixes:
+                cached = tokens
+            if i in breakpoints:
+                keys.append(key)
+        for key in keys:
+            self.prefixes.seen(key)
+        self.calls += 1
+        self.prompt_tokens += tokens
+        self.cached_tokens += cached
+        self.last_call = {"prompt_tokens": tokens, "cached_tokens": cached,
+                          "uncached_tokens": tokens - cached, "breakpoints": sorted(breakpoints)}
+        return self.last_call
+
+    def get_statistics(self) -> dict:
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "uncached_tokens": self.prompt_tokens - self.cached_tokens,
+            "cached_ratio": round(self.cached_tokens / self.prompt_tokens, 4) if self.prompt_tokens else 0.0,
+            "last_call": self.last_call,
+        }
@@ -4,14 +4,22 @@
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from langchain_core.messages import ToolMessage, RemoveMessage, SystemMessage
 from collections import OrderedDict
+from ucagent.util.stream_stats import LatencyHistogram, RecentKeySet
+from .prompt_cache import PromptCacheAccounting
 
 
 class MessageStatistic:
     """Class for message statistics."""
 
-    def __init__(self):
-        """Initialize message statistics."""
-        self.recorded_messages = set()
+    def __init__(self, max_recorded_ids: int = 20000):
+        """Initialize message statistics.
+
+        Args:
+            max_recorded_ids: Max message ids remembered to skip already counted
+                messages. Ids still in the conversation are refreshed on each
+                update, so it only needs to exceed the kept history size.
+        """
+        self.recorded_messages = RecentKeySet(max_recorded_ids)
         self.count_human_messages = 0
         self.count_ai_messages = 0
         self.count_tool_messages = 0
@@ -22,6 +30,9 @@ class MessageStatistic:
         self.text_size_system_messages = 0
         self.count_unknown_messages = 0
         self.text_size_unknown_messages = 0
+        self.tool_message_sizes = LatencyHistogram(min_value=1, max_value=1e9)
+        self.prompt_cache = PromptCacheAccounting()
+        self.provider_cache_read_tokens = 0
 
     def get_message_text_size(self, msg: BaseMessage) -> int:
         """Get the text size of a message."""
@@ -34,20 +45,23 @@ class MessageStatistic:
         if not isinstance(messages, list):
             messages = [messages]
         for msg in messages:
-            if msg.id in self.recorded_messages:
-                continue
             if isinstance(msg, RemoveMessage):
                 continue
-            self.recorded_messages.add(msg.id)
+            if self.recorded_messages.seen(msg.id):
+                continue
             if isinstance(msg, HumanMessage):
                 self.count_human_messages += 1
                 self.text_size_human_messages += self.get_message_text_size(msg)
             elif isinstance(msg, AIMessage):
                 self.count_ai_messages += 1
                 self.text_size_ai_messages += self.get_message_text_size(msg)
+                usage = getattr(msg, "usage_metadata", None) or {}
+                self.provider_cache_read_tokens += (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
             elif isinstance(msg, ToolMessage):
                 self.count_tool_messages += 1
-                self.text_size_tool_messages += self.get_message_text_size(msg)
+                tool_size = self.get_message_text_size(msg)
+                self.text_size_tool_messages += tool_size
+                self.tool_message_sizes.add(tool_size)
             elif isinstance(msg, SystemMessage):
                 self.count_system_messages += 1
                 self.text_size_system_messages += self.get_message_text_size(msg)
@@ -69,6 +83,9 @@ class MessageStatistic:
         self.text_size_system_messages = 0
         self.count_unknown_messages = 0
         self.text_size_unknown_messages = 0
+        self.tool_message_sizes = LatencyHistogram(min_value=1, max_value=1e9)
+        self.prompt_cache = PromptCacheAccounting()
+        self.provider_cache_read_tokens = 0
 
     def get_statistics(self) -> dict:
         """Get the current message statistics."""
@@ -95,4 +112,7 @@ class MessageStatistic:
             "total_text_size_messages": message_in_size + message_out_size,
             "message_in": message_in_size,
             "message_out": message_out_size,
+            "tool_size": self.tool_message_sizes.summary(),
+            "prompt_cache": dict(self.prompt_cache.get_statistics(),
+                                 provider_cache_read=self.provider_cache_read_tokens),
         })
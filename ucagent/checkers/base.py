@@ -8,6 +8,7 @@ from ucagent.util.config import Config
 from ucagent.util.functions import render_template, rm_workspace_prefix, fill_template
 import ucagent.util.functions as fc
 from ucagent.util.log import info, error, warning
+from ucagent.util.proc_group import kill_process_group, format_kill_stats
 import time
 import traceback
 
@@ -27,6 +28,9 @@ class Checker:
     _human_check_passed = None
     _human_check_message = ""
     _human_check_count = 0
+    # whether the stage may reuse the last result while the workspace is unchanged,
+    # False for checkers that keep progress between checks or are not deterministic
+    memoize_result = True
 
     def is_wait_human_check(self):
         return self._need_human_check and \
@@ -64,6 +68,10 @@ class Checker:
         self._is_init = True
         return self
 
+    def on_reset(self):
+        """Called before on_init when the stage starts without history, drop any persisted progress."""
+        pass
+
     def get_tool_by_name(self, tool_name: str):
         """Get a tool by its name."""
         if self.stage_manager is None:
@@ -155,8 +163,11 @@ class Checker:
             return "No check process find"
         error_str = "kill success"
         try:
-            info(f"Killing process {self._process.pid} for checker {self.__class__.__name__}")
-            self._process.kill()
+            info(f"Killing process {self._process.pid} and its children for checker {self.__class__.__name__}")
+            stats = kill_process_group(self._process)
+            error_str += f" ({format_kill_stats(stats)})"
+            if stats["survivors"]:
+                warning(f"Processes {stats['survivors']} of checker {self.__class__.__name__} survived SIGKILL")
         except Exception as e:
             error(f"Error terminating process: {e}")
             error_str = f"kill fail: {e}"
@@ -167,6 +178,15 @@ class Checker:
     def check_std(self, lines):
         if self._process is None:
             return f"No {self.__class__.__name__} is running, or get stdout/erro is not applicable for {self.__class__.__name__}."
+        captures = getattr(self._process, "output_captures", None)
+        if captures is not None:
+            # Live tail of the streamed output, does not block the running check
+            ret = ""
+            for name in ("stdout", "stderr"):
+                cap = captures.get(name)
+                data = "".join(cap.tail(lines)) if cap is not None else "(not captured)\n"
+                ret += f"{name.upper()}:\n{data}"
+            return ret
         return "STDOUT:\n" + "\n".join(self._process.stdout.readlines()[:lines])  + \
                "STDERR:\n" + "\n".join(self._process.stderr.readlines()[:lines])
 
@@ -307,6 +327,36 @@ class NopChecker(Checker):
 
 
 
+class FileDirtyTracker:
+    """Track files validated by a checker by their (size, mtime), so that only
+    new or modified files need to be validated again."""
+
+    def __init__(self, workspace: str = None) -> None:
+        self.workspace = workspace
+        self.signatures = {}
+
+    def _signature(self, file_path: str):
+        try:
+            st = os.stat(os.path.join(self.workspace, file_path))
+        except OSError:
+            return None
+        return [st.st_size, st.st_mtime_ns]
+
+    def is_dirty(self, file_path: str) -> bool:
+        """Check whether file_path is new or modified since its last validation."""
+        sig = self.signatures.get(file_path)
+        return sig is None or sig != self._signature(file_path)
+
+    def get_dirty(self, file_list: list) -> list:
+        return [f for f in file_list if self.is_dirty(f)]
+
+    def mark_clean(self, file_path: str) -> None:
+        self.signatures[file_path] = self._signature(file_path)
+
+    def reset(self, signatures: dict = None) -> None:
+        self.signatures = dict(signatures or {})
+
+
 class UnityChipBatchTask:
     """Batch task manager for Unity chip verification tasks.
 
@@ -348,13 +398,8 @@ class UnityChipBatchTask:
 
     def update_tbd_from_source(self) -> None:
         """Update to-be-done task list by removing tasks not in source list."""
-        tasks_to_remove = []
-        for task in self.tbd_task_list:
-            if task not in self.source_task_list:
-                tasks_to_remove.append(task)
-
-        for task in tasks_to_remove:
-            self.tbd_task_list.remove(task)
+        source_tasks = set(self.source_task_list)
+        self.tbd_task_list = [task for task in self.tbd_task_list if task in source_tasks]
 
     def update_cmp_from_tbd(self) -> list:
         """Update completed task list by removing tasks not in to-be-done list.
@@ -362,13 +407,9 @@ class UnityChipBatchTask:
         Returns:
             List of tasks that were removed from completed list.
         """
-        tasks_to_remove = []
-        for task in self.cmp_task_list:
-            if task not in self.tbd_task_list:
-                tasks_to_remove.append(task)
-
-        for task in tasks_to_remove:
-            self.cmp_task_list.remove(task)
+        tbd_tasks = set(self.tbd_task_list)
+        tasks_to_remove = [task for task in self.cmp_task_list if task not in tbd_tasks]
+        self.cmp_task_list = [task for task in self.cmp_task_list if task in tbd_tasks]
         return tasks_to_remove
 
     def update_tbd_and_cmp(self) -> None:
@@ -396,6 +437,24 @@ class UnityChipBatchTask:
 
         return len(self.tbd_task_list) == 0
 
+    def get_progress(self) -> dict:
+        """Get the progress data to persist."""
+        return {
+            "source": list(self.source_task_list),
+            "gen": list(self.gen_task_list),
+            "cmp": list(self.cmp_task_list),
+            "tbd": list(self.tbd_task_list),
+        }
+
+    def set_progress(self, data: dict) -> None:
+        """Restore the progress saved by get_progress, limited to the current source tasks."""
+        source_tasks = set(self.source_task_list)
+        self.gen_task_list = [t for t in data.get("gen", []) if t in source_tasks]
+        self.tbd_task_list = [t for t in data.get("tbd", []) if t in source_tasks]
+        tbd_tasks = set(self.tbd_task_list)
+        self.cmp_task_list = [t for t in data.get("cmp", []) if t in tbd_tasks]
+        self.update_current_tbd()
+
     def sync_source_task(self, new_task_list: list, note_msg: list, init_msg: str) -> None:
         """Synchronize source task list with new task list.
 
@@ -499,15 +558,16 @@ class UnityChipBatchTask:
             )
 
         # Update completed task list
-        for task in self.tbd_task_list:
-            if task in self.gen_task_list and task not in self.cmp_task_list:
-                self.cmp_task_list.append(task)
+        gen_tasks = set(self.gen_task_list)
+        self.cmp_task_list = fc.ordered_unique(
+            self.cmp_task_list + [task for task in self.tbd_task_list if task in gen_tasks])
 
         # Categorize remaining and completed tasks
+        cmp_tasks = set(self.cmp_task_list)
         remaining_tasks = []
         completed_tasks = []
         for task in self.tbd_task_list:
-            if task not in self.cmp_task_list:
+            if task not in cmp_tasks:
                 remaining_tasks.append(task)
             else:
                 completed_tasks.append(task)
@@ -552,6 +612,8 @@ class UnityChipBatchTask:
 
 class HumanChecker(Checker):
     """Basic class for human-in-the-loop verification checkers."""
+    memoize_result = False
+
     def __init__(self, *a, **kw):
         super().__init__()
         self.set_human_check_needed(True)
@@ -3,6 +3,8 @@
 
 
 from ucagent.checkers.base import Checker
+from ucagent.util.proc_group import run_streaming, format_run_usage, LIMIT_EXIT_REASONS
+from ucagent.util.log import info
 from typing import Tuple
 import re
 import fnmatch
@@ -11,49 +13,92 @@ import fnmatch
 class BashScriptChecker(Checker):
     """Checker for bash scripts."""
 
-    def __init__(self, cmd:str, arguments: list[str]=[], pass_pattern: dict = {}, fail_pattern: dict = {}, need_human_check: bool = False, timeout: int = 0, **kw):
+    def __init__(self, cmd:str, arguments: list[str]=[], pass_pattern: dict = {}, fail_pattern: dict = {}, need_human_check: bool = False, timeout: int = 0,
+                 early_stop: bool = True, stop_on_pass: bool = False, **kw):
         self.cmd = [cmd] + arguments
         self.arguments = arguments
         self.pass_pattern = pass_pattern # e.g., {"All tests passed": "success_message1", "Passed": "success_message2", ...}
         self.fail_pattern = fail_pattern # e.g., {"Error": "error_message1", "Failed": "error_message2", ...}
         self.set_human_check_needed(need_human_check)
         self.timeout = timeout
+        # stop the command as soon as a fail pattern matched its output
+        self.early_stop = early_stop
+        # opt-in: also stop it once a pass pattern matched and there are no fail patterns,
+        # whatever the script does after that line (reports, cleanup) is skipped then
+        self.stop_on_pass = stop_on_pass
 
     def do_check(self, timeout=0, **kw) -> Tuple[bool, object]:
         """Check bash cmd and script output against patterns."""
-        import subprocess
+        matched = set()
+
+        def on_line(_, line):
+            # patterns are matched line by line while the command runs, the result
+            # is decided at once only by the patterns whose line match is conclusive
+            line = line.rstrip("\r\n")
+            for pattern in list(self.fail_pattern) + list(self.pass_pattern):
+                if pattern not in matched and self.pattern_search(pattern, line):
+                    matched.add(pattern)
+            if not self.early_stop:
+                return None
+            if any(p in matched and self.is_line_conclusive(p) for p in self.fail_pattern):
+                return "fail_pattern"
+            if self.stop_on_pass and not self.fail_pattern and any(p in matched and self.is_line_conclusive(p) for p in self.pass_pattern):
+                return "pass_pattern"
+            return None
+
         try:
             _timeout = timeout if timeout > 0 else self.timeout
-            completed_process = subprocess.run(
-                self.cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                timeout=_timeout if _timeout > 0 else None,
-                text=True
-            )
-            output = completed_process.stdout + completed_process.stderr
+            # In its own process group, so KillCheck and timeouts stop the whole script,
+            # the output is streamed into bounded buffers
+            res = run_streaming(self.cmd, timeout=_timeout, on_line=on_line, kill_leftovers=True,
+                                pre_call=lambda p: self.set_check_process(p, _timeout))
+            stdout, stderr, usage = res["stdout"], res["stderr"], res["usage"]
+            if res["timed_out"]:
+                return False, f"Command: {' '.join(self.cmd)} timed out ({format_run_usage(usage)})."
+            if res["stopped"]:
+                info(f"Command: {' '.join(self.cmd)} stopped early, its output matched a {res['stopped'].replace('_', ' ')}.")
+            output = stdout + stderr
+
+            def found(pattern):
+                # the middle of a long output is not kept, use the conclusive line matches then,
+                # anchored and glob patterns need the start and the end which are kept
+                return self.pattern_search(pattern, output) or \
+                       (res["truncated"] and pattern in matched and self.is_line_conclusive(pattern))
+
+            if not res["stopped"] and usage["exit_reason"] in LIMIT_EXIT_REASONS:
+                return False, {"message": f"Command stopped by a resource limit: {format_run_usage(usage)}",
+                               "resource_usage": usage,
+                               "STDOUT": stdout,
+                               "STDERR": stderr}
             for pattern, message in self.fail_pattern.items():
-                if self.pattern_search(pattern, output):
+                if found(pattern):
                     return False, {"message": message,
-                                   "STDOUT": completed_process.stdout,
-                                   "STDERR": completed_process.stderr}
+                                   "STDOUT": stdout,
+                                   "STDERR": stderr}
 
             for pattern, message in self.pass_pattern.items():
-                if self.pattern_search(pattern, output):
+                if found(pattern):
                     return True, {"message": message}
 
-            if completed_process.returncode == 0:
+            if res["returncode"] == 0:
                 return True, "Command executed successfully."
             else:
-                return False, {"message": f"Command failed without matching patterns and exit with non-zero status ({completed_process.returncode}).",
-                               "STDOUT": completed_process.stdout,
-                               "STDERR": completed_process.stderr}
+                return False, {"message": f"Command failed without matching patterns and exit with non-zero status ({res['returncode']}).",
+                               "resource_usage": usage,
+                               "STDOUT": stdout,
+                               "STDERR": stderr}
 
-        except subprocess.TimeoutExpired:
-            return False, f"Command: {' '.join(self.cmd)} timed out."
         except Exception as e:
             return False, f"An error occurred: {str(e)} when executing command: {' '.join(self.cmd)}"
 
+    def is_line_conclusive(self, pattern: str) -> bool:
+        """Whether a match of pattern in one line implies a match in the whole output."""
+        if self.is_normal_str(pattern):
+            return True
+        if self.is_global_str(pattern):
+            return False  # a glob is matched against the whole output
+        return not any(anchor in pattern for anchor in ("^", "$", "\\A", "\\Z"))
+
     def pattern_search(self, pattern: str, target: str) -> bool:
         """Search for a pattern in the target string.
         
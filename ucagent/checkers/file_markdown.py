@@ -2,37 +2,105 @@
 """Markdown file checkers for UCAgent."""
 
 
-from ucagent.checkers.base import Checker, UnityChipBatchTask
+from ucagent.checkers.base import Checker, FileDirtyTracker, UnityChipBatchTask
 import ucagent.util.functions as fc
-from ucagent.util.log import info
+from ucagent.util.log import info, warning
+from ucagent.util.persist import atomic_write_json
 import copy
+import json
 import os
 
 
 class BatchFileProcess(Checker):
     """process files in batch"""
+    memoize_result = False
+
+    progress_file = ".ucagent_batch_progress.json"
+    # re-validate completed files when they are modified
+    recheck_completed_files = True
 
     def __init__(self, name, file_pattern, batch_size=1, mini_inputs=1, need_human_check=False):
         self.file_pattern = file_pattern if isinstance(file_pattern, list) else [file_pattern]
         self.batch_size = batch_size
         self.mini_inputs = mini_inputs
         self.batch_task = UnityChipBatchTask(name, self)
+        self._file_tracker = FileDirtyTracker()
         self.set_human_check_needed(need_human_check)
 
     def get_pfile_list(self) -> list:
         markdown_files = []
         for p in self.file_pattern:
             markdown_files.extend(fc.find_files_by_pattern(self.workspace, p))
-        return markdown_files
+        return sorted(fc.ordered_unique(markdown_files))
+
+    def get_progress_key(self) -> str:
+        return f"{self.__class__.__name__}:{self.batch_task.name}:{'|'.join(self.file_pattern)}"
+
+    def load_progress(self):
+        """Resume the completed files of a previous run."""
+        progress_path = os.path.join(self.workspace, self.progress_file)
+        if not os.path.exists(progress_path):
+            return
+        try:
+            with open(progress_path, "r", encoding="utf-8") as f:
+                data = json.load(f).get(self.get_progress_key())
+        except Exception as e:
+            warning(f"Ignore broken batch progress file {progress_path}: {e}")
+            return
+        if not data:
+            return
+        self.batch_task.set_progress(data)
+        self._file_tracker.reset(data.get("signatures"))
+        info(f"{self.__class__.__name__} resumed {len(self.batch_task.gen_task_list)} completed files from {self.progress_file}.")
+
+    def clear_progress(self):
+        """Drop the persisted progress of this checker."""
+        progress_path = os.path.join(self.workspace, self.progress_file)
+        if not os.path.exists(progress_path):
+            return
+        try:
+            with open(progress_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            warning(f"Remove broken batch progress file {progress_path}: {e}")
+            data = {}
+        if data.pop(self.get_progress_key(), None) is not None:
+            info(f"{self.__class__.__name__} cleared its progress in {self.progress_file}.")
+        if data:
+            atomic_write_json(progress_path, data)
+        else:
+            os.remove(progress_path)
+
+    def on_reset(self):
+        """The stage starts over: do not resume the progress of a previous run."""
+        self.clear_progress()
+        return super().on_reset()
+
+    def save_progress(self):
+        """Persist the batch progress, so that a restart does not re-check completed files."""
+        progress_path = os.path.join(self.workspace, self.progress_file)
+        data = {}
+        if os.path.exists(progress_path):
+            try:
+                with open(progress_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception as e:
+                warning(f"Overwrite broken batch progress file {progress_path}: {e}")
+        progress = self.batch_task.get_progress()
+        progress["signatures"] = self._file_tracker.signatures
+        data[self.get_progress_key()] = progress
+        atomic_write_json(progress_path, data)
 
     def init_batch_task(self):
+        if len(self.batch_task.source_task_list) > 0 or len(self.batch_task.cmp_task_list) > 0:
+            return True
         markdown_files = self.get_pfile_list()
         if len(markdown_files) == 0:
             info("No files found with patterns: {}".format('\n'.join(self.file_pattern)))
             return False
-        if len(self.batch_task.source_task_list) > 0 or len(self.batch_task.cmp_task_list) > 0:
-            return True
         self.batch_task.source_task_list = markdown_files
+        self._file_tracker.workspace = self.workspace
+        self.load_progress()
         self.batch_task.update_current_tbd()
         init_files = '\n'.join(self.batch_task.source_task_list)
         info(f"Load file list(size={len(self.batch_task.source_task_list)}): {init_files}")
@@ -70,20 +138,27 @@ class BatchFileProcess(Checker):
             return False, {
                 "error": "No target files find, please check your file patterns."
             }
-        for task_file in self.batch_task.tbd_task_list:
+        # Only new or modified files need to be (re-)validated
+        task_files = self.batch_task.tbd_task_list
+        if self.recheck_completed_files:
+            task_files = fc.ordered_unique(self.batch_task.gen_task_list + task_files)
+        for task_file in self._file_tracker.get_dirty(task_files):
             ret, msg = self.do_one_file_check(task_file)
             if not ret:
                 return False, {
                     "error": msg
                 }
+            self._file_tracker.mark_clean(task_file)
         note_msg = []
         # Complete
         self.batch_task.sync_gen_task(
-            self.batch_task.gen_task_list + self.batch_task.tbd_task_list,
+            fc.ordered_unique(self.batch_task.gen_task_list + self.batch_task.tbd_task_list),
             note_msg,
             "Completed file changed."
         )
-        return self.batch_task.do_complete(note_msg, is_complete, "", "", "")
+        ret = self.batch_task.do_complete(note_msg, is_complete, "", "", "")
+        self.save_progress()
+        return ret
 
 
     def do_one_file_check(self, file_path):
@@ -93,6 +168,9 @@ class BatchFileProcess(Checker):
 class WalkFilesOneByOne(BatchFileProcess):
     """Walk files one by one"""
 
+    # a file is done once it has been read
+    recheck_completed_files = False
+
     def __init__(self, name, file_pattern, need_human_check=False, **kw):
         super().__init__(name, file_pattern, batch_size=1, need_human_check=need_human_check)
         self.readed_files = []
@@ -5,12 +5,14 @@
 from ucagent.checkers.base import Checker
 from ucagent.util.log import warning, info
 import ucagent.util.diff_ops as diff_ops
+from ucagent.util.diff_service import get_diff_service
 import ucagent.util.functions as func
 import time
 
 
 class IncVerifyHumanInputChecker(Checker):
     """Increment Verification Checker for Human Input."""
+    memoize_result = False
 
     def __init__(self, branch_name: str, data_key: str, repo_ignore: list, **kw):
         self.branch_name = branch_name
@@ -35,7 +37,7 @@ class IncVerifyHumanInputChecker(Checker):
             diff_ops.append_ignore_file(self.workspace, ignore_list)
             diff_ops.git_add_and_commit(self.workspace,
                                         f"Init increment verification ({func.fmt_time_stamp(time.time())}).")
-        if diff_ops.is_dirty(self.workspace) or diff_ops.has_untracked_files(self.workspace):
+        if get_diff_service(self.workspace).is_dirty()[0]:
             warning(f"Workspace is dirty or has untracked files at the start of increment verification. "+
                     "Please ensure a clean state before proceeding.")
         return super().on_init()
@@ -51,6 +53,7 @@ class IncVerifyHumanInputChecker(Checker):
 
 class GitNotDirtyChecker(Checker):
     """Checker to ensure Git workspace is not dirty."""
+    memoize_result = False
 
     def __init__(self, commit_tool="WorkCommit", **kw):
         self.commit_tool = commit_tool
@@ -62,9 +65,11 @@ class GitNotDirtyChecker(Checker):
 
     def do_check(self, timeout=0, **kw) -> tuple[bool, object]:
         """Check if the Git workspace is clean."""
-        if diff_ops.is_dirty(self.workspace):
-            return False, {"error": f"Workspace has uncommitted changes ({diff_ops.get_dirty_files(self.workspace)}). Please commit them before proceeding."}
-        if diff_ops.has_untracked_files(self.workspace):
-            return False, {"error": f"Workspace has untracked files ({diff_ops.get_untracked_files(self.workspace)}). Please commit them before proceeding."}
+        _, status = get_diff_service(self.workspace).is_dirty()
+        dirty_files = sorted(set(status["staged"] + status["modified"]))
+        if dirty_files:
+            return False, {"error": f"Workspace has uncommitted changes ({dirty_files}). Please commit them before proceeding."}
+        if status["untracked"]:
+            return False, {"error": f"Workspace has untracked files ({status['untracked']}). Please commit them before proceeding."}
         self.get_tool_by_name(self.commit_tool).set_disabled(True, "Disabled by GitNotDirtyChecker as workspace is clean.")
         return True, "Workspace is clean."
@@ -6,6 +6,7 @@ from typing import Tuple
 import ucagent.util.functions as fc
 from ucagent.util.config import Config
 from ucagent.util.log import info, warning
+from ucagent.util.dut_cache import DutCache, ensure_dut_package
 from ucagent.tools.testops import RunUnityChipTest
 import os
 import glob
@@ -113,9 +114,23 @@ class UnityChipCheckerDutCreation(Checker):
     def __init__(self, target_file, **kw):
         self.target_file = target_file
         self.update_dut_name(kw["cfg"])
+        cfg = kw["cfg"]
+        self.dut_cache_cfg = cfg.get("dut_cache", {}) if isinstance(cfg, dict) else cfg.get_value("dut_cache", None)
+
+    def restore_dut_package(self):
+        """Restore the DUT package from the picker export cache if it is missing or modified."""
+        cache = DutCache.from_config(self.dut_cache_cfg)
+        if cache is None:
+            return None
+        try:
+            return ensure_dut_package(self.workspace, self.dut_name, cache)
+        except Exception as e:
+            warning(f"Failed to restore DUT package {self.dut_name} from cache: {e}")
+            return None
 
     def do_check(self, timeout=0, **kw) -> Tuple[bool, object]:
         """Check the DUT creation function for correctness."""
+        self.restore_dut_package()
         if not os.path.exists(self.get_path(self.target_file)):
             return False, {"error": f"file '{self.target_file}' does not exist."}
         func_list = fc.get_target_from_file(self.get_path(self.target_file), "create_dut",
@@ -527,6 +542,7 @@ class UnityChipCheckerCoverageGroupBatchImplementation(UnityChipCheckerCoverageG
     This class validates that all functional coverage groups defined in the documentation
     are implemented in the coverage definition file, ensuring comprehensive DUT verification coverage.
     """
+    memoize_result = False
 
     def __init__(self, test_dir, cov_file, doc_file, batch_size, data_key, **kw):
         super().__init__(test_dir, cov_file, doc_file, "CK", **kw)
@@ -637,8 +653,8 @@ class UnityChipCheckerTestFree(BaseUnityChipCheckerTestCase):
         if not test_pass:
             return False, test_msg
         if getattr(self, "compact_test_output", False):
-            str_out = fc.compact_pytest_output(str_out)
-            str_err = fc.compact_pytest_output(str_err)
+            # compacted incrementally while the output was streamed
+            str_out, str_err = self.run_test.compact_output()
         # refine report:
         free_report = OrderedDict({
             "run_test_success": report.get("run_test_success", False),
@@ -682,6 +698,7 @@ class UnityChipCheckerTestFree(BaseUnityChipCheckerTestCase):
 
 
 class UnityChipCheckerTestTemplate(BaseUnityChipCheckerTestCase):
+    memoize_result = False
 
     def get_template_data(self):
         if hasattr(self, "batch_task"):
@@ -949,6 +966,7 @@ class UnityChipCheckerDutApiTest(BaseUnityChipCheckerTestCase):
 
 
 class UnityChipCheckerBatchTestsImplementation(BaseUnityChipCheckerTestCase):
+    memoize_result = False
 
     def __init__(self, **kw):
         super().__init__(**kw)
@@ -2,9 +2,9 @@
 
 
 import ucagent.util.functions as fc
+from ucagent.util.static_discovery import StaticFunction, discover_functions
 from ucagent.checkers.unity_test import BaseUnityChipCheckerTestCase
-from typing import Tuple
-import inspect
+from typing import List, Tuple
 from ucagent.checkers.toffee_report import check_report
 
 
@@ -28,6 +28,7 @@ class RandomTestCasesChecker(BaseUnityChipCheckerTestCase):
         test_case_name_pattern (str): Pattern to match test case function names.
         must_func_code_snippet (dict): Required code snippets in test functions.
     """
+    memoize_result = False
 
     def __init__(self, target_test_file, mini_file_count=1, min_test_count=1,
                  test_case_name_pattern="test_random_*",
@@ -43,6 +44,17 @@ class RandomTestCasesChecker(BaseUnityChipCheckerTestCase):
         self.test_case_name_pattern = test_case_name_pattern
         self.must_func_code_snippet = must_func_code_snippet
 
+    def get_test_functions(self, tfile) -> List[StaticFunction]:
+        """Get the test functions of a file by parsing it, the file is imported
+        only if it may define test functions dynamically."""
+        tc_list = discover_functions(self.get_path(tfile), self.test_case_name_pattern)
+        if tc_list is not None:
+            return tc_list
+        return [StaticFunction.from_object(f) for f in
+                fc.get_target_from_file(self.get_path(tfile), self.test_case_name_pattern,
+                                        ex_python_path=self.workspace,
+                                        dtype="FUNC")]
+
     def do_check(self, timeout=0, **kw) -> Tuple[bool, object]:
         """Check random test cases"""
         test_files = fc.find_files_by_pattern(self.workspace, self.target_test_file)
@@ -51,17 +63,14 @@ class RandomTestCasesChecker(BaseUnityChipCheckerTestCase):
                           f"expected at least {self.mini_file_count} files with pattern: {self.target_test_file}."
         total_test_count = 0
         for tfile in test_files:
-            random_tc_list = fc.get_target_from_file(self.get_path(tfile), self.test_case_name_pattern,
-                                           ex_python_path=self.workspace,
-                                           dtype="FUNC")
+            random_tc_list = self.get_test_functions(tfile)
             total_test_count += len(random_tc_list)
             for tfunc in random_tc_list:
-                args = fc.get_func_arg_list(tfunc)
+                args = tfunc.args
                 if len(args) < 1 or args[0] != "env":
                     return False, {"error": f"The '{tfile + ':' + tfunc.__name__}' Env test function's first arg must be 'env', but got ({', '.join(args)})."}
-                func_source = inspect.getsource(tfunc)
                 for mc, v in self.must_func_code_snippet.items():
-                    if mc not in func_source:
+                    if mc not in tfunc.source:
                         return False, {"error": f"The '{tfile + ':' + tfunc.__name__}' Env test function must contain "
                                                 f"'{mc}', {v}"}
         if total_test_count < self.min_test_count:
@@ -10,7 +10,6 @@ wrapping the functionality from verify.py into a proper CLI module.
 import os
 import sys
 import argparse
-import bdb
 from typing import Dict, List, Any, Optional
 from .version import __version__
 
@@ -38,27 +37,21 @@ class HookMessageAction(argparse.Action):
         self.need_agent_exit = kwargs.get("need_agent_exit", True)
 
     def __call__(self, parser, namespace, values, option_string=None):
-        import ucagent.util.log as log
-        import ucagent.util.functions as fc
-        log.info = lambda msg, end="\n": None
-        success, continue_msg, stop_msg = fc.get_interaction_messages(values[0])
-        if not success:
-            parser.exit(1)
-        msg = fc.get_ucagent_hook_msg(
-            msg_continue=continue_msg,
-            msg_cmp=stop_msg,
-            msg_exit=stop_msg,
-            msg_init=continue_msg,
-            msg_wait_hm="",
-            workspace=".",
-            need_agent_exit=self.need_agent_exit,
-        )
-        if msg:
-            print(msg.strip())
+        if do_hook_message(values[0], self.need_agent_exit):
             sys.exit(0)
         parser.exit(1)
 
 
+class McpServersAction(argparse.Action):
+    """Custom action for --mcp-servers flag that exits after listing."""
+    def __init__(self, option_strings, dest, **kwargs):
+        super().__init__(option_strings, dest, nargs=0, **kwargs)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        do_list_mcp_servers()
+        parser.exit()
+
+
 class UpgradeAction(argparse.Action):
     """Custom action for --upgrade flag that exits after upgrading."""
     def __init__(self, option_strings, dest, **kwargs):
@@ -69,6 +62,98 @@ class UpgradeAction(argparse.Action):
         parser.exit()
 
 
+# Short-lived commands (mostly called from IDE hooks) that are dispatched
+# before the full argument parser is built, see run_fast_path().
+FAST_PATH_OPTIONS = ("--hook-message", "--check", "--upgrade", "--version", "--mcp-servers")
+
+
+def do_hook_message(key: str, need_agent_exit: bool = True) -> bool:
+    """Print the hook message for the workspace in the current directory.
+
+    The hook server of a running agent (--hook-daemon) is asked first; without
+    it only the config and status helpers are imported, so this path never
+    loads the agent stack (LangChain, LangGraph, mem0, urwid, ...).
+
+    Args:
+        key: Hook key in format [config_file.yaml::]continue_prompt_key[|stop_prompt_key]
+        need_agent_exit: Whether completion requires the agent to have exited.
+
+    Returns:
+        True if a message was printed, False otherwise.
+    """
+    from ucagent.util.hook_daemon import query_hook_message
+    # a running agent with the hook server answers without loading configs
+    served, msg = query_hook_message(key, ".", need_agent_exit)
+    if served:
+        if msg:
+            print(msg.strip())
+            return True
+        return False
+    import ucagent.util.log as log
+    # Silence info logs before util.functions binds them at import time
+    log.info = lambda msg, end="\n": None
+    import ucagent.util.functions as fc
+    success, continue_msg, stop_msg = fc.get_interaction_messages(key)
+    if not success:
+        return False
+    msg = fc.get_ucagent_hook_msg(
+        msg_continue=continue_msg,
+        msg_cmp=stop_msg,
+        msg_exit=stop_msg,
+        msg_init=continue_msg,
+        msg_wait_hm="",
+        workspace=".",
+        need_agent_exit=need_agent_exit,
+    )
+    if msg:
+        print(msg.strip())
+        return True
+    return False
+
+
+def do_list_mcp_servers() -> None:
+    """Print the running MCP servers (workspace, url, pid) as JSON."""
+    import json
+    from ucagent.util.mcp_registry import list_endpoints
+    print(json.dumps(list_endpoints(), indent=2, ensure_ascii=False))
+
+
+def run_fast_path(argv: List[str]) -> None:
+    """Handle short-lived commands without building the full CLI.
+
+    The first option of FAST_PATH_OPTIONS found in argv is executed and the
+    process exits, mirroring argparse which runs these actions in order.
+    Returns without doing anything if no fast path option is present or
+    its value is missing (argparse then reports the usage error).
+
+    Args:
+        argv: Command line arguments without the program name.
+    """
+    for i, arg in enumerate(argv):
+        if arg == "--":
+            return
+        opt, _, value = arg.partition("=")
+        if opt not in FAST_PATH_OPTIONS:
+            continue
+        if value and opt != "--hook-message":
+            continue
+        if opt == "--version":
+            print("UCAgent Version: " + __version__)
+            sys.exit(0)
+        if opt == "--check":
+            do_check()
+        if opt == "--upgrade":
+            upgrade()
+        if opt == "--mcp-servers":
+            do_list_mcp_servers()
+            sys.exit(0)
+        if not value:
+            if i + 1 >= len(argv):
+                return
+            value = argv[i + 1]
+        sys.exit(0 if do_hook_message(value) else 1)
+
+
 def get_override_dict(override_str: Optional[str]) -> Dict[str, Any]:
     """Parse override string into dictionary.
 
@@ -271,6 +356,37 @@ def get_args() -> argparse.Namespace:
         default=None, 
         help="Path to the message file"
     )
+    parser.add_argument(
+        "--log-max-size",
+        type=int,
+        default=50,
+        help="Size (MB) to rotate the log file, the message file rotates at 1/5 of it (0: never rotate)"
+    )
+    parser.add_argument(
+        "--log-backups",
+        type=int,
+        default=10,
+        help="Number of rotated log files to keep"
+    )
+    parser.add_argument(
+        "--log-compress",
+        type=str,
+        default="gzip",
+        choices=["gzip", "zstd", "none"],
+        help="Compression of rotated log files (zstd needs the zstandard package)"
+    )
+    parser.add_argument(
+        "--log-max-payload",
+        type=int,
+        default=16384,
+        help="Log messages longer than this (chars) are truncated to head and tail (0: no limit)"
+    )
+    parser.add_argument(
+        "--log-blob-dir",
+        type=str,
+        default=None,
+        help="Directory to save the full payload of truncated log messages, addressed by sha1"
+    )
     
     # MCP Server arguments
     parser.add_argument(
@@ -295,7 +411,7 @@ def get_args() -> argparse.Namespace:
         "--mcp-server-port", 
         type=int, 
         default=None,
-        help="Port for the MCP server. Use -1 to auto-select an available port."
+        help="Port for the MCP server. Use -1 to let the OS assign a free port (see --mcp-servers)."
     )
     
     # Advanced arguments
@@ -385,6 +501,17 @@ def get_args() -> argparse.Namespace:
               " Format: [config_file.yaml::]continue_prompt_key[|stop_prompt_key]"
               )
     )
+    parser.add_argument(
+        "--mcp-servers",
+        action=McpServersAction,
+        help="List the running MCP servers with their workspace and URL as JSON and exit"
+    )
+    parser.add_argument(
+        "--hook-daemon",
+        action="store_true",
+        default=False,
+        help="Serve the agent status to --hook-message on a workspace Unix socket (.ucagent_hook.sock)"
+    )
 
     return parser.parse_args()
 
@@ -486,18 +613,21 @@ def run() -> None:
 
     from .verify_agent import VerifyAgent
     from .util.log import init_log_logger, init_msg_logger
-    from .util.functions import append_python_path, find_available_port
+    from .util.functions import append_python_path
+    from .util.mcp_registry import reserve_port
 
     # Initialize logging if requested
     if args.log_file or args.msg_file or args.log:
+        log_kwargs = dict(compress=args.log_compress, max_payload_chars=args.log_max_payload, blob_dir=args.log_blob_dir)
+        max_size = args.log_max_size * 1024 * 1024
         if args.log_file:
-            init_log_logger(log_file=args.log_file)
+            init_log_logger(log_file=args.log_file, max_bytes=max_size, backup_count=args.log_backups, **log_kwargs)
         else:
-            init_log_logger()
+            init_log_logger(max_bytes=max_size, backup_count=args.log_backups, **log_kwargs)
         if args.msg_file:
-            init_msg_logger(log_file=args.msg_file)
+            init_msg_logger(log_file=args.msg_file, max_bytes=max_size // 5, **log_kwargs)
         else:
-            init_msg_logger()
+            init_msg_logger(max_bytes=max_size // 5, **log_kwargs)
     
     # Prepare initial commands
     init_cmds = []
@@ -506,7 +636,8 @@ def run() -> None:
     
     # Handle MCP server commands
     if args.mcp_server_port == -1:
-        args.mcp_server_port = find_available_port()
+        # the port is held by a listening socket until the MCP server takes it over
+        args.mcp_server_port = reserve_port(args.mcp_server_host)
     mcp_cmd = None
     if args.mcp_server:
         mcp_cmd = "start_mcp_server"
@@ -527,6 +658,10 @@ def run() -> None:
         args.override = args.override or {}
         args.override["backend.key_name"] = args.backend
 
+    if args.hook_daemon:
+        args.override = args.override or {}
+        args.override["hook_daemon.enable"] = True
+
     template_cfg_overrides = {}
     if args.template_cfg_override:
         for cfg_file in args.template_cfg_override:
@@ -595,6 +730,8 @@ def run() -> None:
 
 def main() -> None:
     """Main entry point with exception handling."""
+    run_fast_path(sys.argv[1:])
+    import bdb
     try:
         run()
     except bdb.BdbQuit:
@@ -11,6 +11,7 @@ from .advanced import (
     AdvancedInteractionLogic, 
     AdvancedInteractionState,
     ContextAnalyzer,
+    ContextFeatures,
     PerformanceTracker,
     AdaptiveStrategy,
     ContextComplexity
@@ -28,6 +29,7 @@ __all__ = [
     'AdvancedInteractionLogic',
     'AdvancedInteractionState',
     'ContextAnalyzer',
+    'ContextFeatures',
     'PerformanceTracker',
     'AdaptiveStrategy',
     'ContextComplexity',
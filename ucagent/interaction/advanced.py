@@ -7,11 +7,13 @@ This module provides adaptive interaction strategies with context analysis and p
 import copy
 import time
 import statistics
+from collections import deque
 from typing import Dict, Any, List, Optional, Tuple
 from enum import Enum
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, ToolMessage
 from ucagent.util.log import info, warning, error
 from ucagent.util.functions import yam_str
+from ucagent.util.stream_stats import DecayedRate, LatencyHistogram, RecentKeySet
 
 
 class ContextComplexity(Enum):
@@ -28,11 +30,57 @@ class AdaptiveStrategy(Enum):
     RECOVERY = "recovery"
 
 
+class ContextFeatures:
+    """Running features of a message history, updated in O(new messages)"""
+
+    ERROR_SIGNALS = ('error', 'fail', 'exception', 'traceback')
+    SUCCESS_SIGNALS = ('success', 'pass', 'complete')
+
+    def __init__(self, recent_size: int = 5, max_digests: int = 20000):
+        self.message_count = 0
+        self.recent = deque(maxlen=recent_size)
+        # digests of the most recent messages, a repeat of an evicted one counts as unique
+        self.message_digests = RecentKeySet(max_digests)
+        self.repeated_count = 0
+        self.tool_calls = 0
+        self.error_signals = 0
+        self.success_signals = 0
+
+    @classmethod
+    def from_history(cls, history: List[str]) -> "ContextFeatures":
+        features = cls()
+        features.update(history)
+        return features
+
+    def update(self, new_messages: List[str]):
+        """Consume the messages appended since the last update"""
+        for msg in new_messages:
+            self.message_count += 1
+            self.recent.append(msg)
+            if self.message_digests.seen(hash(msg)):
+                self.repeated_count += 1
+            lower_msg = msg.lower()
+            if 'tool' in lower_msg:
+                self.tool_calls += 1
+            if any(s in lower_msg for s in self.ERROR_SIGNALS):
+                self.error_signals += 1
+            elif any(s in lower_msg for s in self.SUCCESS_SIGNALS):
+                self.success_signals += 1
+
+    def recent_messages(self, n: int) -> List[str]:
+        return list(self.recent)[-n:]
+
+    @property
+    def unique_count(self) -> int:
+        return self.message_count - self.repeated_count
+
+
 class ContextAnalyzer:
     """Analyzes interaction context to determine complexity and requirements"""
     
     def __init__(self):
         self.analysis_cache = {}
+        self.features = ContextFeatures()
         self.context_keywords = {
             'complexity_indicators': {
                 'high': ['complex', 'intricate', 'sophisticated', 'advanced', 'multiple dependencies'],
@@ -54,21 +102,36 @@ class ContextAnalyzer:
         if context_key in self.analysis_cache:
             return self.analysis_cache[context_key]
         
-        analysis = {
-            'complexity': self._assess_complexity(current_tips, message_history),
-            'domain': self._identify_domain(current_tips),
-            'progress_indicators': self._analyze_progress(message_history),
-            'uncertainty_level': self._assess_uncertainty(current_tips, message_history),
-            'tool_usage_patterns': self._analyze_tool_usage(message_history)
-        }
-        
+        analysis = self._analyze_features(current_tips, ContextFeatures.from_history(message_history))
         self.analysis_cache[context_key] = analysis
         return analysis
+
+    def analyze_incremental(self, current_tips: str, new_messages: List[str]) -> Dict[str, Any]:
+        """Analyze context with only the messages appended since the last call.
+
+        Gives the same analysis as analyze_context over the whole history, but the
+        cost per round does not grow with the conversation.
+        """
+        self.features.update(new_messages)
+        return self._analyze_features(current_tips, self.features)
+
+    def reset_incremental(self):
+        """Forget the history consumed by analyze_incremental"""
+        self.features = ContextFeatures()
+
+    def _analyze_features(self, tips: str, features: ContextFeatures) -> Dict[str, Any]:
+        return {
+            'complexity': self._assess_complexity(tips, features),
+            'domain': self._identify_domain(tips),
+            'progress_indicators': self._analyze_progress(features),
+            'uncertainty_level': self._assess_uncertainty(tips, features),
+            'tool_usage_patterns': self._analyze_tool_usage(features)
+        }
     
-    def _assess_complexity(self, tips: str, history: List[str]) -> ContextComplexity:
+    def _assess_complexity(self, tips: str, features: ContextFeatures) -> ContextComplexity:
         """Assess the complexity of the current context"""
         complexity_score = 0
-        text_to_analyze = tips + " " + " ".join(history[-3:])  # Recent history
+        text_to_analyze = tips + " " + " ".join(features.recent_messages(3))  # Recent history
         
         # Check complexity indicators
         for level, keywords in self.context_keywords['complexity_indicators'].items():
@@ -82,9 +145,9 @@ class ContextAnalyzer:
                         complexity_score += 1
         
         # Consider message history length as complexity indicator
-        if len(history) > 10:
+        if features.message_count > 10:
             complexity_score += 2
-        elif len(history) > 5:
+        elif features.message_count > 5:
             complexity_score += 1
         
         # Map score to complexity level
@@ -107,13 +170,13 @@ class ContextAnalyzer:
         
         return max(domain_scores, key=domain_scores.get) if domain_scores else 'general'
     
-    def _analyze_progress(self, history: List[str]) -> Dict[str, Any]:
+    def _analyze_progress(self, features: ContextFeatures) -> Dict[str, Any]:
         """Analyze progress indicators from message history"""
-        if not history:
+        if not features.message_count:
             return {'trend': 'starting', 'stagnation_risk': 0}
         
         # Simple heuristics for progress analysis
-        recent_messages = history[-5:]
+        recent_messages = features.recent_messages(5)
         
         # Check for repetitive patterns
         unique_recent = len(set(recent_messages))
@@ -122,7 +185,7 @@ class ContextAnalyzer:
         # Determine trend
         if stagnation_risk > 0.6:
             trend = 'stagnating'
-        elif len(history) > len(set(history)) * 1.5:
+        elif features.message_count > features.unique_count * 1.5:
             trend = 'struggling'
         else:
             trend = 'progressing'
@@ -130,50 +193,56 @@ class ContextAnalyzer:
         return {
             'trend': trend,
             'stagnation_risk': stagnation_risk,
-            'message_diversity': unique_recent / len(recent_messages) if recent_messages else 1.0
+            'message_diversity': unique_recent / len(recent_messages) if recent_messages else 1.0,
+            'error_signals': features.error_signals,
+            'success_signals': features.success_signals
         }
     
-    def _assess_uncertainty(self, tips: str, history: List[str]) -> float:
+    def _assess_uncertainty(self, tips: str, features: ContextFeatures) -> float:
         """Assess the level of uncertainty in the current context"""
         uncertainty_indicators = [
             'unclear', 'uncertain', 'not sure', 'maybe', 'possibly', 
             'might', 'could be', 'unclear', 'ambiguous'
         ]
         
-        text_to_analyze = tips + " " + " ".join(history[-3:])
+        text_to_analyze = tips + " " + " ".join(features.recent_messages(3))
         uncertainty_count = sum(1 for indicator in uncertainty_indicators 
                               if indicator in text_to_analyze.lower())
         
         return min(1.0, uncertainty_count / 5)  # Normalize to 0-1
     
-    def _analyze_tool_usage(self, history: List[str]) -> Dict[str, int]:
+    def _analyze_tool_usage(self, features: ContextFeatures) -> Dict[str, int]:
         """Analyze tool usage patterns from history"""
-        # This would need to be enhanced to actually parse tool usage from history
-        # For now, return a placeholder
+        # Unique tools and success rate would need actual tool call tracking
         return {
-            'tool_calls': len([msg for msg in history if 'tool' in msg.lower()]),
-            'unique_tools': 0,  # Would need actual parsing
-            'tool_success_rate': 0.8  # Would need actual tracking
+            'tool_calls': features.tool_calls,
+            'unique_tools': 0,
+            'tool_success_rate': 0.8
         }
 
 
 class PerformanceTracker:
     """Tracks interaction performance and provides optimization suggestions"""
     
-    def __init__(self):
+    def __init__(self, window_size: int = 100):
+        # Fixed memory: the per-round lists only keep a window of recent rounds,
+        # exact totals are kept in the round time histogram
         self.metrics = {
-            'round_times': [],
+            'round_times': deque(maxlen=window_size),
             'strategy_performance': {},
             'complexity_handling': {},
             'tool_effectiveness': {},
-            'success_rates': []
+            'success_rates': deque(maxlen=window_size)
         }
+        self.round_time_hist = LatencyHistogram()
+        self.success_rate_decayed = DecayedRate(half_life=10)
         self.current_session_start = time.time()
     
     def record_round_performance(self, strategy: AdaptiveStrategy, complexity: ContextComplexity, 
                                duration: float, success: bool):
         """Record performance metrics for a round"""
         self.metrics['round_times'].append(duration)
+        self.round_time_hist.add(duration)
         
         # Track strategy performance
         strategy_key = strategy.value
@@ -205,16 +274,20 @@ class PerformanceTracker:
         
         # Track overall success rate
         self.metrics['success_rates'].append(1.0 if success else 0.0)
+        self.success_rate_decayed.add(1.0 if success else 0.0)
     
     def get_performance_summary(self) -> Dict[str, Any]:
         """Get current performance summary"""
         if not self.metrics['round_times']:
             return {'status': 'no_data'}
         
+        round_times = self.round_time_hist.summary()
         return {
-            'total_rounds': len(self.metrics['round_times']),
-            'average_round_time': statistics.mean(self.metrics['round_times']),
+            'total_rounds': round_times['count'],
+            'average_round_time': round_times['mean'],
+            'p95_round_time': round_times['p95'],
             'recent_success_rate': self._calculate_recent_success_rate(),
+            'decayed_success_rate': self.success_rate_decayed.value,
             'best_strategy': self._identify_best_strategy(),
             'session_duration': time.time() - self.current_session_start,
             'complexity_success_rates': self._get_complexity_success_rates()
@@ -225,7 +298,7 @@ class PerformanceTracker:
         if not self.metrics['success_rates']:
             return 0.0
         
-        recent_rates = self.metrics['success_rates'][-window:]
+        recent_rates = list(self.metrics['success_rates'])[-window:]
         return statistics.mean(recent_rates) if recent_rates else 0.0
     
     def _identify_best_strategy(self) -> str:
@@ -355,6 +428,8 @@ class AdvancedInteractionLogic:
         self.state = AdvancedInteractionState()
         self.planning_tools = None
         self.tool_orchestrator = None
+        self._consumed_messages = RecentKeySet()
+        self._last_consumed = None  # (history length, key of its last message)
         self._init_components()
     
     def _init_components(self):
@@ -392,8 +467,8 @@ class AdvancedInteractionLogic:
         try:
             # Analyze current context
             current_tips = self.agent.stage_manager.get_current_tips()
-            message_history = self._get_recent_message_history()
-            context_analysis = self.state.context_analyzer.analyze_context(current_tips, message_history)
+            new_messages = self._get_new_message_history()
+            context_analysis = self.state.context_analyzer.analyze_incremental(current_tips, new_messages)
             
             # Adapt strategy if needed
             strategy_adapted = self.state.adapt_strategy(context_analysis)
@@ -582,14 +657,38 @@ Start by diagnosing the current obstacles and identifying alternative approaches
         
         return recommendations.get(strategy_type, "- Use available tools as appropriate for the task")
     
-    def _get_recent_message_history(self) -> List[str]:
-        """Get recent message history for context analysis"""
+    def _get_new_message_history(self) -> List[str]:
+        """Get the messages appended since the last round for incremental context analysis.
+        Only the new messages (and the last consumed one) are keyed, the history is not rescanned"""
         try:
-            # This would need to be implemented based on how the agent stores message history
-            # For now, return a placeholder
-            return []
+            messages = self.agent.messages_get_raw()
         except Exception:
             return []
+        start = None
+        if self._last_consumed is not None:
+            count, key = self._last_consumed
+            # common case: messages were only appended after the last consumed one
+            if 0 < count <= len(messages) and self._get_message_key(messages[count - 1]) == key:
+                start = count
+        if start is None:
+            # history rewritten (e.g. summarized): walk back from the newest message until a consumed one
+            start = len(messages)
+            while start > 0 and self._get_message_key(messages[start - 1]) not in self._consumed_messages:
+                start -= 1
+        history = []
+        key = None
+        for msg in messages[start:]:
+            key = self._get_message_key(msg)
+            self._consumed_messages.seen(key)
+            history.append(f"{msg.type}: {msg.content}")
+        if messages:
+            self._last_consumed = (len(messages), key if key is not None else self._get_message_key(messages[-1]))
+        return history
+
+    @staticmethod
+    def _get_message_key(msg):
+        """The message id, or a hash of the type and content for messages without one"""
+        return msg.id or hash((msg.type, str(msg.content)))
     
     def _execute_with_message(self, message: str):
         """Execute the agent with a specific message"""
@@ -6,9 +6,11 @@ This module provides context-aware tool recommendations and usage guidance.
 
 import copy
 import time
+from collections import deque
 from typing import Dict, Any, List, Optional, Set, Tuple
 from enum import Enum
 from ucagent.util.log import info, warning, error
+from ucagent.util.stream_stats import LatencyHistogram
 
 
 class ToolCategory(Enum):
@@ -193,14 +195,21 @@ class ToolRecommendationEngine:
                 if success:
                     context_effectiveness[context]['successes'] += 1
         
-        # Calculate effectiveness rates
+        return self.summarize_tool_effectiveness(tool_stats, context_effectiveness, len(usage_history))
+
+    def summarize_tool_effectiveness(self, tool_stats: Dict[str, Dict[str, int]],
+                                     context_stats: Dict[str, Dict[str, int]],
+                                     total_usage: int) -> Dict[str, Any]:
+        """Calculate effectiveness rates from aggregated usage counters"""
+        if not total_usage:
+            return {'status': 'no_data'}
         tool_effectiveness = {}
         for tool, stats in tool_stats.items():
             if stats['uses'] > 0:
                 tool_effectiveness[tool] = stats['successes'] / stats['uses']
         
         context_success_rates = {}
-        for context, stats in context_effectiveness.items():
+        for context, stats in context_stats.items():
             if stats['attempts'] > 0:
                 context_success_rates[context] = stats['successes'] / stats['attempts']
         
@@ -209,17 +218,23 @@ class ToolRecommendationEngine:
             'context_success_rates': context_success_rates,
             'most_effective_tools': sorted(tool_effectiveness.items(), 
                                          key=lambda x: x[1], reverse=True)[:5],
-            'total_usage_sessions': len(usage_history)
+            'total_usage_sessions': total_usage
         }
 
 
 class ToolUsageTracker:
     """Tracks tool usage patterns and effectiveness"""
     
-    def __init__(self):
-        self.usage_history = []
+    def __init__(self, history_size: int = 800):
+        # Only a window of recent records is kept, the counters below are
+        # exact over the whole session and take fixed memory per tool/context
+        self.usage_history = deque(maxlen=history_size)
         self.session_tools = set()
         self.current_session_start = time.time()
+        self.total_calls = 0
+        self.tool_stats = {}
+        self.context_stats = {}
+        self.duration_hist = LatencyHistogram()
     
     def record_tool_usage(self, tool_name: str, context: str, success: bool, 
                          duration: float = None, parameters: Dict[str, Any] = None):
@@ -236,24 +251,31 @@ class ToolUsageTracker:
         
         self.usage_history.append(usage_record)
         self.session_tools.add(tool_name)
-        
-        # Keep history manageable
-        if len(self.usage_history) > 1000:
-            self.usage_history = self.usage_history[-800:]  # Keep recent 800 records
+        self.total_calls += 1
+        if tool_name:
+            stats = self.tool_stats.setdefault(tool_name, {'uses': 0, 'successes': 0})
+            stats['uses'] += 1
+            stats['successes'] += 1 if success else 0
+        if context:
+            stats = self.context_stats.setdefault(context, {'attempts': 0, 'successes': 0})
+            stats['attempts'] += 1
+            stats['successes'] += 1 if success else 0
+        if duration is not None:
+            self.duration_hist.add(duration)
     
     def get_session_summary(self) -> Dict[str, Any]:
         """Get summary of current session tool usage"""
         return {
             'session_duration': time.time() - self.current_session_start,
             'unique_tools_used': len(self.session_tools),
-            'total_tool_calls': len([u for u in self.usage_history 
-                                   if u['session_id'] == id(self)]),
-            'tools_used': list(self.session_tools)
+            'total_tool_calls': self.total_calls,
+            'tools_used': list(self.session_tools),
+            'duration': self.duration_hist.summary()
         }
     
     def get_recent_usage_patterns(self, window_size: int = 10) -> Dict[str, Any]:
         """Analyze recent usage patterns"""
-        recent_usage = self.usage_history[-window_size:] if self.usage_history else []
+        recent_usage = list(self.usage_history)[-window_size:] if self.usage_history else []
         
         if not recent_usage:
             return {'status': 'no_recent_usage'}
@@ -331,8 +353,9 @@ class ToolOrchestrator:
         """Get insights about tool usage patterns and effectiveness"""
         recent_patterns = self.usage_tracker.get_recent_usage_patterns()
         session_summary = self.usage_tracker.get_session_summary()
-        effectiveness_analysis = self.recommendation_engine.analyze_tool_effectiveness(
-            self.usage_tracker.usage_history
+        effectiveness_analysis = self.recommendation_engine.summarize_tool_effectiveness(
+            self.usage_tracker.tool_stats, self.usage_tracker.context_stats,
+            self.usage_tracker.total_calls
         )
         
         return {
@@ -381,7 +404,7 @@ class ToolOrchestrator:
     def get_orchestrator_status(self) -> Dict[str, Any]:
         """Get comprehensive status of the tool orchestrator"""
         return {
-            'total_tracked_usage': len(self.usage_tracker.usage_history),
+            'total_tracked_usage': self.usage_tracker.total_calls,
             'session_summary': self.usage_tracker.get_session_summary(),
             'available_categories': list(self.recommendation_engine.tool_categories.keys()),
             'optimization_suggestions': self.suggest_tool_optimization()
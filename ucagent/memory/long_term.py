@@ -7,15 +7,12 @@ import hashlib
 import json
 import math
 import os
+import threading
 import time
 from typing import Dict, Iterable, List, Optional, Tuple
 
-from ucagent.util.log import info
-
-try:
-    from langchain_openai import OpenAIEmbeddings
-except Exception:  # pragma: no cover - optional dependency at runtime
-    OpenAIEmbeddings = None
+from ucagent.util.embed_service import get_embed_service
+from ucagent.util.log import info, warning
 
 
 def _normalize_text(text: str) -> str:
@@ -58,6 +55,8 @@ class LongTermMemoryStore:
         self.vector_path = os.path.join(self.base_dir, "memory.emb.jsonl")
         self._seen_hash = set()
         self._embedder = None
+        self._embedder_failed = False
+        self._vector_lock = threading.Lock()
         self._vector_cache: Optional[List[Dict]] = None
         os.makedirs(self.base_dir, exist_ok=True)
         self._load_seen_hashes()
@@ -163,6 +162,7 @@ class LongTermMemoryStore:
         return [e for _, e in scored[:limit]]
 
     def clear(self) -> None:
+        self.flush_embeddings(timeout=5.0)
         if os.path.exists(self.path):
             try:
                 os.remove(self.path)
@@ -176,6 +176,7 @@ class LongTermMemoryStore:
 
     def archive_completed(self) -> None:
         """Rename memory.jsonl (and embedding file) for archival."""
+        self.flush_embeddings(timeout=10.0)
         dst_main = os.path.join(self.base_dir, "memory.completed.jsonl")
         dst_vec = os.path.join(self.base_dir, "memory.emb.completed.jsonl")
         archived_main = _rename_with_fallback(self.path, dst_main)
@@ -186,34 +187,51 @@ class LongTermMemoryStore:
             info(f"[long_term_memory] archived {archived_vec}")
 
     def _get_embedder(self):
-        if not self.enable_embed or OpenAIEmbeddings is None:
+        if not self.enable_embed or self._embedder_failed:
             return None
         if self._embedder is None:
-            model = self.embed_config.get("model_name")
-            base_url = self.embed_config.get("openai_api_base")
-            api_key = self.embed_config.get("openai_api_key")
-            if not model or not base_url:
+            backend = self.embed_config.get("backend") or "openai"
+            if backend == "openai" and not self.embed_config.get("fallback") and \
+                    (not self.embed_config.get("model_name") or not self.embed_config.get("openai_api_base")):
                 return None
             try:
-                self._embedder = OpenAIEmbeddings(model=model, base_url=base_url, api_key=api_key)
-            except Exception:
-                self._embedder = None
+                self._embedder = get_embed_service(self.embed_config, self.workspace)
+            except Exception as e:
+                warning(f"[long_term_memory] embedding disabled: {e}")
+                self._embedder_failed = True
         return self._embedder
 
     def _maybe_save_embedding(self, payload: Dict) -> None:
+        """Queue the embedding of payload, the vector is appended when the batch is done."""
         if not self.enable_embed or self._get_embedder() is None:
             return
-        try:
-            text = _normalize_text(json.dumps(payload, ensure_ascii=False))
-            vec = self._get_embedder().embed_query(text)
-            item = {"hash": payload.get("hash"), "vec": vec, "meta": payload.get("meta", {}), "ts": payload.get("timestamp")}
-            with open(self.vector_path, "a", encoding="utf-8") as f:
-                f.write(json.dumps(item, ensure_ascii=False) + "\n")
-            self._vector_cache = None
-        except Exception:
-            return
+        text = _normalize_text(json.dumps(payload, ensure_ascii=False))
+        item = {"hash": payload.get("hash"), "meta": payload.get("meta", {}), "ts": payload.get("timestamp")}
+
+        def _done(fut):
+            if fut.exception() is not None:
+                return
+            item["vec"] = fut.result()
+            try:
+                with self._vector_lock:
+                    with open(self.vector_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(item, ensure_ascii=False) + "\n")
+                    self._vector_cache = None
+            except Exception:
+                return
+        self._get_embedder().submit(text).add_done_callback(_done)
+
+    def flush_embeddings(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the queued embeddings of saved entries, return False on timeout."""
+        if self._embedder is None:
+            return True
+        return self._embedder.flush(timeout)
 
     def _load_vector_cache(self) -> List[Dict]:
+        with self._vector_lock:
+            return self._load_vector_cache_locked()
+
+    def _load_vector_cache_locked(self) -> List[Dict]:
         if self._vector_cache is not None:
             return self._vector_cache
         if not os.path.exists(self.vector_path):
@@ -233,6 +251,7 @@ class LongTermMemoryStore:
         return data
 
     def _search_by_embedding(self, query: str, limit: int = 5, filters: Optional[Dict] = None) -> List[Dict]:
+        self.flush_embeddings(timeout=5.0)  # include the entries saved just before
         vecs = self._load_vector_cache()
         if not vecs:
             return []
@@ -298,6 +298,7 @@ class StageManager(object):
             stage: VerifyStage = self.stages[idx]
             stage.set_fail_count(stage_info.get("fail_count", 0))
             stage.set_time_prev_cost(stage_info.get("time_cost", 0.0))
+            stage.set_has_history(True)
             stage.set_reference_file_status(stage_info.get("task", {}).get("reference_files", {}))
         self._go_skip_stage()
         for s in self.stages:
@@ -568,6 +569,9 @@ class StageManager(object):
             "check_info": ck_info,
             "check_pass": ck_pass,
         })
+        if self.stages[self.stage_index].last_check_cached:
+            ret_data["cached"] = True
+            ret_data["cache_note"] = "No file changed since the last check, this is the result of that check."
         if not ck_pass:
             ret_data["action"] = "Please fix the issues reported in 'check_info.last_msg.error' according to the suggestions, and then use the `Check` tool again to re-validate your work."
         self.last_check_info = copy.deepcopy(ret_data)
@@ -663,6 +667,8 @@ class StageManager(object):
             "check_info": ck_info,
             "check_pass": ck_pass,
         })
+        if self.stages[self.stage_index].last_check_cached:
+            self.last_check_info["cached"] = True
         if ck_pass:
             message = f"Stage {self.stage_index} completed successfully. "
             if self.enable_data_collection:
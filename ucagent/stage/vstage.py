@@ -2,11 +2,14 @@
 """Verification stage management for UCAgent."""
 
 from ucagent.util.functions import import_class_from_str, find_files_by_pattern
+from ucagent.util.functions import get_workspace_write_gen, workspace_signature
 from ucagent.util.log import info, warning
 from ucagent.util.config import Config
 import ucagent.checkers as checkers
 from collections import OrderedDict
 import copy
+import hashlib
+import json
 import time
 
 def update_dict(d, u):
@@ -78,6 +81,39 @@ class VerifyStage(object):
         self.time_start = None
         self.time_end = None
         self.time_prev_cost = 0.0
+        self._has_history = False
+        check_cache = cfg.get_value("check_cache", None) if isinstance(cfg, Config) else None
+        self.check_cache_enable = bool(check_cache and check_cache.get_value("enable", False))
+        self.check_cache_exclude = list(check_cache.get_value("exclude", [])) if check_cache else []
+        self.check_watch_patterns = self.get_check_watch_patterns() if self.check_cache_enable else []
+        self._check_memo = None
+        self._check_killed = False
+        self.last_check_cached = False
+
+    def get_check_watch_patterns(self):
+        """Get the workspace paths/patterns the check result depends on: the reference and
+        output files, the path arguments of the checkers and the DUT package dir.
+        """
+        ret = set(self.reference_files) | set(self.output_files)
+
+        def _collect(value):
+            if isinstance(value, dict):
+                for v in value.values():
+                    _collect(v)
+            elif isinstance(value, (list, tuple)):
+                for v in value:
+                    _collect(v)
+            elif isinstance(value, str) and value.strip() and "\n" not in value and len(value) < 1024:
+                ret.add(value.strip())
+        for c in self._checker:
+            _collect(c.args.as_dict())
+            _collect(c.extra_args.as_dict())
+        temp_cfg = self.cfg.get_value("_temp_cfg", None) if isinstance(self.cfg, Config) else None
+        if isinstance(temp_cfg, Config):
+            temp_cfg = temp_cfg.as_dict()
+        if temp_cfg and temp_cfg.get("DUT"):
+            ret.add(temp_cfg["DUT"])
+        return sorted(ret)
 
     def add_reference_files(self, files):
         for f in find_files_by_pattern(self.workspace, files):
@@ -86,6 +122,11 @@ class VerifyStage(object):
                 info(f"[{self.__class__.__name__}] Reference file {f} added.")
 
     def on_init(self):
+        if not self._has_history:
+            # the stage starts over (new run, --no-history or not reached in the saved run)
+            for c in self.checker:
+                c.on_reset()
+            self._has_history = True
         for c in self.checker:
             c.on_init()
         self.time_start = time.time()
@@ -153,6 +194,7 @@ class VerifyStage(object):
             if c.is_processing():
                 ret.append(f"{c.__class__.__name__}: {c.kill()}")
                 empt = False
+                self._check_killed = True
         if empt:
             ret.append("No check process is running.")
         return "\n".join(ret)
@@ -239,8 +281,39 @@ class VerifyStage(object):
                 return True
         return False
 
+    def get_check_fingerprint(self):
+        """Fingerprint of everything the checkers depend on: their configuration, the
+        file tool writes and the (path, size, mtime) of the files matched by
+        check_watch_patterns (including the DUT package). None if the stage result
+        can not be memoized.
+        """
+        if not self.check_cache_enable or self.check_size == 0:
+            return None
+        if any(not c.memoize_result or c.is_human_check_needed() for c in self.checker):
+            return None
+        h = hashlib.sha1()
+        h.update(json.dumps([[c.clss, c.args.as_dict(), c.extra_args.as_dict()] for c in self._checker],
+                            sort_keys=True, default=str).encode("utf-8"))
+        h.update(json.dumps([self.output_files, get_workspace_write_gen()], default=str).encode("utf-8"))
+        h.update(workspace_signature(self.workspace, self.check_cache_exclude,
+                                     self.check_watch_patterns).encode("utf-8"))
+        return h.hexdigest()
+
+    def get_check_memo(self, fingerprint, timeout):
+        """Get the memoized (pass, check_info) for fingerprint, None if it is outdated.
+        A failed result is only reused with the same timeout, a longer one may pass.
+        """
+        memo = self._check_memo
+        if fingerprint is None or memo is None or memo["fingerprint"] != fingerprint:
+            return None
+        if not memo["pass"] and memo["timeout"] != timeout:
+            return None
+        return memo["pass"], memo["check_info"]
+
     def do_check(self, *a, **kwargs):
         self._is_reached = True
+        self.last_check_cached = False
+        self._check_killed = False
         if not all(c[1] for c in self.reference_files.items()):
             emsg = OrderedDict({"error": "You need use tool `ReadTextFile` to read and understand the reference files", "files_need_read": []})
             for k, v in self.reference_files.items():
@@ -258,6 +331,18 @@ class VerifyStage(object):
             self.fail_count += 1
             return False, OrderedDict({"error": f"Output file patterns not found in workspace. you need to generate those files.",
                                        "failed_patterns": success_out_msg})
+        write_gen = get_workspace_write_gen()
+        fingerprint = self.get_check_fingerprint()
+        memo = self.get_check_memo(fingerprint, kwargs.get("timeout"))
+        if memo is not None:
+            info(f"[{self.__class__.__name__}] No file changed since the last check of stage {self.name}, reuse its result.")
+            self.last_check_cached = True
+            self.check_pass = memo[0]
+            if self.check_pass:
+                self.succ_count += 1
+            else:
+                self.fail_count += 1
+            return self.check_pass, copy.deepcopy(memo[1])
         self.check_pass = True
         for i, c in enumerate(self.checker):
             ck_pass, ck_msg = c.check(*a, **kwargs)
@@ -280,6 +365,12 @@ class VerifyStage(object):
                 self.fail_count += 1
         if self.check_pass:
             self.succ_count += 1
+        # a file tool write while the checkers ran (checks run concurrently with other tool
+        # calls) is not covered by the result; the fingerprint taken before the check is
+        # kept, so a change of the watched files during the check is a miss next time
+        if fingerprint is not None and not self._check_killed and get_workspace_write_gen() == write_gen:
+            self._check_memo = {"fingerprint": fingerprint, "pass": self.check_pass,
+                                "timeout": kwargs.get("timeout"), "check_info": copy.deepcopy(self.check_info)}
         return self.check_pass, self.check_info
 
     def is_reached(self):
@@ -294,8 +385,12 @@ class VerifyStage(object):
     def set_time_prev_cost(self, prev_time_cost: float):
         self.time_prev_cost = prev_time_cost
 
+    def set_has_history(self, has_history: bool):
+        self._has_history = has_history
+
     def clear(self):
         self.check_info = [None] * self.check_size
+        self._check_memo = None
 
     def get_substages(self)-> list[Self]:
         ret = []
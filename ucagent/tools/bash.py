@@ -3,6 +3,7 @@
 
 from typing import Optional, Dict
 from ucagent.util.log import info, str_return, str_error
+from ucagent.util.proc_group import run_streaming, run_timeout, format_kill_stats, format_run_usage, LIMIT_EXIT_REASONS
 from .uctool import UCTool
 
 from langchain_core.callbacks import (
@@ -11,7 +12,6 @@ from langchain_core.callbacks import (
 from pydantic import BaseModel, Field
 
 import os
-import subprocess
 
 
 class RunBashCommandInput(BaseModel):
@@ -98,21 +98,22 @@ class RunBashCommand(UCTool):
 
         try:
             # Execute command
-            # shell=True allows using pipes and other shell features
-            process = subprocess.run(
+            # shell=True allows using pipes and other shell features, the output
+            # is streamed into bounded buffers (head and tail of a long output) and
+            # the new process group lets a timeout stop the whole pipeline
+            res = run_streaming(
                 command,
-                cwd=work_dir,
                 timeout=timeout,
-                capture_output=True,
-                text=True,
+                cwd=work_dir,
                 shell=True,
                 executable="/bin/bash",
                 env=env
             )
-            
-            stdout = process.stdout
-            stderr = process.stderr
-            return_code = process.returncode
+            stdout, stderr, usage = res["stdout"], res["stderr"], res["usage"]
+            if res["timed_out"]:
+                info(f"Bash command timed out, {format_kill_stats(res['kill'])}")
+                return str_error(f"Command timed out after {run_timeout(timeout)} seconds ({format_run_usage(usage)}).")
+            return_code = res["returncode"]
 
             # Format output
             output_parts = []
@@ -130,12 +131,12 @@ class RunBashCommand(UCTool):
                 return str_return(msg)
             else:
                 msg = f"Command failed with return code {return_code}."
+                if usage["exit_reason"] in LIMIT_EXIT_REASONS:
+                    msg += f" Stopped by a resource limit ({format_run_usage(usage)})."
                 if full_output:
                     msg += f"\n{full_output}"
                 return str_error(msg)
 
-        except subprocess.TimeoutExpired:
-            return str_error(f"Command timed out after {timeout} seconds.")
         except Exception as e:
             return str_error(f"Execution failed: {str(e)}")
     
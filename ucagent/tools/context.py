@@ -10,6 +10,8 @@ from langchain_core.tools.base import ArgsSchema
 from pydantic import BaseModel, Field
 from typing import Any, Optional
 
+from ucagent.util.result_pages import format_page
+
 
 class ArgArbitContextSummary(BaseModel):
     message: str = Field(
@@ -52,3 +54,103 @@ class ArbitContextSummary(UCTool):
             raise ValueError("The provided conversation manager does not support setting arbitrary summaries.")
         self.conversation_manager = conversation_manager
         return self
+
+
+class ArgReadToolOutput(BaseModel):
+    handle: str = Field(
+        description="Handle of the compacted tool output, e.g. the 'handle' field of a [TOOL_OUTPUT_COMPACTED] result.",
+    )
+    start: int = Field(
+        default=1,
+        description="Start line index (1-based)."
+    )
+    count: int = Field(
+        default=200,
+        description="Number of lines to read."
+    )
+
+
+class ReadToolOutput(UCTool):
+    """Tool to page through tool outputs that were too large for the context."""
+
+    name: str = "ReadToolOutput"
+    description: str = ("Read lines of a tool output that was compacted because of its size. "
+                        "Large tool results are replaced by a digest marked [TOOL_OUTPUT_COMPACTED] with a 'handle', "
+                        "use this tool with the handle to read the needed part of the full output. "
+                        "Each returned line is prefixed with its index (starts from 1)."
+                       )
+    args_schema: Optional[ArgsSchema] = ArgReadToolOutput
+    store: Any = None
+    max_read_size: int = 32768
+
+    def _run(
+        self,
+        handle: str,
+        start: int = 1,
+        count: int = 200,
+        run_manager: CallbackManagerForToolRun = None,
+    ) -> str:
+        """Run the tool."""
+        if self.store is None:
+            return "Tool output store not bound."
+        try:
+            lines, total = self.store.read_lines(handle, start, max(1, count))
+        except KeyError:
+            return f"Tool output '{handle}' not found (invalid handle or removed as too old)."
+        start = max(1, start)
+        ret, size = [], 0
+        for i, line in enumerate(lines):
+            entry = f"{start + i}: {line}"
+            size += len(entry) + 1
+            if size > self.max_read_size and ret:
+                break
+            ret.append(entry)
+        end = start + len(ret) - 1
+        head = f"Read lines {start}-{end} of {total} from tool output '{handle}'"
+        if len(ret) < len(lines):
+            head += f" (cut at {self.max_read_size} characters, use a smaller count)"
+        return head + ":\n" + "\n".join(ret)
+
+    def bind(self, store):
+        """Bind the ToolOutputStore to read from."""
+        self.store = store
+        return self
+
+
+class ArgFetchResultPage(BaseModel):
+    cursor: str = Field(
+        description="Cursor of the page, given in the header of a [RESULT_PAGE] result.",
+    )
+
+
+class FetchResultPage(UCTool):
+    """Tool to fetch the next pages of a large tool result (MCP server)."""
+
+    name: str = "FetchResultPage"
+    description: str = ("Fetch a page of a large tool result. Results larger than one page are returned "
+                        "page by page, each page starts with a [RESULT_PAGE n/total] header that holds the "
+                        "cursor of the next page. Results are kept for a limited time."
+                       )
+    args_schema: Optional[ArgsSchema] = ArgFetchResultPage
+    pager: Any = None
+
+    def _run(
+        self,
+        cursor: str,
+        run_manager: CallbackManagerForToolRun = None,
+    ) -> str:
+        """Run the tool."""
+        if self.pager is None:
+            return "Result page store not bound."
+        try:
+            page = self.pager.get_page(cursor)
+        except KeyError:
+            return f"Result of cursor '{cursor}' not found (expired or removed), call the tool again."
+        except ValueError as e:
+            return str(e)
+        return format_page(page)
+
+    def bind(self, pager):
+        """Bind the ResultPageStore to read from."""
+        self.pager = pager
+        return self
@@ -1,10 +1,10 @@
 # -*- coding: utf-8 -*-
 """File operations tools for UCAgent."""
 
-from typing import Optional, List, Tuple
+from typing import ClassVar, Optional, List, Tuple
 from ucagent.util.log import info, str_info, str_return, str_error, str_data, warning
 from ucagent.util.functions import is_text_file, get_file_size, bytes_to_human_readable, copy_indent_from, rm_workspace_prefix
-from ucagent.util.functions import get_diff
+from ucagent.util.functions import get_diff, mark_workspace_written
 from .uctool import UCTool
 
 from langchain_core.callbacks import (
@@ -68,6 +68,8 @@ class BaseReadWrite:
         default=[],
         description="List of callbacks to use for tool run management."
     )
+    # set by the tools that modify files, a successful call invalidates memoized stage checks
+    modifies_files: ClassVar[bool] = False
 
     def append_callback(self, callback):
         """Append a callback to the tool run callbacks."""
@@ -83,6 +85,8 @@ class BaseReadWrite:
 
     def do_callback(self, *args, **kwargs):
         """Run all callbacks with the provided arguments."""
+        if self.modifies_files and args and args[0]:
+            mark_workspace_written()
         for cb in self.call_backs:
             # func(success, path, msg)
             cb(*args, **kwargs)
@@ -666,6 +670,7 @@ class ArgEditTextFile(BaseModel):
 
 class EditTextFile(UCTool, BaseReadWrite):
     """Edit or create a text file in the workspace with multiple modes."""
+    modifies_files: ClassVar[bool] = True
     name: str = "EditTextFile"
     description: str = (
         "Edit or create a text file in the workspace. Supports multiple modes:\n"
@@ -857,6 +862,7 @@ class ArgCopyFile(BaseModel):
 
 class CopyFile(UCTool, BaseReadWrite):
     """Copy a file from source to destination within the workspace."""
+    modifies_files: ClassVar[bool] = True
     name: str = "CopyFile"
     description: str = (
         "Copy a file from source to destination within the workspace. "
@@ -945,6 +951,7 @@ class ArgMoveFile(BaseModel):
 
 class MoveFile(UCTool, BaseReadWrite):
     """Move/rename a file from source to destination within the workspace."""
+    modifies_files: ClassVar[bool] = True
     name: str = "MoveFile"
     description: str = (
         "Move or rename a file from source to destination within the workspace. "
@@ -1037,6 +1044,7 @@ class ArgDeleteFile(BaseModel):
 
 class DeleteFile(UCTool, BaseReadWrite):
     """Delete a file or directory in the workspace with optional recursive deletion."""
+    modifies_files: ClassVar[bool] = True
     name: str = "DeleteFile"
     description: str = (
         "Delete a file or directory in the workspace. "
@@ -1122,6 +1130,7 @@ class ArgCreateDirectory(BaseModel):
 
 class CreateDirectory(UCTool, BaseReadWrite):
     """Create a directory in the workspace with optional parent directory creation."""
+    modifies_files: ClassVar[bool] = True
     name: str = "CreateDirectory"
     description: str = (
         "Create a directory in the workspace. "
@@ -1207,6 +1216,7 @@ class ArgReplaceStringInFile(BaseModel):
 
 class ReplaceStringInFile(UCTool, BaseReadWrite):
     """Replace exact string content in a text file with precise string matching."""
+    modifies_files: ClassVar[bool] = True
     name: str = "ReplaceStringInFile"
     description: str = (
         "Replace exact string content in a text file. This tool performs precise string matching and replacement. "
@@ -1,20 +1,21 @@
 # -*- coding: utf-8 -*-
 """Memory management tools for UCAgent."""
 
-from mem0 import Memory
 import time
 from .uctool import UCTool
 from langchain_core.tools.base import ArgsSchema
 
-from typing import Optional, List, Union
+from typing import Optional, List, Union, Any
 from pydantic import BaseModel, Field
 
 import os
+import re
 from ucagent.util.log import info, warning, error
+from ucagent.util.embed_service import get_embed_service
+from ucagent.util.doc_index import DocIndex, HashingEmbedder, DEFAULT_MAX_CHARS, DEFAULT_MIN_CHARS
 
 
 from langgraph.store.memory import InMemoryStore
-from langchain_openai import OpenAIEmbeddings
 from langmem import utils
 
 
@@ -24,12 +25,11 @@ class ArgsMemSearch(BaseModel):
     limit: int = Field(3, description="The maximum number of results to return, default 3", ge=1, le=100)
 
 
-def new_embed(config) -> dict:
-    info(f"Creating new embedding with model: {config['model_name']}, base_url: {config['openai_api_base']}")
-    return {"embed":OpenAIEmbeddings(model   = config["model_name"],
-                            base_url= config["openai_api_base"],
-                            api_key = config["openai_api_key"]),
-            "dims":config["dims"]
+def new_embed(config, workspace: Optional[str] = None) -> dict:
+    """Index config of an InMemoryStore, embedding through the shared batching/caching service."""
+    service = get_embed_service(config, workspace)
+    return {"embed": service.embed_documents,
+            "dims": config["dims"]
             }
 
 class SemanticSearchInGuidDoc(UCTool):
@@ -37,114 +37,81 @@ class SemanticSearchInGuidDoc(UCTool):
     name: str = "SemanticSearchInGuidDoc"
     description: str = (
         "Semantic search in the guild documentation for verification definitions and examples. "
+        "Returns the best matching sections with their file path and line range (anchor: path:start-end)."
     )
     args_schema: Optional[ArgsSchema] = ArgsMemSearch
 
     # custom variables
     workspace: str = Field(str, description="The workspace directory to search in")
     doc_path: str = Field(str, description="The path to the documentation directory relative to the workspace")
-    store: InMemoryStore = Field(InMemoryStore, description="In-memory store for document references")
-    namespace: utils.NamespaceTemplate = Field(utils.NamespaceTemplate,
-        description="Namespace template for document references"
-    )
+    index: Any = Field(None, description="Chunked vector index of the documentation (DocIndex)")
     rerank_enabled: bool = Field(False, description="Whether to apply lightweight rerank after semantic search")
     disabled: bool = Field(False, description="Set true if initialization failed")
     disable_reason: str = Field("", description="Reason for disable")
 
-    def __init__(self, config, workspace, doc_path, file_extension: List[str] = [".md", ".py", ".v"], rerank_enabled: bool = False):
+    def __init__(self, config, workspace, doc_path, file_extension: List[str] = [".md", ".py", ".v"],
+                 rerank_enabled: bool = False, index_config=None):
+        """
+        :param config: The embed config (model_name, openai_api_base, openai_api_key, dims).
+        :param index_config: The doc_index config: index_dir (relative to the workspace, empty to keep
+                             the index in memory), chunk_max_chars, chunk_min_chars, batch_size and
+                             embedder ('hashing' for the local model free embedder).
+        """
         super().__init__()
-        self.namespace = utils.NamespaceTemplate("doc_reference")
-        self.store = None
+        if hasattr(index_config, "as_dict"):
+            index_config = index_config.as_dict()
+        index_config = index_config or {}
         self.rerank_enabled = rerank_enabled
         self.workspace = os.path.abspath(workspace)
         self.doc_path = os.path.abspath(os.path.join(workspace, doc_path))
         assert os.path.exists(self.doc_path), f"Doc path {self.doc_path} does not exist."
         info(f"Initializing SearchInGuidDoc with workspace: {self.workspace}, doc_path: {self.doc_path}")
         try:
-            self.store = InMemoryStore(
-                index=new_embed(config)
-            )
-            for root, _, files in os.walk(self.doc_path):
-                for file in files:
-                    if any(file.endswith(ext) for ext in file_extension):
-                        file_path = os.path.abspath(os.path.join(root, file)).removeprefix(self.workspace + os.sep)
-                        self.store.put(self.namespace(),
-                                       key=str(file_path),
-                                       value={
-                                           "content": open(os.path.join(root, file), 'r', encoding='utf-8').read(),
-                                           "path": file_path,
-                                           "source": "guide_doc",
-                                           "timestamp": time.time(),
-                                       }),
-                        info(f"Added file {file_path} to memory.")
+            if index_config.get("embedder", "") == "hashing":
+                embedder = HashingEmbedder()
+                model_key = f"hashing-{embedder.dims}"
+            else:
+                embedder = get_embed_service(config, self.workspace)
+                model_key = embedder.model_key
+            index_dir = index_config.get("index_dir", "")
+            self.index = DocIndex(embedder,
+                                  index_dir=os.path.join(self.workspace, index_dir) if index_dir else None,
+                                  model_key=model_key,
+                                  max_chars=index_config.get("chunk_max_chars", DEFAULT_MAX_CHARS),
+                                  min_chars=index_config.get("chunk_min_chars", DEFAULT_MIN_CHARS),
+                                  batch_size=index_config.get("batch_size", 64))
+            self.index.build(self.doc_path, base_dir=self.workspace, extensions=tuple(file_extension))
         except Exception as e:
             self.disabled = True
             self.disable_reason = f"embedding init failed: {e}"
             warning(f"SemanticSearchInGuidDoc disabled: {self.disable_reason}")
 
-    def _rerank(self, memories: list) -> list:
-        """Lightweight rerank: similarity/score + recency bonus if available."""
-        def _score(m):
-            base = m.get("score") or m.get("similarity") or 0.0
-            ts = None
-            value = m.get("value") or {}
-            if isinstance(value, dict):
-                ts = value.get("timestamp")
-            recency = 0.0
-            if ts:
-                # simple recency bonus with half-life ~1 day
-                age_hours = max(0.0, (time.time() - ts) / 3600.0)
-                recency = 0.1 / (1.0 + age_hours / 24.0)
-            return base + recency
+    def _rerank(self, query: str, hits: list) -> list:
+        """Lightweight rerank: similarity score + bonus for the query words found in the section."""
+        words = set(re.findall(r"\w+", query.lower()))
+        def _score(h):
+            if not words:
+                return h["score"]
+            text = set(re.findall(r"\w+", (h["title"] + " " + h["content"]).lower()))
+            return h["score"] + 0.1 * len(words & text) / len(words)
         try:
-            return sorted(memories, key=_score, reverse=True)
+            return sorted(hits, key=_score, reverse=True)
         except Exception:
-            return memories
+            return hits
 
     def _run(self, query: str, limit: int = 3, run_manager = None) -> str:
-        if self.disabled or self.store is None:
+        if self.disabled or self.index is None:
             warning(f"SemanticSearchInGuidDoc skipped because disabled ({self.disable_reason})")
             return utils.dumps([])
-        memories = self.store.search(
-            self.namespace(),
-            query=query,
-            filter=None,
-            limit=limit,
-            offset=0,
-        )
-        mem_dicts = [m.dict() for m in memories]
-        if self.rerank_enabled:
-            try:
-                preview_before = []
-                for m in mem_dicts[: min(3, len(mem_dicts))]:
-                    value = m.get("value") or {}
-                    preview_before.append(
-                        {
-                            "path": value.get("path", ""),
-                            "score": m.get("score") or m.get("similarity") or 0.0,
-                        }
-                    )
-                info(
-                    f"[context_upgrade][rerank] query='{query[:80]}' "
-                    f"limit={limit} hits={len(mem_dicts)} preview_before={preview_before}"
-                )
-            except Exception:
-                pass
-            mem_dicts = self._rerank(mem_dicts)
-            try:
-                preview_after = []
-                for m in mem_dicts[: min(3, len(mem_dicts))]:
-                    value = m.get("value") or {}
-                    preview_after.append(
-                        {
-                            "path": value.get("path", ""),
-                            "score": m.get("score") or m.get("similarity") or 0.0,
-                        }
-                    )
-                info(f"[context_upgrade][rerank] preview_after={preview_after}")
-            except Exception:
-                pass
-        return utils.dumps(mem_dicts)
+        if not self.rerank_enabled:
+            return utils.dumps(self.index.search(query, k=limit))
+        # rerank a larger candidate pool, not only the final hits
+        hits = self.index.search(query, k=max(limit * 4, 10))
+        info(f"[context_upgrade][rerank] query='{query[:80]}' limit={limit} hits={len(hits)} "
+             f"preview_before={[(h['anchor'], h['score']) for h in hits[:3]]}")
+        hits = self._rerank(query, hits)[:limit]
+        info(f"[context_upgrade][rerank] preview_after={[(h['anchor'], h['score']) for h in hits]}")
+        return utils.dumps(hits)
 
 
 class ArgsMemoryPut(BaseModel):
@@ -10,11 +10,14 @@ from pydantic import BaseModel, Field
 
 
 from ucagent.util.test_tools import ucagent_lib_path
-from ucagent.util.functions import get_toffee_json_test_case, load_toffee_report
+from ucagent.util.functions import get_toffee_json_test_case, load_toffee_report, PytestOutputCompactor
+from ucagent.util.stream_capture import StreamCapture
+from ucagent.util.proc_group import popen_group, kill_process_group, format_kill_stats
+from ucagent.util.proc_group import run_timeout, get_run_usage, format_run_usage, LIMIT_EXIT_REASONS
 from ucagent.util.log import debug, info, warning
 import os
 import shutil
-import psutil
+import tempfile
 from typing import Tuple
 import subprocess
 import json
@@ -61,6 +64,90 @@ class RunPyTest(UCTool):
         default={},
         description="Additional arguments to pass to pytest, e.g., {'verbose': True, 'capture': 'no'}."
     )
+    capture_max_chars: int = Field(
+        default=200000,
+        description="Max characters of stdout/stderr kept in memory, the full output is spilled to a file beyond it."
+    )
+    spill_dir: str = Field(
+        default="",
+        description="Directory of the spilled stdout/stderr files, empty means the system temp directory."
+    )
+    output_captures: dict = Field(
+        default={},
+        description="Stream captures of the last test run."
+    )
+    last_run_usage: dict = Field(
+        default={},
+        description="Resource usage and exit reason of the last test run, see util.proc_group.get_run_usage."
+    )
+    last_run_note: str = Field(
+        default="",
+        description="Status text appended to the stderr of the last test run (timeout, resource limit, error)."
+    )
+
+    def get_spill_file(self, name: str) -> str:
+        """Get the spill file name of the stdout/stderr of the test run, the capture adds a unique suffix."""
+        return os.path.join(self.spill_dir or tempfile.gettempdir(),
+                            f"ucagent_{self.name}_{os.getpid()}_{name}.log")
+
+    def start_captures(self, worker) -> dict:
+        """Start streaming the piped stdout/stderr of worker, attached as `worker.output_captures`."""
+        self.close_captures()
+        captures = {}
+        for name, stream in (("stdout", worker.stdout), ("stderr", worker.stderr)):
+            if stream is None:
+                continue
+            captures[name] = StreamCapture(name, self.capture_max_chars, self.get_spill_file(name),
+                                           compactor=PytestOutputCompactor(), unique_spill=True).start(stream)
+        worker.output_captures = captures
+        self.output_captures = captures
+        return captures
+
+    def finish_captures(self, captures: dict, timeout: float = 5) -> Tuple[str, str]:
+        """Wait for the reader threads and return the captured (stdout, stderr)."""
+        ret = []
+        for name in ("stdout", "stderr"):
+            cap = captures.get(name)
+            if cap is None:
+                ret.append("")
+                continue
+            if not cap.join(timeout):
+                warning(f"Reading {name} of the test run is not finished after {timeout} seconds")
+            ret.append(cap.text())
+        return tuple(ret)
+
+    def close_captures(self):
+        """Remove the spill files of the last test run, the rest are removed at exit."""
+        for cap in self.output_captures.values():
+            cap.remove_spill()
+
+    def set_run_usage(self, worker, timed_out: bool = False, output: str = "") -> dict:
+        """Record the resource usage of the finished test run in `last_run_usage`."""
+        self.last_run_usage = get_run_usage(worker, timed_out=timed_out, output=output)
+        info(f"Test run resource usage: {format_run_usage(self.last_run_usage)}")
+        return self.last_run_usage
+
+    def reclaim_leftovers(self, worker):
+        """Kill the processes the finished test run left behind in its process group.
+
+        The worker is reaped, so only its process group is searched, its pid may be reused.
+        """
+        try:
+            stats = kill_process_group(worker)
+        except Exception as e:
+            warning(f"Error reclaiming the children of the test run: {e}")
+            return
+        if stats["pids"]:
+            warning(f"Test run left {len(stats['pids'])} process(es) running, {format_kill_stats(stats)}")
+
+    def compact_output(self) -> Tuple[str, str]:
+        """Get the compacted (stdout, stderr) of the last test run, built while it was running.
+
+        The stderr keeps the status text (timeout, resource limit) appended by do().
+        """
+        str_out, str_err = (self.output_captures[n].compacted() if n in self.output_captures else ""
+                            for n in ("stdout", "stderr"))
+        return str_out, str_err + self.last_run_note
 
     def do(self,
              test_dir_or_file: str,
@@ -73,6 +160,7 @@ class RunPyTest(UCTool):
         assert os.path.exists(test_dir_or_file), \
             f"Test directory or file does not exist: {test_dir_or_file}"
         ret_stdout, ret_stderr = "", ""
+        self.last_run_note = ""
         env = os.environ.copy()
         pythonpath = env.get("PYTHONPATH", "")
         python_path_str = os.path.abspath(os.getcwd()) + ":" + ucagent_lib_path()
@@ -101,33 +189,40 @@ class RunPyTest(UCTool):
 
         cmd = ["pytest", "-s", *self.get_pytest_args(), *test_target]
         info(f"Run command: PYTHONPATH={env['PYTHONPATH']} {' '.join(cmd)} (in {work_dir})\n")
+        captures = {}
         try:
-            worker = subprocess.Popen(
+            # In its own process group, so a timeout or KillCheck also stops
+            # the simulators and helpers started by the tests
+            worker = popen_group(
                 cmd,
                 stdout=subprocess.PIPE if return_stdout else None,
                 stderr=subprocess.PIPE if return_stderr else None,
                 text=True,
                 env=env,
-                bufsize=10,
+                errors="replace",
                 cwd=work_dir
             )
+            # Stream the output into bounded buffers instead of communicate(),
+            # so that huge test logs do not grow the memory of the agent
+            captures = self.start_captures(worker)
             self.pre_call(worker)
-            ret_stdout, ret_stderr = worker.communicate(timeout=timeout)  # Set a timeout for the test run
-            if not return_stdout:
-                ret_stdout = ""
-            if not return_stderr:
-                ret_stderr = ""
+            worker.wait(timeout=run_timeout(timeout, worker.limits))  # Set a timeout for the test run
+            self.reclaim_leftovers(worker)
+            ret_stdout, ret_stderr = self.finish_captures(captures)
+            usage = self.set_run_usage(worker, output=ret_stdout + ret_stderr)
+            if usage["exit_reason"] in LIMIT_EXIT_REASONS:
+                self.last_run_note = f"\nTest run stopped by a resource limit ({format_run_usage(usage)})."
+                return False, ret_stdout, ret_stderr + self.last_run_note
             return True, ret_stdout, ret_stderr
         except subprocess.TimeoutExpired as e:
             try:
-                worker.terminate()
-                _, alive = psutil.wait_procs([worker], timeout=3)
-                if alive:
-                    worker.kill()
+                info(f"Test run timed out, {format_kill_stats(kill_process_group(worker))}")
             except Exception as ex:
                 warning(f"Error terminating process: {ex}")
-            ret_stdout, ret_stderr = worker.communicate()
-            return False, ret_stdout, ret_stderr + f"\nTest run timed out after {e.timeout} seconds. You may try increasing the timeout argment."
+            ret_stdout, ret_stderr = self.finish_captures(captures)
+            usage = self.set_run_usage(worker, timed_out=True)
+            self.last_run_note = f"\nTest run timed out after {e.timeout} seconds ({format_run_usage(usage)}). You may try increasing the timeout argment."
+            return False, ret_stdout, ret_stderr + self.last_run_note
         except subprocess.CalledProcessError as e:
             if return_stdout:
                 ret_stdout += e.stdout
@@ -213,6 +308,7 @@ class RunUnityChipTest(RunPyTest):
              run_manager: CallbackManagerForToolRun = None, return_all_checks=False) -> dict:
         """Run the Unity chip tests."""
         shutil.rmtree(self.result_dir, ignore_errors=True)
+        self.last_run_usage = {}
         all_pass, pyt_out, pyt_err = RunPyTest.do(self,
                                           os.path.join(self.workspace, test_dir_or_file),
                                           pytest_ex_args,
@@ -227,6 +323,8 @@ class RunUnityChipTest(RunPyTest):
         }
         if os.path.exists(result_json_path):
             ret_data = load_toffee_report(result_json_path, self.workspace, all_pass, return_all_checks)
+        if self.last_run_usage:
+            ret_data["resource_usage"] = self.last_run_usage
         info(f"Run UnityChip test report:\n{json.dumps(ret_data, indent=2)}\n")
         return ret_data, pyt_out, pyt_err
 
@@ -2,6 +2,7 @@
 """UCAgent base tool class implementation."""
 
 
+from langchain_core.messages import ToolMessage
 from langchain_core.tools import BaseTool
 from langchain_core.tools.base import ArgsSchema
 from pydantic import Field, BaseModel
@@ -10,6 +11,7 @@ from mcp.server.fastmcp import Context
 from langchain_mcp_adapters.tools import _get_injected_args, create_model, ArgModelBase, FuncMetadata
 from mcp.server.fastmcp.tools import Tool as FastMCPTool
 import ucagent.util.functions as fc
+from ucagent.util.result_pages import format_page
 
 import threading
 import concurrent.futures
@@ -94,6 +96,10 @@ class UCTool(BaseTool):
         default_factory=asyncio.Lock,
         description="Asynchronous lock for thread safety."
     )
+    output_compactor: Optional[Any] = Field(
+        default=None,
+        description="ToolOutputCompactor for oversized outputs, None to return outputs as is."
+    )
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -126,6 +132,22 @@ class UCTool(BaseTool):
         self.description = fc.render_template(self.description, kwargs)
         return self
 
+    def set_output_compactor(self, compactor):
+        self.output_compactor = compactor
+        return self
+
+    def compact_output(self, output):
+        """Replace an oversized output (str or ToolMessage content) by its digest."""
+        if self.output_compactor is None:
+            return output
+        if isinstance(output, ToolMessage):
+            if isinstance(output.content, str):
+                output.content = self.output_compactor.compact(self.name, output.content)
+            return output
+        if isinstance(output, str):
+            return self.output_compactor.compact(self.name, output)
+        return output
+
     def is_force_exit(self):
         return self.force_exit
 
@@ -160,7 +182,7 @@ class UCTool(BaseTool):
         self.call_count += 1
         self.is_in_call = True
         try:
-            return super().invoke(input, config, **kwargs)
+            return self.compact_output(super().invoke(input, config, **kwargs))
         finally:
             self.is_in_call = False
             self.last_call_time = time.time()
@@ -227,7 +249,7 @@ class UCTool(BaseTool):
             return error_msg
         try:
             data, alive_thread = await self._ainvoke(input, config, **kwargs)
-            return data
+            return self.compact_output(data)
         except Exception as e:
             error_msg = {"error": f"Tool ({self.__class__.__name__}) ainvoke error: {str(e)}"}
             fc.warning(str(error_msg))
@@ -313,8 +335,12 @@ class RoleInfo(UCTool):
             self.role_info = role_info
 
 
-def to_fastmcp(tool: BaseTool) -> FastMCPTool:
-    """Convert a LangChain tool to a FastMCP tool."""
+def to_fastmcp(tool: BaseTool, pager=None) -> FastMCPTool:
+    """Convert a LangChain tool to a FastMCP tool.
+
+    If pager (ResultPageStore) is given, string results larger than one page are
+    returned page by page, see FetchResultPage.
+    """
     if not issubclass(tool.args_schema, BaseModel):
         raise ValueError(
             "Tool args_schema must be a subclass of pydantic.BaseModel. "
@@ -333,7 +359,20 @@ def to_fastmcp(tool: BaseTool) -> FastMCPTool:
     fn_metadata = FuncMetadata(arg_model=arg_model)
 
     async def fn(**arguments: dict[str, Any]) -> Any:
-        return await tool.ainvoke(arguments)
+        data = await tool.ainvoke(arguments)
+        if pager is None or not pager.need_paging(data):
+            return data
+        page = await asyncio.to_thread(pager.put, tool.name, data)
+        del data
+        fc.info(f"tool({tool.name}) result of {page['size']} chars is paged into {page['pages']} pages ({page['handle']})")
+        ctx = arguments.get("ctx")
+        if isinstance(ctx, Context):
+            try:
+                await ctx.report_progress(1, page["pages"])
+                await ctx.info({"msg": f"result of {page['size']} chars, {page['pages']} pages, next cursor: {page['next_cursor']}"})
+            except Exception as e:
+                fc.info(f"Failed to send the paging progress of {tool.name}: {e}, may be connection failed")
+        return format_page(page)
 
     injected_args = _get_injected_args(tool)
     if len(injected_args) > 0:
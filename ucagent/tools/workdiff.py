@@ -7,6 +7,7 @@ from langchain_core.tools.base import ArgsSchema
 from pydantic import BaseModel, Field
 from typing import Optional
 import ucagent.util.diff_ops as diff_ops
+from ucagent.util.diff_service import get_diff_service, paginate_diff
 from ucagent.util.log import info
 
 import os
@@ -16,6 +17,8 @@ class ArgsWorkDiff(BaseModel):
     """Arguments for workdiff tool"""
     file_path: str = Field(".", description="The file path to check for differences, default is current workspace directory. Supports glob patterns.")
     show_diff: bool = Field(False, description="Whether to show detailed diff output, default is False")
+    page: int = Field(1, description="Page of the detailed diff output to show (starting from 1), default is 1")
+    max_chars: int = Field(20000, description="Maximum characters of one page of the detailed diff output, default is 20000")
 
 
 class WorkDiff(UCTool):
@@ -38,6 +41,8 @@ class WorkDiff(UCTool):
         self,
         file_path: str = ".",
         show_diff: bool = False,
+        page: int = 1,
+        max_chars: int = 20000,
         run_manager=None,
     ) -> str:
         """Run the workdiff tool."""
@@ -47,9 +52,10 @@ class WorkDiff(UCTool):
         if not diff_ops.is_git_repo(self.workspace):
             info(f"Workspace {self.workspace} is not a Git repository.")
             return f"The workspace is not a Git repository."
-        repo = diff_ops.git.Repo(self.workspace)
-        changed_files = [item.a_path for item in repo.index.diff(None, paths=file_path)]
-        untracked_files = repo.untracked_files
+        service = get_diff_service(self.workspace)
+        status = service.status(file_path)
+        changed_files = status["modified"]
+        untracked_files = status["untracked"]
         if not changed_files and not untracked_files:
             return "No changes detected in the workspace."
         result = "Changes detected in the workspace:\n"
@@ -57,13 +63,14 @@ class WorkDiff(UCTool):
             result += "\nModified files:\n" + "\n".join(changed_files) + "\n"
         if untracked_files:
             result += "\nUntracked files:\n" + "\n".join(untracked_files) + "\n"
-        # detail diff output
+        # detail diff output, one git call for all files, paginated
         if show_diff and changed_files:
-            result += "\n----------------------- Detailed diff output: -----------------------\n"
-            for dfile in changed_files:
-                file_diff = repo.git.diff(dfile)
-                result += f"\nDiff for {dfile}:\n{file_diff}\n"
+            diff_page, page_count = paginate_diff(service.diff(file_path, changed_files), page, max(max_chars, 1000))
+            result += f"\n----------------------- Detailed diff output (page {min(max(page, 1), page_count)}/{page_count}): -----------------------\n"
+            result += diff_page
             result += "----------------------- End of Detailed diff  -----------------------\n"
+            if page < page_count:
+                result += f"Use arg `page={max(page, 1) + 1}` to get the next page.\n"
         return result
 
 
@@ -102,9 +109,9 @@ class WorkCommit(UCTool):
         if not diff_ops.is_git_repo(self.workspace):
             info(f"Workspace {self.workspace} is not a Git repository.")
             return f"The workspace is not a Git repository."
-        repo = diff_ops.git.Repo(self.workspace)
-        changed_files = [item.a_path for item in repo.index.diff(None)]
-        untracked_files = repo.untracked_files
+        status = get_diff_service(self.workspace).status()
+        changed_files = status["modified"]
+        untracked_files = status["untracked"]
         if not changed_files and not untracked_files:
             return "No changes to commit in the workspace."
         # find target files to commit
@@ -114,8 +121,9 @@ class WorkCommit(UCTool):
                 target_files.append(file)
         if not target_files:
             return f"No changes to commit for files with extensions: {self.subfix_list}."
-        # stage and commit changes
-        for file in target_files:
-            repo.git.add(file)
+        # stage (batched to bound the command line length) and commit changes
+        repo = diff_ops.git.Repo(self.workspace)
+        for i in range(0, len(target_files), 256):
+            repo.git.add("--", *target_files[i:i + 256])
         repo.index.commit(commit_message)
         return f"Committed changes to {len(target_files)} files ({', '.join(target_files)})."
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""Workspace bootstrap utilities: fast file copies with a restart manifest."""
+
+import os
+import json
+import shutil
+import stat
+import time
+from typing import List, Optional, Tuple
+
+from ucagent.util.log import info, warning
+
+# Linux FICLONE ioctl, _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+COPY_MODES = ("auto", "hardlink", "copy")
+
+
+def reflink_file(src: str, dst: str) -> bool:
+    """Create a copy-on-write clone of src at dst.
+
+    Args:
+        src: Source file path.
+        dst: Destination file path (overwritten if exists).
+
+    Returns:
+        True on success, False if the filesystem or platform does not support it.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    except (OSError, AttributeError):
+        if os.path.exists(dst):
+            os.remove(dst)
+        return False
+    shutil.copystat(src, dst)
+    return True
+
+
+def copy_file_fast(src: str, dst: str, mode: str = "auto") -> str:
+    """Copy a file using the cheapest method the filesystem supports.
+
+    Args:
+        src: Source file path.
+        dst: Destination file path.
+        mode: 'auto' tries reflink then copy, 'hardlink' tries hardlink first,
+              'copy' always does a plain copy.
+
+    Returns:
+        The method used: 'hardlink', 'reflink' or 'copy'.
+    """
+    assert mode in COPY_MODES, f"Unsupported copy mode: {mode}, expected one of {COPY_MODES}"
+    if os.path.lexists(dst):
+        os.remove(dst)
+    if mode == "hardlink":
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError:
+            pass
+    if mode != "copy" and reflink_file(src, dst):
+        return "reflink"
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def _file_sig(path: str) -> list:
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _make_writable(path: str):
+    # mode bits instead of os.access, which is always True for root
+    if os.path.exists(path):
+        mode = os.stat(path).st_mode
+        if not mode & stat.S_IWUSR:
+            os.chmod(path, mode | stat.S_IWUSR)
+
+
+def _make_parents_writable(path: str, top: str):
+    """Make the existing directories from top down to the parent of path writable.
+
+    chmode_ro of a previous run may have left the whole tree read-only.
+    """
+    top = os.path.abspath(top)
+    parent = os.path.dirname(os.path.abspath(path))
+    chain = [parent]
+    while parent != top and parent.startswith(top + os.sep):
+        parent = os.path.dirname(parent)
+        chain.append(parent)
+    for d in reversed(chain):
+        if not os.path.isdir(d):
+            break
+        _make_writable(d)
+
+
+def _remove_stale(dst_dir: str, rel: str) -> bool:
+    """Remove a file synced by a previous run and its directories left empty."""
+    dst = os.path.join(dst_dir, rel)
+    if not os.path.lexists(dst) or os.path.isdir(dst):
+        return False
+    _make_parents_writable(dst, dst_dir)
+    os.remove(dst)
+    parent = os.path.dirname(dst)
+    while parent != os.path.abspath(dst_dir) and parent.startswith(os.path.abspath(dst_dir) + os.sep):
+        try:
+            os.rmdir(parent)
+        except OSError:
+            break
+        parent = os.path.dirname(parent)
+    return True
+
+
+def sync_dir(src_dir: str, dst_dir: str, manifest_file: str,
+             extra_files: Optional[List[str]] = None, mode: str = "auto") -> dict:
+    """Synchronize src_dir (and extra files) into dst_dir.
+
+    Files whose source size/mtime match the manifest of the previous run and
+    whose destination still exists are skipped, so restarts only copy what
+    changed. Files of the previous manifest that are no longer in the source
+    (e.g. another source dir) are removed from dst_dir.
+
+    Args:
+        src_dir: Source directory.
+        dst_dir: Destination directory.
+        manifest_file: Path of the JSON manifest recording copied files.
+        extra_files: Extra files copied into the root of dst_dir.
+        mode: Copy mode passed to copy_file_fast.
+
+    Returns:
+        Statistics dict with counts per copy method, skipped files and time cost.
+    """
+    time_start = time.time()
+    old_manifest = {}
+    if os.path.isfile(manifest_file):
+        try:
+            with open(manifest_file, "r", encoding="utf-8") as f:
+                old_manifest = json.load(f).get("files", {})
+        except Exception as e:
+            warning(f"Ignore broken bootstrap manifest {manifest_file}: {e}")
+    items: List[Tuple[str, str]] = []
+    for root, dirs, files in os.walk(src_dir):
+        dirs.sort()
+        for fname in sorted(files):
+            src = os.path.join(root, fname)
+            items.append((src, os.path.relpath(src, src_dir)))
+    for f in extra_files or []:
+        items.append((os.path.abspath(f), os.path.basename(f)))
+    dst_dir = os.path.abspath(dst_dir)
+    stats = {"mode": mode, "skipped": 0, "removed": 0, "copy": 0, "reflink": 0, "hardlink": 0}
+    new_manifest = {}
+    for src, rel in items:
+        dst = os.path.join(dst_dir, rel)
+        sig = _file_sig(src)
+        new_manifest[rel] = sig
+        if old_manifest.get(rel) == sig and os.path.isfile(dst) and \
+           os.path.getsize(dst) == sig[0]:
+            stats["skipped"] += 1
+            continue
+        # previous run may have left the tree read-only
+        _make_parents_writable(dst, dst_dir)
+        dst_parent = os.path.dirname(dst)
+        if not os.path.isdir(dst_parent):
+            os.makedirs(dst_parent)
+        stats[copy_file_fast(src, dst, mode)] += 1
+    for rel in old_manifest:
+        if rel not in new_manifest and _remove_stale(dst_dir, rel):
+            stats["removed"] += 1
+    manifest_dir = os.path.dirname(manifest_file)
+    if manifest_dir and not os.path.exists(manifest_dir):
+        os.makedirs(manifest_dir)
+    with open(manifest_file, "w", encoding="utf-8") as f:
+        json.dump({"source": os.path.abspath(src_dir), "files": new_manifest}, f)
+    stats["time"] = round(time.time() - time_start, 4)
+    info(f"Sync {src_dir} to {dst_dir} completed: {stats}")
+    return stats
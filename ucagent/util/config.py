@@ -1,10 +1,17 @@
 # -*- coding: utf-8 -*-
 
 import os
+import re
+import json
+import hashlib
 import yaml
 from typing import Dict, Any, Optional, Union, List
 from .functions import render_template, dump_as_json, replace_bash_var
-from .log import info
+from .log import info, warning
+
+# attributes of Config that are not configuration keys
+INTERNAL_ATTRS = ("_freeze", "_flat")
+_MISSING = object()
 
 class Config:
     """Configuration class for UCAgent settings."""
@@ -52,7 +59,7 @@ class Config:
         """
         result = {}
         for key, value in self.__dict__.items():
-            if key == "_freeze":
+            if key in INTERNAL_ATTRS:
                 continue
             if isinstance(value, Config):
                 result[key] = value.as_dict()
@@ -129,6 +136,27 @@ class Config:
         self._freeze = True
         return self
 
+    def _flat_map(self):
+        """
+        Flat map of all dotted keys (eg a, a.b, a.b.c) to their values, built once when frozen.
+        :return: dict of dotted key to value.
+        """
+        flat = self.__dict__.get("_flat")
+        if flat is None:
+            flat = {}
+            stack = [("", self)]
+            while stack:
+                prefix, node = stack.pop()
+                for key, value in node.__dict__.items():
+                    if key in INTERNAL_ATTRS:
+                        continue
+                    flat[prefix + key] = value
+                    if isinstance(value, Config):
+                        stack.append((prefix + key + ".", value))
+            # bypass __setattr__, a frozen config only caches its own lookups
+            object.__setattr__(self, "_flat", flat)
+        return flat
+
     def un_freeze(self):
         """
         Unfreeze the configuration, making it mutable again.
@@ -141,6 +169,7 @@ class Config:
                 for v in value:
                     if isinstance(v, Config):
                         v.un_freeze()
+        self.__dict__.pop("_flat", None)
         self._freeze = False
         return self
 
@@ -179,6 +208,8 @@ class Config:
         if not isinstance(other, Config):
             raise TypeError("Can only merge from another Config instance.")
         for key, value in other.__dict__.items():
+            if key in INTERNAL_ATTRS:
+                continue
             if isinstance(value, Config):
                 if self.has_attr(key) and isinstance(getattr(self, key), Config):
                     getattr(self, key).merge_from(value)
@@ -216,7 +247,7 @@ class Config:
         keys = key.split('.')
         current = self
         for k in keys[:-1]:
-            if not self.has_attr(k):
+            if not current.has_attr(k):
                 raise AttributeError(f"Configuration does not have attribute '{k}'")
             current = getattr(current, k)
         setattr(current, keys[-1], value)
@@ -229,10 +260,14 @@ class Config:
         :param default: Default value to return if the key does not exist.
         :return: Value of the key if it exists, otherwise default.
         """
+        if self.__dict__.get("_freeze"):
+            value = self._flat_map().get(key, _MISSING)
+            if value is not _MISSING:
+                return value
         keys = key.split('.')
         current = self
         for k in keys[:-1]:
-            if not self.has_attr(k):
+            if not current.has_attr(k):
                 raise AttributeError(f"Configuration does not have attribute '{k}'")
             current = getattr(current, k)
         if not current.has_attr(keys[-1]):
@@ -283,15 +318,245 @@ def find_file_in_paths(filename, search_paths):
     return None
 
 
-def get_config(config_file=None, cfg_override=None):
+CONFIG_CACHE_VERSION = 2
+CONFIG_CACHE_MAX_FILES = 32
+CONFIG_SNAPSHOT_ENV = "UCAGENT_CONFIG_SNAPSHOT"
+ENV_VAR_PATTERN = re.compile(r'\$\(\s*(\w+)\s*:')
+# a whole $(VAR: default) expression, as substituted by replace_bash_var
+ENV_EXPR_PATTERN = re.compile(r'\$\(\s*(?P<key>\w+)\s*:\s*(?P<default>.*?)\s*\)')
+ENV_TOKEN_PREFIX = "__UCAGENT_ENV_"
+ENV_TOKEN_PATTERN = re.compile(re.escape(ENV_TOKEN_PREFIX) + r"\d+__")
+
+
+def get_config_cache_dir():
+    """
+    Get the directory of the merged config cache.
+    :return: $UCAGENT_CONFIG_CACHE_DIR or ~/.ucagent/cache/config
+    """
+    return os.environ.get("UCAGENT_CONFIG_CACHE_DIR") or \
+        os.path.join(os.path.expanduser('~'), ".ucagent/cache/config")
+
+
+def _check_json_safe(data):
+    if isinstance(data, dict):
+        for k, v in data.items():
+            if not isinstance(k, str):
+                raise TypeError(f"Config key {k!r} is not a string")
+            _check_json_safe(v)
+    elif isinstance(data, list):
+        for v in data:
+            _check_json_safe(v)
+    elif not (data is None or isinstance(data, (str, int, float, bool))):
+        raise TypeError(f"Config value {data!r} is not JSON serializable")
+
+
+def save_config_snapshot(cfg, path):
+    """
+    Save a config as a JSON snapshot, which is loaded without YAML parsing.
+    :param cfg: Config to save.
+    :param path: Snapshot file path.
+    :return: path
+    """
+    from .persist import atomic_write_json
+    data = cfg.as_dict()
+    _check_json_safe(data)
+    atomic_write_json(path, {"version": CONFIG_CACHE_VERSION, "data": data})
+    return path
+
+
+def load_config_snapshot(path=None, freeze=True):
+    """
+    Load a config snapshot saved by save_config_snapshot.
+    :param path: Snapshot file path, default the one shared by the parent process ($UCAGENT_CONFIG_SNAPSHOT).
+    :param freeze: Freeze the loaded config.
+    :return: Config, or None if there is no shared snapshot.
+    """
+    path = path or os.environ.get(CONFIG_SNAPSHOT_ENV)
+    if not path or not os.path.isfile(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        snapshot = json.load(f)
+    if snapshot.get("version") != CONFIG_CACHE_VERSION:
+        return None
+    cfg = Config(snapshot["data"])
+    return cfg.freeze() if freeze else cfg
+
+
+def share_config_snapshot(cfg, path=None):
+    """
+    Save cfg as a snapshot and export its path to worker subprocesses ($UCAGENT_CONFIG_SNAPSHOT),
+    which get it by load_config_snapshot() without re-parsing the config files.
+    The snapshot may hold API keys and is inherited by every child process, so only call
+    this where a worker consumes it; by default it is a private temp file (not in the
+    workspace the LLM can read), removed at exit.
+    :param cfg: Config to share.
+    :param path: Snapshot file path, default a temp file of this process.
+    :return: path, or None if cfg cannot be saved.
+    """
+    if path is None:
+        import atexit
+        import tempfile
+        path = os.path.join(tempfile.gettempdir(), f"ucagent-config-{os.getpid()}.json")
+        atexit.register(lambda: os.path.exists(path) and os.remove(path))
+    try:
+        save_config_snapshot(cfg, path)
+    except (OSError, TypeError) as e:
+        warning(f"Failed to share config snapshot at {path}: {e}")
+        return None
+    path = os.path.abspath(path)
+    os.environ[CONFIG_SNAPSHOT_ENV] = path
+    return path
+
+
+def _config_cache_key(config_file, search_dir):
+    """
+    Key of the merged config: contents of all candidate source files, the env vars they use and the args.
+    """
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    user_dir = os.path.join(os.path.expanduser('~'), ".ucagent")
+    target_file = config_file or 'config.yaml'
+    lang_dir = os.path.join(base_dir, "lang")
+    lang_config_dirs = sorted(os.path.join(lang_dir, d, "config") for d in os.listdir(lang_dir))
+    candidates = [os.path.join(base_dir, "setting.yaml"), os.path.join(user_dir, "setting.yaml")]
+    for d in [search_dir or os.getcwd(), user_dir] + lang_config_dirs:
+        candidates.append(os.path.join(d, target_file))
+    candidates += [os.path.join(d, "default.yaml") for d in lang_config_dirs]
+    h = hashlib.sha256(json.dumps([CONFIG_CACHE_VERSION, config_file, search_dir or os.getcwd()]).encode())
+    env_names = set()
+    for path in candidates:
+        h.update(path.encode("utf-8") + b"\0")
+        if not os.path.isfile(path):
+            h.update(b"-\0")
+            continue
+        with open(path, 'rb') as f:
+            content = f.read()
+        h.update(hashlib.sha256(content).digest())
+        env_names.update(ENV_VAR_PATTERN.findall(content.decode("utf-8", errors="replace")))
+    for name in sorted(env_names):
+        h.update(json.dumps([name, os.environ.get(name)]).encode("utf-8"))
+    return h.hexdigest()[:32]
+
+
+def _prune_config_cache(cache_dir):
+    prefix = f"v{CONFIG_CACHE_VERSION}-"
+    files, outdated = [], []
+    for f in os.listdir(cache_dir):
+        if f.endswith(".json"):
+            (files if f.startswith(prefix) else outdated).append(os.path.join(cache_dir, f))
+    files.sort(key=os.path.getmtime)
+    # outdated entries may hold substituted values (API keys), always remove them
+    for f in outdated + files[:max(0, len(files) - CONFIG_CACHE_MAX_FILES)]:
+        try:
+            os.remove(f)
+        except OSError:
+            pass
+
+
+def _tokenize_env_vars(content, env_vars):
+    """Replace the $(VAR: default) expressions of a config file by tokens, recorded in env_vars."""
+    def replace_match(match):
+        token = f"{ENV_TOKEN_PREFIX}{len(env_vars)}__"
+        quoted = match.start() > 0 and content[match.start() - 1] in "'\""
+        env_vars[token] = {"expr": match.group(0), "plain": not quoted}
+        return token
+    return ENV_EXPR_PATTERN.sub(replace_match, content)
+
+
+def substitute_env_vars(data, env_vars, env=None):
+    """
+    Substitute the tokens of a config tree loaded with env var tokens (see load_config_files).
+    A value that is a single unquoted expression gets the YAML type of the substituted text.
+    :param data: Config tree (dict, list or value).
+    :param env_vars: Token table filled by load_config_files.
+    :param env: Variables, default os.environ.
+    :return: The substituted tree.
+    """
+    env = os.environ if env is None else env
+    if isinstance(data, dict):
+        return {k: substitute_env_vars(v, env_vars, env) for k, v in data.items()}
+    if isinstance(data, list):
+        return [substitute_env_vars(v, env_vars, env) for v in data]
+    if not isinstance(data, str) or ENV_TOKEN_PREFIX not in data:
+        return data
+    var = env_vars.get(data)
+    if var is not None:
+        value = replace_bash_var(var["expr"], env)
+        return yaml.safe_load(value) if var["plain"] else value
+    return ENV_TOKEN_PATTERN.sub(lambda m: replace_bash_var(env_vars[m.group(0)]["expr"], env)
+                                 if m.group(0) in env_vars else m.group(0), data)
+
+
+def _load_config_cache(cache_path):
+    if not os.path.isfile(cache_path):
+        return None
+    with open(cache_path, 'r', encoding='utf-8') as f:
+        cache = json.load(f)
+    if cache.get("version") != CONFIG_CACHE_VERSION:
+        return None
+    return Config(substitute_env_vars(cache["data"], cache["env_vars"]))
+
+
+def _build_config_cache(cache_path, config_file, search_dir):
+    """Load the config files once with env var tokens, cache that tree and return it substituted."""
+    from .persist import atomic_write_json
+    env_vars = {}
+    raw = load_config_files(config_file, search_dir, env_vars=env_vars).as_dict()
+    cfg = Config(substitute_env_vars(raw, env_vars))
+    try:
+        _check_json_safe(raw)
+        atomic_write_json(cache_path, {"version": CONFIG_CACHE_VERSION, "data": raw, "env_vars": env_vars})
+        _prune_config_cache(os.path.dirname(cache_path))
+    except (OSError, TypeError) as e:
+        warning(f"Failed to cache config at {cache_path}: {e}")
+    return cfg
+
+
+def get_config(config_file=None, cfg_override=None, search_dir=None):
     """
     Get the configuration for the agent.
+    The merged result of the config files is cached (keyed by the file contents and the env vars
+    they use) in get_config_cache_dir(), set UCAGENT_CONFIG_CACHE=0 to disable it. The cache holds
+    the $(VAR: default) expressions, not their values, so values from the environment (API keys)
+    are never written to disk, they are substituted after parsing (on a cache miss too).
     :param config_file: Path to the configuration file.
+    :param search_dir: Directory searched first for the configuration file, default the current directory.
     :return: Configuration dictionary.
     """
+    cfg, cache_path = None, None
+    if os.environ.get("UCAGENT_CONFIG_CACHE", "1") != "0":
+        try:
+            cache_path = os.path.join(get_config_cache_dir(),
+                                      f"v{CONFIG_CACHE_VERSION}-{_config_cache_key(config_file, search_dir)}.json")
+            cfg = _load_config_cache(cache_path)
+        except (OSError, ValueError, KeyError, yaml.YAMLError) as e:
+            warning(f"Ignore config cache {cache_path}: {e}")
+    if cfg is not None:
+        info(f"Load config from cache '{cache_path}' completed.")
+    elif cache_path is not None:
+        try:
+            cfg = _build_config_cache(cache_path, config_file, search_dir)
+        except yaml.YAMLError as e:
+            info(f"Config is not cached, its $(VAR: default) expressions can not be substituted after parsing: {e}")
+    if cfg is None:
+        cfg = load_config_files(config_file, search_dir)
+    # set override values
+    return cfg.set_values(cfg_override).freeze()
+
+
+def load_config_files(config_file=None, search_dir=None, env_vars=None):
+    """
+    Load and merge the config files: default, user, language and the specified (or found) config file.
+    :param config_file: Path to the configuration file.
+    :param search_dir: Directory searched first for the configuration file, default the current directory.
+    :param env_vars: If a dict, the $(VAR: default) expressions are not substituted but replaced by
+                     tokens recorded in it, see substitute_env_vars.
+    :return: Merged Config (not frozen, without overrides).
+    """
     def load_yaml_with_env_vars(file_path):
         with open(file_path, 'r') as file:
             content = file.read()
+            if env_vars is not None:
+                return yaml.safe_load(_tokenize_env_vars(content, env_vars))
             rendered_content = replace_bash_var(content, os.environ)
             return yaml.safe_load(rendered_content)
 
@@ -331,7 +596,7 @@ def get_config(config_file=None, cfg_override=None):
     target_file = config_file
     if config_file is None:
         target_file = 'config.yaml'  # Default configuration file
-    user_config_file_path = find_file_in_paths(target_file, [os.getcwd(),
+    user_config_file_path = find_file_in_paths(target_file, [search_dir or os.getcwd(),
                                                              os.path.join(user_home, '.ucagent/'),
                                                              os.path.join(os.path.dirname(__file__), f"../lang/{lang}/config/")
                                                       ])
@@ -346,6 +611,4 @@ def get_config(config_file=None, cfg_override=None):
             info(f"Load config from '{user_config_file_path}' completed.")
         else:
             info(f"Config file '{user_config_file_path}' already loaded, ignore.")
-
-    # set override values
-    return cfg.set_values(cfg_override).freeze()
+    return cfg
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""Batched and cached git status/diff service for workspace tools."""
+
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# agent internal files and directories (state, caches, spill files) in the workspace
+INTERNAL_PREFIX = ".ucagent"
+
+
+def is_internal_path(path: str) -> bool:
+    """Check if a repo relative path is (inside) an agent internal file or directory."""
+    return any(part.startswith(INTERNAL_PREFIX) for part in path.split("/"))
+
+
+class DiffService:
+    """Compute workspace git status and diffs with a bounded number of subprocesses.
+
+    - status(): one `git status --porcelain -z` call.
+    - diff(): one `git diff --numstat -p` call for all changed files, cached by
+      the repository state (HEAD/index/refs) and the stat of the changed files,
+      so repeated or paginated requests on an unchanged tree cost no subprocess.
+    """
+
+    def __init__(self, path: str, max_cache_entries: int = 16):
+        self.path = os.path.abspath(path)
+        self.max_cache_entries = max_cache_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.stat_git_calls = 0
+        self.stat_cache_hits = 0
+        self._git_dirs = None
+        self._resolve_git_dirs()
+
+    def _git(self, *args) -> str:
+        self.stat_git_calls += 1
+        ret = subprocess.run(["git", "-C", self.path, "-c", "core.quotePath=false", *args],
+                             capture_output=True, text=True, errors="replace")
+        if ret.returncode != 0:
+            raise ValueError(f"git {' '.join(args)} failed in '{self.path}': {ret.stderr.strip()}")
+        return ret.stdout
+
+    def _resolve_git_dirs(self) -> Optional[Tuple[str, str]]:
+        """Get (git dir, common dir) of the repository, also for worktrees, submodules and $GIT_DIR."""
+        if self._git_dirs is None:
+            try:
+                out = self._git("rev-parse", "--git-dir", "--git-common-dir").splitlines()
+                self._git_dirs = tuple(os.path.join(self.path, d) for d in out[:2])
+            except ValueError:
+                return None  # not a repository (yet), resolved again next time
+        return self._git_dirs
+
+    def _state_key(self) -> tuple:
+        """Cheap fingerprint of HEAD, the index and refs without spawning git."""
+        key = []
+        git_dir, common_dir = self._resolve_git_dirs() or (os.path.join(self.path, ".git"),) * 2
+        head_ref = ""
+        head_file = os.path.join(git_dir, "HEAD")
+        if os.path.isfile(head_file):
+            with open(head_file, "r", encoding="utf-8") as f:
+                head_ref = f.read().strip()
+        key.append(head_ref)
+        targets = [(git_dir, "index"), (common_dir, "packed-refs")]
+        if head_ref.startswith("ref:"):
+            targets.append((common_dir, head_ref[4:].strip()))
+        for base, name in targets:
+            try:
+                st = os.stat(os.path.join(base, name))
+                key.append((name, st.st_mtime_ns, st.st_size))
+            except OSError:
+                key.append((name, None))
+        return tuple(key)
+
+    def _files_key(self, files: List[str]) -> tuple:
+        key = []
+        for f in files:
+            try:
+                st = os.stat(os.path.join(self.path, f))
+                key.append((f, st.st_mtime_ns, st.st_size))
+            except OSError:
+                key.append((f, None))
+        return tuple(key)
+
+    def status(self, pathspec: str = ".") -> Dict[str, List[str]]:
+        """Get staged, modified (unstaged) and untracked files under pathspec.
+
+        Untracked agent internal files (see is_internal_path) are not reported.
+
+        Returns:
+            Dict with keys 'staged', 'modified' and 'untracked', paths relative to the repo root.
+        """
+        out = self._git("status", "--porcelain=v1", "-z", "--untracked-files=all", "--", pathspec)
+        ret = {"staged": [], "modified": [], "untracked": []}
+        entries = out.split("\0")
+        i = 0
+        while i < len(entries):
+            entry = entries[i]
+            i += 1
+            if len(entry) < 4:
+                continue
+            x, y, fpath = entry[0], entry[1], entry[3:]
+            if x in "RC":
+                i += 1  # skip the rename/copy source path
+            if x == "?" and y == "?":
+                if not is_internal_path(fpath):
+                    ret["untracked"].append(fpath)
+                continue
+            if x not in " !":
+                ret["staged"].append(fpath)
+            if y not in " !":
+                ret["modified"].append(fpath)
+        return ret
+
+    def is_dirty(self, pathspec: str = ".") -> Tuple[bool, Dict[str, List[str]]]:
+        """Check staged/unstaged/untracked changes with a single git call."""
+        st = self.status(pathspec)
+        return bool(st["staged"] or st["modified"] or st["untracked"]), st
+
+    def diff(self, pathspec: str = ".", files: Optional[List[str]] = None) -> "OrderedDict[str, dict]":
+        """Get the worktree diff (against the index) of all changed files.
+
+        Args:
+            pathspec: Path or glob limiting the diff.
+            files: Changed files from status(), used to validate the cache; queried if None.
+
+        Returns:
+            OrderedDict of file -> {"added", "deleted", "patch"}.
+        """
+        if files is None:
+            files = self.status(pathspec)["modified"]
+        key = (pathspec, self._state_key(), self._files_key(sorted(files)))
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.stat_cache_hits += 1
+                return self._cache[key]
+        data = parse_numstat_patch(self._git("diff", "--no-color", "--no-ext-diff",
+                                             "--numstat", "-p", "--", pathspec))
+        with self._lock:
+            self._cache[key] = data
+            while len(self._cache) > self.max_cache_entries:
+                self._cache.popitem(last=False)
+        return data
+
+    def invalidate(self):
+        with self._lock:
+            self._cache.clear()
+
+
+def parse_numstat_patch(text: str) -> "OrderedDict[str, dict]":
+    """Parse the output of `git diff --numstat -p` into per-file entries."""
+    ret = OrderedDict()
+    lines = text.split("\n")
+    i = 0
+    # numstat section: "<added>\t<deleted>\t<path>" until the first patch header
+    while i < len(lines) and not lines[i].startswith("diff --git "):
+        parts = lines[i].split("\t", 2)
+        if len(parts) == 3:
+            ret[parts[2]] = {"added": parts[0], "deleted": parts[1], "patch": ""}
+        i += 1
+    # patch section, split by file headers
+    buf = []
+    def _flush():
+        if buf:
+            ret.setdefault(_patch_path(buf), {"added": "-", "deleted": "-", "patch": ""})["patch"] = "\n".join(buf)
+    for line in lines[i:]:
+        if line.startswith("diff --git "):
+            _flush()
+            buf = [line]
+            continue
+        if buf:
+            buf.append(line)
+    _flush()
+    return ret
+
+
+def _strip_patch_path(name: str, prefix: str) -> str:
+    # git appends a tab to names with spaces and quotes names with special characters
+    name = name.rstrip("\t")
+    if len(name) > 1 and name[0] == name[-1] == '"':
+        name = name[1:-1]
+    return name[len(prefix):] if name.startswith(prefix) else name
+
+
+def _patch_path(buf: List[str]) -> str:
+    """Path of a file patch: from '+++ b/<path>', '--- a/<path>' for deleted files,
+    the 'diff --git a/<path> b/<path>' header only for patches without them (binary, mode change)."""
+    old_path = None
+    for line in buf[1:]:
+        if line.startswith("@@"):
+            break
+        if line.startswith("+++ ") and line[4:].rstrip("\t") != "/dev/null":
+            return _strip_patch_path(line[4:], "b/")
+        if line.startswith("--- ") and line[4:].rstrip("\t") != "/dev/null":
+            old_path = _strip_patch_path(line[4:], "a/")
+        if line.startswith("rename to "):
+            return line[len("rename to "):]
+    if old_path is not None:
+        return old_path
+    header = buf[0][len("diff --git "):]
+    # both paths are the same without a rename: 'a/<path> b/<path>'
+    half = (len(header) - 1) // 2
+    if header[half] == " " and header[:half].startswith("a/") and header[half + 1:].startswith("b/"):
+        return header[half + 3:]
+    return _strip_patch_path(header.rsplit(" b/", 1)[-1], "")
+
+
+def paginate_diff(data: "OrderedDict[str, dict]", page: int = 1, max_chars: int = 20000) -> Tuple[str, int]:
+    """Pack per-file patches into pages of at most max_chars characters.
+
+    A patch larger than a page is truncated with a note.
+
+    Returns:
+        (page_text, page_count)
+    """
+    pages, cur = [], ""
+    for fname, item in data.items():
+        patch = f"\nDiff for {fname} (+{item['added']} -{item['deleted']}):\n{item['patch']}\n"
+        if len(patch) > max_chars:
+            note = f"\n...[patch of {fname} truncated, {len(patch)} chars in total]\n"
+            patch = patch[:max(0, max_chars - len(note))] + note
+        if cur and len(cur) + len(patch) > max_chars:
+            pages.append(cur)
+            cur = ""
+        cur += patch
+    if cur or not pages:
+        pages.append(cur)
+    page = min(max(page, 1), len(pages))
+    return pages[page - 1], len(pages)
+
+
+__services__: Dict[str, DiffService] = {}
+
+
+def get_diff_service(path: str) -> DiffService:
+    """Get the shared DiffService of a workspace (shared by tools and checkers)."""
+    path = os.path.abspath(path)
+    if path not in __services__:
+        __services__[path] = DiffService(path)
+    return __services__[path]
@@ -0,0 +1,381 @@
+# -*- coding: utf-8 -*-
+"""Chunked and persisted vector index of the Guide_Doc files.
+
+Files are split into chunks that follow their structure (markdown headings,
+Python and Verilog functions/modules), every chunk is embedded once and the
+vectors are kept in a float32 matrix on disk. A search is one matrix-vector
+product (numpy if it is installed) and returns chunks with file/line anchors
+instead of whole files. Unchanged files keep their vectors when the index is
+rebuilt.
+"""
+
+import ast
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from ucagent.util.embed_service import HashingEmbedder  # noqa: F401 (re-exported)
+from ucagent.util.log import info, warning
+from ucagent.util.persist import atomic_write_bytes, atomic_write_json, make_private_dir
+
+INDEX_VERSION = 1
+INDEX_FILE = "index.json"
+DEFAULT_MAX_CHARS = 2000
+DEFAULT_MIN_CHARS = 200
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+_VERILOG_BLOCK = re.compile(r"^\s*(?:(module|macromodule|interface|package|class)\s+(\w+)|"
+                            r"(?:virtual\s+|static\s+|automatic\s+)*(function|task)\b[^;(]*?(\w+)\s*[;(])")
+_VERILOG_END = re.compile(r"^\s*(endmodule|endinterface|endpackage|endclass|endfunction|endtask)\b")
+
+
+def _make_chunk(lines: List[str], start: int, end: int, title: str) -> dict:
+    """Chunk of lines[start:end] (0-based), anchored with 1-based inclusive lines."""
+    return {"start_line": start + 1, "end_line": end, "title": title, "text": "".join(lines[start:end])}
+
+
+def _split_long(lines: List[str], start: int, end: int, title: str, max_chars: int) -> List[dict]:
+    """Split lines[start:end] into chunks of at most max_chars, at blank lines if possible."""
+    chunks = []
+    while start < end:
+        size, cut, last_blank = 0, start, None
+        while cut < end and (size + len(lines[cut]) <= max_chars or cut == start):
+            size += len(lines[cut])
+            if not lines[cut].strip():
+                last_blank = cut + 1
+            cut += 1
+        if cut < end and last_blank is not None and last_blank > start + 1:
+            cut = last_blank
+        chunks.append(_make_chunk(lines, start, cut, title))
+        start = cut
+    return chunks
+
+
+def _pack_sections(lines: List[str], sections: List[Tuple[int, int, str]],
+                   max_chars: int, min_chars: int) -> List[dict]:
+    """Merge sections shorter than min_chars into the next one and split the long ones."""
+    chunks = []
+    pending = None
+    for start, end, title in sections:
+        if pending is not None:
+            start, title = pending[0], pending[1] or title
+            pending = None
+        size = sum(len(l) for l in lines[start:end])
+        if size < min_chars and end < len(lines):
+            pending = (start, title)
+            continue
+        if size <= max_chars:
+            chunks.append(_make_chunk(lines, start, end, title))
+        else:
+            chunks += _split_long(lines, start, end, title, max_chars)
+    if pending is not None:
+        chunks.append(_make_chunk(lines, pending[0], len(lines), pending[1]))
+    return [c for c in chunks if c["text"].strip()]
+
+
+def split_markdown(text: str, max_chars: int = DEFAULT_MAX_CHARS, min_chars: int = DEFAULT_MIN_CHARS) -> List[dict]:
+    """Split markdown at its headings, the chunk title is the heading path (e.g. 'A > B')."""
+    lines = text.splitlines(keepends=True)
+    sections, path = [], []
+    start, title, in_fence = 0, "", False
+    for i, line in enumerate(lines):
+        if _FENCE.match(line):
+            in_fence = not in_fence
+            continue
+        m = None if in_fence else _HEADING.match(line)
+        if not m:
+            continue
+        if i > start:
+            sections.append((start, i, title))
+        level = len(m.group(1))
+        path = path[:level - 1] + [m.group(2)]
+        start, title = i, " > ".join(p for p in path if p)
+    sections.append((start, len(lines), title))
+    return _pack_sections(lines, sections, max_chars, min_chars)
+
+
+def split_python(text: str, max_chars: int = DEFAULT_MAX_CHARS, min_chars: int = DEFAULT_MIN_CHARS) -> List[dict]:
+    """Split Python source into top level functions and classes (large classes into methods)."""
+    lines = text.splitlines(keepends=True)
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return _split_long(lines, 0, len(lines), "", max_chars)
+
+    def first_line(node):
+        return min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])]) - 1
+
+    defs = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+    sections = []
+    pos = 0
+    for node in tree.body:
+        if not isinstance(node, defs):
+            continue
+        start, end = first_line(node), node.end_lineno
+        if start > pos:
+            sections.append((pos, start, ""))
+        size = sum(len(l) for l in lines[start:end])
+        methods = [n for n in node.body if isinstance(n, defs)] if isinstance(node, ast.ClassDef) else []
+        if size > max_chars and methods:
+            cpos = start
+            for n in methods:
+                if first_line(n) > cpos:
+                    sections.append((cpos, first_line(n), node.name))
+                sections.append((first_line(n), n.end_lineno, f"{node.name}.{n.name}"))
+                cpos = n.end_lineno
+            if end > cpos:
+                sections.append((cpos, end, node.name))
+        else:
+            sections.append((start, end, node.name))
+        pos = end
+    if pos < len(lines):
+        sections.append((pos, len(lines), ""))
+    return _pack_sections(lines, sections, max_chars, min_chars)
+
+
+def split_verilog(text: str, max_chars: int = DEFAULT_MAX_CHARS, min_chars: int = DEFAULT_MIN_CHARS) -> List[dict]:
+    """Split Verilog/SystemVerilog into modules, functions and tasks."""
+    lines = text.splitlines(keepends=True)
+    sections, stack = [], []
+    pos = 0
+    for i, line in enumerate(lines):
+        code = line.split("//", 1)[0]
+        m = _VERILOG_BLOCK.match(code)
+        if m:
+            name = m.group(2) or m.group(4)
+            if not stack and i > pos:
+                sections.append((pos, i, ""))
+                pos = i
+            stack.append(name)
+            continue
+        if _VERILOG_END.match(code) and stack:
+            name = stack.pop()
+            # functions and tasks inside a module stay in the module chunk
+            if not stack:
+                sections.append((pos, i + 1, name))
+                pos = i + 1
+    if pos < len(lines):
+        sections.append((pos, len(lines), stack[0] if stack else ""))
+    return _pack_sections(lines, sections, max_chars, min_chars)
+
+
+def split_text(text: str, max_chars: int = DEFAULT_MAX_CHARS, min_chars: int = DEFAULT_MIN_CHARS) -> List[dict]:
+    lines = text.splitlines(keepends=True)
+    return [c for c in _split_long(lines, 0, len(lines), "", max_chars) if c["text"].strip()]
+
+
+SPLITTERS = {
+    ".md": split_markdown,
+    ".markdown": split_markdown,
+    ".py": split_python,
+    ".v": split_verilog,
+    ".sv": split_verilog,
+    ".svh": split_verilog,
+    ".vh": split_verilog,
+}
+
+
+def split_file(path: str, text: str, max_chars: int = DEFAULT_MAX_CHARS, min_chars: int = DEFAULT_MIN_CHARS) -> List[dict]:
+    """Split a file by its type, see SPLITTERS (plain line windows for other types)."""
+    splitter = SPLITTERS.get(os.path.splitext(path)[1].lower(), split_text)
+    return splitter(text, max_chars, min_chars)
+
+
+def _normalize(vec) -> List[float]:
+    norm = math.sqrt(sum(v * v for v in vec))
+    return [v / norm for v in vec] if norm > 0 else list(vec)
+
+
+class DocIndex:
+    """Chunk embeddings of a document directory, persisted in index_dir.
+
+    index_dir holds index.json (chunks, file hashes, embedder key) and the
+    vectors-<digest>.f32 matrix (float32, one normalized row per chunk),
+    written before index.json refers to it, so a crash never leaves an index
+    with mismatched vectors.
+
+    Args:
+        embedder: Object with embed_documents(texts) and embed_query(text).
+        index_dir: Directory of the persisted index, None to keep it in memory only.
+        model_key: Identifies the embedder, the vectors are recomputed when it changes.
+        max_chars: Max characters of a chunk.
+        min_chars: Shorter sections are merged with the next one.
+        batch_size: Chunks embedded per embed_documents call.
+    """
+
+    def __init__(self, embedder, index_dir: Optional[str] = None, model_key: str = "",
+                 max_chars: int = DEFAULT_MAX_CHARS, min_chars: int = DEFAULT_MIN_CHARS, batch_size: int = 64):
+        self.embedder = embedder
+        self.index_dir = index_dir
+        self.model_key = model_key or getattr(embedder, "model", embedder.__class__.__name__)
+        self.max_chars = max_chars
+        self.min_chars = min_chars
+        self.batch_size = batch_size
+        self.chunks: List[dict] = []
+        self.files: Dict[str, dict] = {}
+        self.dims = 0
+        self._vectors = array("f")
+        self._matrix = None  # numpy view of _vectors
+        self.stats = {"files": 0, "chunks": 0, "embedded": 0, "reused": 0}
+
+    def _settings(self) -> dict:
+        return {"version": INDEX_VERSION, "model": self.model_key,
+                "max_chars": self.max_chars, "min_chars": self.min_chars}
+
+    def _load(self) -> Tuple[dict, array]:
+        """Load the persisted index, ({}, empty) if there is none or it is outdated."""
+        if not self.index_dir:
+            return {}, array("f")
+        try:
+            with open(os.path.join(self.index_dir, INDEX_FILE), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("settings") != self._settings():
+                return {}, array("f")
+            vectors = array("f")
+            with open(os.path.join(self.index_dir, data["vectors"]), "rb") as f:
+                vectors.frombytes(f.read())
+            if len(vectors) != len(data["chunks"]) * data["dims"]:
+                raise ValueError("vector count does not match the chunks")
+            return data, vectors
+        except (OSError, ValueError, KeyError) as e:
+            if not isinstance(e, FileNotFoundError):
+                warning(f"Ignore the doc index in {self.index_dir}: {e}")
+            return {}, array("f")
+
+    def build(self, root: str, base_dir: Optional[str] = None, extensions=(".md", ".py", ".v")) -> "DocIndex":
+        """Index the files with extensions under root, reusing the vectors of unchanged files.
+
+        Args:
+            root: Directory to index.
+            base_dir: Chunk paths are relative to it, default root.
+            extensions: File extensions to index.
+        """
+        base_dir = os.path.abspath(base_dir or root)
+        self.stats = {"files": 0, "chunks": 0, "embedded": 0, "reused": 0}
+        old, old_vectors = self._load()
+        old_files, old_chunks, old_dims = old.get("files", {}), old.get("chunks", []), old.get("dims", 0)
+        chunks, vectors, files = [], array("f"), {}
+        to_embed = []  # (chunk index, text)
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if not name.endswith(tuple(extensions)):
+                    continue
+                full = os.path.join(dirpath, name)
+                rel = os.path.relpath(full, base_dir)
+                try:
+                    with open(full, "rb") as f:
+                        raw = f.read()
+                except OSError as e:
+                    warning(f"Skip {rel} in the doc index: {e}")
+                    continue
+                digest = hashlib.sha1(raw).hexdigest()
+                prev = old_files.get(rel)
+                first = len(chunks)
+                if prev is not None and prev["sha1"] == digest:
+                    for i in range(prev["first"], prev["first"] + prev["count"]):
+                        chunks.append(old_chunks[i])
+                        vectors.extend(old_vectors[i * old_dims:(i + 1) * old_dims])
+                    self.stats["reused"] += prev["count"]
+                else:
+                    for c in split_file(rel, raw.decode("utf-8", "replace"), self.max_chars, self.min_chars):
+                        c["path"] = rel
+                        to_embed.append((len(chunks), self._embed_text(c)))
+                        chunks.append(c)
+                files[rel] = {"sha1": digest, "first": first, "count": len(chunks) - first}
+        dims = old_dims if self.stats["reused"] else 0
+        new_vectors = {}
+        for i in range(0, len(to_embed), self.batch_size):
+            batch = to_embed[i:i + self.batch_size]
+            for (idx, _), vec in zip(batch, self.embedder.embed_documents([t for _, t in batch])):
+                vec = _normalize(vec)
+                if dims and len(vec) != dims:
+                    raise ValueError(f"Embedding size changed from {dims} to {len(vec)}, set a new model key")
+                dims = len(vec)
+                new_vectors[idx] = vec
+        self.stats["embedded"] = len(new_vectors)
+        if new_vectors:
+            # insert the new rows at their chunk positions
+            merged, pos = array("f"), 0
+            for idx in range(len(chunks)):
+                if idx in new_vectors:
+                    merged.extend(new_vectors[idx])
+                else:
+                    merged.extend(vectors[pos * dims:(pos + 1) * dims])
+                    pos += 1
+            vectors = merged
+        self.chunks, self._vectors, self.files, self.dims = chunks, vectors, files, dims
+        self._matrix = None
+        self.stats["files"], self.stats["chunks"] = len(files), len(chunks)
+        if self.index_dir and (new_vectors or files != old_files):
+            self._save()
+        info(f"Doc index of {root}: {self.stats}")
+        return self
+
+    def _embed_text(self, chunk: dict) -> str:
+        head = chunk["path"] + (f" | {chunk['title']}" if chunk["title"] else "")
+        return f"{head}\n{chunk['text']}"
+
+    def _save(self):
+        data = self._vectors.tobytes()
+        name = f"vectors-{hashlib.sha1(data).hexdigest()[:16]}.f32"
+        make_private_dir(self.index_dir)
+        atomic_write_bytes(os.path.join(self.index_dir, name), data)
+        atomic_write_json(os.path.join(self.index_dir, INDEX_FILE), {
+            "settings": self._settings(), "dims": self.dims, "vectors": name,
+            "files": self.files, "chunks": self.chunks,
+        })
+        for old in os.listdir(self.index_dir):
+            if old.startswith("vectors-") and old.endswith(".f32") and old != name:
+                os.remove(os.path.join(self.index_dir, old))
+
+    def _scores(self, query_vec: List[float]):
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        if np is not None:
+            if self._matrix is None:
+                self._matrix = np.frombuffer(self._vectors, dtype=np.float32).reshape(len(self.chunks), self.dims)
+            return self._matrix @ np.asarray(query_vec, dtype=np.float32)
+        d = self.dims
+        v = self._vectors
+        return [sum(a * b for a, b in zip(v[i * d:(i + 1) * d], query_vec)) for i in range(len(self.chunks))]
+
+    def search(self, query: str, k: int = 3) -> List[dict]:
+        """Top k chunks by cosine similarity to query.
+
+        Returns:
+            Dicts with path, start_line, end_line, anchor ('path:start-end'), title, score and content.
+        """
+        if not self.chunks or k <= 0:
+            return []
+        qvec = _normalize(self.embedder.embed_query(query))
+        if len(qvec) != self.dims:
+            raise ValueError(f"Query embedding has {len(qvec)} dims, the index has {self.dims}")
+        scores = self._scores(qvec)
+        if hasattr(scores, "argpartition"):
+            k = min(k, len(self.chunks))
+            top = scores.argpartition(-k)[-k:]
+            order = sorted(((float(scores[i]), int(i)) for i in top), key=lambda x: (-x[0], x[1]))
+        else:
+            order = heapq.nsmallest(k, ((s, i) for i, s in enumerate(scores)), key=lambda x: (-x[0], x[1]))
+        ret = []
+        for score, i in order:
+            c = self.chunks[i]
+            ret.append({
+                "path": c["path"],
+                "start_line": c["start_line"],
+                "end_line": c["end_line"],
+                "anchor": f"{c['path']}:{c['start_line']}-{c['end_line']}",
+                "title": c["title"],
+                "score": round(float(score), 4),
+                "content": c["text"],
+            })
+        return ret
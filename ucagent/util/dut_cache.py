@@ -0,0 +1,467 @@
+# -*- coding: utf-8 -*-
+"""Content-addressed cache of DUT packages exported by picker."""
+
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from ucagent.util.bootstrap import copy_file_fast
+from ucagent.util.log import info, warning
+from ucagent.util.persist import atomic_write_json
+
+# HDL sources next to the top file are hashed too (includes, submodules)
+RTL_EXTS = (".v", ".sv", ".vh", ".svh", ".scala")
+# run time outputs written into the DUT package dir, never cached
+SKIP_EXTS = (".fst", ".vcd", ".dat", ".pyc", ".log")
+SKIP_DIRS = ("__pycache__",)
+EXPORT_RECORD_FILE = ".ucagent_dut_export.json"
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def get_picker_version(picker: str = "picker") -> str:
+    """Get the version string of picker, 'unknown' if it cannot be run."""
+    try:
+        ret = subprocess.run([picker, "--version"], capture_output=True, text=True, timeout=30)
+        return (ret.stdout or ret.stderr).strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def list_rtl_files(rtl_file: str, filelist: Optional[str] = None) -> List[str]:
+    """Get the source files a picker export depends on.
+
+    Args:
+        rtl_file: Top RTL file.
+        filelist: Optional picker filelist (--fs), its entries are relative to its dir.
+
+    Returns:
+        Sorted absolute paths of the top file, the HDL files in its dir, the filelist and its entries.
+    """
+    rtl_file = os.path.abspath(rtl_file)
+    files = {rtl_file}
+    rtl_dir = os.path.dirname(rtl_file)
+    for fname in os.listdir(rtl_dir):
+        if fname.endswith(RTL_EXTS) and os.path.isfile(os.path.join(rtl_dir, fname)):
+            files.add(os.path.join(rtl_dir, fname))
+    if filelist:
+        filelist = os.path.abspath(filelist)
+        files.add(filelist)
+        with open(filelist, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith(("#", "//", "+", "-")):
+                    continue
+                path = line if os.path.isabs(line) else os.path.join(os.path.dirname(filelist), line)
+                if os.path.isfile(path):
+                    files.add(os.path.abspath(path))
+    return sorted(files)
+
+
+def source_hashes(rtl_files: List[str]) -> List[list]:
+    """Get sorted [base name, sha256] of the source files."""
+    return sorted([os.path.basename(f), file_sha256(f)] for f in rtl_files)
+
+
+def make_cache_key(sources: List[list], sname: str, flags: List[str], picker_version: str) -> str:
+    """Key of an export: source hashes (see source_hashes), the picker version and the flags."""
+    data = json.dumps({"sname": sname, "flags": list(flags), "picker": picker_version,
+                       "sources": sources}, sort_keys=True)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:32]
+
+
+def package_manifest(pkg_dir: str) -> Dict[str, list]:
+    """Get {relative path: [size, sha256]} of the cacheable files in a DUT package."""
+    ret = {}
+    for root, dirs, files in os.walk(pkg_dir):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+        for fname in sorted(files):
+            if fname.endswith(SKIP_EXTS):
+                continue
+            path = os.path.join(root, fname)
+            if os.path.islink(path) or not os.path.isfile(path):
+                continue
+            ret[os.path.relpath(path, pkg_dir)] = [os.path.getsize(path), file_sha256(path)]
+    return ret
+
+
+def diff_manifest(expected: Dict[str, list], actual: Dict[str, list]) -> List[str]:
+    """Get the paths that are missing, extra or different between two manifests."""
+    ret = []
+    for rel in sorted(set(expected) | set(actual)):
+        if rel not in actual:
+            ret.append(f"missing: {rel}")
+        elif rel not in expected:
+            ret.append(f"extra: {rel}")
+        elif expected[rel] != actual[rel]:
+            ret.append(f"changed: {rel}")
+    return ret
+
+
+def package_signature(pkg_dir: str, files) -> Dict[str, list]:
+    """Get {relative path: [size, mtime_ns]} of files in pkg_dir, None for missing files."""
+    ret = {}
+    for rel in files:
+        try:
+            st = os.stat(os.path.join(pkg_dir, rel))
+            ret[rel] = [st.st_size, st.st_mtime_ns]
+        except OSError:
+            ret[rel] = None
+    return ret
+
+
+def stale_package_files(expected: Dict[str, list], pkg_dir: str) -> List[str]:
+    """Get the files of a manifest that are missing or different in pkg_dir.
+
+    Files in pkg_dir that are not in the manifest (e.g. README.md or helpers
+    copied in after the export) are ignored.
+    """
+    ret = []
+    for rel, (size, digest) in sorted(expected.items()):
+        path = os.path.join(pkg_dir, rel)
+        if os.path.islink(path) or not os.path.isfile(path) or os.path.getsize(path) != size \
+                or file_sha256(path) != digest:
+            ret.append(rel)
+    return ret
+
+
+class DutCache:
+    """Cache of exported DUT packages, keyed by make_cache_key.
+
+    Each entry is <cache_dir>/<key>/ with the package in pkg/ and a
+    manifest.json holding the file hashes; entries are evicted in LRU order
+    (the manifest mtime is refreshed on restore).
+
+    Args:
+        cache_dir: Cache directory, default $UCAGENT_DUT_CACHE_DIR or ~/.cache/ucagent/dut.
+        max_entries: Max number of cached packages.
+        max_size_mb: Max total size of the cached packages.
+        copy_mode: How packages are restored, see bootstrap.copy_file_fast. With 'hardlink'
+                   the workspace shares the inodes of the entry: a chmod of the package
+                   (e.g. un_write_dirs) also changes the entry, so it must be skipped for them.
+        verify_on_restore: Check the entry against its manifest before restoring it.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_entries: int = 20, max_size_mb: float = 4096,
+                 copy_mode: str = "auto", verify_on_restore: bool = True):
+        self.cache_dir = os.path.abspath(os.path.expanduser(
+            cache_dir or os.environ.get("UCAGENT_DUT_CACHE_DIR") or "~/.cache/ucagent/dut"))
+        self.max_entries = max_entries
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.copy_mode = copy_mode
+        self.verify_on_restore = verify_on_restore
+
+    @classmethod
+    def from_config(cls, cfg) -> Optional["DutCache"]:
+        """Create from the dut_cache section (a dict or Config), None if disabled."""
+        if cfg is None:
+            cfg = {}
+        elif not isinstance(cfg, dict):
+            cfg = cfg.as_dict()
+        if not cfg.get("enable", True):
+            return None
+        return cls(cache_dir=cfg.get("dir") or None,
+                   max_entries=cfg.get("max_entries", 20),
+                   max_size_mb=cfg.get("max_size_mb", 4096),
+                   copy_mode=cfg.get("copy_mode", "auto"),
+                   verify_on_restore=cfg.get("verify_on_restore", True))
+
+    def entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    @contextmanager
+    def _lock(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(os.path.join(self.cache_dir, ".lock"), "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def get_manifest(self, key: str) -> Optional[dict]:
+        path = os.path.join(self.entry_dir(key), "manifest.json")
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            warning(f"Broken DUT cache manifest {path}: {e}")
+            return None
+
+    def verify_entry(self, key: str) -> Tuple[bool, List[str]]:
+        """Check that the files of an entry still match its manifest."""
+        manifest = self.get_manifest(key)
+        if manifest is None:
+            return False, ["missing: manifest.json"]
+        diffs = diff_manifest(manifest["files"], package_manifest(os.path.join(self.entry_dir(key), "pkg")))
+        return not diffs, diffs
+
+    def remove(self, key: str):
+        path = self.entry_dir(key)
+        if not os.path.isdir(path):
+            return
+        for root, dirs, _ in os.walk(path):
+            os.chmod(root, 0o755)
+        shutil.rmtree(path, ignore_errors=True)
+
+    def store(self, key: str, pkg_dir: str, meta: Optional[dict] = None) -> dict:
+        """Copy a freshly exported package into the cache, return its manifest."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=f".tmp-{key}-", dir=self.cache_dir)
+        try:
+            files = package_manifest(pkg_dir)
+            for rel in files:
+                dst = os.path.join(tmp_dir, "pkg", rel)
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                shutil.copy2(os.path.join(pkg_dir, rel), dst)
+                # hardlinked restores share these inodes, keep them read-only
+                os.chmod(dst, 0o444 | (os.stat(dst).st_mode & 0o111))
+            manifest = {"key": key, "created": time.time(), "meta": meta or {}, "files": files}
+            atomic_write_json(os.path.join(tmp_dir, "manifest.json"), manifest)
+            with self._lock():
+                if os.path.isdir(self.entry_dir(key)):
+                    self.remove(key)
+                os.rename(tmp_dir, self.entry_dir(key))
+                self._evict(keep=key)
+        finally:
+            if os.path.isdir(tmp_dir):
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        return manifest
+
+    def restore(self, key: str, dst_dir: str, files: Optional[List[str]] = None) -> Optional[dict]:
+        """Restore the package of key into dst_dir in place, None on cache miss.
+
+        Only the files of the entry are written, one by one (temp file + rename),
+        files in dst_dir that are not part of the package are kept.
+
+        Args:
+            key: Cache key.
+            dst_dir: Package directory to restore into.
+            files: Relative paths to restore, default all files of the entry
+                   that are missing or different in dst_dir.
+
+        Returns:
+            Statistics dict: counts per copy method and time cost.
+        """
+        time_start = time.time()
+        manifest = self.get_manifest(key)
+        if manifest is None:
+            return None
+        if self.verify_on_restore:
+            ok, diffs = self.verify_entry(key)
+            if not ok:
+                warning(f"Drop corrupted DUT cache entry {key}: {diffs[:5]}")
+                with self._lock():
+                    self.remove(key)
+                return None
+        if files is None:
+            files = stale_package_files(manifest["files"], dst_dir)
+        src_dir = os.path.join(self.entry_dir(key), "pkg")
+        stats = {"key": key, "copy": 0, "reflink": 0, "hardlink": 0, "kept": len(manifest["files"]) - len(files)}
+        os.makedirs(dst_dir, exist_ok=True)
+        for rel in files:
+            dst = os.path.join(dst_dir, rel)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            tmp_path = f"{dst}.{os.getpid()}.restore"
+            try:
+                method = copy_file_fast(os.path.join(src_dir, rel), tmp_path, self.copy_mode)
+                if method != "hardlink":
+                    # private copy, drop the read-only mode of the entry
+                    os.chmod(tmp_path, os.stat(tmp_path).st_mode | 0o200)
+                stats[method] += 1
+                os.replace(tmp_path, dst)
+            finally:
+                if os.path.lexists(tmp_path):
+                    os.remove(tmp_path)
+        os.utime(os.path.join(self.entry_dir(key), "manifest.json"))
+        stats["time"] = round(time.time() - time_start, 4)
+        return stats
+
+    def entries(self) -> List[Tuple[str, float, int]]:
+        """Get (key, last use time, size in bytes) of the entries."""
+        ret = []
+        if not os.path.isdir(self.cache_dir):
+            return ret
+        for key in os.listdir(self.cache_dir):
+            manifest_path = os.path.join(self.cache_dir, key, "manifest.json")
+            if key.startswith(".") or not os.path.isfile(manifest_path):
+                continue
+            manifest = self.get_manifest(key) or {"files": {}}
+            size = sum(v[0] for v in manifest["files"].values())
+            ret.append((key, os.path.getmtime(manifest_path), size))
+        return ret
+
+    def _evict(self, keep: Optional[str] = None):
+        entries = sorted(self.entries(), key=lambda e: e[1])
+        total = sum(e[2] for e in entries)
+        for key, _, size in entries:
+            if len(entries) <= self.max_entries and total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            info(f"Evict DUT cache entry {key} ({size} bytes)")
+            self.remove(key)
+            entries = [e for e in entries if e[0] != key]
+            total -= size
+
+    def get_statistics(self) -> dict:
+        entries = self.entries()
+        return {"dir": self.cache_dir, "entries": len(entries), "bytes": sum(e[2] for e in entries)}
+
+
+def unshare_files(pkg_dir: str):
+    """Replace hardlinked files in pkg_dir by private writable copies.
+
+    Picker writes into an existing package in place, which would otherwise
+    go through the hardlinks into the cache entry.
+    """
+    for root, _, files in os.walk(pkg_dir):
+        for fname in files:
+            path = os.path.join(root, fname)
+            st = os.lstat(path)
+            if not os.path.isfile(path) or os.path.islink(path) or st.st_nlink <= 1:
+                continue
+            tmp_path = path + ".unshare"
+            shutil.copy2(path, tmp_path)
+            os.chmod(tmp_path, st.st_mode | 0o200)
+            os.replace(tmp_path, path)
+
+
+def _read_export_record(tdir: str) -> dict:
+    path = os.path.join(tdir, EXPORT_RECORD_FILE)
+    if not os.path.isfile(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def picker_export_cached(rtl_file: str, sname: str, tdir: str, flags: List[str],
+                         filelist: Optional[str] = None, cache: Optional[DutCache] = None,
+                         verify: bool = False, picker: str = "picker") -> dict:
+    """Run `picker export`, or restore its output package tdir/sname from the cache.
+
+    Args:
+        rtl_file: Top RTL file.
+        sname: DUT name (--sname).
+        tdir: Target dir (--tdir), the package is created at tdir/sname.
+        flags: Other picker export options, part of the cache key.
+        filelist: Optional filelist (--fs).
+        cache: DutCache, None to always run picker.
+        verify: On a cache hit, also run picker and compare the result with the entry
+                (a mismatching entry is replaced by the fresh build).
+        picker: The picker executable.
+
+    Returns:
+        Dict with 'result' ('hit', 'miss', 'mismatch' or 'uncached'), 'key' and timings.
+    """
+    time_start = time.time()
+    pkg_dir = os.path.join(tdir, sname)
+
+    def run_picker(target_dir):
+        cmd = [picker, "export", rtl_file, "--sname", sname, "--tdir", target_dir.rstrip("/") + "/"] + list(flags)
+        if filelist:
+            cmd += ["--fs", filelist]
+        subprocess.run(cmd, check=True)
+
+    if cache is None:
+        run_picker(tdir)
+        return {"result": "uncached", "time": round(time.time() - time_start, 4)}
+    rtl_files = list_rtl_files(rtl_file, filelist)
+    sources = source_hashes(rtl_files)
+    key = make_cache_key(sources, sname, flags, get_picker_version(picker))
+    meta = {"rtl": rtl_files, "sources": sources, "flags": list(flags)}
+    ret = {"key": key}
+    stats = cache.restore(key, pkg_dir)
+    if stats is not None and verify:
+        with tempfile.TemporaryDirectory(prefix="ucagent-dut-verify-") as tmp:
+            run_picker(tmp)
+            diffs = diff_manifest(cache.get_manifest(key)["files"],
+                                  package_manifest(os.path.join(tmp, sname)))
+            ret["diffs"] = diffs
+            if diffs:
+                warning(f"Cached DUT package {key} differs from a fresh build: {diffs[:5]}")
+                cache.store(key, os.path.join(tmp, sname), meta)
+                stats = cache.restore(key, pkg_dir)
+                ret["result"] = "mismatch"
+    if stats is not None:
+        ret.setdefault("result", "hit")
+        ret["restore"] = stats
+    else:
+        if os.path.isdir(pkg_dir):
+            unshare_files(pkg_dir)
+        run_picker(tdir)
+        cache.store(key, pkg_dir, meta)
+        ret["result"] = "miss"
+    record = _read_export_record(tdir)
+    record[sname] = {"key": key, "rtl_file": os.path.abspath(rtl_file), "flags": list(flags),
+                     "filelist": os.path.abspath(filelist) if filelist else None,
+                     "cache_dir": cache.cache_dir,
+                     "files": package_signature(pkg_dir, cache.get_manifest(key)["files"])}
+    atomic_write_json(os.path.join(tdir, EXPORT_RECORD_FILE), record, indent=2)
+    ret["time"] = round(time.time() - time_start, 4)
+    info(f"picker export {sname}: {ret['result']} ({ret['time']}s)")
+    return ret
+
+
+def ensure_dut_package(tdir: str, sname: str, cache: Optional[DutCache] = None) -> Optional[dict]:
+    """Restore the missing or modified files of tdir/sname from the cache.
+
+    Extra files in the package dir are kept and do not trigger a restore.
+
+    Uses the export record written by picker_export_cached: while the
+    size/mtime of every package file matches the record nothing is hashed,
+    so this is cheap enough to run on each check. Otherwise the key is
+    recomputed from the current sources, so a package is never restored
+    for changed RTL, and the entry is verified before it is restored.
+
+    Returns:
+        Restore statistics, or None if nothing was restored.
+    """
+    record = _read_export_record(tdir)
+    entry = record.get(sname)
+    if not entry:
+        return None
+    pkg_dir = os.path.join(tdir, sname)
+    signature = entry.get("files")
+    if signature and package_signature(pkg_dir, signature) == signature:
+        return None
+    if cache is None:
+        cache = DutCache(cache_dir=entry.get("cache_dir"))
+    manifest = cache.get_manifest(entry["key"])
+    if manifest is None:
+        return None
+    try:
+        sources = source_hashes(list_rtl_files(entry["rtl_file"], entry.get("filelist")))
+    except OSError:
+        return None
+    if sources != manifest["meta"].get("sources"):
+        return None
+    stale = stale_package_files(manifest["files"], pkg_dir)
+    if stale:
+        stats = cache.restore(entry["key"], pkg_dir, stale)
+        if stats is None:
+            return None
+        info(f"DUT package {pkg_dir} restored from cache: {stats}")
+    else:
+        stats = None  # only touched, refresh the signature
+    entry["files"] = package_signature(pkg_dir, manifest["files"])
+    atomic_write_json(os.path.join(tdir, EXPORT_RECORD_FILE), record, indent=2)
+    return stats
@@ -0,0 +1,401 @@
+# -*- coding: utf-8 -*-
+"""Embedding service: batched, deduplicated and cached embedding requests.
+
+Every text is keyed by the hash of its content. Known texts are served from an
+on-disk cache (one binary float32 file per embedding model, capped by entries
+with LRU pruning), the others are sent to the backend in batches. submit() queues a text for a background thread that
+collects requests for up to batch_wait seconds or batch_size texts, so callers
+like LongTermMemoryStore.save do not wait on a network round trip.
+
+Backends:
+    openai:  OpenAIEmbeddings of langchain_openai (embed.model_name, openai_api_base, openai_api_key).
+    local:   sentence-transformers model on the CPU (embed.local_model), hashing if it is not installed.
+    hashing: HashingEmbedder, no model and no network.
+"""
+
+import atexit
+import hashlib
+import json
+import math
+import os
+import re
+import struct
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from ucagent.util.log import info, warning
+from ucagent.util.persist import atomic_write_bytes, make_private_dir
+
+EMBED_BACKENDS = ("openai", "local", "hashing")
+# cache file: header (magic, dims), then records of a sha1 digest and dims float32 values
+CACHE_MAGIC = b"UCEMB1\0\0"
+CACHE_HEADER = struct.Struct("<8sI")
+CACHE_KEY_SIZE = 20
+
+
+class HashingEmbedder:
+    """Deterministic local embedder: hashed word and word-bigram features, L2 normalized.
+
+    It needs no model and no network, for tests and as an offline fallback.
+    Has the embed_documents/embed_query interface of langchain embeddings.
+    """
+
+    model = "hashing"
+
+    def __init__(self, dims: int = 256):
+        self.dims = dims
+
+    def _vector(self, text: str) -> List[float]:
+        vec = [0.0] * self.dims
+        words = re.findall(r"\w+", text.lower())
+        for feature in words + [a + " " + b for a, b in zip(words, words[1:])]:
+            h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+            vec[h % self.dims] += 1.0 if (h >> 63) == 0 else -1.0
+        norm = math.sqrt(sum(v * v for v in vec))
+        return [v / norm for v in vec] if norm > 0 else vec
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
+
+
+class SentenceTransformerEmbedder:
+    """CPU embedding with a sentence-transformers model (e.g. all-MiniLM-L6-v2)."""
+
+    def __init__(self, model_name: str, batch_size: int = 32):
+        from sentence_transformers import SentenceTransformer
+        self.model = model_name
+        self.batch_size = batch_size
+        self._model = SentenceTransformer(model_name, device="cpu")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._model.encode(list(texts), batch_size=self.batch_size,
+                                  normalize_embeddings=True, show_progress_bar=False).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def new_embed_backend(config) -> Tuple[object, str]:
+    """Create the embedding backend of an embed config.
+
+    Args:
+        config: Dict or Config of the embed section (backend, model_name, openai_api_base,
+                openai_api_key, dims, local_model, fallback).
+
+    Returns:
+        (backend, model_key), model_key identifies the vectors of the backend.
+    """
+    if hasattr(config, "as_dict"):
+        config = config.as_dict()
+    backend = config.get("backend") or "openai"
+    if backend not in EMBED_BACKENDS:
+        raise ValueError(f"Unknown embed backend '{backend}', expected one of {EMBED_BACKENDS}")
+    try:
+        if backend == "openai":
+            model, base_url = config.get("model_name"), config.get("openai_api_base")
+            if not model or not base_url:
+                raise ValueError("embed.model_name and embed.openai_api_base are required")
+            from langchain_openai import OpenAIEmbeddings
+            return (OpenAIEmbeddings(model=model, base_url=base_url, api_key=config.get("openai_api_key")),
+                    f"openai:{model}@{base_url}")
+        if backend == "local":
+            model = config.get("local_model") or "all-MiniLM-L6-v2"
+            try:
+                return SentenceTransformerEmbedder(model), f"st:{model}"
+            except ImportError:
+                warning("sentence-transformers is not installed, use the hashing embedder")
+    except Exception as e:
+        fallback = config.get("fallback") or ""
+        if not fallback or fallback == backend:
+            raise
+        warning(f"Embed backend '{backend}' is not available ({e}), fall back to '{fallback}'")
+        return new_embed_backend({**config, "backend": fallback, "fallback": ""})
+    dims = int(config.get("dims") or 256)
+    return HashingEmbedder(dims), f"hashing:{dims}"
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8", errors="ignore")).hexdigest()
+
+
+class EmbeddingService:
+    """Batches, deduplicates and caches the requests to an embedding backend.
+
+    Has the embed_documents/embed_query interface of langchain embeddings, so it
+    can replace the backend anywhere, plus submit() for requests that should not
+    block the caller.
+
+    Args:
+        backend: Object with embed_documents(texts).
+        model_key: Identifies the backend vectors, the cache file is named after it.
+        cache_dir: Directory of the on-disk cache, None to cache in memory only.
+        batch_size: Max texts per backend call.
+        batch_wait: Seconds the background thread waits for more submitted texts.
+        cache_max_entries: Max cached vectors, the least recently used are pruned
+            (to 90% of it) and the cache file is compacted.
+    """
+
+    def __init__(self, backend, model_key: str, cache_dir: Optional[str] = None,
+                 batch_size: int = 64, batch_wait: float = 0.05, cache_max_entries: int = 20000):
+        self.backend = backend
+        self.model_key = model_key
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+        self.cache_max_entries = max(1, cache_max_entries)
+        self.cache_path = None
+        if cache_dir:
+            self.cache_path = os.path.join(cache_dir, f"{text_key(model_key)[:16]}.f32")
+        self.stats = {"requests": 0, "cache_hits": 0, "backend_calls": 0, "embedded": 0}
+        self._cache: "OrderedDict[str, array]" = OrderedDict()
+        self._cache_dims = 0
+        self._cache_lock = threading.Lock()
+        self._backend_lock = threading.Lock()
+        self._pending: Dict[str, Tuple[str, List[Future]]] = {}
+        self._cond = threading.Condition()
+        self._running = 0
+        self._thread = None
+        self._stop = False
+        self._load_cache()
+
+    def _load_cache(self):
+        if not self.cache_path:
+            return
+        legacy = self.cache_path[:-len(".f32")] + ".jsonl"
+        if os.path.exists(legacy):
+            os.remove(legacy)  # unbounded text format of older versions
+        try:
+            with open(self.cache_path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            warning(f"Failed to read the embedding cache {self.cache_path}: {e}")
+            return
+        try:
+            magic, dims = CACHE_HEADER.unpack_from(data)
+        except struct.error:
+            magic, dims = b"", 0
+        if magic != CACHE_MAGIC or dims <= 0:
+            warning(f"Ignore the broken embedding cache {self.cache_path}")
+            return
+        self._cache_dims = dims
+        record = CACHE_KEY_SIZE + dims * 4
+        count = (len(data) - CACHE_HEADER.size) // record  # a torn last record after a crash is dropped
+        for i in range(count):
+            pos = CACHE_HEADER.size + i * record
+            vec = array("f")
+            vec.frombytes(data[pos + CACHE_KEY_SIZE:pos + record])
+            self._cache[data[pos:pos + CACHE_KEY_SIZE].hex()] = vec
+        if len(self._cache) > self.cache_max_entries or len(self._cache) != count or \
+                len(data) != CACHE_HEADER.size + count * record:
+            self._prune_cache()
+        info(f"Loaded {len(self._cache)} cached embeddings from {self.cache_path}")
+
+    def _record(self, key: str, vec: array) -> bytes:
+        return bytes.fromhex(key) + vec.tobytes()
+
+    def _prune_cache(self):
+        """Drop the least recently used vectors beyond the cap and rewrite the cache file."""
+        if len(self._cache) > self.cache_max_entries:
+            keep = max(1, self.cache_max_entries * 9 // 10)
+            while len(self._cache) > keep:
+                self._cache.popitem(last=False)
+        if not self.cache_path or not self._cache_dims:
+            return
+        try:
+            make_private_dir(os.path.dirname(self.cache_path))
+            atomic_write_bytes(self.cache_path, CACHE_HEADER.pack(CACHE_MAGIC, self._cache_dims) + b"".join(
+                self._record(k, v) for k, v in self._cache.items() if len(v) == self._cache_dims))
+        except OSError as e:
+            warning(f"Failed to compact the embedding cache {self.cache_path}: {e}")
+
+    def _cache_get(self, key: str) -> Optional[List[float]]:
+        """Get a cached vector and mark it as recently used, call with _cache_lock held."""
+        vec = self._cache.get(key)
+        if vec is None:
+            return None
+        self._cache.move_to_end(key)
+        return vec.tolist()
+
+    def _store(self, keys: List[str], vectors: List[List[float]]) -> Dict[str, List[float]]:
+        """Cache the vectors, return them as cached (float32) by key."""
+        ret = {}
+        with self._cache_lock:
+            records = []
+            for k, v in zip(keys, vectors):
+                vec = array("f", v)
+                self._cache[k] = vec
+                ret[k] = vec.tolist()
+                if not self._cache_dims:
+                    self._cache_dims = len(vec)
+                if len(vec) == self._cache_dims:
+                    records.append(self._record(k, vec))
+            if len(self._cache) > self.cache_max_entries:
+                self._prune_cache()
+                return ret
+            if not self.cache_path or not records:
+                return ret
+            try:
+                make_private_dir(os.path.dirname(self.cache_path))
+                with open(self.cache_path, "ab") as f:
+                    if f.tell() == 0:
+                        f.write(CACHE_HEADER.pack(CACHE_MAGIC, self._cache_dims))
+                    f.write(b"".join(records))
+            except OSError as e:
+                warning(f"Failed to write the embedding cache {self.cache_path}: {e}")
+        return ret
+
+    def _embed_missing(self, items: Dict[str, str]) -> Dict[str, List[float]]:
+        """Get the vectors of {key: text}, the texts that are not cached are embedded in batches."""
+        ret = {}
+        with self._cache_lock:
+            for k in items:
+                vec = self._cache_get(k)
+                if vec is not None:
+                    ret[k] = vec
+        missing = [(k, t) for k, t in items.items() if k not in ret]
+        for i in range(0, len(missing), self.batch_size):
+            batch = missing[i:i + self.batch_size]
+            with self._backend_lock:
+                vectors = self.backend.embed_documents([t for _, t in batch])
+                self.stats["backend_calls"] += 1
+                self.stats["embedded"] += len(batch)
+            if len(vectors) != len(batch):
+                raise ValueError(f"Embedding backend returned {len(vectors)} vectors for {len(batch)} texts")
+            ret.update(self._store([k for k, _ in batch], [list(map(float, v)) for v in vectors]))
+        return ret
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts now, duplicate and cached texts are not sent to the backend."""
+        keys = [text_key(t) for t in texts]
+        self.stats["requests"] += len(texts)
+        with self._cache_lock:
+            self.stats["cache_hits"] += sum(1 for k in keys if k in self._cache)
+        vectors = self._embed_missing(dict(zip(keys, texts)))
+        return [vectors[k] for k in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def submit(self, text: str) -> Future:
+        """Queue text for the background thread and return a Future of its vector."""
+        fut = Future()
+        key = text_key(text)
+        self.stats["requests"] += 1
+        with self._cache_lock:
+            vec = self._cache_get(key)
+        if vec is not None:
+            self.stats["cache_hits"] += 1
+            fut.set_result(vec)
+            return fut
+        with self._cond:
+            self._pending.setdefault(key, (text, []))[1].append(fut)
+            if self._thread is None or not self._thread.is_alive():
+                self._stop = False
+                self._thread = threading.Thread(target=self._run, name="ucagent-embed-service", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+        return fut
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stop:
+                    self._cond.wait()
+                if self._stop and not self._pending:
+                    return
+                # wait for a full batch, at most batch_wait seconds
+                deadline = time.time() + self.batch_wait
+                while len(self._pending) < self.batch_size and not self._stop:
+                    remain = deadline - time.time()
+                    if remain <= 0:
+                        break
+                    self._cond.wait(remain)
+                keys = list(self._pending)[:self.batch_size]
+                batch = {k: self._pending.pop(k) for k in keys}
+                self._running += 1
+            try:
+                results = self._embed_missing({k: text for k, (text, _) in batch.items()})
+                for k, (_, futures) in batch.items():
+                    for fut in futures:
+                        fut.set_result(results[k])
+            except Exception as e:
+                warning(f"Embedding of {len(batch)} texts failed: {e}")
+                for _, futures in batch.values():
+                    for fut in futures:
+                        fut.set_exception(e)
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    self._cond.notify_all()
+
+    def is_pending(self) -> bool:
+        with self._cond:
+            return bool(self._pending) or self._running > 0
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until all submitted texts are embedded, return False on timeout."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            if self._thread is None:
+                return True
+            while self._pending or self._running > 0:
+                if not self._thread.is_alive():
+                    return False
+                remain = None if deadline is None else deadline - time.time()
+                if remain is not None and remain <= 0:
+                    return False
+                self._cond.wait(remain)
+        return True
+
+    def close(self, timeout: Optional[float] = None):
+        """Embed the pending texts and stop the background thread."""
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        self.flush(timeout)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+__embed_services__: Dict[Tuple[str, str], EmbeddingService] = {}
+__embed_services_lock__ = threading.Lock()
+
+
+def get_embed_service(config, workspace: Optional[str] = None) -> EmbeddingService:
+    """Get the process wide EmbeddingService of an embed config (flushed at exit).
+
+    Args:
+        config: Dict or Config of the embed section, see new_embed_backend, plus
+                batch_size, batch_wait_ms, cache_dir (relative to workspace) and cache_max_entries.
+        workspace: Base directory of cache_dir, no on-disk cache if None.
+    """
+    if hasattr(config, "as_dict"):
+        config = config.as_dict()
+    config = config or {}
+    cache_dir = config.get("cache_dir", "")
+    if cache_dir and workspace:
+        cache_dir = os.path.join(os.path.abspath(workspace), cache_dir)
+    else:
+        cache_dir = None
+    key = (json.dumps({k: v for k, v in config.items() if k != "openai_api_key"}, sort_keys=True, default=str),
+           cache_dir or "")
+    with __embed_services_lock__:
+        service = __embed_services__.get(key)
+        if service is None:
+            backend, model_key = new_embed_backend(config)
+            service = EmbeddingService(backend, model_key, cache_dir=cache_dir,
+                                       batch_size=int(config.get("batch_size", 64)),
+                                       batch_wait=float(config.get("batch_wait_ms", 50)) / 1000.0,
+                                       cache_max_entries=int(config.get("cache_max_entries", 20000)))
+            __embed_services__[key] = service
+            atexit.register(service.close, 10)
+            info(f"Embedding service: {model_key}, cache: {service.cache_path}")
+        return service
@@ -15,8 +15,10 @@ import fnmatch
 import ast
 from pathlib import Path
 import yaml
-from collections import OrderedDict
+from collections import OrderedDict, deque
 import traceback
+import functools
+from ucagent.util.intervals import IntervalSet
 
 
 def fmt_time_deta(sec: Union[int, float, str, None], abbr: bool = False) -> str:
@@ -278,26 +280,32 @@ def save_json_file(path: str, data):
     :param path: Path to the JSON file.
     :param data: Data to be saved (should be JSON serializable).
     """
-    dir_name = os.path.dirname(path)
-    if dir_name and not os.path.exists(dir_name):
-        os.makedirs(dir_name)
-    with open(path, 'w', encoding='utf-8') as f:
-        try:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-        except TypeError as e:
-            raise ValueError(f"Data provided is not JSON serializable: {e}")
-        except Exception as e:
-            raise RuntimeError(f"Unexpected error while saving JSON file {path}: {e}")
+    from ucagent.util.persist import atomic_write_json
+    try:
+        atomic_write_json(path, data, indent=4)
+    except TypeError as e:
+        raise ValueError(f"Data provided is not JSON serializable: {e}")
+    except OSError as e:
+        raise RuntimeError(f"Unexpected error while saving JSON file {path}: {e}")
 
-def save_ucagent_info(workspace, info: dict):
+def save_ucagent_info(workspace, info: dict, sync: bool = False):
     """
     Save UCAgent information to a JSON file in the workspace.
+    The compact JSON is written atomically by the background state persister,
+    updates in a short interval are coalesced into one write.
     :param workspace: The workspace directory where the file will be saved.
     :param info: The UCAgent information to be saved.
+    :param sync: Wait until the file is written.
     """
+    from ucagent.util.persist import get_state_persister
+    from ucagent.util.hook_daemon import publish_hook_status
     assert os.path.exists(workspace), f"Workspace {workspace} does not exist."
     info_path = os.path.join(workspace, ".ucagent_info.json")
-    save_json_file(info_path, info)
+    persister = get_state_persister()
+    persister.submit(info_path, info)
+    publish_hook_status(workspace, info)
+    if sync:
+        persister.flush()
 
 def load_ucagent_info(workspace) -> dict:
     """
@@ -307,7 +315,11 @@ def load_ucagent_info(workspace) -> dict:
     """
     if not os.path.exists(workspace):
         return {}
+    from ucagent.util.persist import get_state_persister
     info_path = os.path.join(workspace, ".ucagent_info.json")
+    persister = get_state_persister()
+    if persister.is_pending(info_path):
+        persister.flush()
     if not os.path.exists(info_path):
         return {}
     return load_json_file(info_path)
@@ -561,6 +573,33 @@ def import_python_file(file_path: str, py_path:list = []):
     return module
 
 
+TEMPLATE_CACHE_MAX_LEN = 16384
+TEMPLATE_KEY_RE = re.compile(r"\{[^{}]*\}")
+
+
+@functools.lru_cache(maxsize=4096)
+def _compile_template(template: str) -> tuple:
+    """
+    Parse a template string once.
+    :return: (key, None) if the whole template is a single placeholder, else
+             (None, parts) where parts are literal strings and (token, key) tuples.
+    """
+    tvalue = template.strip()
+    if (tvalue.count("{") == tvalue.count("}") == 1) and \
+       (tvalue.startswith("{") and tvalue.endswith("}")):
+        return tvalue.replace("}", "").replace("{", "").strip(), None
+    parts, pos = [], 0
+    for m in TEMPLATE_KEY_RE.finditer(template):
+        if m.start() > pos:
+            parts.append(template[pos:m.start()])
+        token = m.group()
+        parts.append((token, token.replace("}", "").replace("{", "").strip()))
+        pos = m.end()
+    if pos < len(template):
+        parts.append(template[pos:])
+    return None, tuple(parts)
+
+
 def render_template(template: str, kwargs) -> str:
     """
     Render a template string with the provided keyword arguments.
@@ -568,27 +607,42 @@ def render_template(template: str, kwargs) -> str:
     :param kwargs: Keyword arguments to be used in the template.
     :return: The rendered string.
     """
-    tvalue = template.strip()
-    if (tvalue.count("{") == tvalue.count("}") == 1) and \
-       (tvalue.startswith("{") and tvalue.endswith("}")):
-        key = tvalue.replace("}", "").replace("{", "").strip()
-        if isinstance(kwargs, dict):
-            target = kwargs.get(key)
-        else:
-            target = getattr(kwargs, key, None)
+    if "{" not in template:
+        return template  # static text, nothing to render
+    if len(template) <= TEMPLATE_CACHE_MAX_LEN:
+        key, parts = _compile_template(template)
+    else:
+        key, parts = _compile_template.__wrapped__(template)
+    if isinstance(kwargs, dict):
+        get_value = kwargs.get
+    else:
+        get_value = lambda k: getattr(kwargs, k, None)
+    if key is not None:
+        target = get_value(key)
         if target is not None:
             return target
         return template
-    else:
-        for k in re.findall(r"\{[^{}]*\}", template):
-            key = str(k).replace("}", "").replace("{", "").strip()
-            if isinstance(kwargs, dict):
-                target = kwargs.get(key)
-            else:
-                target = getattr(kwargs, key, None)
-            if target is not None:
-                template = template.replace(k, str(target))
-        return template
+    ret = []
+    for p in parts:
+        if isinstance(p, str):
+            ret.append(p)
+            continue
+        target = get_value(p[1])
+        ret.append(p[0] if target is None else str(target))
+    return "".join(ret)
+
+
+@functools.lru_cache(maxsize=256)
+def jinja_from_string(source: str):
+    """Get a compiled jinja2 template of source from a shared environment."""
+    return get_jinja_env().from_string(source)
+
+
+@functools.lru_cache(maxsize=1)
+def get_jinja_env():
+    """Get the shared jinja2 environment."""
+    import jinja2
+    return jinja2.Environment(keep_trailing_newline=True)
 
 
 def fill_template(data, template_data):
@@ -678,6 +732,84 @@ def find_files_by_pattern(workspace, pattern):
     return list(set(ret))
 
 
+__workspace_write_gen__ = 0
+
+
+def mark_workspace_written():
+    """Record a write through the file tools, it invalidates the memoized stage check results.
+    """
+    global __workspace_write_gen__
+    __workspace_write_gen__ += 1
+
+
+def get_workspace_write_gen():
+    """Get the number of writes recorded by mark_workspace_written.
+    """
+    return __workspace_write_gen__
+
+
+def workspace_signature(workspace, exclude=None, patterns=None):
+    """Get a digest of the (path, size, mtime) of the files in a workspace.
+
+    :param workspace: The workspace directory.
+    :param exclude: Glob patterns of file or directory names to skip (e.g. '*.log', '.git').
+    :param patterns: Paths or glob patterns (relative to workspace) the digest is restricted to,
+                     matched directories are walked. None for the whole workspace.
+    :return: The hex digest, it changes when any covered file is created, deleted or modified.
+    """
+    import glob
+    import hashlib
+    exclude = exclude or []
+    h = hashlib.sha1()
+    if patterns is None:
+        roots = [workspace]
+    else:
+        roots = set()
+        for p in sorted(set(patterns)):
+            full = os.path.join(workspace, p)
+            if glob.has_magic(p):
+                matches = glob.glob(full, recursive=True)
+            else:
+                matches = [full] if os.path.lexists(full) else []
+            # a pattern that starts or stops matching changes the digest too
+            h.update(f"{p}\0{len(matches)}\n".encode("utf-8", "surrogateescape"))
+            roots.update(os.path.normpath(m) for m in matches
+                         if not any(fnmatch.fnmatch(os.path.basename(m), x) for x in exclude))
+        roots = sorted(roots, reverse=True)
+
+    def _add(path, st):
+        h.update(f"{os.path.relpath(path, workspace)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8", "surrogateescape"))
+
+    stack = []
+    for root in roots:
+        try:
+            st = os.stat(root, follow_symlinks=False)
+        except OSError:
+            continue
+        if stat.S_ISDIR(st.st_mode):
+            stack.append(root)
+        else:
+            _add(root, st)
+    while stack:
+        path = stack.pop()
+        try:
+            entries = sorted(os.scandir(path), key=lambda e: e.name)
+        except OSError:
+            continue
+        for e in entries:
+            if any(fnmatch.fnmatch(e.name, p) for p in exclude):
+                continue
+            try:
+                if e.is_dir(follow_symlinks=False):
+                    stack.append(e.path)
+                    continue
+                st = e.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            _add(e.path, st)
+    return h.hexdigest()
+
+
 def dump_as_json(data):
     """
     Convert a dictionary to a JSON string with pretty formatting.
@@ -708,7 +840,7 @@ def render_template_dir(workspace, template_dir, kwargs):
     for root, _, files in os.walk(dst_dir):
         for fname in files:
             abs_path = os.path.join(root, fname)
-            new_fname = jinja2.Template(fname).render(**kwargs)
+            new_fname = jinja_from_string(fname).render(**kwargs) if "{" in fname else fname
             new_abs_path = os.path.join(root, new_fname)
             if new_fname != fname:
                 os.rename(abs_path, new_abs_path)
@@ -829,6 +961,26 @@ def get_func_arg_list(func):
                               inspect.Parameter.POSITIONAL_OR_KEYWORD)]
 
 
+def match_name_pattern(names, func_pattern):
+    """
+    Filter names by a pattern.
+    :param names: Names to filter.
+    :param func_pattern: Exact string, glob pattern or regex pattern
+                         (treated as regex if it contains regex special characters).
+    :return: List of matched names, in the input order.
+    """
+    regex_chars = set('[]()+?^${}\\|.')
+    if any(char in func_pattern for char in regex_chars):
+        # Treat as regex pattern
+        try:
+            regex = re.compile(func_pattern)
+        except re.error as e:
+            raise ValueError(f"Invalid regex pattern '{func_pattern}': {e}")
+        return [name for name in names if regex.match(name)]
+    # Treat as glob pattern or exact string
+    return [name for name in names if fnmatch.fnmatch(name, func_pattern)]
+
+
 def get_target_from_file(target_file, func_pattern, ex_python_path = [], dtype="FUNC"):
     """
     Import target file and get objects (functions, classes, or all) that match the given pattern.
@@ -903,27 +1055,8 @@ def get_target_from_file(target_file, func_pattern, ex_python_path = [], dtype="
             if is_target_type(obj, dtype):
                 all_objects.append((name, obj))
         # Filter objects based on pattern
-        matched_objects = []
-        # Determine if pattern is regex or glob
-        def is_regex_pattern(pattern):
-            """Check if pattern contains regex special characters"""
-            regex_chars = set('[]()+?^${}\\|.')
-            return any(char in pattern for char in regex_chars)
-        if is_regex_pattern(func_pattern):
-            # Treat as regex pattern
-            try:
-                regex = re.compile(func_pattern)
-                for name, obj in all_objects:
-                    if regex.match(name):
-                        matched_objects.append(obj)
-            except re.error as e:
-                raise ValueError(f"Invalid regex pattern '{func_pattern}': {e}")
-        else:
-            # Treat as glob pattern or exact string
-            for name, obj in all_objects:
-                if fnmatch.fnmatch(name, func_pattern):
-                    matched_objects.append(obj)
-        return matched_objects
+        matched_names = set(match_name_pattern([name for name, _ in all_objects], func_pattern))
+        return [obj for name, obj in all_objects if name in matched_names]
     except Exception as e:
         raise ImportError(f"Failed to import and process {target_file}: {e}")
 
@@ -1082,7 +1215,7 @@ def copy_indent_from(src: list, dst: list):
     return ret
 
 
-def create_verify_mcps(mcp_tools: list, host: str, port: int, logger=None):
+def create_verify_mcps(mcp_tools: list, host: str, port: int, logger=None, pager=None):
     import logging
     __old_getLogger = logging.getLogger
     def __getLogger(name):
@@ -1094,7 +1227,10 @@ def create_verify_mcps(mcp_tools: list, host: str, port: int, logger=None):
     from ucagent.util.log import info
     fastmcp_tools = []
     for tool in mcp_tools:
-        fastmcp_tools.append(to_fastmcp(tool))
+        fastmcp_tools.append(to_fastmcp(tool, pager))
+    if pager is not None:
+        from ucagent.tools.context import FetchResultPage
+        fastmcp_tools.append(to_fastmcp(FetchResultPage().bind(pager)))
     # Start the FastMCP server
     info(f"create FastMCP server with tools: {[tool.name for tool in fastmcp_tools]}")
     mcp = FastMCP("UnityTest", tools=fastmcp_tools, host=host, port=port)
@@ -1113,12 +1249,12 @@ def create_verify_mcps(mcp_tools: list, host: str, port: int, logger=None):
     return uvicorn.Server(config), __old_getLogger
 
 
-def start_verify_mcps(server, old_getLogger):
+def start_verify_mcps(server, old_getLogger, sockets=None):
     import logging
     from ucagent.util.log import info
     import anyio
     async def _run():
-        await server.serve()
+        await server.serve(sockets=sockets)
     try:
         anyio.run(_run)
     except Exception as e:
@@ -1237,6 +1373,38 @@ def parse_marks_from_file(file_path: str, tag: str) -> dict:
     return ret
 
 
+__file_parse_cache__ = {}
+
+
+def cached_file_parse(file_path: str, parser, *args):
+    """Call parser(file_path, *args), reusing the result while the file is unchanged.
+
+    Args:
+        file_path (str): The file to parse, its mtime and size are the cache key.
+        parser (callable): The parse function.
+    Returns:
+        A deep copy of the (cached) parse result.
+    """
+    file_path = os.path.abspath(file_path)
+    assert os.path.exists(file_path), f"File {file_path} does not exist."
+    st = os.stat(file_path)
+    key = (file_path, parser.__name__, args)
+    sig = (st.st_mtime_ns, st.st_size)
+    cached = __file_parse_cache__.get(key)
+    if cached is None or cached[0] != sig:
+        cached = (sig, parser(file_path, *args))
+        __file_parse_cache__[key] = cached
+    return copy.deepcopy(cached[1])
+
+
+def read_file_lines(file_path: str) -> List[str]:
+    """Read the lines of a text file, cached by mtime."""
+    def _read_lines(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.readlines()
+    return cached_file_parse(file_path, _read_lines)
+
+
 def parse_line_ignore_file(file_path: str) -> dict:
     """Parse ignore lines from a file.
 
@@ -1245,10 +1413,13 @@ def parse_line_ignore_file(file_path: str) -> dict:
     Returns:
         dict: A dictionary with the ignore lines and their count.
     """
+    return cached_file_parse(file_path, _parse_line_ignore_file)
+
+
+def _parse_line_ignore_file(file_path: str) -> dict:
     ret = {
         "detail": [],
     }
-    assert os.path.exists(file_path), f"File {file_path} does not exist."
     with open(file_path, 'r', encoding='utf-8') as f:
         lines = f.readlines()
         for i, line in enumerate(lines):
@@ -1274,6 +1445,22 @@ def parse_un_coverage_json(file_path: str, workspace: str) -> dict:
     Returns:
         dict: A dictionary with the coverage data and statistics.
     """
+    if file_path.startswith(os.sep):
+        file_path = file_path[1:]
+    file_path = os.path.abspath(os.path.join(workspace, file_path))
+    assert os.path.exists(file_path), f"File {file_path} does not exist."
+    return cached_file_parse(file_path, _parse_un_coverage_json, os.path.abspath(workspace))
+
+
+def compact_line_list(lines: list) -> str:
+    """Compact line items like ['1', '2', '3', '7-9'] into '1-3,7-9'."""
+    try:
+        return IntervalSet.parse(",".join(str(x) for x in lines)).to_str()
+    except ValueError:
+        return ','.join(str(x) for x in lines)
+
+
+def _parse_un_coverage_json(file_path: str, workspace: str) -> dict:
     ret = OrderedDict({
         "lines_total": 0,
         "lines_covered": 0,
@@ -1281,11 +1468,8 @@ def parse_un_coverage_json(file_path: str, workspace: str) -> dict:
         "coverage_rate": 0.0,
         "uncoverage_detail": [],
     })
-    if file_path.startswith(os.sep):
-        file_path = file_path[1:]
-    file_path = os.path.abspath(os.path.join(workspace, file_path))
-    assert os.path.exists(file_path), f"File {file_path} does not exist."
-    data = json.load(open(file_path, 'r', encoding='utf-8'))
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
     ret["lines_total"] = data['overview']['total']["line"]
     ret["lines_uncovered"] = data['overview']['miss']["line"]
     ret["lines_covered"] = ret["lines_total"] - ret["lines_uncovered"]
@@ -1301,10 +1485,9 @@ def parse_un_coverage_json(file_path: str, workspace: str) -> dict:
                 if cover_lines["miss"]["line"] == 0:
                     continue
                 cpath = rm_workspace_prefix(workspace, cpath)
-                lines = cover_lines["line"]
                 ret["uncoverage_detail"].append(OrderedDict({
                         "module_name": module_name,
-                        "lines_uncovered": cpath  + ":" + ','.join(lines),
+                        "lines_uncovered": cpath  + ":" + compact_line_list(cover_lines["line"]),
                     }))
     return ret
 
@@ -1318,11 +1501,17 @@ def is_str_array_eq(str_list1, str_list2):
 def get_str_array_diff(str_list1, str_list2):
     a = sorted([s.strip() for s in str_list1 if s and s.strip()])
     b = sorted([s.strip() for s in str_list2 if s and s.strip()])
-    only_in_1 = [s for s in a if s not in b]
-    only_in_2 = [s for s in b if s not in a]
+    set_a, set_b = set(a), set(b)
+    only_in_1 = [s for s in a if s not in set_b]
+    only_in_2 = [s for s in b if s not in set_a]
     return only_in_1, only_in_2
 
 
+def ordered_unique(items) -> list:
+    """Remove duplicates from items, keeping the first occurrence order."""
+    return list(OrderedDict.fromkeys(items))
+
+
 def clean_report_with_keys(report: dict,
                            keys: list = None,
                            default_keys=["all_check_point_list"]) -> dict:
@@ -1716,21 +1905,7 @@ def range_list_merge(range1: list, range2: list) -> list:
     Returns:
         list: The merged list of ranges.
     """
-    all_ranges = range1 + range2
-    if not all_ranges:
-        return []
-    # Sort ranges by start line
-    all_ranges.sort(key=lambda x: x[0])
-    merged_ranges = []
-    current_start, current_end = all_ranges[0]
-    for start, end in all_ranges[1:]:
-        if start <= current_end + 1:
-            current_end = max(current_end, end)
-        else:
-            merged_ranges.append((current_start, current_end))
-            current_start, current_end = start, end
-    merged_ranges.append((current_start, current_end))
-    return merged_ranges
+    return IntervalSet(range1 + range2).ranges()
 
 
 def parse_line_CK_map_file(workspace, file_path: str) -> dict:
@@ -1741,13 +1916,17 @@ def parse_line_CK_map_file(workspace, file_path: str) -> dict:
     Returns:
         dict: A dictionary with the CK and its mapped lines.
     """
+    real_file_path = os.path.abspath(workspace + os.sep + file_path)
+    assert os.path.exists(real_file_path), f"File {real_file_path} does not exist."
+    return cached_file_parse(real_file_path, _parse_line_CK_map_file, file_path)
+
+
+def _parse_line_CK_map_file(real_file_path: str, file_path: str) -> dict:
     # mapped lines format:
     # FGROUP/FC-FUNCTION/CK-CHECK: line_start1-line_end1,line_start2-line_end2,...
     # eg:
     #  FGROUP1/FC-FUNCTION1/CK-CHECK1: 10-20,30-40,45-45
     ret = {}
-    real_file_path = os.path.abspath(workspace + os.sep + file_path)
-    assert os.path.exists(real_file_path), f"File {real_file_path} does not exist."
     with open(real_file_path, 'r', encoding='utf-8') as f:
         lines = f.readlines()
         for i, line in enumerate(lines):
@@ -1771,10 +1950,7 @@ def parse_line_CK_map_file(workspace, file_path: str) -> dict:
                 assert start_line <= end_line, f"{file_path} at line {i+1}: Line range '{lr}' start line must be less than or equal to end line"
                 line_list.append((start_line, end_line))
             # Merge line ranges
-            pre_list = []            
-            if key in ret:
-                pre_list = ret[key]
-            ret[key] = range_list_merge(pre_list, line_list)
+            ret[key] = range_list_merge(ret.get(key, []), line_list)
     return ret
 
 
@@ -1793,19 +1969,11 @@ def get_un_mapped_lines(workspace,
     """
     real_file_path = os.path.abspath(workspace + os.sep + source_file)
     assert os.path.exists(real_file_path), f"File {real_file_path} does not exist."
-    with open(real_file_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-        total_lines = len(lines)
-    range_list = []
-    for _, v in ck_line_map.items():
-        range_list.extend(v)
-    range_list = range_list_merge([], range_list)
-    mapped_lines = set()
-    for start_line, end_line in range_list:
-        for line_num in range(start_line, end_line + 1):
-            mapped_lines.add(line_num)
-    unmapped_lines = [line_num for line_num in range(1, total_lines + 1) if line_num not in mapped_lines]
-    unmapped_lines = [line_num for line_num in unmapped_lines if lines[line_num -1].strip()]
+    lines = read_file_lines(real_file_path)
+    total_lines = len(lines)
+    mapped_lines = IntervalSet(r for v in ck_line_map.values() for r in v)
+    unmapped_lines = [line_num for line_num in mapped_lines.complement(1, total_lines)
+                      if lines[line_num -1].strip()]
     tline = "line"
     line_size = max([len(f"{line_num}") for line_num in unmapped_lines[:max_example_lines]] + [len(tline)])
     if len(unmapped_lines) > 0:
@@ -1831,7 +1999,13 @@ def is_ucagent_complete(workspace=".", need_agent_exit=False):
 def get_ucagent_hook_msg(msg_continue, msg_cmp, msg_exit, msg_init,
                          msg_wait_hm="", workspace=".", need_agent_exit=False):
     """Get UCAgent hook message from file"""
-    status_data = load_ucagent_info(workspace)
+    return select_hook_msg(load_ucagent_info(workspace), msg_continue, msg_cmp, msg_exit, msg_init,
+                           msg_wait_hm, need_agent_exit)
+
+
+def select_hook_msg(status_data, msg_continue, msg_cmp, msg_exit, msg_init,
+                    msg_wait_hm="", need_agent_exit=False):
+    """Select the hook message for the UCAgent status (empty if there is no status yet)"""
     if not status_data:
         return msg_init
     if status_data.get("is_agent_exit", False):
@@ -1848,18 +2022,14 @@ def get_interaction_messages(key, config_file=None):
     """Get interaction prompts from default cfg"""
     # [config_file.yaml::]continue_prompt_keys[|stop_prompt_keys]
     from ucagent.util.config import get_config
+    from ucagent.util.hook_daemon import parse_hook_key
     import os
-    if '::' in key:
-        config_file, key = key.split('::', 1)
+    key_config_file, continue_key, stop_key = parse_hook_key(key)
+    config_file = key_config_file or config_file
     if config_file:
         if not os.path.isfile(config_file):
             print(f"Config file '{config_file}' not found.")
             return False, None, None
-    continue_key = key
-    if '|' in key:
-        continue_key, stop_key = key.split('|', 1)
-    else:
-        stop_key = None
     cfg = get_config(config_file)
     continue_value = os.environ.get(continue_key, None)
     if continue_value is None:
@@ -1918,7 +2088,11 @@ def get_tools_from_cfg(tool_list, cfg: dict):
 
 
 def find_available_port(start_port=5000, end_port=65000):
-    """Find an available port in the given range."""
+    """Find an available port in the given range.
+
+    The port is free only at the time of the check, use mcp_registry.reserve_port
+    to get a port that stays reserved until the server binds it.
+    """
     for port in range(start_port, end_port + 1):
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
             try:
@@ -1929,47 +2103,55 @@ def find_available_port(start_port=5000, end_port=65000):
     raise RuntimeError(f"No available port found in range {start_port}-{end_port}.")
 
 
-def chmode_ro(workspace, pattern_list: str, ignore_list: list = ["__pycache__"]) -> list:
-    """Change file mode to read-only."""
-    file_list = []
-    path_list = []
+def _is_mode_ignored(file_path: str, ignore_list: list) -> bool:
+    for ig in ignore_list:
+        if ig in file_path:
+            return True
+        if "*" in ig:
+            if fnmatch.fnmatch(os.path.basename(file_path), ig):
+                return True
+    return False
+
+
+def chmode_ro(workspace, pattern_list: str, ignore_list: list = ["__pycache__"], skip_links: bool = False) -> list:
+    """Change file mode to read-only.
+
+    Matched files and directory trees are walked once and their modes are
+    changed during the same pass (no separate collect/stat/chmod phases).
+    If skip_links is True, files with more than one hard link are left
+    untouched, as changing their mode would also change the link source.
+    """
+    mfile = stat.S_IREAD | stat.S_IRGRP | stat.S_IROTH
+    mpath = mfile | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH
+    all_list = []
+    visited = set()
+    def _chmod(path, mode):
+        if path in visited:
+            return
+        visited.add(path)
+        if skip_links and mode == mfile and os.stat(path).st_nlink > 1:
+            return
+        all_list.append(path)
+        if _is_mode_ignored(path, ignore_list):
+            info(f"File ignored for setting mode to read-only: {path}")
+            return
+        os.chmod(path, mode)
     for file_path_pattern in pattern_list:
         for p in find_files_by_pattern(workspace, file_path_pattern):
             file_path = os.path.abspath(os.path.join(workspace, p))
-            if os.path.exists(file_path):
-                if os.path.isdir(file_path):
-                    for dirpath, dirnames, filenames in os.walk(file_path):
-                        for filename in filenames:
-                            file_full_path =  os.path.join(dirpath, filename)
-                            file_list.append(file_full_path)
-                        for dirname in dirnames:
-                            dir_full_path = os.path.join(dirpath, dirname)
-                            path_list.append(dir_full_path)
-                    path_list.append(file_path)
-                else:
-                    file_list.append(file_path)
-            else:
+            if not os.path.exists(file_path):
                 warning(f"File not found for: {file_path}")
-    mfile = stat.S_IREAD | stat.S_IRGRP | stat.S_IROTH
-    mpath = mfile | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH
-    all_list = file_list + path_list
-    for file_path in all_list:
-        ignored = False
-        for ig in ignore_list:
-            if ig in file_path:
-                ignored = True
-                break
-            if "*" in ig:
-                if fnmatch.fnmatch(os.path.basename(file_path), ig):
-                    ignored = True
-                    break
-        if ignored:
-            info(f"File ignored for setting mode to read-only: {file_path}")
-            continue
-        if os.path.isdir(file_path):
-            os.chmod(file_path, mpath)
-        else:
-            os.chmod(file_path, mfile)
+                continue
+            if not os.path.isdir(file_path):
+                _chmod(file_path, mfile)
+                continue
+            # bottom-up so that directories lose write permission last
+            for dirpath, dirnames, filenames in os.walk(file_path, topdown=False):
+                for filename in filenames:
+                    _chmod(os.path.join(dirpath, filename), mfile)
+                for dirname in dirnames:
+                    _chmod(os.path.join(dirpath, dirname), mpath)
+            _chmod(file_path, mpath)
     info(f"Set file mode to read-only completed ({len(all_list)} files).")
     return all_list
 
@@ -1979,16 +2161,7 @@ def chmode_rw(path_list: list, ignore_list: list = ["__pycache__"]):
     mfile = stat.S_IREAD | stat.S_IWRITE | stat.S_IRGRP | stat.S_IWGRP | stat.S_IROTH | stat.S_IWOTH
     mpath = mfile | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH
     for file_path in path_list:
-        ignored = False
-        for ig in ignore_list:
-            if ig in file_path:
-                ignored = True
-                break
-            if "*" in ig:
-                if fnmatch.fnmatch(os.path.basename(file_path), ig):
-                    ignored = True
-                    break
-        if ignored:
+        if _is_mode_ignored(file_path, ignore_list):
             info(f"File ignored for setting mode to read-write: {file_path}")
             continue
         if os.path.exists(file_path):
@@ -2001,60 +2174,90 @@ def chmode_rw(path_list: list, ignore_list: list = ["__pycache__"]):
     info(f"Set file mode to read-write completed ({len(path_list)} files).")
 
 
-def compact_pytest_output(text: str, max_lines: int = 120, max_chars: int = 8000) -> str:
+class PytestOutputCompactor:
     """
-    Compact pytest stdout/stderr while keeping failure signal and key context.
+    Incremental version of compact_pytest_output.
 
-    Keeps:
-      - FAILURES/ERRORS headers
-      - test case headers and short summaries
-      - error type lines (E   ...)
-      - a few context lines per failure
+    Lines are fed one by one (e.g. while a pytest subprocess is running) and
+    only the kept lines plus a bounded tail are held in memory.
     """
-    if not text:
-        return text
-    lines = text.splitlines()
-    kept = []
-    in_fail_section = False
-    context_lines_left = 0
 
-    for line in lines:
+    def __init__(self, max_lines: int = 120, max_chars: int = 8000):
+        self.max_lines = max_lines
+        self.max_chars = max_chars
+        self.kept = []
+        self.kept_chars = 0
+        self.tail = deque(maxlen=max_lines)
+        self.in_fail_section = False
+        self.context_lines_left = 0
+        self.has_input = False
+
+    def _keep(self, line):
+        # Once the result is known to be truncated, the rest cannot change it
+        if len(self.kept) > self.max_lines or self.kept_chars > self.max_chars:
+            return
+        self.kept_chars += len(line) + (1 if self.kept else 0)
+        self.kept.append(line)
+
+    def feed(self, line: str):
+        self.has_input = True
+        self.tail.append(line)
         low = line.lower()
         if "=================================== failures" in low or "==================================== errors" in low:
-            in_fail_section = True
-            kept.append(line)
-            context_lines_left = 0
-            continue
+            self.in_fail_section = True
+            self._keep(line)
+            self.context_lines_left = 0
+            return
         if "short test summary info" in low or "generated report" in low:
-            kept.append(line)
-            context_lines_left = 0
-            continue
+            self._keep(line)
+            self.context_lines_left = 0
+            return
         if line.startswith("FAILED ") or line.startswith("ERROR "):
-            kept.append(line)
-            context_lines_left = 4
-            continue
+            self._keep(line)
+            self.context_lines_left = 4
+            return
         if line.startswith("E   ") or line.startswith("E  "):
-            kept.append(line)
-            continue
+            self._keep(line)
+            return
         if line.startswith("_ _ _ _") or line.startswith("___"):
-            kept.append(line)
-            context_lines_left = 4
-            continue
-        if in_fail_section and context_lines_left > 0:
+            self._keep(line)
+            self.context_lines_left = 4
+            return
+        if self.in_fail_section and self.context_lines_left > 0:
             if line.strip():
-                kept.append(line)
-                context_lines_left -= 1
-            continue
+                self._keep(line)
+                self.context_lines_left -= 1
+            return
         if "====" in line and ("failed" in low or "passed" in low):
-            kept.append(line)
-
-    if not kept:
-        kept = lines[-max_lines:]
-    out = "\n".join(kept)
-    if len(out) > max_chars:
-        out = out[:max_chars] + "\n...[truncated]"
-    out_lines = out.splitlines()
-    if len(out_lines) > max_lines:
-        out_lines = out_lines[:max_lines]
-        out = "\n".join(out_lines) + "\n...[truncated]"
-    return out
+            self._keep(line)
+
+    def result(self) -> str:
+        kept = self.kept
+        if not kept:
+            kept = list(self.tail)
+        out = "\n".join(kept)
+        if len(out) > self.max_chars:
+            out = out[:self.max_chars] + "\n...[truncated]"
+        out_lines = out.splitlines()
+        if len(out_lines) > self.max_lines:
+            out_lines = out_lines[:self.max_lines]
+            out = "\n".join(out_lines) + "\n...[truncated]"
+        return out
+
+
+def compact_pytest_output(text: str, max_lines: int = 120, max_chars: int = 8000) -> str:
+    """
+    Compact pytest stdout/stderr while keeping failure signal and key context.
+
+    Keeps:
+      - FAILURES/ERRORS headers
+      - test case headers and short summaries
+      - error type lines (E   ...)
+      - a few context lines per failure
+    """
+    if not text:
+        return text
+    compactor = PytestOutputCompactor(max_lines, max_chars)
+    for line in text.splitlines():
+        compactor.feed(line)
+    return compactor.result()
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""Resident hook status server on a workspace Unix socket, and its client.
+
+The running agent serves its status and the resolved hook messages, so
+`ucagent --hook-message` can answer from a socket round trip instead of
+loading the config and the status file in every IDE hook call. The client
+part only uses the standard library and is imported by the CLI fast path.
+"""
+
+import json
+import os
+import socket
+import threading
+from typing import Dict, Optional, Tuple
+
+HOOK_SOCKET_FILE = ".ucagent_hook.sock"
+# sun_path is limited to 108 bytes on Linux
+MAX_SOCKET_PATH = 100
+STATUS_KEYS = ("is_agent_exit", "all_completed", "is_wait_human_check")
+
+
+def get_hook_socket_path(workspace: str) -> str:
+    """Socket path of a workspace, in /tmp if the workspace path is too long."""
+    workspace = os.path.abspath(workspace)
+    path = os.path.join(workspace, HOOK_SOCKET_FILE)
+    if len(path.encode("utf-8")) <= MAX_SOCKET_PATH:
+        return path
+    import hashlib
+    import tempfile
+    digest = hashlib.sha1(workspace.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), f"ucagent-hook-{digest}.sock")
+
+
+def parse_hook_key(key: str) -> Tuple[Optional[str], str, Optional[str]]:
+    """Parse a hook key: [config_file.yaml::]continue_prompt_key[|stop_prompt_key].
+
+    Returns:
+        (config_file or None, continue_key, stop_key or None).
+    """
+    config_file = None
+    if "::" in key:
+        config_file, key = key.split("::", 1)
+    stop_key = None
+    if "|" in key:
+        key, stop_key = key.split("|", 1)
+    return config_file, key, stop_key
+
+
+def _request(path: str, req: dict, timeout: float) -> Optional[dict]:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path)
+        sock.sendall(json.dumps(req).encode("utf-8") + b"\n")
+        data = b""
+        while not data.endswith(b"\n"):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+        return json.loads(data.decode("utf-8"))
+    except (OSError, ValueError):
+        return None
+    finally:
+        sock.close()
+
+
+def query_hook_message(key: str, workspace: str = ".", need_agent_exit: bool = False,
+                       timeout: float = 0.5) -> Tuple[bool, Optional[str]]:
+    """Ask the hook server of workspace for the hook message of key.
+
+    Returns:
+        (True, message) if the server answered, (False, None) if there is no
+        server (or the key needs the file path, e.g. a missing config file).
+    """
+    path = get_hook_socket_path(workspace)
+    if not os.path.exists(path):
+        return False, None
+    config_file, continue_key, stop_key = parse_hook_key(key)
+    if config_file:
+        config_file = os.path.abspath(config_file)
+        if not os.path.isfile(config_file):
+            return False, None
+    env = {k: os.environ[k] for k in (continue_key, stop_key) if k and k in os.environ}
+    ret = _request(path, {"op": "hook", "config_file": config_file, "cwd": os.getcwd(),
+                          "continue_key": continue_key, "stop_key": stop_key, "env": env,
+                          "need_agent_exit": need_agent_exit}, timeout)
+    if not ret or not ret.get("ok"):
+        return False, None
+    return True, ret.get("msg")
+
+
+class HookStatusServer:
+    """Serves the agent status and hook messages of a workspace on a Unix socket.
+
+    Requests and replies are one JSON line each. Config files are loaded
+    once and reloaded when their mtime changes.
+
+    Args:
+        workspace: Workspace of the agent.
+        status: Initial status (the content of .ucagent_info.json).
+    """
+
+    def __init__(self, workspace: str, status: Optional[dict] = None):
+        self.workspace = os.path.abspath(workspace)
+        self.path = get_hook_socket_path(self.workspace)
+        self.status = {}
+        self.request_count = 0
+        self._config_cache: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+        self._sock = None
+        self._thread = None
+        self._stop = threading.Event()
+        self.update(status or {})
+
+    def update(self, status: dict):
+        """Update the served status, the caller may modify status afterwards."""
+        new_status = {k: status[k] for k in STATUS_KEYS if k in status}
+        if status:
+            new_status["exists"] = True  # an existing status is never empty, see select_hook_msg
+        with self._lock:
+            self.status = new_status
+
+    def _get_config(self, config_file: Optional[str], cwd: Optional[str]):
+        """Load the config as the client would (config.yaml is searched in its cwd), cached by mtime."""
+        from ucagent.util.config import get_config
+        path = config_file or os.path.join(cwd or ".", "config.yaml")
+        mtime = os.path.getmtime(path) if os.path.isfile(path) else None
+        cache_key = (config_file, cwd)
+        cached = self._config_cache.get(cache_key)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, get_config(config_file, search_dir=cwd))
+            self._config_cache[cache_key] = cached
+        return cached[1]
+
+    def handle_request(self, req: dict) -> dict:
+        op = req.get("op")
+        if op == "ping":
+            return {"ok": True}
+        with self._lock:
+            status = dict(self.status)
+        if op == "status":
+            return {"ok": True, "status": status}
+        if op != "hook":
+            return {"ok": False, "error": f"unknown op: {op}"}
+        from ucagent.util.functions import select_hook_msg
+        cfg = self._get_config(req.get("config_file"), req.get("cwd"))
+        env = req.get("env") or {}
+        msgs = []
+        for k in (req.get("continue_key"), req.get("stop_key")):
+            if not k:
+                msgs.append(None)
+            elif k in env:
+                msgs.append(env[k])
+            else:
+                msgs.append(cfg.get_value("hooks." + k, None))
+        continue_msg, stop_msg = msgs
+        msg = select_hook_msg(status, msg_continue=continue_msg, msg_cmp=stop_msg, msg_exit=stop_msg,
+                              msg_init=continue_msg, msg_wait_hm="",
+                              need_agent_exit=req.get("need_agent_exit", False))
+        return {"ok": True, "msg": msg}
+
+    def _serve(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            with conn:
+                conn.settimeout(1.0)
+                try:
+                    data = b""
+                    while not data.endswith(b"\n"):
+                        chunk = conn.recv(65536)
+                        if not chunk:
+                            break
+                        data += chunk
+                    self.request_count += 1
+                    try:
+                        ret = self.handle_request(json.loads(data.decode("utf-8")))
+                    except Exception as e:
+                        ret = {"ok": False, "error": str(e)}
+                    conn.sendall(json.dumps(ret).encode("utf-8") + b"\n")
+                except OSError:
+                    continue
+
+    def start(self) -> bool:
+        """Bind the socket and serve in a daemon thread, False if another server owns it."""
+        if os.path.exists(self.path):
+            if _request(self.path, {"op": "ping"}, 0.5) is not None:
+                return False
+            os.remove(self.path)  # stale socket of a dead agent
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.bind(self.path)
+        os.chmod(self.path, 0o600)
+        self._sock.listen(16)
+        self._sock.settimeout(0.2)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._serve, name="ucagent-hook-server", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(2)
+            self._thread = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+__hook_servers__: Dict[str, HookStatusServer] = {}
+
+
+def start_hook_server(workspace: str, status: Optional[dict] = None) -> Optional[HookStatusServer]:
+    """Start the hook server of workspace (once per process), None if it cannot be started."""
+    import atexit
+    from ucagent.util.log import info, warning
+    workspace = os.path.abspath(workspace)
+    if workspace in __hook_servers__:
+        return __hook_servers__[workspace]
+    server = HookStatusServer(workspace, status)
+    try:
+        if not server.start():
+            warning(f"Hook server of {workspace} is already running in another process")
+            return None
+    except OSError as e:
+        warning(f"Failed to start hook server at {server.path}: {e}")
+        return None
+    __hook_servers__[workspace] = server
+    atexit.register(stop_hook_server, workspace)
+    info(f"Hook server listening at {server.path}")
+    return server
+
+
+def stop_hook_server(workspace: str):
+    server = __hook_servers__.pop(os.path.abspath(workspace), None)
+    if server is not None:
+        server.stop()
+
+
+def publish_hook_status(workspace: str, status: dict):
+    """Push the status of workspace to its hook server, no-op if there is none."""
+    if not __hook_servers__:
+        return
+    server = __hook_servers__.get(os.path.abspath(workspace))
+    if server is not None:
+        server.update(status)
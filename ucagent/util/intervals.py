@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""Compact line sets stored as sorted, disjoint and closed intervals."""
+
+from bisect import bisect_right
+from typing import Iterable, Iterator, List, Tuple
+
+
+class IntervalSet:
+    """A set of integers (e.g. line numbers) kept as sorted merged ranges.
+
+    Memory is proportional to the number of ranges instead of the number of
+    lines, and membership is a binary search.
+    """
+
+    __slots__ = ("_starts", "_ends")
+
+    def __init__(self, ranges: Iterable[Tuple[int, int]] = ()):
+        """Initialize the set.
+
+        Args:
+            ranges: Closed ranges (start, end), in any order, may overlap.
+        """
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+        merged = []
+        for start, end in sorted(ranges):
+            if start > end:
+                raise ValueError(f"Invalid range {start}-{end}: start > end")
+            if merged and start <= merged[-1][1] + 1:
+                if end > merged[-1][1]:
+                    merged[-1][1] = end
+            else:
+                merged.append([start, end])
+        for start, end in merged:
+            self._starts.append(start)
+            self._ends.append(end)
+
+    @classmethod
+    def from_values(cls, values: Iterable[int]) -> "IntervalSet":
+        return cls((v, v) for v in values)
+
+    @classmethod
+    def parse(cls, text: str, sep: str = ",") -> "IntervalSet":
+        """Parse a range string like '10-20,30,45-45'.
+
+        Raises:
+            ValueError: If an item is not a number or a 'start-end' range.
+        """
+        ranges = []
+        for item in text.split(sep):
+            item = item.strip()
+            if not item:
+                continue
+            start, _, end = item.partition("-")
+            start, end = int(start), int(end if end else start)
+            ranges.append((start, end))
+        return cls(ranges)
+
+    def ranges(self) -> List[Tuple[int, int]]:
+        return list(zip(self._starts, self._ends))
+
+    def __iter__(self) -> Iterator[int]:
+        for start, end in zip(self._starts, self._ends):
+            yield from range(start, end + 1)
+
+    def __contains__(self, value: int) -> bool:
+        i = bisect_right(self._starts, value) - 1
+        return i >= 0 and value <= self._ends[i]
+
+    def __len__(self) -> int:
+        return sum(e - s + 1 for s, e in zip(self._starts, self._ends))
+
+    def __bool__(self) -> bool:
+        return bool(self._starts)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, IntervalSet) and self.ranges() == other.ranges()
+
+    def __repr__(self) -> str:
+        return f"IntervalSet({self.to_str()!r})"
+
+    def union(self, other: "IntervalSet") -> "IntervalSet":
+        return IntervalSet(self.ranges() + other.ranges())
+
+    __or__ = union
+
+    def difference(self, other: "IntervalSet") -> "IntervalSet":
+        """Get the values in self but not in other."""
+        ret = []
+        j, other_ranges = 0, other.ranges()
+        for start, end in self.ranges():
+            cur = start
+            while j < len(other_ranges) and other_ranges[j][1] < cur:
+                j += 1
+            k = j
+            while cur <= end and k < len(other_ranges) and other_ranges[k][0] <= end:
+                o_start, o_end = other_ranges[k]
+                if o_start > cur:
+                    ret.append((cur, o_start - 1))
+                cur = max(cur, o_end + 1)
+                k += 1
+            if cur <= end:
+                ret.append((cur, end))
+        return IntervalSet(ret)
+
+    __sub__ = difference
+
+    def complement(self, start: int, end: int) -> "IntervalSet":
+        """Get the values in [start, end] that are not in the set."""
+        return IntervalSet([(start, end)] if start <= end else []).difference(self)
+
+    def to_str(self, sep: str = ",", always_range: bool = False) -> str:
+        """Format as 'a-b,c,...', single values as 'a-a' if always_range."""
+        return sep.join(f"{s}-{e}" if (s != e or always_range) else f"{s}"
+                        for s, e in zip(self._starts, self._ends))
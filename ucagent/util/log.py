@@ -6,6 +6,8 @@ import logging.handlers
 import os
 from typing import Optional
 
+from ucagent.util.stream_stats import RecentKeySet
+
 RESET = "\033[0m"
 GREEN = "\033[32m"
 RED = "\033[31m"
@@ -39,38 +41,284 @@ def get_msg_logger() -> Optional[logging.Logger]:
     return __msg_logger__
 
 
-def init_log_logger(name: str = "ucagent-log", level: int = logging.DEBUG,
-                log_file:str="log/ucagent-log.log"):
-    """Initializes the logger with the given name and level."""
-    global __log_logger__
-    __log_logger__ = logging.getLogger(name)
-    __log_logger__.setLevel(level)
-    __log_logger__.handlers.clear()
+__log_listeners__ = {}
+__log_files__ = {}
+
+LOG_COMPRESS_EXT = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def get_log_compress(compress: Optional[str]) -> Optional[str]:
+    """Normalize a compress option: 'gzip', 'zstd' (gzip if zstandard is missing) or None."""
+    if not compress or compress == "none":
+        return None
+    assert compress in LOG_COMPRESS_EXT, f"Unsupported log compress: {compress}"
+    if compress == "zstd":
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            print(f"{YELLOW}[WARN] zstandard is not installed, use gzip for log rotation{RESET}", flush=True)
+            return "gzip"
+    return compress
+
+
+def compress_file(source: str, dest: str, compress: str):
+    """Compress file source to dest with gzip or zstd."""
+    import shutil
+    if compress == "zstd":
+        import zstandard
+        with open(source, "rb") as fsrc, open(dest, "wb") as fdst:
+            zstandard.ZstdCompressor().copy_stream(fsrc, fdst)
+    else:
+        import gzip
+        with open(source, "rb") as fsrc, gzip.open(dest, "wb") as fdst:
+            shutil.copyfileobj(fsrc, fdst)
+
+
+def open_log_file(path: str):
+    """Open a (maybe rotated and compressed) log file for text reading."""
+    if path.endswith(".gz"):
+        import gzip
+        return gzip.open(path, "rt", encoding="utf-8", errors="ignore")
+    if path.endswith(".zst"):
+        import io
+        import zstandard
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True),
+                                encoding="utf-8", errors="ignore")
+    return open(path, "r", encoding="utf-8", errors="ignore")
+
+
+def read_log_lines(log_file: str):
+    """Yield the lines of a log file and its rotated backups, oldest first."""
+    backups = []
+    log_dir = os.path.dirname(log_file) or "."
+    prefix = os.path.basename(log_file) + "."
+    if os.path.isdir(log_dir):
+        for f in os.listdir(log_dir):
+            index = f[len(prefix):].split(".")[0] if f.startswith(prefix) else ""
+            if index.isdigit():
+                backups.append((int(index), os.path.join(log_dir, f)))
+    for _, path in sorted(backups, reverse=True):
+        with open_log_file(path) as f:
+            for line in f:
+                yield line.rstrip("\n")
+    if os.path.isfile(log_file):
+        with open_log_file(log_file) as f:
+            for line in f:
+                yield line.rstrip("\n")
+
+
+class CompressedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler compressing the rotated files (name.1.gz, name.2.gz, ...).
+
+    The total size of a log category is capped by max_bytes * (backup_count + 1)
+    before compression.
+    """
+
+    def __init__(self, filename: str, max_bytes: int, backup_count: int, compress: Optional[str] = "gzip"):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        self.compress = get_log_compress(compress)
+        if self.compress:
+            self.namer = lambda name: name + LOG_COMPRESS_EXT[self.compress]
+            self.rotator = self._compress_rotator
+
+    def _compress_rotator(self, source: str, dest: str):
+        compress_file(source, dest, self.compress)
+        os.remove(source)
+
+
+class LogBlobStore:
+    """Content-addressed store (gzip files named by sha1) of full log payloads.
+
+    Args:
+        root_dir: Directory of the blobs.
+        max_bytes: Cap of the total (compressed) size, the oldest blobs are removed.
+    """
+
+    def __init__(self, root_dir: str, max_bytes: int = 1024 * 1024 * 1024):
+        self.root_dir = root_dir
+        self.max_bytes = max_bytes
+        os.makedirs(root_dir, exist_ok=True)
+        self.total_bytes = sum(os.path.getsize(p) for p in self._blob_files())
+
+    def _blob_files(self):
+        for d in os.listdir(self.root_dir):
+            sub_dir = os.path.join(self.root_dir, d)
+            if os.path.isdir(sub_dir):
+                for f in os.listdir(sub_dir):
+                    yield os.path.join(sub_dir, f)
+
+    def get_path(self, digest: str) -> str:
+        return os.path.join(self.root_dir, digest[:2], digest + ".gz")
+
+    def put(self, digest: str, data: str):
+        import gzip
+        path = self.get_path(digest)
+        if os.path.exists(path):
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self.total_bytes += os.path.getsize(path)
+        if self.total_bytes > self.max_bytes:
+            self._prune()
+        return path
+
+    def get(self, digest: str) -> Optional[str]:
+        import gzip
+        path = self.get_path(digest)
+        if not os.path.exists(path):
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return f.read()
+
+    def _prune(self):
+        files = sorted(((os.path.getmtime(p), os.path.getsize(p), p) for p in self._blob_files()))
+        for _, size, path in files:
+            if self.total_bytes <= self.max_bytes * 0.8:
+                break
+            os.remove(path)
+            self.total_bytes -= size
+
+
+class PayloadLimitFilter(logging.Filter):
+    """Truncates messages longer than max_chars to their head and tail.
+
+    The full payload is attached to the record (log_blob) for a LogBlobHandler,
+    and a payload repeated within the last payloads is logged by reference only.
+    """
+
+    def __init__(self, max_chars: int = 16384, keep_blob: bool = False, recent_size: int = 1024):
+        super().__init__()
+        self.max_chars = max_chars
+        self.keep_blob = keep_blob
+        self.recent_payloads = RecentKeySet(recent_size)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.max_chars <= 0:
+            return True
+        msg = record.getMessage()
+        if len(msg) <= self.max_chars:
+            return True
+        import hashlib
+        digest = hashlib.sha1(msg.encode("utf-8", errors="replace")).hexdigest()
+        if self.recent_payloads.seen(digest):
+            record.msg = f"{msg[:200]}...[repeated payload of {len(msg)} chars, blob {digest}]"
+        else:
+            keep = self.max_chars // 2
+            record.msg = f"{msg[:keep]}\n...[{len(msg) - 2 * keep} chars truncated, blob {digest}]...\n{msg[-keep:]}"
+            if self.keep_blob:
+                record.log_blob = (digest, msg)
+        record.args = None
+        return True
+
+
+class LogBlobHandler(logging.Handler):
+    """Writes the full payloads attached by PayloadLimitFilter to a LogBlobStore."""
+
+    def __init__(self, store: LogBlobStore):
+        super().__init__()
+        self.store = store
+
+    def emit(self, record: logging.LogRecord):
+        blob = getattr(record, "log_blob", None)
+        if blob is None:
+            return
+        try:
+            self.store.put(*blob)
+        except Exception:
+            self.handleError(record)
+
+
+def _init_logger(name: str, level: int, log_file: str, formatter: Optional[logging.Formatter],
+                 max_bytes: int, backup_count: int, compress: Optional[str], async_write: bool,
+                 max_payload_chars: int, blob_dir: Optional[str], blob_max_bytes: int) -> logging.Logger:
+    """Set up logger name: payload filter -> (queue ->) compressed rotating file (+ blob store)."""
+    import atexit
+    import queue
+    old_listener = __log_listeners__.pop(name, None)
+    if old_listener is not None:
+        old_listener.stop()
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    for h in logger.handlers:
+        h.close()
+    logger.handlers.clear()
+    logger.filters.clear()
     log_path = os.path.dirname(log_file)
     if log_path and not os.path.exists(log_path):
         os.makedirs(log_path)
-    fh = logging.FileHandler(log_file, mode='a')
-    fm = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    fh = CompressedRotatingFileHandler(log_file, max_bytes, backup_count, compress)
     fh.setLevel(level)
-    fh.setFormatter(fm)
-    __log_logger__.addHandler(fh)
+    if formatter is not None:
+        fh.setFormatter(formatter)
+    handlers = [fh]
+    if blob_dir:
+        handlers.append(LogBlobHandler(LogBlobStore(blob_dir, blob_max_bytes)))
+    logger.addFilter(PayloadLimitFilter(max_payload_chars, keep_blob=bool(blob_dir)))
+    __log_files__[name] = os.path.abspath(log_file)
+    if not async_write:
+        for h in handlers:
+            logger.addHandler(h)
+        return logger
+    # the writer thread does file I/O, rotation and compression off the caller threads
+    log_queue = queue.Queue(-1)
+    qh = logging.handlers.QueueHandler(log_queue)
+    qh.setLevel(level)
+    logger.addHandler(qh)
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    __log_listeners__[name] = listener
+    atexit.register(stop_log_listener, name)
+    return logger
+
+
+def stop_log_listener(name: str):
+    """Flush the queued records of logger name and stop its writer thread."""
+    listener = __log_listeners__.pop(name, None)
+    if listener is not None:
+        listener.stop()
+        for h in listener.handlers:
+            h.close()
+
+
+def get_log_file_path(name: str = "ucagent-log") -> Optional[str]:
+    """Get the file of the logger initialized by init_log_logger/init_msg_logger."""
+    return __log_files__.get(name)
+
+
+def init_log_logger(name: str = "ucagent-log", level: int = logging.DEBUG,
+                log_file:str="log/ucagent-log.log", max_bytes: int = 50 * 1024 * 1024,
+                backup_count: int = 10, compress: Optional[str] = "gzip", async_write: bool = True,
+                max_payload_chars: int = 16384, blob_dir: Optional[str] = None,
+                blob_max_bytes: int = 1024 * 1024 * 1024):
+    """Initializes the logger with the given name and level.
+
+    Args:
+        max_bytes: Size of the log file to rotate, 0 to never rotate.
+        backup_count: Number of rotated files kept.
+        compress: Compression of rotated files: gzip, zstd or None.
+        async_write: Write through a queue and a writer thread.
+        max_payload_chars: Longer messages are truncated, 0 to disable.
+        blob_dir: If set, full truncated payloads are saved here by sha1.
+        blob_max_bytes: Size cap of blob_dir.
+    """
+    global __log_logger__
+    fm = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    __log_logger__ = _init_logger(name, level, log_file, fm, max_bytes, backup_count, compress,
+                                  async_write, max_payload_chars, blob_dir, blob_max_bytes)
 
 
 def init_msg_logger(name: str = "ucagent-msg", level: int = logging.INFO,
-                log_file:str="log/ucagent-msg.log"):
-    """Initializes the message logger with the given name and level."""
+                log_file:str="log/ucagent-msg.log", max_bytes: int = 10 * 1024 * 1024,
+                backup_count: int = 5, compress: Optional[str] = "gzip", async_write: bool = True,
+                max_payload_chars: int = 16384, blob_dir: Optional[str] = None,
+                blob_max_bytes: int = 1024 * 1024 * 1024):
+    """Initializes the message logger with the given name and level (Args as init_log_logger)."""
     global __msg_logger__
-    __msg_logger__ = logging.getLogger(name)
-    __msg_logger__.setLevel(level)
-    __msg_logger__.handlers.clear()
-    log_path = os.path.dirname(log_file)
-    if log_path and not os.path.exists(log_path):
-        os.makedirs(log_path)
-    fh = logging.handlers.RotatingFileHandler(
-        log_file, maxBytes=10 * 1024 * 1024, backupCount
-        =5)
-    fh.setLevel(level)
-    __msg_logger__.addHandler(fh)
+    __msg_logger__ = _init_logger(name, level, log_file, None, max_bytes, backup_count, compress,
+                                  async_write, max_payload_chars, blob_dir, blob_max_bytes)
 
 
 def msg_msg(msg: str, end: str = "\n"):
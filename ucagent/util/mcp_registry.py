@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""Port allocation and endpoint registry of the MCP servers.
+
+reserve_port() binds a listening socket to a port chosen by the OS (port 0)
+and keeps it open until the MCP server takes it over, so concurrent agents
+never get the same port and no port range has to be scanned.
+
+A running server publishes its endpoint in <workspace>/.ucagent_mcp_endpoint.json
+and in a registry file shared by all agents of the user (flock protected), so
+clients can find the server of a workspace with list_endpoints().
+"""
+
+import fcntl
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from ucagent.util.log import warning
+from ucagent.util.persist import atomic_write_json
+
+ENDPOINT_FILE = ".ucagent_mcp_endpoint.json"
+REGISTRY_ENV = "UCAGENT_MCP_REGISTRY"
+
+__reserved_sockets__: Dict[int, socket.socket] = {}
+__reserved_lock__ = threading.Lock()
+
+
+def get_registry_path() -> str:
+    """$UCAGENT_MCP_REGISTRY or ~/.ucagent/mcp_endpoints.json"""
+    return os.environ.get(REGISTRY_ENV) or os.path.join(os.path.expanduser("~"), ".ucagent/mcp_endpoints.json")
+
+
+def reserve_port(host: Optional[str] = "127.0.0.1") -> int:
+    """Bind a listening socket on host to a free port chosen by the OS and keep it.
+
+    The socket is held until take_reserved_socket() or release_port(), nobody
+    else can bind the port in between.
+
+    Returns:
+        The reserved port.
+    """
+    host = host or "127.0.0.1"
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, 0))
+        sock.listen(128)  # a listening socket also blocks SO_REUSEADDR binds of others
+    except OSError:
+        sock.close()
+        raise
+    port = sock.getsockname()[1]
+    with __reserved_lock__:
+        __reserved_sockets__[port] = sock
+    return port
+
+
+def take_reserved_socket(port: int, host: Optional[str] = None) -> Optional[socket.socket]:
+    """Hand over the socket reserved for port, None if there is none.
+
+    If host is given and differs from the reserved one the socket is closed
+    and None is returned, the server then binds the port itself.
+    """
+    with __reserved_lock__:
+        sock = __reserved_sockets__.pop(port, None)
+    if sock is None or not host:
+        return sock
+    try:
+        bound = sock.getsockname()[0]
+        if bound in ("0.0.0.0", "::") or bound == socket.getaddrinfo(host, port, sock.family)[0][4][0]:
+            return sock
+    except OSError:
+        pass
+    sock.close()
+    return None
+
+
+def release_port(port: int):
+    """Close the socket reserved for port."""
+    sock = take_reserved_socket(port)
+    if sock is not None:
+        sock.close()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _is_live(entry: dict) -> bool:
+    # entries of other hosts (shared home) can not be checked, keep them
+    if entry.get("hostname") != socket.gethostname():
+        return True
+    return _pid_alive(entry.get("pid", -1))
+
+
+@contextmanager
+def _locked_registry(path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + ".lock", "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _read_registry(path: str) -> List[dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return [e for e in data.get("endpoints", []) if isinstance(e, dict)]
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError, AttributeError) as e:
+        warning(f"Ignore broken MCP endpoint registry {path}: {e}")
+        return []
+
+
+def publish_endpoint(workspace: str, host: str, port: int, registry: Optional[str] = None, **extra) -> dict:
+    """Publish the MCP server endpoint of workspace (this process).
+
+    Args:
+        workspace: Workspace served by the MCP server.
+        host: Host the server listens on.
+        port: Port the server listens on.
+        registry: Registry file, default get_registry_path().
+        extra: Additional fields of the entry (e.g. no_file_ops).
+
+    Returns:
+        The published entry.
+    """
+    workspace = os.path.abspath(workspace)
+    entry = {
+        "workspace": workspace,
+        "host": host,
+        "port": port,
+        "url": f"http://{host}:{port}/mcp",
+        "pid": os.getpid(),
+        "hostname": socket.gethostname(),
+        "started": time.time(),
+        **extra,
+    }
+    atomic_write_json(os.path.join(workspace, ENDPOINT_FILE), entry, fsync=False)
+    path = registry or get_registry_path()
+    try:
+        with _locked_registry(path):
+            endpoints = [e for e in _read_registry(path) if _is_live(e) and not (
+                e.get("hostname") == entry["hostname"] and
+                (e.get("pid") == entry["pid"] and e.get("workspace") == workspace or e.get("port") == port))]
+            endpoints.append(entry)
+            atomic_write_json(path, {"endpoints": endpoints}, fsync=False)
+    except OSError as e:
+        warning(f"Failed to publish the MCP endpoint in {path}: {e}")
+    return entry
+
+
+def unpublish_endpoint(workspace: str, registry: Optional[str] = None):
+    """Remove the endpoint of workspace published by this process."""
+    workspace = os.path.abspath(workspace)
+    endpoint_file = os.path.join(workspace, ENDPOINT_FILE)
+    try:
+        with open(endpoint_file, "r", encoding="utf-8") as f:
+            if json.load(f).get("pid") == os.getpid():
+                os.remove(endpoint_file)
+    except (OSError, ValueError):
+        pass
+    path = registry or get_registry_path()
+    hostname, pid = socket.gethostname(), os.getpid()
+    try:
+        with _locked_registry(path):
+            endpoints = [e for e in _read_registry(path) if _is_live(e) and not (
+                e.get("hostname") == hostname and e.get("pid") == pid and e.get("workspace") == workspace)]
+            atomic_write_json(path, {"endpoints": endpoints}, fsync=False)
+    except OSError as e:
+        warning(f"Failed to remove the MCP endpoint from {path}: {e}")
+
+
+def list_endpoints(workspace: Optional[str] = None, registry: Optional[str] = None) -> List[dict]:
+    """Running MCP servers, optionally only those of workspace.
+
+    The workspace endpoint file is checked first, the registry covers the
+    workspaces without one (e.g. not writable).
+    """
+    if workspace is not None:
+        workspace = os.path.abspath(workspace)
+        try:
+            with open(os.path.join(workspace, ENDPOINT_FILE), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if _is_live(entry):
+                return [entry]
+        except (OSError, ValueError):
+            pass
+    endpoints = [e for e in _read_registry(registry or get_registry_path()) if _is_live(e)]
+    if workspace is not None:
+        endpoints = [e for e in endpoints if e.get("workspace") == workspace]
+    return endpoints
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""Crash-consistent persistence: atomic file writes, debounced state writer and append-only journals."""
+
+import atexit
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from ucagent.util.log import warning
+
+# mkstemp creates 0600 files, atomic writes give new files the usual mode instead
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+# temp files older than this are leftovers of a crashed writer
+STALE_TMP_SECONDS = 600
+__cleaned_tmp_targets__ = set()
+
+
+def _fsync_dir(dir_name: str):
+    try:
+        fd = os.open(dir_name or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_text(path: str, text: str, fsync: bool = True):
+    """Write text to path atomically (temp file + fsync + rename).
+
+    Readers, and a process restarted after a crash, see either the old or the
+    new content, never a partial write.
+    """
+    _atomic_write(path, text.encode("utf-8"), fsync)
+
+
+def atomic_write_bytes(path: str, data: bytes, fsync: bool = True):
+    """Write binary data to path atomically, see atomic_write_text."""
+    _atomic_write(path, data, fsync)
+
+
+def _remove_stale_tmp_files(path: str):
+    """Remove the temp files of path left by a writer that crashed before the rename.
+
+    Done once per target path and process, files younger than STALE_TMP_SECONDS
+    may belong to a running writer and are kept.
+    """
+    if path in __cleaned_tmp_targets__:
+        return
+    __cleaned_tmp_targets__.add(path)
+    deadline = time.time() - STALE_TMP_SECONDS
+    for tmp_path in glob.glob(glob.escape(path) + ".*.tmp"):
+        try:
+            if os.path.getmtime(tmp_path) < deadline:
+                os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def _atomic_write(path: str, data: bytes, fsync: bool):
+    path = os.path.abspath(path)
+    dir_name = os.path.dirname(path)
+    os.makedirs(dir_name, exist_ok=True)
+    _remove_stale_tmp_files(path)
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except OSError:
+        mode = 0o666 & ~_UMASK
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=dir_name)
+    try:
+        os.fchmod(fd, mode)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if fsync:
+        _fsync_dir(dir_name)
+
+
+def make_private_dir(path: str) -> str:
+    """Create a directory of agent internal files and keep it out of version control.
+
+    A .gitignore ignoring everything is written into the directory, so its files
+    never show up as untracked in the workspace repository.
+
+    Returns:
+        path.
+    """
+    os.makedirs(path, exist_ok=True)
+    ignore_file = os.path.join(path, ".gitignore")
+    if not os.path.exists(ignore_file):
+        try:
+            with open(ignore_file, "w", encoding="utf-8") as f:
+                f.write("*\n")
+        except OSError as e:
+            warning(f"Failed to write {ignore_file}: {e}")
+    return path
+
+
+def dump_json(data: Any, indent: Optional[int] = None) -> str:
+    """Serialize data as JSON, compact if indent is None."""
+    if indent is None:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return json.dumps(data, ensure_ascii=False, indent=indent)
+
+
+def atomic_write_json(path: str, data: Any, indent: Optional[int] = None, fsync: bool = True):
+    """Write data as JSON (compact by default) to path atomically."""
+    atomic_write_text(path, dump_json(data, indent), fsync)
+
+
+def journal_append(path: str, lines: List[str], header: Optional[str] = None, fsync: bool = True):
+    """Append complete lines to an append-only journal file.
+
+    A torn last line left by a crash during a previous append is dropped
+    first, and header is written if the file is new or empty.
+    """
+    dir_name = os.path.dirname(os.path.abspath(path))
+    os.makedirs(dir_name, exist_ok=True)
+    with open(path, "ab+") as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - 1))
+        if size > 0 and f.read(1) != b"\n":
+            # drop the torn line: search the last newline backwards
+            end = size
+            while end > 0:
+                start = max(0, end - 65536)
+                f.seek(start)
+                cut = f.read(end - start).rfind(b"\n")
+                if cut >= 0:
+                    end = start + cut + 1
+                    break
+                end = start
+            f.truncate(end)
+            size = f.seek(0, os.SEEK_END)
+        data = "".join(line.rstrip("\n") + "\n" for line in lines)
+        if size == 0 and header is not None:
+            data = header.rstrip("\n") + "\n" + data
+        f.write(data.encode("utf-8"))
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class StatePersister:
+    """Coalesces state updates and writes them atomically from a background thread.
+
+    Only the latest data submitted for a path is written, at most once per
+    debounce interval, so frequent updates on the agent loop cost a dict
+    assignment instead of a synchronous file rewrite.
+
+    Args:
+        debounce: Seconds to wait for more updates before writing.
+    """
+
+    def __init__(self, debounce: float = 0.2):
+        self.debounce = debounce
+        self.write_count = 0
+        self._pending: Dict[str, str] = {}
+        self._writing = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stop = False
+
+    def submit(self, path: str, data: Any):
+        """Schedule data to be written to path as compact JSON.
+
+        Data is serialized here, so the caller may modify it afterwards.
+        """
+        text = dump_json(data)
+        with self._cond:
+            self._pending[os.path.abspath(path)] = text
+            if self._thread is None or not self._thread.is_alive():
+                self._stop = False
+                self._thread = threading.Thread(target=self._run, name="ucagent-state-persister", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stop:
+                    self._cond.wait()
+                if self._stop and not self._pending:
+                    return
+            if self.debounce > 0 and not self._stop:
+                time.sleep(self.debounce)
+            with self._cond:
+                items, self._pending = self._pending, {}
+                self._writing += 1
+            try:
+                for path, text in items.items():
+                    try:
+                        atomic_write_text(path, text)
+                        self.write_count += 1
+                    except Exception as e:
+                        warning(f"Failed to persist state to {path}: {e}")
+            finally:
+                with self._cond:
+                    self._writing -= 1
+                    self._cond.notify_all()
+
+    def is_pending(self, path: Optional[str] = None) -> bool:
+        with self._cond:
+            if path is None:
+                return bool(self._pending) or self._writing > 0
+            return os.path.abspath(path) in self._pending or self._writing > 0
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until all submitted data is written, return False on timeout."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            if self._thread is None:
+                return True
+            while self._pending or self._writing > 0:
+                if not self._thread.is_alive():
+                    return False
+                remain = None if deadline is None else deadline - time.time()
+                if remain is not None and remain <= 0:
+                    return False
+                self._cond.wait(remain)
+        return True
+
+    def close(self, timeout: Optional[float] = None):
+        """Write the pending data and stop the writer thread."""
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        self.flush(timeout)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+__state_persister__: Optional[StatePersister] = None
+__state_persister_lock__ = threading.Lock()
+
+
+def get_state_persister() -> StatePersister:
+    """Get the process wide StatePersister (flushed at exit)."""
+    global __state_persister__
+    with __state_persister_lock__:
+        if __state_persister__ is None:
+            __state_persister__ = StatePersister()
+            atexit.register(__state_persister__.close, 10)
+        return __state_persister__
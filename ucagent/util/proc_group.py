@@ -0,0 +1,525 @@
+# -*- coding: utf-8 -*-
+"""Run subprocesses in their own process group and kill the whole tree.
+
+Checkers run pytest, picker, Verilator and bash helpers which fork their own
+children. Killing only the direct child leaves those running, so every
+checker subprocess is started as a session (and process group) leader and
+terminated with kill_process_group: SIGTERM to the group and all known
+descendants, then SIGKILL to whatever is still alive after a grace period.
+Processes are found through /proc, no psutil is needed.
+
+The children also get resource limits (setrlimit before exec, see
+set_run_limits) and their resource usage is collected when they are reaped,
+see get_run_usage. run_streaming reads the output of a run into bounded
+captures while it runs and can stop it as soon as the output decides it.
+"""
+
+import os
+import signal
+import subprocess
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from ucagent.util.stream_capture import StreamCapture
+
+# seconds between SIGTERM and SIGKILL, and to wait for SIGKILL to take effect
+KILL_GRACE = 3.0
+KILL_TIMEOUT = 2.0
+_POLL_INTERVAL = 0.02
+
+# per-run limits, 0 means unlimited
+DEFAULT_RUN_LIMITS = {
+    "memory_mb": 0,      # virtual address space (RLIMIT_AS), Linux does not enforce RLIMIT_RSS
+    "cpu_seconds": 0,    # RLIMIT_CPU, SIGXCPU then SIGKILL one second later
+    "wall_seconds": 0,   # cap of the run time, also when the caller has no timeout
+    "open_files": 0,     # RLIMIT_NOFILE
+    "file_size_mb": 0,   # RLIMIT_FSIZE, the largest file (or redirected output) a run can write
+    "output_kb": 0,      # captured stdout/stderr kept per stream, DEFAULT_OUTPUT_KB if 0
+}
+DEFAULT_OUTPUT_KB = 1024
+__run_limits__ = dict(DEFAULT_RUN_LIMITS)
+
+
+def set_run_limits(limits) -> dict:
+    """Set the default limits of the runs started by popen_group.
+
+    Args:
+        limits: Dict or Config with keys of DEFAULT_RUN_LIMITS, missing keys are unlimited.
+
+    Returns:
+        The new default limits.
+    """
+    if hasattr(limits, "as_dict"):
+        limits = limits.as_dict()
+    unknown = set(limits or {}) - set(DEFAULT_RUN_LIMITS) - {"enable"}
+    if unknown:
+        raise ValueError(f"Unknown run limits: {sorted(unknown)}")
+    __run_limits__.clear()
+    __run_limits__.update(DEFAULT_RUN_LIMITS)
+    if limits and limits.get("enable", True):
+        __run_limits__.update({k: limits[k] or 0 for k in DEFAULT_RUN_LIMITS if k in limits})
+    return dict(__run_limits__)
+
+
+def get_run_limits(**override) -> dict:
+    """The default run limits updated with override."""
+    ret = dict(__run_limits__)
+    ret.update(override)
+    return ret
+
+
+def run_timeout(timeout, limits: Optional[dict] = None):
+    """Effective timeout of a run: timeout capped by wall_seconds, None if there is neither."""
+    wall = (limits if limits is not None else __run_limits__).get("wall_seconds") or 0
+    timeout = timeout if timeout and timeout > 0 else 0
+    if wall > 0 and (timeout == 0 or wall < timeout):
+        return wall
+    return timeout or None
+
+
+def output_limit_chars(limits: Optional[dict] = None) -> int:
+    """Characters of stdout (and of stderr) kept in memory by run_streaming."""
+    kb = (limits if limits is not None else __run_limits__).get("output_kb") or DEFAULT_OUTPUT_KB
+    return int(kb * 1024)
+
+
+def _limit_preexec(limits: dict):
+    """preexec_fn applying limits with setrlimit in the child, None if nothing to limit."""
+    import resource
+    rlimits = []
+    mb = 1024 * 1024
+    if limits.get("memory_mb"):
+        rlimits.append((resource.RLIMIT_AS, int(limits["memory_mb"] * mb)))
+    if limits.get("cpu_seconds"):
+        rlimits.append((resource.RLIMIT_CPU, int(limits["cpu_seconds"])))
+    if limits.get("open_files"):
+        rlimits.append((resource.RLIMIT_NOFILE, int(limits["open_files"])))
+    if limits.get("file_size_mb"):
+        rlimits.append((resource.RLIMIT_FSIZE, int(limits["file_size_mb"] * mb)))
+    if not rlimits:
+        return None
+
+    def preexec():
+        for res, value in rlimits:
+            _, hard = resource.getrlimit(res)
+            soft = value if hard == resource.RLIM_INFINITY else min(value, hard)
+            if res == resource.RLIMIT_CPU:
+                # SIGXCPU at the soft limit, SIGKILL at the hard one
+                new_hard = soft + 1 if hard == resource.RLIM_INFINITY else min(soft + 1, hard)
+            else:
+                new_hard = hard
+            resource.setrlimit(res, (soft, new_hard))
+    return preexec
+
+
+class GroupPopen(subprocess.Popen):
+    """Popen which reaps the child with wait4 to keep its resource usage.
+
+    Only the public poll() and wait() are overridden, they reap the child
+    themselves, so the private reaping hooks of subprocess (which differ
+    between Python versions) are never replaced.
+
+    Attributes:
+        limits: The limits of the run.
+        rusage: resource.struct_rusage of the child and its reaped descendants, None while running.
+        start_time, end_time: Wall clock of the run.
+    """
+
+    def __init__(self, *args, limits: Optional[dict] = None, **kwargs):
+        self.limits = limits or {}
+        self.rusage = None
+        self.end_time = None
+        self.start_time = time.time()
+        self._reap_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def _reap(self, flags: int) -> bool:
+        """wait4 the child (lock held), True once it is reaped."""
+        if self.returncode is not None:
+            return True
+        try:
+            pid, sts, usage = os.wait4(self.pid, flags)
+        except ChildProcessError:
+            # reaped elsewhere (e.g. SIGCHLD ignored), as subprocess does
+            self.returncode = 0
+            self.end_time = time.time()
+            return True
+        if pid == 0:
+            return False
+        self.rusage = usage
+        self.end_time = time.time()
+        self.returncode = os.waitstatus_to_exitcode(sts)
+        return True
+
+    def poll(self):
+        if self.returncode is None and self._reap_lock.acquire(False):
+            try:
+                self._reap(os.WNOHANG)
+            finally:
+                self._reap_lock.release()
+        return self.returncode
+
+    def wait(self, timeout=None):
+        if self.returncode is not None:
+            return self.returncode
+        if timeout is None:
+            with self._reap_lock:
+                self._reap(0)
+            return self.returncode
+        deadline = time.monotonic() + timeout
+        delay = 0.0005
+        while self.poll() is None:
+            remain = deadline - time.monotonic()
+            if remain <= 0:
+                raise subprocess.TimeoutExpired(self.args, timeout)
+            time.sleep(min(delay, remain))
+            delay = min(delay * 2, 0.05)
+        return self.returncode
+
+def popen_group(cmd, limits: Optional[dict] = None, **kwargs) -> subprocess.Popen:
+    """subprocess.Popen with the child as leader of a new session and process group.
+
+    Args:
+        cmd: Command, as for subprocess.Popen.
+        limits: Resource limits of the run, default get_run_limits().
+        kwargs: Other arguments of subprocess.Popen.
+
+    Returns:
+        The started GroupPopen, its pid is also its process group id.
+    """
+    if limits is None:
+        limits = get_run_limits()
+    if os.name != "posix":
+        return subprocess.Popen(cmd, **kwargs)
+    kwargs["start_new_session"] = True
+    preexec = _limit_preexec(limits)
+    if preexec is not None and "preexec_fn" not in kwargs:
+        kwargs["preexec_fn"] = preexec
+    return GroupPopen(cmd, limits=limits, **kwargs)
+
+
+_MEMORY_ERRORS = ("MemoryError", "std::bad_alloc", "Cannot allocate memory", "out of memory")
+
+
+def get_run_usage(process, timed_out: bool = False, output: str = "") -> dict:
+    """Resource usage and exit reason of a finished run started by popen_group.
+
+    Args:
+        process: The GroupPopen.
+        timed_out: The run was stopped because of its timeout.
+        output: Captured output, used to recognize allocation failures.
+
+    Returns:
+        Dict with exit_reason, returncode, peak_rss_mb, cpu_user, cpu_sys,
+        wall_seconds and the limits of the run.
+    """
+    limits = getattr(process, "limits", {}) or {}
+    usage = getattr(process, "rusage", None)
+    rc = process.returncode
+    start = getattr(process, "start_time", None)
+    end = getattr(process, "end_time", None) or time.time()
+    ret = {
+        "exit_reason": "",
+        "returncode": rc,
+        # ru_maxrss is in KB on Linux
+        "peak_rss_mb": round(usage.ru_maxrss / 1024, 1) if usage else None,
+        "cpu_user": round(usage.ru_utime, 3) if usage else None,
+        "cpu_sys": round(usage.ru_stime, 3) if usage else None,
+        "wall_seconds": round(end - start, 3) if start else None,
+        "limits": {k: v for k, v in limits.items() if v},
+    }
+    cpu = (usage.ru_utime + usage.ru_stime) if usage else 0
+    if timed_out:
+        reason = "timeout"
+    elif rc is None:
+        reason = "running"
+    elif rc == 0:
+        reason = "ok"
+    elif rc < 0 or rc - 128 in (signal.SIGXCPU, signal.SIGXFSZ):
+        # a shell reports a child killed by a signal as 128 + signal
+        sig = -rc if rc < 0 else rc - 128
+        if sig == signal.SIGXCPU or (sig == signal.SIGKILL and limits.get("cpu_seconds")
+                                     and cpu >= limits["cpu_seconds"]):
+            reason = "cpu_limit"
+        elif sig == signal.SIGXFSZ:
+            reason = "file_size_limit"
+        elif sig in (signal.SIGKILL, signal.SIGTERM):
+            reason = "killed"
+        else:
+            reason = f"signal {signal.Signals(sig).name}" if sig in signal.Signals._value2member_map_ else f"signal {sig}"
+    elif limits.get("memory_mb") and output and any(e in output for e in _MEMORY_ERRORS):
+        reason = "memory_limit"
+    else:
+        reason = "exit"
+    ret["exit_reason"] = reason
+    return ret
+
+
+LIMIT_EXIT_REASONS = ("timeout", "cpu_limit", "file_size_limit", "memory_limit")
+
+
+def format_run_usage(usage: dict) -> str:
+    """One line summary of get_run_usage."""
+    msg = f"exit: {usage['exit_reason']}"
+    if usage["returncode"] is not None:
+        msg += f" (returncode {usage['returncode']})"
+    if usage["peak_rss_mb"] is not None:
+        msg += (f", peak RSS {usage['peak_rss_mb']} MB, CPU user {usage['cpu_user']}s"
+                f" sys {usage['cpu_sys']}s")
+    if usage["wall_seconds"] is not None:
+        msg += f", wall {usage['wall_seconds']}s"
+    if usage["limits"]:
+        msg += ", limits: " + ", ".join(f"{k}={v}" for k, v in usage["limits"].items())
+    return msg
+
+
+def _read_proc_table() -> Dict[int, Tuple[str, int, int]]:
+    """Map of pid -> (state, ppid, pgid) of all processes, empty without /proc."""
+    table = {}
+    try:
+        names = os.listdir("/proc")
+    except OSError:
+        return table
+    for name in names:
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat", "rb") as f:
+                data = f.read().decode("utf-8", "replace")
+        except OSError:
+            continue
+        # the command name in (...) may contain spaces and parentheses
+        fields = data[data.rfind(")") + 2:].split()
+        if len(fields) < 3:
+            continue
+        table[int(name)] = (fields[0], int(fields[1]), int(fields[2]))
+    return table
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            data = f.read().decode("utf-8", "replace")
+        return data[data.rfind(")") + 2:][:1] not in ("Z", "X")
+    except FileNotFoundError:
+        return False
+    except OSError:
+        pass
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def list_process_tree(pid: int, pgid: Optional[int] = None, include_root: bool = True) -> List[int]:
+    """Live processes of the tree of pid: its process group and its descendants.
+
+    Descendants which started their own session are included as long as
+    their parent is still alive when this is called.
+
+    Args:
+        pid: Root process.
+        pgid: Process group to include, default the group of pid if pid leads one.
+        include_root: Include pid and walk its children, False once pid is reaped
+            (the pid may be reused), then only the group and its descendants count.
+
+    Returns:
+        Sorted pids, zombies excluded.
+    """
+    table = _read_proc_table()
+    if not table:
+        return [pid] if include_root and _is_alive(pid) else []
+    if pgid is None:
+        pgid = pid
+    children: Dict[int, List[int]] = {}
+    for p, (_, ppid, _) in table.items():
+        children.setdefault(ppid, []).append(p)
+    found: Set[int] = {p for p, (_, _, g) in table.items() if g == pgid}
+    stack = ([pid] if include_root else []) + list(found)
+    while stack:
+        p = stack.pop()
+        for c in children.get(p, []):
+            if c not in found:
+                found.add(c)
+                stack.append(c)
+    if include_root and pid in table:
+        found.add(pid)
+    return sorted(p for p in found if p in table and table[p][0] not in ("Z", "X"))
+
+
+def _signal_all(pgid: Optional[int], pids, sig):
+    if pgid is not None:
+        try:
+            os.killpg(pgid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+    for p in pids:
+        try:
+            os.kill(p, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+
+def kill_process_group(process, grace: float = KILL_GRACE, kill_timeout: float = KILL_TIMEOUT) -> dict:
+    """Terminate a process with its group and descendants, SIGTERM first then SIGKILL.
+
+    Once the Popen is reaped its pid may belong to another process, so only
+    the group (and the descendants of its members) is walked then.
+
+    Args:
+        process: subprocess.Popen (reaped here) or pid, started by popen_group.
+        grace: Seconds to wait after SIGTERM before SIGKILL.
+        kill_timeout: Seconds to wait for the processes to vanish after SIGKILL.
+
+    Returns:
+        Accounting dict: pids (all processes found), terminated (gone after
+        SIGTERM), killed (needed SIGKILL), survivors (still alive at the end)
+        and elapsed seconds.
+    """
+    start = time.time()
+    popen = process if isinstance(process, subprocess.Popen) else None
+    pid = popen.pid if popen is not None else int(process)
+    pgid = None
+    if popen is None or popen.returncode is None:
+        try:
+            if os.getpgid(pid) == pid:
+                pgid = pid
+        except (ProcessLookupError, PermissionError, OSError):
+            pass
+    if pgid is None and popen is not None and os.name == "posix":
+        pgid = pid  # leader already exited, its group may still have members
+
+    def tree() -> List[int]:
+        return list_process_tree(pid, pgid, include_root=popen is None or popen.returncode is None)
+
+    seen = set(tree())
+
+    def alive() -> List[int]:
+        if popen is not None:
+            popen.poll()
+        now = set(tree())
+        seen.update(now)  # children forked while terminating
+        return sorted(p for p in seen if (p in now or _is_alive(p)))
+
+    stats = {"pids": [], "terminated": [], "killed": [], "survivors": [], "elapsed": 0.0}
+    remaining = alive()
+    if remaining:
+        _signal_all(pgid, remaining, signal.SIGTERM)
+        signalled = set(remaining)
+        deadline = time.time() + grace
+        while remaining and time.time() < deadline:
+            time.sleep(_POLL_INTERVAL)
+            remaining = alive()
+            _signal_all(None, [p for p in remaining if p not in signalled], signal.SIGTERM)
+            signalled.update(remaining)
+        stats["terminated"] = sorted(seen - set(remaining))
+        if remaining:
+            stats["killed"] = list(remaining)
+            deadline = time.time() + kill_timeout
+            while remaining and time.time() < deadline:
+                _signal_all(pgid, remaining, signal.SIGKILL)
+                time.sleep(_POLL_INTERVAL)
+                remaining = alive()
+    if popen is not None:
+        try:
+            popen.wait(timeout=max(0.0, kill_timeout))
+        except subprocess.TimeoutExpired:
+            pass
+    stats["pids"] = sorted(seen)
+    stats["killed"] = sorted(set(stats["killed"]) - set(remaining))
+    stats["survivors"] = remaining
+    stats["elapsed"] = round(time.time() - start, 3)
+    return stats
+
+
+def format_kill_stats(stats: dict) -> str:
+    """One line summary of the result of kill_process_group."""
+    msg = (f"{len(stats['pids'])} process(es) reclaimed in {stats['elapsed']:.2f}s: "
+           f"{len(stats['terminated'])} by SIGTERM, {len(stats['killed'])} by SIGKILL")
+    if stats["survivors"]:
+        msg += f", survivors: {stats['survivors']}"
+    return msg
+
+
+def run_streaming(cmd, timeout=None, on_line: Optional[Callable[[str, str], object]] = None,
+                  limits: Optional[dict] = None, pre_call: Optional[Callable] = None,
+                  kill_leftovers: bool = False, **kwargs) -> dict:
+    """Run cmd in its own process group and stream its output into bounded captures.
+
+    stdout and stderr keep at most output_limit_chars() characters each (head
+    and tail), so the memory does not grow with the output. The run is killed
+    with its process group when it times out or when on_line decides it.
+
+    Args:
+        cmd: Command, as for subprocess.Popen.
+        timeout: Timeout in seconds, capped by the wall_seconds limit (see run_timeout).
+        on_line: Called as on_line(stream_name, line) from the reader threads, a
+            true return value stops the run and is returned as "stopped".
+        limits: Resource limits of the run, default get_run_limits().
+        pre_call: Called with the process once it is started (e.g. to allow KillCheck).
+        kill_leftovers: Kill what is left in the process group when cmd exits,
+            instead of waiting for it to close the output pipes.
+        kwargs: Other arguments of subprocess.Popen (cwd, env, shell, ...).
+
+    Returns:
+        Dict with returncode, stdout, stderr, truncated (output was cut),
+        timed_out, stopped (the value of on_line, or None), usage (see
+        get_run_usage) and kill (kill_process_group stats, or None).
+    """
+    if limits is None:
+        limits = get_run_limits()
+    stop = threading.Event()
+    ret = {"stopped": None, "timed_out": False, "kill": None}
+    lock = threading.Lock()
+
+    def make_callback(name):
+        if on_line is None:
+            return None
+
+        def callback(line):
+            if stop.is_set():
+                return
+            with lock:
+                decision = on_line(name, line)
+            if decision:
+                ret["stopped"] = decision
+                stop.set()
+        return callback
+
+    process = popen_group(cmd, limits=limits, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          text=True, errors="replace", **kwargs)
+    max_chars = output_limit_chars(limits)
+    captures = {name: StreamCapture(name, max_chars, None, on_line=make_callback(name)).start(stream)
+                for name, stream in (("stdout", process.stdout), ("stderr", process.stderr))}
+    if pre_call is not None:
+        pre_call(process)
+    timeout = run_timeout(timeout, limits)
+    deadline = time.time() + timeout if timeout else None
+    # wait for the exit and for the pipes to be closed (children may keep them open)
+    while not stop.is_set():
+        if process.poll() is not None and (kill_leftovers or all(c.join(0) for c in captures.values())):
+            break
+        if deadline is not None and time.time() >= deadline:
+            ret["timed_out"] = True
+            break
+        stop.wait(_POLL_INTERVAL * 2.5)
+    if ret["timed_out"] or stop.is_set() or kill_leftovers:
+        ret["kill"] = kill_process_group(process)
+    for c in captures.values():
+        # a process which escaped the kill may still hold the pipe, keep what was read
+        c.join(KILL_TIMEOUT)
+    if process.returncode is None:
+        process.wait()
+    stdout, stderr = captures["stdout"].text(), captures["stderr"].text()
+    ret.update({
+        "returncode": process.returncode,
+        "stdout": stdout,
+        "stderr": stderr,
+        "truncated": any(c.truncated for c in captures.values()),
+        "usage": get_run_usage(process, timed_out=ret["timed_out"], output=stdout + stderr),
+    })
+    return ret
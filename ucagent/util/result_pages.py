@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""Cursor based pagination of large tool results for the MCP server.
+
+A result larger than one page is written to a spill file page by page and only
+the first page is returned, with a cursor for the next one. The server keeps
+the byte offsets of the pages, not the text, so the memory held per result and
+the size of every response are bounded by the page size. Results are kept in
+an LRU with a TTL, the spill file is removed when a result is dropped.
+"""
+
+import os
+import re
+import secrets
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from ucagent.util.log import warning
+from ucagent.util.persist import make_private_dir
+
+CURSOR_RE = re.compile(r"^([A-Za-z0-9_-]+)\.(\d+)$")
+
+
+def split_pages(text: str, page_chars: int) -> List[Tuple[int, int]]:
+    """Split text in (start, end) char ranges of at most page_chars, at line ends if possible."""
+    ret = []
+    start = 0
+    while start < len(text):
+        end = min(start + page_chars, len(text))
+        if end < len(text):
+            nl = text.rfind("\n", start, end)
+            if nl >= start + page_chars // 2:
+                end = nl + 1
+        ret.append((start, end))
+        start = end
+    return ret
+
+
+class _Result:
+    __slots__ = ("tool", "path", "offsets", "size", "accessed")
+
+    def __init__(self, tool: str, path: str, offsets: List[int], size: int):
+        self.tool = tool
+        self.path = path
+        self.offsets = offsets  # byte offsets of the pages and the file end
+        self.size = size  # chars
+        self.accessed = time.time()
+
+    @property
+    def pages(self) -> int:
+        return len(self.offsets) - 1
+
+
+class ResultPageStore:
+    """Pages of large tool results, addressed by cursor '<handle>.<page>'.
+
+    Args:
+        spill_dir: Directory of the spill files, a temporary directory if empty.
+        page_chars: Max characters of a page.
+        max_results: Number of results kept, the least recently read ones are dropped.
+        ttl: Seconds a result is kept after it was last read.
+    """
+
+    def __init__(self, spill_dir: Optional[str] = None, page_chars: int = 32768,
+                 max_results: int = 32, ttl: float = 900):
+        self.spill_dir = spill_dir
+        self.page_chars = max(1024, page_chars)
+        self.max_results = max(1, max_results)
+        self.ttl = ttl
+        self.count_paged = 0
+        self._results: "OrderedDict[str, _Result]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._tmp_dir = None
+
+    def _get_dir(self) -> str:
+        if self.spill_dir:
+            return make_private_dir(self.spill_dir)
+        if self._tmp_dir is None:
+            self._tmp_dir = tempfile.mkdtemp(prefix="ucagent_mcp_results_")
+        return self._tmp_dir
+
+    def need_paging(self, text) -> bool:
+        return isinstance(text, str) and len(text) > self.page_chars
+
+    def put(self, tool_name: str, text: str) -> dict:
+        """Spill text and return its first page.
+
+        Returns:
+            Dict with handle, tool, pages, size, page (text of the first page) and
+            next_cursor (None if there is only one page).
+        """
+        handle = f"{re.sub(r'[^A-Za-z0-9_]', '_', tool_name)}-{secrets.token_hex(6)}"
+        path = os.path.join(self._get_dir(), handle + ".txt")
+        ranges = split_pages(text, self.page_chars)
+        offsets = [0]
+        with open(path, "wb") as f:
+            for start, end in ranges:
+                offsets.append(offsets[-1] + f.write(text[start:end].encode("utf-8", errors="replace")))
+        result = _Result(tool_name, path, offsets, len(text))
+        with self._lock:
+            self._results[handle] = result
+            self.count_paged += 1
+            self._expire()
+        first = text[ranges[0][0]:ranges[0][1]] if ranges else ""
+        return {"handle": handle, "tool": tool_name, "pages": result.pages, "size": len(text), "page": first,
+                "next_cursor": f"{handle}.1" if result.pages > 1 else None}
+
+    def get_page(self, cursor: str) -> dict:
+        """Read the page of a cursor.
+
+        Returns:
+            Dict with handle, tool, page_no (0-based), pages, size, page and next_cursor.
+
+        Raises:
+            ValueError: If the cursor is malformed or out of range.
+            KeyError: If the result is unknown or was dropped (expired).
+        """
+        m = CURSOR_RE.match(cursor or "")
+        if not m:
+            raise ValueError(f"Invalid cursor '{cursor}'")
+        handle, page_no = m.group(1), int(m.group(2))
+        with self._lock:
+            self._expire()
+            result = self._results.get(handle)
+            if result is None:
+                raise KeyError(handle)
+            if page_no >= result.pages:
+                raise ValueError(f"Cursor '{cursor}' is out of range, the result has {result.pages} pages")
+            result.accessed = time.time()
+            self._results.move_to_end(handle)
+            start, end = result.offsets[page_no], result.offsets[page_no + 1]
+            with open(result.path, "rb") as f:
+                f.seek(start)
+                data = f.read(end - start)
+        return {"handle": handle, "tool": result.tool, "page_no": page_no, "pages": result.pages, "size": result.size,
+                "page": data.decode("utf-8", errors="replace"),
+                "next_cursor": f"{handle}.{page_no + 1}" if page_no + 1 < result.pages else None}
+
+    def _expire(self):
+        now = time.time()
+        for handle in list(self._results):
+            result = self._results[handle]
+            if len(self._results) > self.max_results or now - result.accessed > self.ttl:
+                self._drop(handle)
+
+    def _drop(self, handle: str):
+        result = self._results.pop(handle)
+        try:
+            os.remove(result.path)
+        except OSError as e:
+            warning(f"Failed to remove the paged result {result.path}: {e}")
+
+    def __len__(self):
+        with self._lock:
+            return len(self._results)
+
+    def close(self):
+        """Drop all results."""
+        with self._lock:
+            for handle in list(self._results):
+                self._drop(handle)
+            if self._tmp_dir is not None:
+                shutil.rmtree(self._tmp_dir, ignore_errors=True)
+                self._tmp_dir = None
+
+
+def format_page(page: dict) -> str:
+    """The text returned to the client: the page with a header telling how to get the next one."""
+    page_no = page.get("page_no", 0)
+    head = (f"[RESULT_PAGE {page_no + 1}/{page['pages']}] {page['tool']} result of {page['size']} chars "
+            f"is paged")
+    if page["next_cursor"]:
+        head += f", call FetchResultPage(cursor='{page['next_cursor']}') for the next page."
+    else:
+        head += ", this is the last page."
+    return head + "\n" + page["page"]
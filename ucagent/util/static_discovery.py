@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""Static (ast based) discovery of test functions, without importing test modules."""
+
+import ast
+import hashlib
+import inspect
+import os
+from typing import List, Optional
+
+from ucagent.util.functions import get_func_arg_list, match_name_pattern
+from ucagent.util.log import info
+
+
+class StaticFunction:
+    """A module level function found by parsing the source file."""
+
+    def __init__(self, name: str, args: List[str], source: str, lineno: int,
+                 markers: List[str], docstring: Optional[str], is_async: bool = False):
+        self.__name__ = name
+        self.name = name
+        self.args = args
+        self.fixtures = [a for a in args if a not in ("self", "request")]
+        self.source = source
+        self.lineno = lineno
+        self.markers = markers
+        self.docstring = docstring
+        self.is_async = is_async
+
+    def __repr__(self):
+        return f"StaticFunction({self.name}, line {self.lineno})"
+
+    @classmethod
+    def from_object(cls, func) -> "StaticFunction":
+        """Build from an imported function (import based fallback)."""
+        lineno = getattr(getattr(func, "__code__", None), "co_firstlineno", 0)
+        return cls(func.__name__, get_func_arg_list(func), inspect.getsource(func), lineno,
+                   [m.name for m in getattr(func, "pytestmark", [])], inspect.getdoc(func),
+                   inspect.iscoroutinefunction(func))
+
+
+class StaticModuleIndex:
+    """Functions of one python file and whether it may generate them dynamically."""
+
+    def __init__(self, file_path: str, digest: str, functions: List[StaticFunction],
+                 dynamic_names: List[str], has_dynamic_code: bool):
+        self.file_path = file_path
+        self.digest = digest
+        self.functions = functions
+        self.dynamic_names = dynamic_names
+        self.has_dynamic_code = has_dynamic_code
+
+
+def _decorator_name(node) -> str:
+    if isinstance(node, ast.Call):
+        node = node.func
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+def _is_dynamic_call(node) -> bool:
+    """Calls that can create module attributes: exec/setattr/globals()[...]."""
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+        return node.func.id in ("exec", "setattr", "globals", "vars")
+    return False
+
+
+def parse_module_index(file_path: str, source: str, digest: str) -> StaticModuleIndex:
+    """Parse the source of a python file into a StaticModuleIndex.
+
+    Raises:
+        SyntaxError: If the source can not be parsed.
+    """
+    tree = ast.parse(source, filename=file_path)
+    lines = source.splitlines(keepends=True)
+    functions, dynamic_names = [], []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            a = node.args
+            args = [x.arg for x in a.posonlyargs + a.args]
+            start = min([d.lineno for d in node.decorator_list] + [node.lineno])
+            markers = []
+            for d in node.decorator_list:
+                dname = _decorator_name(d)
+                if dname.startswith("pytest.mark."):
+                    markers.append(dname[len("pytest.mark."):])
+            functions.append(StaticFunction(node.name, args, "".join(lines[start - 1:node.end_lineno]),
+                                            node.lineno, markers, ast.get_docstring(node),
+                                            isinstance(node, ast.AsyncFunctionDef)))
+        elif isinstance(node, ast.ClassDef):
+            # classes are callable, the import based discovery also returns them
+            dynamic_names.append(node.name)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign, ast.AugAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for t in targets:
+                for n in ast.walk(t):
+                    if isinstance(n, ast.Name):
+                        dynamic_names.append(n.id)
+        elif isinstance(node, (ast.If, ast.For, ast.While, ast.With, ast.Try)):
+            # definitions in conditional/loop blocks are only known at import time
+            for n in ast.walk(node):
+                if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                    dynamic_names.append(n.name)
+                elif isinstance(n, ast.Name) and isinstance(n.ctx, ast.Store):
+                    dynamic_names.append(n.id)
+    return StaticModuleIndex(file_path, digest, functions, dynamic_names, _has_module_level_dynamic_call(tree))
+
+
+def _has_module_level_dynamic_call(tree) -> bool:
+    """Find exec/setattr/globals() calls executed at import time (not in function bodies)."""
+    todo = list(tree.body)
+    while todo:
+        node = todo.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            # decorators and default values are evaluated at import time
+            todo.extend(node.decorator_list if not isinstance(node, ast.Lambda) else [])
+            todo.extend(node.args.defaults + [d for d in node.args.kw_defaults if d is not None])
+            continue
+        if _is_dynamic_call(node):
+            return True
+        todo.extend(ast.iter_child_nodes(node))
+    return False
+
+
+__index_cache__ = {}
+
+
+def get_module_index(file_path: str) -> StaticModuleIndex:
+    """Get the StaticModuleIndex of a python file, cached by the file content hash."""
+    file_path = os.path.abspath(file_path)
+    with open(file_path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha1(data).hexdigest()
+    index = __index_cache__.get(file_path)
+    if index is None or index.digest != digest:
+        index = parse_module_index(file_path, data.decode("utf-8", errors="replace"), digest)
+        __index_cache__[file_path] = index
+    return index
+
+
+def discover_functions(file_path: str, func_pattern: str) -> Optional[List[StaticFunction]]:
+    """Find module level functions matching func_pattern without importing the file.
+
+    Args:
+        file_path: Path to the python file.
+        func_pattern: Exact, glob or regex pattern (see functions.match_name_pattern).
+
+    Returns:
+        List of StaticFunction sorted by name (as the import based discovery), or None if the file can not
+        be parsed or may create matching objects at import time (the caller
+        should fall back to the import based discovery).
+    """
+    try:
+        index = get_module_index(file_path)
+    except (SyntaxError, ValueError) as e:
+        info(f"Static discovery of {file_path} failed ({e}), fall back to import")
+        return None
+    if index.has_dynamic_code or match_name_pattern(index.dynamic_names, func_pattern):
+        info(f"Dynamic definitions found in {file_path}, fall back to import")
+        return None
+    matched = set(match_name_pattern([f.name for f in index.functions], func_pattern))
+    # a later definition overrides an earlier one with the same name
+    funcs = {}
+    for f in index.functions:
+        if f.name in matched:
+            funcs[f.name] = f
+    return sorted(funcs.values(), key=lambda f: f.name)
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""Streaming, bounded-memory capture of subprocess output."""
+
+import atexit
+import os
+import tempfile
+import threading
+from collections import deque
+from typing import Callable, List, Optional
+
+# spill files of this process, removed at exit
+__spill_files__ = set()
+
+
+@atexit.register
+def _remove_spill_files():
+    for path in list(__spill_files__):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    __spill_files__.clear()
+
+
+class StreamCapture:
+    """Capture a text stream line by line with bounded memory.
+
+    Output is kept in memory as is until it exceeds max_chars. After that the
+    capture switches to a frozen head plus a tail ring (each at most
+    max_chars/2) and all lines are written to a spill file on disk (or
+    dropped if there is none), so the memory used is independent of the
+    output size.
+    An optional compactor (with feed(line)/result()) gets every line as it
+    arrives, e.g. util.functions.PytestOutputCompactor, and so does the
+    optional on_line callback.
+    """
+
+    def __init__(self, name: str = "stdout", max_chars: int = 200000,
+                 spill_file: Optional[str] = None, max_line_chars: int = 8192,
+                 compactor=None, on_line: Optional[Callable[[str], None]] = None,
+                 unique_spill: bool = False):
+        """Initialize the capture.
+
+        Args:
+            name: Name of the captured stream.
+            max_chars: Max characters held in memory.
+            spill_file: File receiving the full output once max_chars is exceeded,
+                None to keep only the head and the tail.
+            max_line_chars: Longer lines are split into chunks of this size.
+            compactor: Optional incremental compactor fed with each line.
+            on_line: Optional callback called with each line, in the reader thread.
+            unique_spill: Create the spill file with a unique suffix (mkstemp) next to
+                spill_file, so captures sharing a name never write the same file.
+        """
+        self.name = name
+        self.max_chars = max_chars
+        self.spill_file = spill_file
+        self.max_line_chars = max_line_chars
+        self.compactor = compactor
+        self.on_line = on_line
+        self.unique_spill = unique_spill
+        self.truncated = False
+        self.lines = 0
+        self.chars = 0
+        self._buf: List[str] = []
+        self._head: List[str] = []
+        self._tail = deque()
+        self._tail_chars = 0
+        self._spill = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def spilled(self) -> bool:
+        return self._spill is not None
+
+    def _start_spill(self):
+        self.truncated = True
+        if self.spill_file:
+            spill_dir = os.path.dirname(self.spill_file)
+            if spill_dir and not os.path.exists(spill_dir):
+                os.makedirs(spill_dir)
+            if self.unique_spill:
+                stem, ext = os.path.splitext(os.path.basename(self.spill_file))
+                fd, self.spill_file = tempfile.mkstemp(prefix=stem + "_", suffix=ext, dir=spill_dir or None)
+                self._spill = os.fdopen(fd, "w", encoding="utf-8", errors="replace")
+            else:
+                self._spill = open(self.spill_file, "w", encoding="utf-8", errors="replace")
+            __spill_files__.add(self.spill_file)
+            self._spill.writelines(self._buf)
+        head_chars = 0
+        for line in self._buf:
+            if head_chars + len(line) > self.max_chars // 2:
+                break
+            self._head.append(line)
+            head_chars += len(line)
+        for line in self._buf[len(self._head):]:
+            self._append_tail(line)
+        self._buf = []
+
+    def _append_tail(self, line: str):
+        self._tail.append(line)
+        self._tail_chars += len(line)
+        while len(self._tail) > 1 and self._tail_chars > self.max_chars // 2:
+            self._tail_chars -= len(self._tail.popleft())
+
+    def feed(self, line: str):
+        """Add a line (with its line ending, if any) to the capture."""
+        if self.compactor is not None:
+            self.compactor.feed(line.rstrip("\r\n"))
+        if self.on_line is not None:
+            self.on_line(line)
+        with self._lock:
+            self.lines += 1
+            self.chars += len(line)
+            if self.truncated:
+                if self._spill is not None:
+                    self._spill.write(line)
+                self._append_tail(line)
+                return
+            self._buf.append(line)
+            if self.chars > self.max_chars:
+                self._start_spill()
+
+    def _read_loop(self, stream):
+        try:
+            for line in iter(lambda: stream.readline(self.max_line_chars), ""):
+                self.feed(line)
+        except (ValueError, OSError):
+            pass  # stream closed while the process is killed
+        finally:
+            self.close()
+
+    def start(self, stream) -> "StreamCapture":
+        """Start a daemon thread reading the stream until EOF."""
+        self._thread = threading.Thread(target=self._read_loop, args=(stream,),
+                                        name=f"capture-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the reader thread, return True if it has finished."""
+        if self._thread is None:
+            return True
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def close(self):
+        with self._lock:
+            if self._spill is not None and not self._spill.closed:
+                self._spill.close()
+
+    def remove_spill(self):
+        """Close and remove the spill file (the output is kept as head + tail)."""
+        self.close()
+        with self._lock:
+            if self._spill is None:
+                return
+            __spill_files__.discard(self.spill_file)
+            try:
+                os.remove(self.spill_file)
+            except OSError:
+                pass
+            self._spill = None
+
+    def tail(self, n: int = -1) -> List[str]:
+        """Get the last n buffered lines (all buffered tail lines if n <= 0)."""
+        with self._lock:
+            data = list(self._tail) if self.truncated else list(self._buf)
+        if n > 0:
+            data = data[-n:]
+        return data
+
+    def text(self) -> str:
+        """Get the captured text: complete if it fits in memory, else head + tail."""
+        with self._lock:
+            if not self.truncated:
+                return "".join(self._buf)
+            omitted = self.lines - len(self._head) - len(self._tail)
+            where = f", full output in {self.spill_file}" if self._spill is not None else ""
+            return "".join(self._head) + \
+                   f"\n...[{omitted} lines omitted{where}]...\n" + \
+                   "".join(self._tail)
+
+    def compacted(self) -> str:
+        """Get the result of the compactor, or text() if there is none."""
+        if self.compactor is None:
+            return self.text()
+        return self.compactor.result()
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""Fixed-memory streaming statistics: running totals, decayed rates and latency histograms."""
+
+import math
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class RunningStat:
+    """Exact count/total/mean/min/max of a value stream in O(1) memory."""
+
+    __slots__ = ("count", "total", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def as_dict(self) -> dict:
+        return {"count": self.count, "total": self.total, "mean": self.mean,
+                "min": self.min, "max": self.max}
+
+
+class DecayedRate:
+    """Exponentially weighted moving average of a value stream.
+
+    Args:
+        half_life: Number of samples after which the weight of a sample is halved.
+    """
+
+    __slots__ = ("alpha", "value", "count")
+
+    def __init__(self, half_life: float = 10):
+        self.alpha = 1.0 - math.pow(0.5, 1.0 / half_life)
+        self.value = 0.0
+        self.count = 0
+
+    def add(self, value: float):
+        if self.count == 0:
+            self.value = float(value)
+        else:
+            self.value += self.alpha * (value - self.value)
+        self.count += 1
+
+
+class LatencyHistogram:
+    """HDR-style histogram with logarithmic buckets and bounded relative error.
+
+    Each power of two between min_value and max_value is divided into
+    `sub_buckets` linear buckets, so memory is fixed and percentiles have a
+    relative error below 1/sub_buckets.
+    """
+
+    def __init__(self, min_value: float = 1e-4, max_value: float = 1e5, sub_buckets: int = 16):
+        self.min_value = min_value
+        self.max_value = max_value
+        self.sub_buckets = sub_buckets
+        self.octaves = int(math.ceil(math.log2(max_value / min_value)))
+        self.counts = [0] * (self.octaves * sub_buckets + 2)
+        self.stat = RunningStat()
+
+    def _index(self, value: float) -> int:
+        if value < self.min_value:
+            return 0
+        if value >= self.max_value:
+            return len(self.counts) - 1
+        mantissa, exponent = math.frexp(value / self.min_value)  # value/min = m * 2**e, 0.5 <= m < 1
+        sub = int((mantissa * 2 - 1) * self.sub_buckets)
+        return 1 + (exponent - 1) * self.sub_buckets + sub
+
+    def _value(self, index: int) -> float:
+        """Upper bound of the bucket at index."""
+        if index == 0:
+            return self.min_value
+        if index == len(self.counts) - 1:
+            return self.stat.max
+        octave, sub = divmod(index - 1, self.sub_buckets)
+        return self.min_value * math.ldexp(1 + (sub + 1) / self.sub_buckets, octave)
+
+    def add(self, value: float):
+        self.counts[self._index(value)] += 1
+        self.stat.add(value)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Get the value below which p percent (0-100) of the samples fall."""
+        if self.stat.count == 0:
+            return None
+        target = max(1, int(math.ceil(self.stat.count * p / 100.0)))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return min(self._value(i), self.stat.max)
+        return self.stat.max
+
+    def summary(self) -> dict:
+        return {"count": self.stat.count, "mean": self.stat.mean, "max": self.stat.max,
+                "p50": self.percentile(50), "p95": self.percentile(95), "p99": self.percentile(99)}
+
+
+class RecentKeySet:
+    """Set of the most recently seen keys, bounded by max_size (LRU eviction).
+
+    A key seen again is refreshed, so keys that keep arriving (e.g. messages
+    still in the conversation) are never evicted while newer ones are added.
+    """
+
+    def __init__(self, max_size: int = 20000):
+        self.max_size = max_size
+        self._keys = OrderedDict()
+
+    def seen(self, key: Hashable) -> bool:
+        """Return True if key was seen, and record it as the most recent key."""
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            return True
+        self._keys[key] = None
+        if len(self._keys) > self.max_size:
+            self._keys.popitem(last=False)
+        return False
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def clear(self):
+        self._keys.clear()
+
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""Size-aware compaction of tool outputs with spill-to-file handles."""
+
+import hashlib
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from ucagent.util.log import warning
+from ucagent.util.persist import make_private_dir
+from ucagent.util.stream_stats import LatencyHistogram
+
+
+HANDLE_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
+KEY_LINE_RE = re.compile(r"FAILED|ERROR|Error|Exception|Traceback|assert|failed")
+COUNT_RES = {
+    "passed": re.compile(r"(?<!\d)(\d+) passed"),
+    "failed": re.compile(r"(?<!\d)(\d+) failed"),
+    "errors": re.compile(r"(?<!\d)(\d+) errors?\b"),
+}
+
+
+class ToolOutputStore:
+    """Saves oversized tool outputs in a workspace directory, addressed by handle.
+
+    Args:
+        root_dir: Directory of the saved outputs (created on demand).
+        max_files: Number of outputs kept, the oldest ones are removed.
+    """
+
+    def __init__(self, root_dir: str, max_files: int = 200):
+        self.root_dir = root_dir
+        self.max_files = max_files
+        self._lock = threading.Lock()
+
+    def save(self, tool_name: str, text: str) -> str:
+        """Save text and return its handle (same text, same handle)."""
+        digest = hashlib.sha1(text.encode("utf-8", errors="replace")).hexdigest()[:12]
+        handle = f"{re.sub(r'[^A-Za-z0-9_]', '_', tool_name)}-{digest}"
+        path = os.path.join(self.root_dir, handle + ".txt")
+        with self._lock:
+            make_private_dir(self.root_dir)
+            if not os.path.exists(path):
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8", errors="replace") as f:
+                    f.write(text)
+                os.replace(tmp_path, path)
+                self._prune()
+            else:
+                os.utime(path)
+        return handle
+
+    def _prune(self):
+        files = [os.path.join(self.root_dir, f) for f in os.listdir(self.root_dir) if f.endswith(".txt")]
+        if len(files) <= self.max_files:
+            return
+        files.sort(key=os.path.getmtime)
+        for f in files[:len(files) - self.max_files]:
+            try:
+                os.remove(f)
+            except OSError as e:
+                warning(f"Failed to remove old tool output {f}: {e}")
+
+    def get_path(self, handle: str) -> Optional[str]:
+        """Get the file of a handle, None if the handle is invalid or expired."""
+        if not handle or not HANDLE_RE.match(handle):
+            return None
+        path = os.path.join(self.root_dir, handle + ".txt")
+        return path if os.path.isfile(path) else None
+
+    def read_lines(self, handle: str, start: int = 1, count: int = 200) -> Tuple[List[str], int]:
+        """Read count lines from line start (1-based) of a saved output.
+
+        Returns:
+            (lines, total_lines).
+
+        Raises:
+            KeyError: If the handle is not found.
+        """
+        path = self.get_path(handle)
+        if path is None:
+            raise KeyError(handle)
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            lines = f.read().splitlines()
+        start = max(1, start)
+        return lines[start - 1:start - 1 + count], len(lines)
+
+
+class ToolOutputCompactor:
+    """Replaces tool outputs larger than the tool budget with a structured digest.
+
+    Args:
+        store: ToolOutputStore for the full outputs.
+        default_budget: Max characters of an output kept in the message history.
+        budgets: Per tool budgets, 0 disables the compaction of that tool.
+        max_line_chars: Lines in the digest are cut to this length.
+    """
+
+    def __init__(self, store: ToolOutputStore, default_budget: int = 16384,
+                 budgets: Optional[Dict[str, int]] = None, max_line_chars: int = 400):
+        self.store = store
+        self.default_budget = default_budget
+        self.budgets = dict(budgets or {})
+        self.max_line_chars = max_line_chars
+        self.raw_sizes = LatencyHistogram(min_value=1, max_value=1e9)
+        self.count_compacted = 0
+
+    def get_budget(self, tool_name: str) -> int:
+        return self.budgets.get(tool_name, self.default_budget)
+
+    def compact(self, tool_name: str, text: str) -> str:
+        """Return text unchanged if it fits the budget of tool_name, else its digest."""
+        self.raw_sizes.add(len(text))
+        budget = self.get_budget(tool_name)
+        if budget <= 0 or len(text) <= budget:
+            return text
+        try:
+            handle = self.store.save(tool_name, text)
+        except OSError as e:
+            warning(f"Failed to save output of {tool_name}: {e}, keep it uncompacted")
+            return text
+        self.count_compacted += 1
+        return make_digest(tool_name, text, handle, budget, self.max_line_chars)
+
+    def get_statistics(self) -> dict:
+        return {"compacted": self.count_compacted, "raw_size": self.raw_sizes.summary()}
+
+
+def _cut(line: str, max_chars: int) -> str:
+    return line if len(line) <= max_chars else line[:max_chars] + f"...[{len(line) - max_chars} chars]"
+
+
+def make_digest(tool_name: str, text: str, handle: str, budget: int, max_line_chars: int = 400) -> str:
+    """Build the digest of an oversized output: counts, key lines, head and tail.
+
+    The digest is kept within budget characters (plus a small header).
+    """
+    lines = text.splitlines()
+    counts = {}
+    for k, r in COUNT_RES.items():
+        found = r.findall(text[-8192:])  # pytest like summary is at the end
+        if found:
+            counts[k] = int(found[-1])
+    header = [
+        "[TOOL_OUTPUT_COMPACTED]",
+        f"tool: {tool_name}",
+        f"size: {len(text)} chars, {len(lines)} lines",
+        f"handle: {handle}",
+        f"hint: output exceeds {budget} chars, the full output is saved. "
+        f"Use ReadToolOutput(handle='{handle}', start=<line>, count=<lines>) to page through it.",
+    ]
+    if counts:
+        header.append("counts: " + ", ".join(f"{k}={v}" for k, v in counts.items()))
+    # key lines, head and tail share the budget
+    key_budget, part_budget = budget // 5, budget * 2 // 5
+    key_lines, used = [], 0
+    for i, line in enumerate(lines):
+        if KEY_LINE_RE.search(line):
+            entry = f"{i + 1}: {_cut(line, max_line_chars)}"
+            used += len(entry) + 1
+            if used > key_budget:
+                key_lines.append("...")
+                break
+            key_lines.append(entry)
+    head, used = [], 0
+    for i, line in enumerate(lines):
+        entry = f"{i + 1}: {_cut(line, max_line_chars)}"
+        used += len(entry) + 1
+        if used > part_budget:
+            break
+        head.append(entry)
+    tail, used = [], 0
+    for i in range(len(lines) - 1, len(head) - 1, -1):
+        entry = f"{i + 1}: {_cut(lines[i], max_line_chars)}"
+        used += len(entry) + 1
+        if used > part_budget:
+            break
+        tail.append(entry)
+    tail.reverse()
+    ret = header
+    if key_lines:
+        ret += ["key lines:"] + key_lines
+    ret += ["head:"] + head
+    if tail:
+        ret += [f"...[{len(lines) - len(head) - len(tail)} lines omitted]...", "tail:"] + tail
+    return "\n".join(ret)
@@ -1,13 +1,20 @@
 # -*- coding: utf-8 -*-
 
-from .tools.context import ArbitContextSummary
+from .tools.context import ArbitContextSummary, ReadToolOutput
 from .util.config import get_config
-from .util.log import info, message, warning, error, msg_msg, get_log_logger
+from .util.log import info, message, warning, error, msg_msg, get_log_logger, get_log_file_path, read_log_lines
 from .util.functions import fmt_time_deta, fmt_time_stamp, get_template_path, render_template_dir, import_and_instance_tools
 from .util.functions import yam_str
 from .memory.long_term import LongTermMemoryStore
 from .util.functions import start_verify_mcps, create_verify_mcps, stop_verify_mcps, rm_workspace_prefix
 from .util.test_tools import ucagent_lib_path
+from .util.bootstrap import sync_dir
+from .util.tool_output import ToolOutputStore, ToolOutputCompactor
+from .util.persist import atomic_write_text, journal_append
+from .util.hook_daemon import start_hook_server
+from .util.proc_group import set_run_limits
+from .util.result_pages import ResultPageStore
+from .util.mcp_registry import reserve_port, take_reserved_socket, publish_endpoint, unpublish_endpoint
 
 import ucagent.tools
 from .tools import *
@@ -26,8 +33,6 @@ import copy
 from datetime import datetime
 
 from .abackend import get_backend
-from langfuse import Langfuse
-from langfuse.langchain import CallbackHandler
 from uuid import uuid4
 from typing import Any, Dict, List, Optional, OrderedDict
 import traceback
@@ -95,6 +100,8 @@ class VerifyAgent:
             no_write_targets (list, optional): List of files/directories that cannot be written to. Defaults to None.
             interaction_mode (str, optional): Interaction mode - 'standard', 'enhanced', or 'advanced'. Defaults to 'standard'.
         """
+        time_init_start = time.time()
+        self._startup_stats = OrderedDict()
         saved_info = {}
         if not no_history:
             saved_info = fc.load_ucagent_info(workspace)
@@ -142,6 +149,10 @@ class VerifyAgent:
         )
         self.workspace = os.path.abspath(workspace)
         self.output_dir = os.path.join(self.workspace, output)
+        # IDE hooks (--hook-message) query the status from this server instead of the status file
+        self.hook_server = None
+        if self.cfg.get_value("hook_daemon.enable", False):
+            self.hook_server = start_hook_server(self.workspace, saved_info)
         self.long_term_memory = None
         if self.enable_long_term_memory:
             self.long_term_memory = LongTermMemoryStore(
@@ -151,9 +162,11 @@ class VerifyAgent:
                 embed_config=self.cfg.embed.as_dict() if hasattr(self.cfg, "embed") else None,
             )
             info(f"[long_term_memory] enabled at {self.long_term_memory.path}")
-        # copy doc/Guide_Doc to workspace
+        # copy doc/Guide_Doc to workspace, unchanged files are skipped on restart by the manifest
         guide_doc_path = os.path.join(self.workspace, "Guide_Doc")
-        if not os.path.exists(guide_doc_path):
+        guide_doc_manifest = os.path.join(self.workspace, ".ucagent_bootstrap.json")
+        self.guide_doc_copy_mode = self.cfg.get_value("bootstrap.guide_doc_copy_mode", "auto")
+        if not os.path.exists(guide_doc_path) or os.path.exists(guide_doc_manifest):
             doc_guide_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lang", self.cfg.lang, "doc", "Guide_Doc")
             doc_files_to_append = []
             if len(guid_doc_path) > 0:
@@ -169,9 +182,9 @@ class VerifyAgent:
                         continue
                     assert False, f"Specified guid_doc_path {gfile} is not a valid file or directory"
                 assert os.path.exists(doc_guide_path), f"Specified guid_doc_path {doc_guide_path} does not exist"
-            shutil.copytree(doc_guide_path, guide_doc_path)
-            for f in doc_files_to_append:
-                shutil.copy(f, guide_doc_path)
+            self._startup_stats["guide_doc"] = sync_dir(doc_guide_path, guide_doc_path, guide_doc_manifest,
+                                                        extra_files=doc_files_to_append,
+                                                        mode=self.guide_doc_copy_mode)
         self.thread_id = thread_id if thread_id is not None else random.randint(100000, 999999)
         self.dut_name = dut_name
         self.seed = seed if seed is not None else random.randint(1, 999999)
@@ -188,12 +201,24 @@ class VerifyAgent:
             self.tool_read_text,
             RoleInfo(self._default_system_prompt)
         ]
+        self.tool_output_compactor = None
+        tool_output_cfg = self.cfg.get_value("tool_output", None)
+        if tool_output_cfg is not None and tool_output_cfg.get_value("enable", True):
+            budgets = tool_output_cfg.get_value("budgets", None)
+            self.tool_output_compactor = ToolOutputCompactor(
+                ToolOutputStore(os.path.join(self.workspace, tool_output_cfg.get_value("spill_dir", ".ucagent_tool_outputs")),
+                                tool_output_cfg.get_value("max_files", 200)),
+                default_budget=tool_output_cfg.get_value("default_budget", 16384),
+                budgets=budgets.as_dict() if budgets is not None else {},
+            )
+            self.tool_list_base.append(ReadToolOutput().bind(self.tool_output_compactor.store))
         if not no_embed_tools:
             self.tool_reference = SemanticSearchInGuidDoc(
                 self.cfg.embed,
                 workspace=self.workspace,
                 doc_path="Guide_Doc",
                 rerank_enabled=self.enable_rerank,
+                index_config=self.cfg.get_value("doc_index", {}),
             )
             self.tool_memory_put = MemoryPut().set_store(self.cfg.embed)
             self.tool_memory_get = MemoryGet().set_store(store=self.tool_memory_put.get_store())
@@ -210,7 +235,13 @@ class VerifyAgent:
                 assert abs_f.startswith(os.path.abspath(self.workspace)), \
                     f"Specified no-write target {abs_f} must be under the workspace {self.workspace}"
                 self.cfg.un_write_dirs.append(rm_workspace_prefix(self.workspace, abs_f))
-        self.cwd_read_only_files = fc.chmode_ro(self.workspace, self.cfg.get_value("un_write_dirs", []))
+        set_run_limits(self.cfg.get_value("run_limits", {}))
+        time_chmode = time.time()
+        # hardlinked files share their mode with the link source (Guide_Doc source, DUT cache entry)
+        skip_links = "hardlink" in (self.guide_doc_copy_mode, self.cfg.get_value("dut_cache.copy_mode", "auto"))
+        self.cwd_read_only_files = fc.chmode_ro(self.workspace, self.cfg.get_value("un_write_dirs", []),
+                                                skip_links=skip_links)
+        self._startup_stats["chmode_ro"] = round(time.time() - time_chmode, 4)
         self.tool_list_file = [
                            # Directory and file listing tools
                            PathList(self.workspace),
@@ -311,6 +342,10 @@ class VerifyAgent:
                 warning("Context management tools are enabled but no message management node is available.")
         self.test_tools = fc.get_tools_from_cfg(self.tool_list_base + self.tool_list_file + self.tool_list_task + self.tool_list_ext + self.planning_tools + self.context_tools,
                                                 self.cfg.tools.as_dict())
+        if self.tool_output_compactor is not None:
+            for tool in self.test_tools:
+                if isinstance(tool, UCTool):
+                    tool.set_output_compactor(self.tool_output_compactor)
         self.pdb = VerifyPDB(self, init_cmd=init_cmd)
         self.backend.init()
         self.backend.set_debug(debug)
@@ -321,6 +356,8 @@ class VerifyAgent:
         langfuse_cfg = self.cfg.get_value("langfuse", {})
         self.langfuse_enable = langfuse_cfg.get_value("enable", False) is True
         if self.langfuse_enable:
+            from langfuse import Langfuse
+            from langfuse.langchain import CallbackHandler
             public_key = langfuse_cfg.get_value("public_key", "")
             secret_key = langfuse_cfg.get_value("secret_key", "")
             base_url = langfuse_cfg.get_value("base_url", "")
@@ -331,6 +368,8 @@ class VerifyAgent:
             )
             assert self.langfuse.auth_check(), "Can't connect to langfuse, please check your configuration"
             self.langfuse_handler = CallbackHandler()
+        self._startup_stats["init_time"] = round(time.time() - time_init_start, 4)
+        info(f"Verify Agent initialized in {self._startup_stats['init_time']} seconds: {dict(self._startup_stats)}")
 
     def get_messages_cfg(self, keys: Optional[List[str]] = None) -> Dict[str, Any]:
         if self.message_manage_node is None:
@@ -408,10 +447,30 @@ class VerifyAgent:
         self.cfg.update_template({
             "TOOLS": ", ".join([t.name for t in tools]),
         })
-        self._mcps, glogger = create_verify_mcps(tools, host=host, port=port, logger=self._mcps_logger)
+        pager = None
+        paging_cfg = self.cfg.get_value("mcp_server.result_paging", None)
+        if paging_cfg is not None and paging_cfg.get_value("enable", False):
+            pager = ResultPageStore(os.path.join(self.workspace, paging_cfg.get_value("spill_dir", ".ucagent_mcp_results")),
+                                    page_chars=paging_cfg.get_value("page_chars", 32768),
+                                    max_results=paging_cfg.get_value("max_results", 32),
+                                    ttl=paging_cfg.get_value("ttl_seconds", 900))
+            # MCP clients get the full result page by page instead of the digest made for the LLM context
+            for tool in tools:
+                if isinstance(tool, UCTool):
+                    tool.set_output_compactor(None)
+        if port == 0:
+            port = reserve_port(host)
+        sock = take_reserved_socket(port, host)
+        self._mcps, glogger = create_verify_mcps(tools, host=host, port=port, logger=self._mcps_logger, pager=pager)
         info("Init Prompt:\n" + self.cfg.mcp_server.init_prompt)
-        start_verify_mcps(self._mcps, glogger)
+        publish_endpoint(self.workspace, host, port, no_file_ops=no_file_ops)
+        try:
+            start_verify_mcps(self._mcps, glogger, sockets=[sock] if sock is not None else None)
+        finally:
+            unpublish_endpoint(self.workspace)
         self._mcps = None
+        if pager is not None:
+            pager.close()
 
     def stop_mcps(self):
         """Stop the MCPs server if it is running."""
@@ -516,6 +575,7 @@ class VerifyAgent:
         return {
             "version": self.__version__,
             "seed": self.seed,
+            "startup": dict(self._startup_stats),
         }
 
     def is_exit(self):
@@ -633,6 +693,8 @@ class VerifyAgent:
         logger = get_log_logger()
         if not logger:
             return None
+        if get_log_file_path(logger.name):
+            return get_log_file_path(logger.name)
         for handler in logger.handlers:
             base_filename = getattr(handler, "baseFilename", None)
             if base_filename:
@@ -683,7 +745,7 @@ class VerifyAgent:
         if not log_path or not os.path.isfile(log_path):
             return 0, 0, 0
         try:
-            lines = open(log_path, "r", encoding="utf-8", errors="ignore").read().splitlines()
+            lines = list(read_log_lines(log_path))
         except Exception:
             return 0, 0, 0
 
@@ -828,6 +890,7 @@ class VerifyAgent:
 
     def _append_res_csv(self, elapsed_seconds: float, token_in: int, token_out: int, replace_last: bool = False):
         import csv
+        import io
         base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
         res_path = os.path.join(base_dir, "res.csv")
         model_label = "improved" if self._context_upgrade_enabled() else "origin"
@@ -836,6 +899,9 @@ class VerifyAgent:
         token_in_str = self._format_tokens_short(int(token_in)) if isinstance(token_in, (int, float)) else "N/A"
         token_out_str = self._format_tokens_short(int(token_out)) if isinstance(token_out, (int, float)) else "N/A"
         row = [model_label, dut, time_str, token_in_str, token_out_str]
+        buf = io.StringIO()
+        csv.writer(buf, lineterminator="\n").writerow(row)
+        row_line = buf.getvalue()
         if replace_last and os.path.exists(res_path):
             with open(res_path, "r", encoding="utf-8") as f:
                 lines = f.readlines()
@@ -848,16 +914,10 @@ class VerifyAgent:
                 if last_idx is not None and last_idx > 0:
                     last_row = next(csv.reader([lines[last_idx].strip()]))
                     if len(last_row) >= 2 and last_row[0] == model_label and last_row[1] == dut:
-                        lines[last_idx] = ",".join(row) + "\n"
-                        with open(res_path, "w", encoding="utf-8", newline="") as f:
-                            f.writelines(lines)
+                        lines[last_idx] = row_line
+                        atomic_write_text(res_path, "".join(lines))
                         return
-        needs_header = not os.path.exists(res_path)
-        with open(res_path, "a", encoding="utf-8", newline="") as f:
-            writer = csv.writer(f)
-            if needs_header:
-                writer.writerow(["Model", "DUT", "time", "token_in", "token_out"])
-            writer.writerow(row)
+        journal_append(res_path, [row_line], header="Model,DUT,time,token_in,token_out")
 
     def one_loop(self, msg=None):
         """Enhanced one loop with intelligent interaction logic based on configured mode"""
@@ -1032,12 +1092,17 @@ class VerifyAgent:
         msg_info = self.message_info()
         msg_c, msg_s = msg_info.get("count", "-"), msg_info.get("size", "-")
         msg_stat = self.backend.get_statistics()
+        tool_size = msg_stat.get("tool_size", {})
+        prompt_cache = msg_stat.get("prompt_cache", {})
         stats= OrderedDict({
                "UCAgent": self.__version__, "LLM": self.backend.model_name(), "Temperature": self.backend.temperature(), "Stream": self.stream_output, "Seed": self.seed,
                "SummaryMode": self.summary_mode(), "MessageCount": msg_c, "MessageSize": msg_s, "Interaction Mode": self.interaction_mode,
                "AI-Message": self.backend._stat_msg_count_ai, "Tool-Message": self.backend._stat_msg_count_tool, "Sys-Message": self.backend._stat_msg_count_system,
                "MsgIn(bytes)": msg_stat["message_in"], "MsgOut(bytes)": msg_stat["message_out"],
-               "Start Time": fmt_time_stamp(self._time_start), "Run Time": fmt_time_deta(self.stage_manager.get_time_cost()),
+               "ToolMsg(p50/p95/max)": "/".join("-" if tool_size.get(k) is None else str(int(tool_size[k])) for k in ("p50", "p95", "max")),
+               "ToolOut-Compacted": self.tool_output_compactor.count_compacted if self.tool_output_compactor else "-",
+               "PromptCache(cached/total)": "%s/%s" % (prompt_cache.get("cached_tokens", "-"), prompt_cache.get("prompt_tokens", "-")),
+               "Start Time": fmt_time_stamp(self._time_start), "Startup(s)": self._startup_stats.get("init_time", "-"), "Run Time": fmt_time_deta(self.stage_manager.get_time_cost()),
               f"Token Reception({self.backend.token_total()})/TPS": self.backend.token_speed()})
         return stats
 